@@ -34,7 +34,7 @@ DEFAULT_NUM_SLOTS = 10  # Number of tee time slots booked
 DB_PATH = "data/golf_swindle.db"
 
 # WhatsApp Settings
-MAX_MESSAGES = 200  # Number of recent messages to check in WhatsApp group
+MAX_MESSAGES = 200  # Number of recent messages to check in WhatsApp group (everything since "taking names" is always kept)
 MAIN_GROUP_CHECK_MINUTES = 10  # How often to check the main swindle group (minutes) - snapshot comparison makes idle checks free
 ADMIN_GROUP_CHECK_SECONDS = 60  # How often to check the admin group (seconds)
 ADMIN_BURST_DURATION_SECONDS = 180  # After a command, check admin group rapidly for this long (seconds)
@@ -42,3 +42,33 @@ ADMIN_BURST_CHECK_SECONDS = 5  # During burst mode, check every N seconds
 
 # Chrome Settings
 CHROME_RESTART_HOURS = 24  # Restart Chrome session every N hours
+
+# AI Analysis Settings
+FULL_ANALYSIS_EVERY = 6  # Run a full re-analysis after this many incremental updates (consistency check)
+INCREMENTAL_MAX_MESSAGES = 40  # More new messages than this since the last analysis triggers a full re-analysis
+ANALYSIS_CHUNK_MESSAGES = 120  # Longer signup windows are split into chunks of this many messages, analysed in parallel
+ANALYSIS_CHUNK_WORKERS = 4  # Chunk analyses run at once
+AI_TIMEOUT_SECONDS = 60  # Deadline for one main group analysis call (seconds)
+AI_COMMAND_TIMEOUT_SECONDS = 15  # Deadline for one admin command parse call (seconds)
+AI_MAX_RETRIES = 2  # Retries (with jittered backoff) for timeouts, overload and rate limits
+AI_BREAKER_THRESHOLD = 5  # Consecutive failed calls before the AI circuit breaker opens
+AI_BREAKER_RESET_SECONDS = 300  # How long the breaker stays open before a trial call
+AI_MAX_CONNECTIONS = 10  # Keep-alive connections in the shared Anthropic client pool (all AI callers share it)
+AI_KEEPALIVE_SECONDS = 300  # How long an idle pooled connection is kept open
+AI_PREWARM_IDLE_SECONDS = 240  # Re-open a warm connection before a main group check if the API has been idle this long
+WEEKLY_AI_BUDGET_USD = 3.0  # AI spend per week (Mon-Sun) before the bot starts saving - 0 = no budget, just record usage
+BUDGET_SLOW_AT = 0.6  # Share of the budget spent before the main group is checked less often (and shadow runs pause)
+BUDGET_LOCAL_COMMANDS_AT = 0.8  # ... before admin commands are only understood by the built-in rules
+BUDGET_FAST_ONLY_AT = 0.9  # ... before main group analysis uses the cheaper model only
+BUDGET_SLOW_FACTOR = 3  # How much longer the main group check interval gets once saving starts
+ANALYSIS_WAIT_SECONDS = 120  # How long Show list / scheduled updates wait for the background analysis to finish
+AI_CASCADE = True  # Analyse with Haiku first and escalate to Sonnet only when its result fails the sanity checks
+CASCADE_MAX_CHANGE_RATIO = 0.3  # Escalate if the cheap model's list changes more than this fraction of the current list
+TRANSCRIPT_COMPACTION = True  # Strip quoted replies, phone lines and emoji noise and merge short bursts before analysis
+LOCAL_CLASSIFIER = True  # Apply simple, confidently classified new messages ("please mate", "can't make it") without an AI call
+LOCAL_CLASSIFIER_THRESHOLD = 0.9  # Minimum classifier confidence for handling a message locally
+SHADOW_SAMPLE_RATE = 0.0  # Fraction of full analyses also run on SHADOW_MODEL in the background and compared (0 = off)
+SHADOW_MODEL = "claude-haiku-4-5-20251001"  # Candidate model for shadow runs - never changes the participant list
+SHADOW_PROMPT_FILE = None  # Optional path to a candidate system prompt for shadow runs (None = live prompt)
+VOTE_SIGNUPS = True  # Read poll votes and reactions on the "taking names" post as signups (no AI call needed)
+SIGNUP_REACTIONS = ["👍", "✅", "⛳", "🏌️", "🙋"]  # Reactions on the "taking names" post that count as "I'm in"
@@ -14,11 +14,7 @@ db = Database("golf_swindle.db")
 config = Config()
 generator = TeeSheetGenerator(config)
 
-# Clear existing participants first
-db.clear_participants()
-print("\n✅ Cleared existing participants\n")
-
-# Add test participants
+# Add test participants (replacing any existing ones - one transaction, statuses recalculated once)
 # Include all the players from our constraints plus some others
 test_participants = [
     # Constraint players (all 6 people from the 3 pairs)
@@ -43,7 +39,10 @@ test_participants = [
 ]
 
 print("Adding participants...")
-db.update_participants(test_participants)
+with db.batch() as outcome:
+    db.clear_participants()
+    db.update_participants(test_participants)
+print(f"✅ Replaced existing participants ({len(outcome['demoted'])} on reserves)\n")
 for p in test_participants:
     guest_info = f" (+ guest: {', '.join(p['guests'])})" if p['guests'] else ""
     pref_info = f" - {p['preferences']}" if p['preferences'] else ""
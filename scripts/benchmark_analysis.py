@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Offline benchmark for the main group analysis - replays recorded weeks through AIAnalyzer.
+
+Each week in the manifest (tests/fixtures/analysis_benchmark.json) is a transcript in the
+fresh_messages.txt format plus hand-labelled expectations. Every week is run through
+AIAnalyzer.analyze_messages once per variant (model / cascade / compaction), and the report
+shows player-list accuracy, prompt tokens, output tokens, latency and cost per variant.
+
+The Anthropic client is pluggable:
+  replay  recorded responses from tests/fixtures/analysis_recordings.json - no network,
+          deterministic (default). A prompt change is a cache miss: re-record it live.
+  live    real API calls (ANTHROPIC_API_KEY). Add --record to save the responses for replay.
+  echo    answers with the labelled expectation - no model at all. Accuracy is meaningless,
+          but prompt tokens are real, so it catches prompt/compaction size regressions.
+
+To compare prompt versions, run on each git revision with --output and diff the JSON.
+
+Usage: python scripts/benchmark_analysis.py [--mode replay|live|echo] [--record]
+                                            [--variants sonnet,haiku,...] [--output results.json]
+"""
+
+import sys, os, json, time, hashlib, argparse, contextlib, io
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AIAnalyzer, Config, parse_recorded_transcript, estimate_tokens
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+MANIFEST_PATH = os.path.join(ROOT, 'tests', 'fixtures', 'analysis_benchmark.json')
+RECORDINGS_PATH = os.path.join(ROOT, 'tests', 'fixtures', 'analysis_recordings.json')
+
+# name -> (analysis model, cascade on?, compaction on?)
+VARIANTS = {
+    'sonnet': {'model': AIAnalyzer.ANALYSIS_MODEL, 'cascade': False, 'compaction': True},
+    'haiku': {'model': AIAnalyzer.FAST_MODEL, 'cascade': False, 'compaction': True},
+    'cascade': {'model': AIAnalyzer.ANALYSIS_MODEL, 'cascade': True, 'compaction': True},
+    'sonnet-raw': {'model': AIAnalyzer.ANALYSIS_MODEL, 'cascade': False, 'compaction': False},
+}
+
+
+def _plain(block):
+    """Content block (SDK object, replayed namespace or dict) -> the fields that matter for a request key"""
+    if isinstance(block, dict):
+        fields = block
+    elif hasattr(block, 'model_dump'):
+        fields = block.model_dump()
+    else:
+        fields = vars(block)
+    return {k: fields[k] for k in ('type', 'id', 'name', 'input', 'text', 'tool_use_id', 'is_error', 'content')
+            if k in fields}
+
+
+def _response(content: list, usage: dict):
+    blocks = [SimpleNamespace(**block) for block in content]
+    return SimpleNamespace(content=blocks, usage=SimpleNamespace(**usage), stop_reason='tool_use')
+
+
+class RecordedClient:
+    """Stands in for anthropic.Anthropic: replays recorded responses keyed by request content.
+
+    With a live client, misses (or every call, if refresh=True) go to the real API and the
+    response, usage and latency are kept so save() can write them out for later replays."""
+
+    def __init__(self, path: str, live=None, refresh: bool = False):
+        self.path = path
+        self.live = live
+        self.refresh = refresh
+        self.recordings = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.recordings = json.load(f)
+        self.messages = self  # client.messages.create(...)
+        self.seconds = 0.0
+        self.calls = 0
+
+    @staticmethod
+    def request_key(kwargs: dict) -> str:
+        messages = [{'role': m['role'], 'content': m['content'] if isinstance(m['content'], str)
+                     else [_plain(b) for b in m['content']]} for m in kwargs.get('messages', [])]
+        payload = [kwargs.get('model'), kwargs.get('system'), kwargs.get('tools'), messages]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def create(self, timeout=None, **kwargs):
+        key = self.request_key(kwargs)
+        if self.live and (self.refresh or key not in self.recordings):
+            started = time.time()
+            response = self.live.messages.create(timeout=timeout, **kwargs)
+            self.recordings[key] = {
+                'model': kwargs.get('model'),
+                'content': [_plain(b) for b in response.content],
+                'usage': {'input_tokens': response.usage.input_tokens, 'output_tokens': response.usage.output_tokens},
+                'seconds': round(time.time() - started, 3),
+            }
+        elif key not in self.recordings:
+            raise LookupError(f"no recorded response for this {kwargs.get('model')} request - "
+                              f"run with --mode live --record to capture it")
+        recorded = self.recordings[key]
+        self.calls += 1
+        self.seconds += recorded['seconds']
+        return _response(recorded['content'], recorded['usage'])
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.recordings, f, indent=1, sort_keys=True)
+
+
+class ExpectedClient:
+    """Answers record_signups with the week's labelled expectation - measures the prompt side only"""
+
+    def __init__(self, expected: dict):
+        self.expected = expected
+        self.messages = self
+        self.seconds = 0.0
+        self.calls = 0
+
+    def create(self, timeout=None, **kwargs):
+        tool = kwargs['tools'][0]['name']
+        if tool != 'record_signups':
+            raise LookupError(f"echo client only answers record_signups, not {tool}")
+        prefs = self.expected.get('preferences', {})
+        names = self.expected['order'] + self.expected.get('also_playing', [])
+        players = [{'name': n, 'status': 'playing', 'guests': [], 'preferences': prefs.get(n)} for n in names]
+        answer = {'players': players, 'pairings': self.expected.get('pairings', []), 'total_count': len(players)}
+        prompt = kwargs['system'] + ''.join(m['content'] for m in kwargs['messages'] if isinstance(m['content'], str))
+        self.calls += 1
+        return _response([{'type': 'tool_use', 'id': 'toolu_echo', 'name': tool, 'input': answer}],
+                         {'input_tokens': estimate_tokens(prompt), 'output_tokens': estimate_tokens(json.dumps(answer))})
+
+
+def _norm(name: str) -> str:
+    return ' '.join(name.lower().split())
+
+
+def score_result(result: dict, expected: dict) -> dict:
+    """Player-list accuracy against labelled expectations (each component 0.0 - 1.0).
+
+    found:    expected players present        excluded: non-players absent
+    order:    consecutive expected players in the right relative order
+    prefs:    expected preference keyword in the player's preferences
+    pairings: expected MP pairs present       accuracy: mean of the above"""
+    if not result:
+        return {'found': 0.0, 'excluded': 0.0, 'order': 0.0, 'prefs': 0.0, 'pairings': 0.0, 'accuracy': 0.0}
+
+    players = [p for p in result.get('players', []) if p.get('status', 'playing') == 'playing']
+    position = {}
+    for i, p in enumerate(players):
+        position.setdefault(_norm(p['name']), i)
+    prefs = {_norm(p['name']): (p.get('preferences') or '').lower() for p in players}
+    pairs = {frozenset(_norm(n) for n in pair) for pair in result.get('pairings', [])}
+
+    wanted = expected['order'] + expected.get('also_playing', [])
+    scores = {
+        'found': sum(_norm(n) in position for n in wanted) / len(wanted),
+        'excluded': (sum(_norm(n) not in position for n in expected['not_playing']) / len(expected['not_playing'])
+                     if expected.get('not_playing') else 1.0),
+    }
+    present = [position[_norm(n)] for n in expected['order'] if _norm(n) in position]
+    scores['order'] = (sum(a < b for a, b in zip(present, present[1:])) / (len(present) - 1)
+                       if len(present) > 1 else 0.0)
+    wanted_prefs = expected.get('preferences', {})
+    scores['prefs'] = (sum(word.lower() in prefs.get(_norm(n), '') for n, word in wanted_prefs.items()) / len(wanted_prefs)
+                       if wanted_prefs else 1.0)
+    wanted_pairs = expected.get('pairings', [])
+    scores['pairings'] = (sum(frozenset(_norm(n) for n in pair) in pairs for pair in wanted_pairs) / len(wanted_pairs)
+                          if wanted_pairs else 1.0)
+    scores['accuracy'] = sum(scores.values()) / len(scores)
+    return scores
+
+
+@contextlib.contextmanager
+def _variant_config(variant: dict):
+    saved = (Config.AI_CASCADE, Config.TRANSCRIPT_COMPACTION)
+    Config.AI_CASCADE, Config.TRANSCRIPT_COMPACTION = variant['cascade'], variant['compaction']
+    try:
+        yield
+    finally:
+        Config.AI_CASCADE, Config.TRANSCRIPT_COMPACTION = saved
+
+
+def run_variant(variant: dict, messages: list, client, verbose: bool = False) -> tuple:
+    """One analysis of one week under one variant -> (result or None, metrics)"""
+    ai = AIAnalyzer(None)  # No db - the persistent cache would hide the model's behaviour
+    ai.client = ai.gateway.client = client
+    ai.ANALYSIS_MODEL = variant['model']
+    calls_before, seconds_before = client.calls, client.seconds
+    log = io.StringIO()
+    with _variant_config(variant), contextlib.redirect_stdout(sys.stdout if verbose else log):
+        result = ai.analyze_messages(messages)
+    return result, {
+        'calls': client.calls - calls_before,
+        'input_tokens': sum(t['input_tokens'] for t in ai.tier_stats.values()),
+        'output_tokens': sum(t['output_tokens'] for t in ai.tier_stats.values()),
+        'seconds': client.seconds - seconds_before,
+        'cost': sum(t['cost'] for t in ai.tier_stats.values()),
+        'escalated': bool(ai.cascade_stats['escalations']),
+        'error': None if result else (log.getvalue().strip().splitlines() or ['no result'])[-1].replace('❌ ', ''),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main group analysis on recorded weeks")
+    parser.add_argument('--mode', choices=['replay', 'live', 'echo'], default='replay')
+    parser.add_argument('--record', action='store_true', help="live mode: save responses for replay")
+    parser.add_argument('--variants', default=','.join(VARIANTS), help="comma-separated: " + ', '.join(VARIANTS))
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--recordings', default=RECORDINGS_PATH)
+    parser.add_argument('--output', help="write per-week results as JSON")
+    parser.add_argument('--verbose', action='store_true', help="show the analyzer's own output")
+    args = parser.parse_args()
+
+    names = [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = [n for n in names if n not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variant(s): {', '.join(unknown)}")
+
+    with open(args.manifest) as f:
+        weeks = json.load(f)['weeks']
+
+    shared = None
+    if args.mode != 'echo':
+        live = None
+        if args.mode == 'live':
+            import anthropic
+            live = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY, max_retries=0)
+        shared = RecordedClient(args.recordings, live=live, refresh=args.mode == 'live')
+
+    print("="*70)
+    print(f" ANALYSIS BENCHMARK ({args.mode})")
+    print("="*70)
+
+    rows = []
+    for week in weeks:
+        with open(os.path.join(ROOT, week['transcript'])) as f:
+            messages = parse_recorded_transcript(f.read())
+        print(f"\n📅 {week['name']}: {len(messages)} messages from {week['transcript']}")
+        for name in names:
+            client = shared or ExpectedClient(week['expected'])
+            result, metrics = run_variant(VARIANTS[name], messages, client, args.verbose)
+            scores = score_result(result, week['expected'])
+            rows.append({'week': week['name'], 'variant': name, **scores, **metrics})
+            status = f"❌ {metrics['error']}" if metrics['error'] else f"{scores['accuracy']:.0%}"
+            print(f"   {name:<12} {status}")
+
+    print(f"\n{'Variant':<13}{'accuracy':>9}{'found':>7}{'excl':>6}{'order':>7}{'prefs':>7}{'pairs':>7}"
+          f"{'in tok':>8}{'out tok':>8}{'sec':>7}{'cost':>9}")
+    for name in names:
+        runs = [r for r in rows if r['variant'] == name]
+        mean = lambda k: sum(r[k] for r in runs) / len(runs)
+        total = lambda k: sum(r[k] for r in runs)
+        print(f"{name:<13}{mean('accuracy'):>9.0%}{mean('found'):>7.0%}{mean('excluded'):>6.0%}{mean('order'):>7.0%}"
+              f"{mean('prefs'):>7.0%}{mean('pairings'):>7.0%}{total('input_tokens'):>8}{total('output_tokens'):>8}"
+              f"{total('seconds'):>7.1f}{total('cost'):>9.4f}")
+        escalated = sum(r['escalated'] for r in runs)
+        if VARIANTS[name]['cascade']:
+            print(f"{'':<13}escalated {escalated}/{len(runs)} week(s)")
+
+    if args.mode == 'echo':
+        print("\n⚠️  echo mode: accuracy is the labels scored against themselves - only the token counts are real")
+    if args.record and shared:
+        shared.save()
+        print(f"\n💾 Saved {len(shared.recordings)} recorded response(s) to {args.recordings}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+    print("="*70)
+
+
+if __name__ == '__main__':
+    main()
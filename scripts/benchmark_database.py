@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for Database - common operations with per-call connections vs persistent ones.
+
+"before" is the old connection handling (a fresh rollback-journal connection opened and closed
+for every Database call, several per call for methods like add_player_manually). "after" is the
+current one (one long-lived WAL connection per thread, synchronous=NORMAL, cached statements).
+Both run the same Database methods on a temporary database seeded with --players players.
+
+Usage: python scripts/benchmark_database.py [--iterations 200] [--players 24] [--threads 4]
+"""
+
+import sys, os, time, sqlite3, tempfile, threading, argparse, contextlib, io
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database, _ThreadConnection, _ConnectionHandle
+
+
+class _PerCallConnection(_ThreadConnection):
+    def release(self):
+        super().release()
+        self.conn.close()
+
+
+class PerCallDatabase(Database):
+    """The connection handling before persistent connections: connect, run, close - every call"""
+
+    def _open(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)  # Default rollback journal, synchronous=FULL
+
+    def _connect(self) -> _ConnectionHandle:
+        return _ConnectionHandle(_PerCallConnection(self._open()))
+
+
+def seeded(cls, path: str, players: int) -> Database:
+    db = cls(path)
+    for i in range(players):
+        db.add_player_manually(f"Player {i:02d}")
+    db.save_cached_analysis('bench-key', 'analysis', 'model', {'players': []}, None)
+    return db
+
+
+def timed(fn, iterations: int) -> float:
+    """Mean seconds per call"""
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - started) / iterations
+
+
+def concurrent_writes(db: Database, threads: int, per_thread: int) -> tuple:
+    """Writers on `threads` threads plus one reader; returns (seconds, errors)"""
+    errors = []
+    stop = threading.Event()
+
+    def write(t):
+        for i in range(per_thread):
+            try:
+                db.add_player_manually(f"Thread {t} #{i}")
+                db.remove_player_manually(f"Thread {t} #{i}")
+            except Exception as e:
+                errors.append(e)
+
+    def read():
+        while not stop.is_set():
+            try:
+                db.get_participants()
+            except Exception as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=read)
+    writers = [threading.Thread(target=write, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    reader.start()
+    for w in writers:
+        w.start()
+    for w in writers:
+        w.join()
+    seconds = time.perf_counter() - started
+    stop.set()
+    reader.join()
+    return seconds, len(errors)
+
+
+OPERATIONS = [
+    ("get_participants", lambda db, i: db.get_participants()),
+    ("add + remove player", lambda db, i: (db.add_player_manually(f"Bench {i}"), db.remove_player_manually(f"Bench {i}"))),
+    ("recalculate_statuses", lambda db, i: db.recalculate_statuses()),
+    ("analysis cache hit", lambda db, i: db.get_cached_analysis('bench-key')),
+    ("save_snapshot", lambda db, i: db.save_snapshot([{'sender': 'Wes', 'text': f"Please {i}", 'timestamp': ''}])),
+    ("generate_tee_times", lambda db, i: db.generate_tee_times()),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Database operations before/after persistent connections")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--players', type=int, default=24)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    print("="*70)
+    print(" DATABASE BENCHMARK")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):  # Reserve promotion prints etc.
+            before = seeded(PerCallDatabase, os.path.join(tmp, 'before.db'), args.players)
+            after = seeded(Database, os.path.join(tmp, 'after.db'), args.players)
+
+        print(f"\n{'Operation':<24}{'before':>12}{'after':>12}{'speedup':>10}")
+        for name, op in OPERATIONS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                old = timed(lambda i: op(before, i), args.iterations)
+                new = timed(lambda i: op(after, i), args.iterations)
+            print(f"{name:<24}{old * 1e6:>10.0f}µs{new * 1e6:>10.0f}µs{old / new:>9.1f}x")
+
+        per_thread = max(1, args.iterations // args.threads)
+        with contextlib.redirect_stdout(io.StringIO()):
+            old, old_errors = concurrent_writes(before, args.threads, per_thread)
+            new, new_errors = concurrent_writes(after, args.threads, per_thread)
+        print(f"\n{args.threads} writer threads + 1 reader, {per_thread} add/remove each:")
+        print(f"  before {old:.2f}s ({old_errors} errors), after {new:.2f}s ({new_errors} errors), {old / new:.1f}x")
+        after.close()
+
+    print("="*70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Offline accuracy/latency report for the local intent classifier against held-out weeks.
+
+Walk-forward evaluation over the labelled messages the bot logs (message_labels table):
+each week is scored by a model trained only on the weeks before it, so the numbers match
+what the bot would have done live. Also scores the keyword rules alone as a baseline.
+
+Usage: python scripts/intent_classifier_report.py [path/to/golf_swindle.db]
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database, Config, IntentClassifier
+
+db_path = sys.argv[1] if len(sys.argv) > 1 else Config.DB_PATH
+threshold = Config.LOCAL_CLASSIFIER_THRESHOLD
+
+print("="*70)
+print(" INTENT CLASSIFIER REPORT")
+print("="*70)
+
+examples = Database(db_path).get_message_labels()
+weeks = sorted({e['week'] for e in examples})
+print(f"\n{len(examples)} labelled messages over {len(weeks)} week(s) in {db_path}")
+counts = {label: sum(1 for e in examples if e['label'] == label) for label in IntentClassifier.LABELS}
+print("Labels: " + ", ".join(f"{label} {n}" for label, n in counts.items()))
+
+if len(weeks) < 2:
+    print("\n⚠️  Need at least two weeks of labelled messages to hold one out")
+    sys.exit(0)
+
+print(f"\nConfidence threshold for local handling: {threshold}\n")
+print(f"{'Held-out week':<15}{'train':>7}{'test':>6}{'keyword acc':>13}{'model acc':>11}{'local':>8}{'local acc':>11}{'µs/msg':>9}")
+
+totals = {'test': 0, 'correct': 0, 'local': 0, 'local_correct': 0}
+for i, week in enumerate(weeks[1:], start=1):
+    train = [e for e in examples if e['week'] in weeks[:i]]
+    test = [e for e in examples if e['week'] == week]
+
+    baseline = IntentClassifier().evaluate(test, threshold)
+    model = IntentClassifier()
+    started = time.time()
+    model.train(train)
+    train_seconds = time.time() - started
+    result = model.evaluate(test, threshold)
+
+    totals['test'] += result['examples']
+    totals['correct'] += round(result['accuracy'] * result['examples'])
+    totals['local'] += round(result['coverage'] * result['examples'])
+    totals['local_correct'] += round(result['local_accuracy'] * result['coverage'] * result['examples'])
+    print(f"{week:<15}{len(train):>7}{len(test):>6}{baseline['accuracy']:>13.0%}{result['accuracy']:>11.0%}"
+          f"{result['coverage']:>8.0%}{result['local_accuracy']:>11.0%}{result['latency_us']:>9.0f}"
+          f"   (trained in {train_seconds:.1f}s)")
+
+print("\n" + "="*70)
+if totals['test']:
+    print(f"Overall: {totals['correct'] / totals['test']:.0%} accuracy, "
+          f"{totals['local'] / totals['test']:.0%} of messages handled locally "
+          f"at {totals['local_correct'] / totals['local'] if totals['local'] else 0:.0%} accuracy")
+print("="*70)
@@ -10,10 +10,21 @@ import sqlite3
 import subprocess
 import time
 import json
+import math
+import queue
+import re
+import hashlib
+import bisect
+import copy
+import functools
+import weakref
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, NamedTuple
 import schedule
 import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import anthropic
 
@@ -68,6 +79,35 @@ class Config:
         ADMIN_GROUP_CHECK_SECONDS = _config.ADMIN_GROUP_CHECK_SECONDS
         ADMIN_BURST_DURATION_SECONDS = _config.ADMIN_BURST_DURATION_SECONDS
         ADMIN_BURST_CHECK_SECONDS = _config.ADMIN_BURST_CHECK_SECONDS
+        # Newer settings - optional so older config.py files keep working
+        FULL_ANALYSIS_EVERY = getattr(_config, 'FULL_ANALYSIS_EVERY', 6)
+        INCREMENTAL_MAX_MESSAGES = getattr(_config, 'INCREMENTAL_MAX_MESSAGES', 40)
+        ANALYSIS_CHUNK_MESSAGES = getattr(_config, 'ANALYSIS_CHUNK_MESSAGES', 120)
+        ANALYSIS_CHUNK_WORKERS = getattr(_config, 'ANALYSIS_CHUNK_WORKERS', 4)
+        AI_TIMEOUT_SECONDS = getattr(_config, 'AI_TIMEOUT_SECONDS', 60)
+        AI_COMMAND_TIMEOUT_SECONDS = getattr(_config, 'AI_COMMAND_TIMEOUT_SECONDS', 15)
+        AI_MAX_RETRIES = getattr(_config, 'AI_MAX_RETRIES', 2)
+        AI_BREAKER_THRESHOLD = getattr(_config, 'AI_BREAKER_THRESHOLD', 5)
+        AI_BREAKER_RESET_SECONDS = getattr(_config, 'AI_BREAKER_RESET_SECONDS', 300)
+        AI_MAX_CONNECTIONS = getattr(_config, 'AI_MAX_CONNECTIONS', 10)
+        AI_KEEPALIVE_SECONDS = getattr(_config, 'AI_KEEPALIVE_SECONDS', 300)
+        AI_PREWARM_IDLE_SECONDS = getattr(_config, 'AI_PREWARM_IDLE_SECONDS', 240)
+        WEEKLY_AI_BUDGET_USD = getattr(_config, 'WEEKLY_AI_BUDGET_USD', 3.0)
+        BUDGET_SLOW_AT = getattr(_config, 'BUDGET_SLOW_AT', 0.6)
+        BUDGET_LOCAL_COMMANDS_AT = getattr(_config, 'BUDGET_LOCAL_COMMANDS_AT', 0.8)
+        BUDGET_FAST_ONLY_AT = getattr(_config, 'BUDGET_FAST_ONLY_AT', 0.9)
+        BUDGET_SLOW_FACTOR = getattr(_config, 'BUDGET_SLOW_FACTOR', 3)
+        ANALYSIS_WAIT_SECONDS = getattr(_config, 'ANALYSIS_WAIT_SECONDS', 120)
+        AI_CASCADE = getattr(_config, 'AI_CASCADE', True)
+        CASCADE_MAX_CHANGE_RATIO = getattr(_config, 'CASCADE_MAX_CHANGE_RATIO', 0.3)
+        TRANSCRIPT_COMPACTION = getattr(_config, 'TRANSCRIPT_COMPACTION', True)
+        LOCAL_CLASSIFIER = getattr(_config, 'LOCAL_CLASSIFIER', True)
+        LOCAL_CLASSIFIER_THRESHOLD = getattr(_config, 'LOCAL_CLASSIFIER_THRESHOLD', 0.9)
+        SHADOW_SAMPLE_RATE = getattr(_config, 'SHADOW_SAMPLE_RATE', 0.0)
+        SHADOW_MODEL = getattr(_config, 'SHADOW_MODEL', "claude-haiku-4-5-20251001")
+        SHADOW_PROMPT_FILE = getattr(_config, 'SHADOW_PROMPT_FILE', None)
+        VOTE_SIGNUPS = getattr(_config, 'VOTE_SIGNUPS', True)
+        SIGNUP_REACTIONS = getattr(_config, 'SIGNUP_REACTIONS', ["👍", "✅", "⛳", "🏌️", "🙋"])
     except (ImportError, AttributeError) as e:
         # Use safe defaults if config.py doesn't exist
         print("⚠️  Warning: config.py not found. Please copy config.example.py to config.py")
@@ -86,19 +126,898 @@ class Config:
         ADMIN_GROUP_CHECK_SECONDS = 60
         ADMIN_BURST_DURATION_SECONDS = 180
         ADMIN_BURST_CHECK_SECONDS = 5
+        FULL_ANALYSIS_EVERY = 6
+        INCREMENTAL_MAX_MESSAGES = 40
+        ANALYSIS_CHUNK_MESSAGES = 120
+        ANALYSIS_CHUNK_WORKERS = 4
+        AI_TIMEOUT_SECONDS = 60
+        AI_COMMAND_TIMEOUT_SECONDS = 15
+        AI_MAX_RETRIES = 2
+        AI_BREAKER_THRESHOLD = 5
+        AI_BREAKER_RESET_SECONDS = 300
+        AI_MAX_CONNECTIONS = 10
+        AI_KEEPALIVE_SECONDS = 300
+        AI_PREWARM_IDLE_SECONDS = 240
+        WEEKLY_AI_BUDGET_USD = 3.0
+        BUDGET_SLOW_AT = 0.6
+        BUDGET_LOCAL_COMMANDS_AT = 0.8
+        BUDGET_FAST_ONLY_AT = 0.9
+        BUDGET_SLOW_FACTOR = 3
+        ANALYSIS_WAIT_SECONDS = 120
+        AI_CASCADE = True
+        CASCADE_MAX_CHANGE_RATIO = 0.3
+        TRANSCRIPT_COMPACTION = True
+        LOCAL_CLASSIFIER = True
+        LOCAL_CLASSIFIER_THRESHOLD = 0.9
+        SHADOW_SAMPLE_RATE = 0.0
+        SHADOW_MODEL = "claude-haiku-4-5-20251001"
+        SHADOW_PROMPT_FILE = None
+        VOTE_SIGNUPS = True
+        SIGNUP_REACTIONS = ["👍", "✅", "⛳", "🏌️", "🙋"]
         DB_PATH = "golf_swindle.db"
         CHROME_RESTART_HOURS = 24
 
 
+# ==================== MESSAGE HELPERS ====================
+def message_sort_key(msg: Dict) -> str:
+    """Sortable key from a scraped message's data-pre-plain-text timestamp.
+    Format: [HH:MM, DD/MM/YYYY] Name: -> "YYYY/MM/DD HH:MM" (messages without one sort last)"""
+    ts = msg.get('timestamp', '')
+    if ts and '[' in ts and ']' in ts:
+        try:
+            bracket_content = ts.split('[')[1].split(']')[0]  # "HH:MM, DD/MM/YYYY"
+            parts = bracket_content.split(', ')
+            if len(parts) == 2:
+                time_str = parts[0].strip()  # "HH:MM"
+                date_str = parts[1].strip()  # "DD/MM/YYYY"
+                date_parts = date_str.split('/')
+                if len(date_parts) == 3:
+                    return f"{date_parts[2]}/{date_parts[1]}/{date_parts[0]} {time_str}"
+        except:
+            pass
+    return "9999/99/99 99:99"  # No timestamp — sort to end
+
+
+def message_key(msg: Dict) -> tuple:
+    """Identity of a scraped message (WhatsApp Web exposes no stable message id)"""
+    return (msg.get('sender', ''), msg.get('text', ''), msg.get('timestamp', ''))
+
+
+def format_message_line(msg: Dict) -> str:
+    """Format a message for the AI prompt, including its timestamp for chronological context"""
+    ts = msg.get('timestamp', '')
+    if ts and '[' in ts and ']' in ts:
+        try:
+            time_part = ts.split('[')[1].split(']')[0]  # "HH:MM, DD/MM/YYYY"
+            return f"[{time_part}] [{msg['sender']}]: {msg['text']}"
+        except:
+            pass
+    return f"[{msg['sender']}]: {msg['text']}"
+
+
+RECORDED_LINE = re.compile(r'^(?:\[(\d{1,2}:\d{2}), (\d{1,2})/(\d{1,2})/(\d{4})\] )?\[(.*?)\]: ?(.*)$')
+
+
+def parse_recorded_transcript(text: str) -> List[Dict]:
+    """Parse a recorded scrape (fresh_messages.txt format) back into message dicts.
+    Lines look like "[HH:MM, M/D/YYYY] [Sender]: text" (the timestamp is sometimes missing);
+    any other line continues the previous message."""
+    messages = []
+    for line in text.splitlines():
+        match = RECORDED_LINE.match(line)
+        if match:
+            hhmm, month, day, year, sender, first_line = match.groups()
+            timestamp = f"[{hhmm.zfill(5)}, {day.zfill(2)}/{month.zfill(2)}/{year}] {sender}: " if hhmm else ""
+            messages.append({'sender': sender, 'text': first_line, 'is_outgoing': False, 'timestamp': timestamp})
+        elif messages:
+            messages[-1]['text'] += '\n' + line
+    for msg in messages:
+        msg['text'] = msg['text'].strip()
+    return [m for m in messages if m['text']]
+
+
+# ==================== TRANSCRIPT COMPACTION ====================
+# Runs between the scrape and the prompt builder: strips quoted blocks, drops emoji-only and
+# deleted-message noise, and merges bursts of short messages from the same sender.
+PHONE_LINE = re.compile(r'^\+?\d[\d\s\-()]{7,}$')
+EMOJI_CHARS = re.compile('[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D\u20E3]')
+NOISE_TEXTS = {"this message was deleted", "you deleted this message", "waiting for this message"}
+MEDIA_LABELS = {"gif", "photo", "video", "sticker", "audio", "voice message", "document"}
+MERGE_MAX_CHARS = 80  # Only messages this short are merged with their neighbours
+MERGE_GAP_MINUTES = 5
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for compaction reporting"""
+    return (len(text) + 3) // 4
+
+
+def _normalised_lines(text: str) -> List[str]:
+    return [' '.join(line.split()) for line in text.splitlines() if line.strip()]
+
+
+def strip_quote(msg: Dict, earlier: List[Dict], senders: set) -> str:
+    """The sender's own words with any quoted reply block removed ('' if it was only a quote).
+
+    Uses the DOM quote container text when the scraper captured it ('quoted'). Otherwise a
+    quote is recognised by its header - the quoted sender's name followed by a phone line,
+    or a known sender's name (or "You") on its own line - and its body must match an earlier
+    message or be a media label (GIF, Photo...). `earlier` should hold both the original and
+    the quote-stripped text of previous messages, since WhatsApp quotes only a reply's own words.
+    Anything that can't be resolved is returned unchanged for the model to interpret."""
+    lines = _normalised_lines(msg['text'])
+    if len(lines) < 2:
+        return msg['text']
+
+    if PHONE_LINE.match(lines[1]) and len(lines[0]) <= 40:
+        header = 2
+    elif lines[0] in senders or lines[0] == 'You':
+        header = 1
+    else:
+        header = 0
+
+    if msg.get('quoted'):
+        bodies = [_normalised_lines(msg['quoted'])]
+    elif header:
+        # Most recent first, preferring messages by the quoted name
+        by_name = [m for m in reversed(earlier) if m['sender'] == lines[0]]
+        bodies = []
+        for m in by_name + [m for m in reversed(earlier) if m not in by_name]:
+            body = _normalised_lines(m['text'])
+            bodies.append(body)
+            # Media captions are scraped as "Sender\ncaption\nHH:MM" but quoted as just the caption
+            if body and body[0] == m['sender'] and re.match(r'^\d{1,2}:\d{2}$', body[-1]):
+                bodies.append(body[1:-1])
+    else:
+        return msg['text']
+    if header and len(lines) > header and lines[header].lower() in MEDIA_LABELS:
+        bodies = [[lines[header]]] + bodies
+
+    for body in bodies:
+        if not body:
+            continue
+        for start in sorted({0, header}):
+            if lines[start:start + len(body)] == body:
+                return '\n'.join(lines[start + len(body):])
+
+    if header == 2 and len(lines) == 2:
+        return ''  # Name + phone with no body (quoted media) and no reply text
+    return msg['text']
+
+
+def _minutes_between(earlier: Dict, later: Dict) -> Optional[float]:
+    try:
+        start = datetime.strptime(message_sort_key(earlier), "%Y/%m/%d %H:%M")
+        end = datetime.strptime(message_sort_key(later), "%Y/%m/%d %H:%M")
+    except ValueError:
+        return None
+    return (end - start).total_seconds() / 60
+
+
+def compact_transcript(messages: List[Dict], context: List[Dict] = None) -> tuple:
+    """Token-cheap copy of a scraped transcript. `context` is earlier history used only to
+    resolve quotes. Returns (compacted_messages, stats); the input list is not modified."""
+    context = context or []
+    senders = {m['sender'] for m in context + messages}
+    history = list(context)
+    stats = {'messages_before': len(messages), 'quotes_stripped': 0, 'noise_dropped': 0, 'merged': 0}
+
+    compacted = []
+    last_piece_len = 0
+    for msg in messages:
+        text = strip_quote(msg, history, senders)
+        history.append(msg)
+        if text != msg['text']:
+            stats['quotes_stripped'] += 1
+            history.append({'sender': msg['sender'], 'text': text})
+        text = re.sub(r'[ \t]+', ' ', EMOJI_CHARS.sub('', text))
+        text = '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+        if not re.search(r'[A-Za-z0-9]', text) or text.lower() in NOISE_TEXTS:
+            stats['noise_dropped'] += 1
+            continue
+
+        prev = compacted[-1] if compacted else None
+        if (prev and prev['sender'] == msg['sender'] and last_piece_len <= MERGE_MAX_CHARS
+                and len(text) <= MERGE_MAX_CHARS):
+            gap = _minutes_between(prev, msg)
+            if gap is not None and 0 <= gap <= MERGE_GAP_MINUTES:
+                prev['text'] += '\n' + text
+                last_piece_len = len(text)
+                stats['merged'] += 1
+                continue
+
+        entry = {k: v for k, v in msg.items() if k != 'quoted'}
+        entry['text'] = text
+        compacted.append(entry)
+        last_piece_len = len(text)
+
+    stats['messages_after'] = len(compacted)
+    stats['tokens_before'] = estimate_tokens('\n'.join(format_message_line(m) for m in messages))
+    stats['tokens_after'] = estimate_tokens('\n'.join(format_message_line(m) for m in compacted))
+    return compacted, stats
+
+
+# ==================== IDENTITY RESOLUTION ====================
+class IdentityIndex:
+    """Who is who: every known spelling of a player (alias) -> their canonical name.
+
+    Exact aliases (including the canonical names themselves, case-insensitive) are a dict
+    lookup. Unique first names / prefixes ("dave" -> "Dave Walker", "ken" -> "KennyD") use a
+    sorted key list, and near-miss spellings a trigram index, so only aliases sharing letters
+    with the query are compared by edit distance. Canonical names are seeded from season
+    history (labelled senders, constraints, participants); learned aliases (NAME_MAPPING,
+    phone numbers) persist in the aliases table. Prefix and near-miss matches are guesses, so
+    they are only ever used for the call that made them."""
+
+    MIN_PREFIX = 3  # Shorter queries never match by prefix ("al" is anyone)
+    MIN_FUZZY = 4
+
+    def __init__(self, db: 'Database' = None):
+        self.db = db
+        self.aliases = {}   # alias key -> canonical name
+        self.trigrams = {}  # trigram -> alias keys containing it
+        self.key_grams = {}  # alias key -> its trigrams
+        self.keys = []      # sorted alias keys, for prefix lookups
+        self.stats = {'exact': 0, 'prefix': 0, 'fuzzy': 0, 'miss': 0}
+        self._lock = threading.Lock()
+        if db:
+            for name in db.get_known_names():
+                self.add_name(name)
+            for alias, name in db.get_aliases().items():
+                self._index(alias, name)
+
+    @staticmethod
+    def key(name: str) -> str:
+        """Lookup key: lower-case, single spaces; phone numbers reduced to their digits"""
+        name = (name or '').replace('\u2019', "'").strip()
+        if PHONE_LINE.match(name):
+            return re.sub(r"\D", '', name)
+        return ' '.join(name.lower().split())
+
+    @staticmethod
+    def _grams(key: str) -> set:
+        padded = f"  {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _index(self, alias: str, name: str) -> bool:
+        key = self.key(alias)
+        if not key or self.aliases.get(key) == name:
+            return False
+        with self._lock:
+            if key not in self.aliases:
+                self.key_grams[key] = self._grams(key)
+                for gram in self.key_grams[key]:
+                    self.trigrams.setdefault(gram, set()).add(key)
+                bisect.insort(self.keys, key)
+            self.aliases[key] = name
+        return True
+
+    def add_name(self, name: str):
+        """Index a canonical name (a player, sender or constraint name) - never overrides an alias"""
+        if name and self.key(name) not in self.aliases:
+            self._index(name, name)
+
+    def learn(self, alias: str, name: str, source: str) -> bool:
+        """Remember that `alias` is `name` (persisted). Returns True if this is new."""
+        if not alias or not name or self.key(alias) == self.key(name):
+            return False
+        self.add_name(name)
+        if not self._index(alias, name):
+            return False
+        if self.db:
+            self.db.save_alias(self.key(alias), name, source)
+        print(f"🪪 Learned alias: {alias} = {name} ({source})")
+        return True
+
+    def resolve(self, name: str, within: List[str] = None, fuzzy: bool = True) -> Optional[str]:
+        """Canonical name for `name`, or None if unknown or ambiguous. `within` limits the answer to
+        those names (e.g. this week's participants). fuzzy=False allows only exact/known aliases -
+        used wherever a new name may legitimately be a new person."""
+        key = self.key(name)
+        if not key:
+            return None
+        allowed = None
+        if within is not None:
+            allowed = set(within)
+            for n in allowed:
+                self.add_name(n)
+
+        found = self.aliases.get(key)
+        if found and (allowed is None or found in allowed):
+            self.stats['exact'] += 1
+            return found
+        if not fuzzy:
+            self.stats['miss'] += 1
+            return None
+
+        if len(key) >= self.MIN_PREFIX:
+            with self._lock:
+                start = bisect.bisect_left(self.keys, key)
+                matches = set()
+                for k in self.keys[start:]:
+                    if not k.startswith(key):
+                        break
+                    matches.add(self.aliases[k])
+            matches = {n for n in matches if allowed is None or n in allowed}
+            if len(matches) == 1:
+                self.stats['prefix'] += 1
+                return matches.pop()
+            if matches:
+                self.stats['miss'] += 1
+                return None  # "dave" with two Daves - ambiguous
+
+        if len(key) >= self.MIN_FUZZY:
+            limit = 1 if len(key) < 8 else 2
+            grams = self._grams(key)
+            # An edit changes at most 4 trigrams (a transposition), so any key within `limit` edits
+            # shares one of the query's 4 * limit + 1 rarest trigrams - only those posting lists are read
+            with self._lock:
+                rarest = sorted(grams, key=lambda gram: len(self.trigrams.get(gram, ())))[:4 * limit + 1]
+                pool = set().union(*(self.trigrams.get(gram, ()) for gram in rarest))
+                counts = {k: len(grams & self.key_grams[k]) for k in pool}
+            # A key sharing `shared` trigrams is at least (len(grams) - shared) / 4 edits away - best first
+            best, close = limit, set()
+            for k, shared in sorted(counts.items(), key=lambda item: -item[1]):
+                if (len(grams) - shared + 3) // 4 > best:
+                    break
+                name = self.aliases[k]
+                if abs(len(k) - len(key)) > best or (allowed is not None and name not in allowed):
+                    continue
+                distance = edit_distance(key, k, best)
+                if distance < best:
+                    best, close = distance, set()
+                if distance <= best:
+                    close.add(name)
+            if len(close) == 1:  # The one closest spelling
+                self.stats['fuzzy'] += 1
+                return close.pop()
+        self.stats['miss'] += 1
+        return None
+
+    def canonical(self, name: str) -> str:
+        """`name` under its known canonical spelling (exact aliases only), else unchanged"""
+        return self.resolve(name, fuzzy=False) or name
+
+    def merge_players(self, players: List[Dict], senders: List[str] = ()) -> tuple:
+        """Collapse an analysis player list onto canonical names. Known aliases are renamed; a name
+        nobody sent a message as ("ken", signed up by a mate) that uniquely matches another listed
+        player ([KennyD]) is merged into them at the earlier position, guests combined. Such a match
+        is a guess about this list only - it is never remembered as an alias ("Tom" may be a new
+        player next week, not Tommy Smith). Returns (players, {old name: new name})."""
+        sender_keys = {self.key(s) for s in senders}
+        renamed = {}
+        listed = []
+        for player in players:
+            canonical = self.canonical(player['name'])
+            if canonical != player['name']:
+                renamed[player['name']] = canonical
+            listed.append(canonical)
+
+        merged = {}
+        for player, name in zip(players, listed):
+            if self.key(name) not in sender_keys:
+                others = [n for n in listed if n != name]
+                target = self.resolve(name, within=others)
+                if not target and len(name.split()) > 1:
+                    # Recap full name for a sender who goes by their first name ("Ricky Parkhurst" = [Ricky])
+                    target = self.resolve(name.split()[0], within=[n for n in others if self.key(n) in sender_keys],
+                                          fuzzy=False)
+                if target:
+                    renamed[player['name']] = target
+                    name = target
+            if name in merged:
+                entry = merged[name]
+                entry['guests'] = entry.get('guests', []) + [g for g in player.get('guests', [])
+                                                             if g not in entry.get('guests', [])]
+                entry['preferences'] = entry.get('preferences') or player.get('preferences')
+            else:
+                merged[name] = {**player, 'name': name}
+        return list(merged.values()), renamed
+
+
 # ==================== DATABASE ====================
+class _ThreadConnection:
+    """One thread's long-lived SQLite connection, shared by every Database call on that thread"""
+
+    def __init__(self, conn: sqlite3.Connection, on_commit=None, on_rollback=None):
+        self.conn = conn
+        self.users = 0  # Open handles (Database methods can call each other)
+        self.depth = 0  # transaction() nesting
+        self.on_commit = on_commit  # Runs the commit and publishes in-memory state that was waiting for it
+        self.on_rollback = on_rollback  # Drops in-memory state that assumed the rolled-back writes
+
+    def __del__(self):
+        # The thread has ended. Close now - the connection's statement cache is a reference cycle,
+        # so left to the garbage collector it would stay open (and keep the WAL) for a while
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def release(self):
+        """Last handle gone: roll back anything its caller left uncommitted (an error part-way
+        through a method), as closing a per-call connection used to"""
+        self.users -= 1
+        if self.users <= 0 and not self.depth and self.conn.in_transaction:
+            self.rollback()
+
+    def commit(self):
+        if self.on_commit:
+            self.on_commit(self.conn.commit)
+        else:
+            self.conn.commit()
+
+    def rollback(self):
+        if self.on_rollback:
+            self.on_rollback()
+        self.conn.rollback()
+
+
+class _ConnectionHandle:
+    """What Database._connect() hands out. Methods still call commit()/close() as usual:
+    close() (or dropping the handle) releases the thread's connection instead of closing it,
+    and inside transaction() commit() waits for the end of the block."""
+
+    def __init__(self, shared: _ThreadConnection):
+        self._shared = shared
+        self._open = True
+        self._on_write = None  # Set on the handle transaction() yields: its SQL bypasses the Database methods
+        shared.users += 1
+
+    def _writing(self, sql: str = None):
+        if self._on_write and (sql is None or not sql.lstrip().upper().startswith(('SELECT', 'EXPLAIN'))):
+            self._on_write()
+
+    def execute(self, sql, *args):
+        self._writing(sql)
+        return self._shared.conn.execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        self._writing(sql)
+        return self._shared.conn.executemany(sql, *args)
+
+    def executescript(self, script):
+        self._writing()
+        return self._shared.conn.executescript(script)
+
+    def cursor(self, *args):
+        self._writing()  # Can't see what will run on it
+        return self._shared.conn.cursor(*args)
+
+    def commit(self):
+        if not self._shared.depth:
+            self._shared.commit()
+
+    def close(self):
+        if getattr(self, '_open', False):
+            self._open = False
+            self._shared.release()
+
+    __del__ = close
+
+    def __getattr__(self, name):
+        return getattr(self._shared.conn, name)
+
+
+class StatusEngine:
+    """Playing/reserve allocation kept in memory between recalculations.
+
+    Same rule as always: in signup order, a player's block (themselves plus guests) plays if it
+    still fits in the capacity, otherwise they're a reserve - and later, smaller blocks can still
+    fit. `before[i]` is the prefix sum of playing spots ahead of entry i, so after a change at
+    position i only entries from i onwards are re-checked, stopping as soon as the running total
+    matches the one an unchanged entry was settled with (everything after it stays the same).
+    Database tells the engine about each change; a rollback or a bulk replacement invalidates it
+    and the next recalculation reloads it with one query. Capacity is cached until a tee time change."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.stats = {'loads': 0, 'settles': 0, 'checked': 0}  # checked = entries re-checked, over all settles
+        self.invalidate()
+
+    def invalidate(self):
+        with self.lock:
+            self.capacity = None  # Cached get_capacity()
+            self.settled_capacity = None  # What the current statuses were settled with
+            self.loaded = False
+            self.names, self.sizes, self.statuses, self.before = [], [], [], []
+            self.index = {}
+            self.dirty = None  # First position to re-check
+            self.pending = 0  # Changed entries (before = None) not re-checked yet
+
+    def capacity_changed(self):
+        with self.lock:
+            self.capacity = None
+
+    def load(self, rows: List[tuple]):
+        """rows: (name, status, block size) in signup order, statuses as stored"""
+        with self.lock:
+            capacity = self.capacity
+            self.invalidate()
+            self.capacity = capacity
+            for name, status, size in rows:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+                self.sizes.append(size)
+                self.statuses.append(status)
+                self.before.append(None)
+            self.dirty, self.pending, self.loaded = 0, len(rows), True
+            self.stats['loads'] += 1
+
+    def _mark(self, position: int):
+        self.dirty = position if self.dirty is None else min(self.dirty, position)
+
+    def _touch(self, position: int):
+        if self.before[position] is not None:
+            self.before[position] = None
+            self.pending += 1
+        self._mark(position)
+
+    def added(self, name: str, size: int):
+        """A new player, last in signup order (stored as 'playing' until settled)"""
+        with self.lock:
+            if not self.loaded:
+                return
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.sizes.append(size)
+            self.statuses.append('playing')
+            self.before.append(None)
+            self.pending += 1
+            self._mark(len(self.names) - 1)
+
+    def removed(self, name: str):
+        with self.lock:
+            position = self.index.pop(name, None) if self.loaded else None
+            if position is None:
+                return
+            if self.before[position] is None:
+                self.pending -= 1
+            for items in (self.names, self.sizes, self.statuses, self.before):
+                del items[position]
+            for later in self.names[position:]:
+                self.index[later] -= 1
+            self._mark(position)
+
+    def resized(self, name: str, change: int):
+        """A host's guests changed by `change`"""
+        with self.lock:
+            position = self.index.get(name) if self.loaded else None
+            if position is None or not change:
+                return
+            self.sizes[position] += change
+            self._touch(position)
+
+    def settle(self, capacity: int) -> List[tuple]:
+        """Re-check from the first changed entry; returns [(new status, name)] for those that changed"""
+        with self.lock:
+            if capacity != self.settled_capacity:
+                self.settled_capacity = capacity
+                self.dirty, self.pending = 0, len(self.names)
+                self.before = [None] * len(self.names)
+            if self.dirty is None:
+                return []
+            self.stats['settles'] += 1
+            position = self.dirty
+            spots = 0
+            if position:
+                spots = self.before[position - 1] + (self.sizes[position - 1] if self.statuses[position - 1] == 'playing' else 0)
+            changes = []
+            while position < len(self.names):
+                settled_with = self.before[position]
+                if settled_with is None:
+                    self.pending -= 1
+                elif settled_with == spots and not self.pending:
+                    break  # Same running total as last time - the rest is unchanged
+                self.stats['checked'] += 1
+                self.before[position] = spots
+                status = 'playing' if spots + self.sizes[position] <= capacity else 'reserve'
+                if status == 'playing':
+                    spots += self.sizes[position]
+                if status != self.statuses[position]:
+                    self.statuses[position] = status
+                    changes.append((status, self.names[position]))
+                position += 1
+            self.dirty, self.pending = None, 0
+            return changes
+
+
+class WeeklyState(NamedTuple):
+    """An immutable snapshot of the week's state, as Database.state() hands it out.
+    Players and constraints are read-only mappings; guests and lists are tuples."""
+    participants: tuple  # Every player in signup order: name, guests, preferences, signup_order, status
+    constraints: tuple  # Active constraints (with their id), in show_constraints order
+    tee_time_settings: Optional[MappingProxyType]  # start_time, interval_minutes, num_slots
+    manual_tee_times: tuple
+    removed_tee_times: tuple
+    tee_times: tuple  # Generated from the three above
+    capacity: int
+
+    @staticmethod
+    def player(name: str, guests=(), preferences: str = None, signup_order: int = 0, status: str = 'playing'):
+        return MappingProxyType({'name': name, 'guests': tuple(guests), 'preferences': preferences,
+                                 'signup_order': signup_order, 'status': status})
+
+    @staticmethod
+    def constraint(constraint_id: int, constraint_type: str, player_name: str, target_name: str = None, value: str = None):
+        return MappingProxyType({'id': constraint_id, 'type': constraint_type, 'player': player_name,
+                                 'target': target_name, 'value': value})
+
+    @staticmethod
+    def constraint_key(c) -> tuple:
+        """Sort key matching the constraints index order (NULL targets first, then by id)"""
+        return (c['type'], c['player'], c['target'] is not None, c['target'] or '', c['id'])
+
+    def with_participants(self, participants) -> 'WeeklyState':
+        """In signup order - a stable sort, so ties stay in insertion order like the table's ids"""
+        return self._replace(participants=tuple(sorted(participants, key=lambda p: p['signup_order'])))
+
+    def with_changed_players(self, changes: Dict[str, Dict]) -> 'WeeklyState':
+        """Change some players' fields: {name: {field: new value}}"""
+        return self.with_participants(WeeklyState.player(**{**p, **changes[p['name']]}) if p['name'] in changes else p
+                                      for p in self.participants)
+
+    def with_constraints(self, constraints) -> 'WeeklyState':
+        return self._replace(constraints=tuple(sorted(constraints, key=self.constraint_key)))
+
+    def with_tee_times(self, **changes) -> 'WeeklyState':
+        """Replace settings/manual/removed times and regenerate tee_times and capacity"""
+        state = self._replace(**changes)
+        tee_times = self.generate_tee_times(state.tee_time_settings, state.manual_tee_times, state.removed_tee_times)
+        return state._replace(tee_times=tee_times, capacity=len(tee_times) * Config.MAX_GROUP_SIZE)
+
+    @staticmethod
+    def generate_tee_times(settings, manual_times, removed_times) -> tuple:
+        """Auto-generated times + additions - removals, sorted"""
+        if not settings:
+            return ()
+        start_hour, start_min = map(int, settings['start_time'].split(':'))
+        current = datetime.now().replace(hour=start_hour, minute=start_min, second=0, microsecond=0)
+        tee_times = set()
+        for _ in range(settings['num_slots']):
+            tee_times.add(current.strftime('%H:%M'))
+            current += timedelta(minutes=settings['interval_minutes'])
+        tee_times.update(manual_times)
+        tee_times.difference_update(removed_times)
+        return tuple(sorted(tee_times))
+
+    def players(self, status: str = None) -> tuple:
+        return tuple(p for p in self.participants if status is None or p['status'] == status)
+
+    def spots_used(self) -> Dict:
+        spots = {'playing': 0, 'reserve': 0}
+        for p in self.participants:
+            spots[p['status']] = spots.get(p['status'], 0) + 1 + len(p['guests'])
+        return spots
+
+    def partner_preferences(self) -> Dict[str, List[str]]:
+        """{player: [preferred partners]} from partner_preference and weekly_pairing constraints"""
+        preferences = {}
+        for c in self.constraints:
+            if c['type'] in ('partner_preference', 'weekly_pairing'):
+                partners = preferences.setdefault(c['player'], [])
+                if c['target'] not in partners:
+                    partners.append(c['target'])
+        return preferences
+
+    def avoidances(self) -> Dict[str, List[str]]:
+        avoidances = {}
+        for c in self.constraints:
+            if c['type'] == 'avoid':
+                avoidances.setdefault(c['player'], []).append(c['target'])
+        return avoidances
+
+    def weekly_pairings(self) -> List[list]:
+        pairings = sorted((c for c in self.constraints if c['type'] == 'weekly_pairing'), key=lambda c: c['id'])
+        return [[c['player'], c['target']] for c in pairings]
+
+
+class StateCache:
+    """The week's participants, constraints and tee times, kept in memory so reads make no SQLite
+    round trips. Loaded once, then updated write-through: each Database mutator hands it the new
+    WeeklyState after its writes. That state is private to the writing thread until its transaction
+    commits (other threads keep reading the last committed one), and is dropped on rollback.
+
+    A change made while nothing is loaded can't be applied, so that transaction's commit drops the
+    cache instead (the next read reloads). Loads outside a transaction are only kept if nothing
+    was committed while they ran (`version`)."""
+
+    STALE = object()  # This thread's transaction changed state the cache didn't hold
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {'loads': 0, 'publishes': 0}
+        self.version = 0  # Bumped by every publish and invalidate
+        self._committed = None
+        self._local = threading.local()  # This thread's uncommitted state: (version it's based on, state)
+
+    def _pending(self):
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            return None
+        return pending[1] if pending[0] == self.version else self.STALE  # Invalidated meanwhile
+
+    def current(self) -> Optional[WeeklyState]:
+        """What this thread should read: its own uncommitted state, else the committed one (None = load it)"""
+        pending = self._pending()
+        if pending is self.STALE:
+            return None
+        return pending if pending is not None else self._committed
+
+    def loaded(self, state: WeeklyState, version: int, in_transaction: bool) -> WeeklyState:
+        """Keep a state just read from the database (inside a write transaction it includes that
+        transaction's changes, so it waits for the commit like any other change)"""
+        with self.lock:
+            self.stats['loads'] += 1
+            if in_transaction:
+                self._local.pending = (self.version, state)
+            elif version == self.version and self._committed is None:
+                self._committed = state
+        return state
+
+    def update(self, change):
+        """Write-through: change(state) -> new state, applied to what this thread sees"""
+        with self.lock:
+            pending = self._pending()
+            base = pending if pending is not None else self._committed
+            self._local.pending = (self.version, self.STALE if base is None or base is self.STALE else change(base))
+
+    def commit(self, commit):
+        """Run commit() for this thread's transaction and publish its state, as one step: the
+        next writer can take the database's write lock as soon as the commit releases it, and its
+        update() then waits here until the state it builds on is published"""
+        with self.lock:
+            commit()
+            pending = self._pending()
+            self._local.pending = None
+            if pending is not None:
+                self._committed = None if pending is self.STALE else pending
+                self.version += 1
+                self.stats['publishes'] += 1
+
+    def rolled_back(self):
+        self._local.pending = None
+
+    def changed_elsewhere(self):
+        """This thread's transaction wrote to the tables without a change for the cache (raw SQL),
+        so its commit drops the cache instead"""
+        with self.lock:
+            self._local.pending = (self.version, self.STALE)
+
+    def invalidate(self):
+        """Forget everything, including other threads' uncommitted states (the next read reloads)"""
+        with self.lock:
+            self._committed = None
+            self.version += 1
+        self._local.pending = None
+
+
 class Database:
+    BUSY_TIMEOUT_SECONDS = 10  # SQLite's busy handler waits this long for another thread's write lock
+    STATEMENT_CACHE = 256  # Prepared statements kept per connection (the SQL text is the key)
+
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self._local = threading.local()  # This thread's _ThreadConnection
+        self._connections = weakref.WeakSet()  # Every thread's, for close()
+        self._connections_lock = threading.Lock()
+        self.status_engine = StatusEngine()
+        self.state_cache = StateCache()
+        self._remove_stale_wal(db_path)
         self.init_db()
+        self.identity = IdentityIndex(self)
+        # Connections still open at exit are closed then (checkpoints the WAL)
+        weakref.finalize(self, self._close_connections, db_path, self._connections, self._connections_lock)
+
+    @staticmethod
+    def _remove_stale_wal(db_path: str):
+        """WAL files next to a missing database belong to a deleted one - never replay them into a new one"""
+        if not os.path.exists(db_path):
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+    def _open(self) -> sqlite3.Connection:
+        """A new connection in WAL mode: readers never wait for the writer, and commits only fsync
+        at checkpoints (synchronous=NORMAL - a power cut can lose the last commits, never corrupt)"""
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_SECONDS,
+                               cached_statements=self.STATEMENT_CACHE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.BUSY_TIMEOUT_SECONDS * 1000)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _connect(self) -> _ConnectionHandle:
+        """Get this thread's connection (opened on first use, then kept). Always use with
+        try/finally to ensure close. Inside transaction() this is the transaction's connection."""
+        shared = getattr(self._local, 'conn', None)
+        if shared is None:
+            shared = self._local.conn = _ThreadConnection(self._open(), on_commit=self.state_cache.commit,
+                                                          on_rollback=self._rolled_back)
+            with self._connections_lock:
+                self._connections.add(shared)
+        return _ConnectionHandle(shared)
+
+    @contextmanager
+    def transaction(self):
+        """Run several Database calls (on this thread) as one transaction: they share a
+        connection and commit together at the end, or all roll back if the block raises.
+        A nested transaction() joins the outer one. Yields the connection.
+
+        Takes the write lock up front (BEGIN IMMEDIATE), so a transaction waits for another
+        thread's writes to finish rather than failing part-way when it first writes."""
+        conn = self._connect()
+        conn._on_write = self._written_directly
+        shared = conn._shared
+        outer = not shared.depth
+        if outer and not shared.conn.in_transaction:
+            shared.conn.execute("BEGIN IMMEDIATE")
+        shared.depth += 1
+        try:
+            yield conn
+            if outer:
+                shared.commit()
+        except BaseException:
+            if outer:
+                shared.rollback()
+            raise
+        finally:
+            shared.depth -= 1
+            conn.close()
 
-    def _connect(self):
-        """Get a database connection. Always use with try/finally to ensure close."""
-        return sqlite3.connect(self.db_path, timeout=10)
+    @contextmanager
+    def batch(self):
+        """Unit of work for many participant changes (on this thread): one transaction, and
+        recalculate_statuses() runs once at the end instead of after every change. Yields a dict
+        that holds the combined {'promoted': [names], 'demoted': [names]} once the block is done.
+        A nested batch() joins the outer one (and shares its dict).
+
+        Inside the block, statuses aren't settled: add_player_manually() returns 'added', and the
+        promoted/demoted lists of single changes are empty."""
+        current = getattr(self._local, 'batch', None)
+        if current is not None:
+            yield current
+            return
+        outcome = self._local.batch = {'promoted': [], 'demoted': []}
+        try:
+            with self.transaction():
+                yield outcome
+                self._local.batch = None
+                outcome.update(self.recalculate_statuses())
+        finally:
+            self._local.batch = None
+
+    def _in_batch(self) -> bool:
+        return getattr(self._local, 'batch', None) is not None
+
+    def _written_directly(self):
+        """SQL run on the connection transaction() yields: the in-memory state can't follow it"""
+        self.status_engine.invalidate()
+        self.state_cache.changed_elsewhere()
+
+    def _rolled_back(self):
+        """This thread's transaction is being rolled back: drop what the in-memory state assumed of it"""
+        self.status_engine.invalidate()
+        self.state_cache.rolled_back()
+
+    @classmethod
+    def _close_connections(cls, db_path: str, connections: weakref.WeakSet, lock: threading.Lock):
+        with lock:
+            open_connections = list(connections)
+            connections.clear()
+        for shared in open_connections:
+            try:
+                shared.conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        cls._remove_stale_wal(db_path)  # SQLite leaves them behind if the database was deleted while open
+
+    def close(self):
+        """Close every thread's connection (checkpoints the WAL). The next call on a thread reconnects."""
+        self._close_connections(self.db_path, self._connections, self._connections_lock)
+        self._local = threading.local()
+        self.state_cache.invalidate()
 
     def init_db(self):
         """Initialize simplified database"""
@@ -137,6 +1056,53 @@ class Database:
             cursor.execute("ALTER TABLE participants ADD COLUMN manually_added INTEGER NOT NULL DEFAULT 0")
             print("   Migrated participants table: added manually_added column")
 
+        # Playing/reserve lists are read by status in signup order (before the state cache is loaded)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_participants_status ON participants (status, signup_order)")
+
+        # Guests, one row each (signup_order is the order within the host's guests). Names can repeat:
+        # a host bringing two anonymous guests has two "[Host]-Guest" rows.
+        # The host index serves capacity counts and per-host lookups; the name index, host-less removals.
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'guests'")
+        row = cursor.fetchone()
+        if row and 'UNIQUE' in row[0]:
+            # Migrate: early versions of the table had UNIQUE (host_id, guest_name) - rebuild without it
+            cursor.execute("ALTER TABLE guests RENAME TO guests_unique")
+            rebuild_guests = True
+        else:
+            rebuild_guests = False
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS guests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                host_id INTEGER NOT NULL REFERENCES participants(id),
+                guest_name TEXT NOT NULL,
+                signup_order INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        if rebuild_guests:
+            cursor.execute("""
+                INSERT INTO guests (id, host_id, guest_name, signup_order)
+                SELECT id, host_id, guest_name, signup_order FROM guests_unique
+            """)
+            cursor.execute("DROP TABLE guests_unique")
+            print("   Migrated guests table: a host can list the same guest name twice")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_guests_host ON guests (host_id, signup_order)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_guests_name ON guests (guest_name)")
+
+        # Migrate: move guests out of the old participants.guests JSON column (left in place, always NULL now)
+        legacy = cursor.execute("""
+            SELECT id, guests FROM participants WHERE guests IS NOT NULL AND guests NOT IN ('', '[]')
+        """).fetchall()
+        for host_id, guests_json in legacy:
+            try:
+                guests = json.loads(guests_json)
+            except ValueError:
+                guests = []
+            cursor.executemany("INSERT INTO guests (host_id, guest_name, signup_order) VALUES (?, ?, ?)",
+                               [(host_id, guest, order) for order, guest in enumerate(guests, 1)])
+        cursor.execute("UPDATE participants SET guests = NULL WHERE guests IS NOT NULL")
+        if legacy:
+            print(f"   Migrated guests of {len(legacy)} participants into the guests table")
+
         # Tee sheet table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS tee_sheet (
@@ -157,6 +1123,112 @@ class Database:
             )
         """)
 
+        # Incremental analysis bookkeeping (how many patches since the last full re-analysis)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_state (
+                id INTEGER PRIMARY KEY,
+                incremental_runs INTEGER NOT NULL DEFAULT 0,
+                full_analyzed_at DATETIME,
+                incremental_analyzed_at DATETIME
+            )
+        """)
+
+        # AI analysis cache - keyed by hash of model + prompt + normalised transcript, survives restarts
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                cache_key TEXT PRIMARY KEY,
+                purpose TEXT NOT NULL,
+                model TEXT NOT NULL,
+                result_json TEXT NOT NULL,
+                usage_json TEXT,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                last_hit_at DATETIME
+            )
+        """)
+
+        # Main group messages labelled from AI decisions - training data for the local intent classifier
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS message_labels (
+                message_key TEXT PRIMARY KEY,
+                week TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                text TEXT NOT NULL,
+                label TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Trained intent classifier weights (single row)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS intent_model (
+                id INTEGER PRIMARY KEY,
+                model_json TEXT NOT NULL,
+                examples INTEGER NOT NULL,
+                trained_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Shadow-mode runs - a candidate model/prompt replayed on sampled analyses, diffed against the primary
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS shadow_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                primary_model TEXT NOT NULL,
+                candidate_model TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                agree INTEGER NOT NULL,
+                diff_json TEXT,
+                error TEXT,
+                primary_seconds REAL,
+                candidate_seconds REAL,
+                primary_input_tokens INTEGER,
+                primary_output_tokens INTEGER,
+                candidate_input_tokens INTEGER,
+                candidate_output_tokens INTEGER,
+                primary_cost REAL,
+                candidate_cost REAL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Learned name aliases (nickname / phone number / display name -> canonical player name)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS aliases (
+                alias TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                source TEXT NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Poll votes / reactions on this week's "taking names" post (cleared with participants)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS signup_votes (
+                voter TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                choice TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                active INTEGER DEFAULT 1
+            )
+        """)
+
+        # Every Anthropic API response: tokens, latency and cost (created_at is local time, for weekly budgets)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                lane TEXT NOT NULL,
+                purpose TEXT NOT NULL,
+                model TEXT NOT NULL,
+                input_tokens INTEGER DEFAULT 0,
+                output_tokens INTEGER DEFAULT 0,
+                cache_read_tokens INTEGER DEFAULT 0,
+                cache_write_tokens INTEGER DEFAULT 0,
+                seconds REAL,
+                cost REAL DEFAULT 0
+            )
+        """)
+
         # Constraints table (Phase 3)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS constraints (
@@ -169,6 +1241,33 @@ class Database:
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        # Every read and the add/remove checks only look at active rows, so the indexes leave removed ones out.
+        # The type-first one also returns the full list already sorted for show_constraints.
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_constraints_type
+            ON constraints (constraint_type, player_name, target_name) WHERE active = 1
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_constraints_player
+            ON constraints (player_name, constraint_type) WHERE active = 1
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_constraints_target
+            ON constraints (target_name) WHERE active = 1 AND target_name IS NOT NULL
+        """)
+
+        # Removed (soft-deleted) constraints, moved out of constraints by archive_inactive_constraints()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS constraints_archive (
+                id INTEGER PRIMARY KEY,
+                constraint_type TEXT NOT NULL,
+                player_name TEXT NOT NULL,
+                target_name TEXT,
+                value TEXT,
+                created_at DATETIME,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
         # Tee time settings table (Phase 4)
         cursor.execute("""
@@ -221,46 +1320,169 @@ class Database:
         conn.commit()
         conn.close()
 
-    def get_participants(self, status_filter: str = None) -> List[Dict]:
-        """Get participants, optionally filtered by status ('playing', 'reserve', or None for all)"""
+    def state(self) -> WeeklyState:
+        """This week's participants, constraints and tee times as an immutable snapshot. Served
+        from the state cache (no SQLite round trip) once loaded; inside a transaction it includes
+        that transaction's changes."""
+        state = self.state_cache.current()
+        if state is not None:
+            return state
         conn = self._connect()
-        cursor = conn.cursor()
-        if status_filter:
-            cursor.execute("SELECT name, guests, preferences, signup_order, status FROM participants WHERE status = ? ORDER BY signup_order", (status_filter,))
-        else:
-            cursor.execute("SELECT name, guests, preferences, signup_order, status FROM participants ORDER BY signup_order")
-        rows = cursor.fetchall()
-        conn.close()
+        try:
+            version = self.state_cache.version
+            in_transaction = conn.in_transaction
+            return self.state_cache.loaded(self._read_state(conn), version, in_transaction)
+        finally:
+            conn.close()
 
-        participants = []
-        for row in rows:
-            guests = json.loads(row[1]) if row[1] else []
-            participants.append({
-                'name': row[0],
-                'guests': guests,
-                'preferences': row[2],
-                'signup_order': row[3],
-                'status': row[4]
-            })
-        return participants
+    def _read_state(self, conn) -> WeeklyState:
+        """Read the week's state from the database, all tables from one read snapshot"""
+        in_transaction = conn.in_transaction
+        if not in_transaction:
+            conn.execute("BEGIN")
+        try:
+            # One row per guest (or one with a NULL guest for a player without any), in signup order
+            rows = conn.execute("""
+                SELECT p.id, p.name, p.preferences, p.signup_order, p.status, g.guest_name
+                FROM participants p LEFT JOIN guests g ON g.host_id = p.id
+                ORDER BY p.signup_order, p.id, g.signup_order
+            """).fetchall()
+            constraints = conn.execute("""
+                SELECT id, constraint_type, player_name, target_name, value
+                FROM constraints
+                WHERE active = 1
+                ORDER BY constraint_type, player_name, target_name
+            """).fetchall()
+            settings = conn.execute("""
+                SELECT start_time, interval_minutes, num_slots
+                FROM tee_time_settings
+                WHERE active = 1
+                ORDER BY created_at DESC
+                LIMIT 1
+            """).fetchone()
+            manual_times = conn.execute("SELECT tee_time FROM manual_tee_times ORDER BY tee_time").fetchall()
+            removed_times = conn.execute("SELECT tee_time FROM removed_tee_times ORDER BY tee_time").fetchall()
+        finally:
+            if not in_transaction:
+                conn.execute("COMMIT")
+
+        state = WeeklyState(participants=(), constraints=(), tee_time_settings=None,
+                            manual_tee_times=(), removed_tee_times=(), tee_times=(), capacity=0)
+        return state.with_participants(WeeklyState.player(**player) for player in self._players_from_rows(rows)) \
+            .with_constraints(WeeklyState.constraint(*row) for row in constraints) \
+            .with_tee_times(
+                tee_time_settings=MappingProxyType({'start_time': settings[0], 'interval_minutes': settings[1],
+                                                    'num_slots': settings[2]}) if settings else None,
+                manual_tee_times=tuple(row[0] for row in manual_times),
+                removed_tee_times=tuple(row[0] for row in removed_times))
+
+    @staticmethod
+    def _players_from_rows(rows) -> List[Dict]:
+        """Players (guests gathered into a list) from participant rows joined with their guests"""
+        players = []
+        last_id = None
+        for host_id, name, preferences, signup_order, status, guest in rows:
+            if host_id != last_id:
+                last_id = host_id
+                players.append({'name': name, 'guests': [], 'preferences': preferences,
+                                'signup_order': signup_order, 'status': status})
+            if guest is not None:
+                players[-1]['guests'].append(guest)
+        return players
+
+    def verify_state_cache(self) -> List[str]:
+        """Check the state cache against the database. Returns what differs (empty if it all
+        matches, or nothing is cached yet); if anything does, the cache is dropped and reloaded
+        on the next read."""
+        version = self.state_cache.version
+        cached = self.state_cache.current()
+        if cached is None:
+            return []
+        conn = self._connect()
+        try:
+            stored = self._read_state(conn)
+        finally:
+            conn.close()
+        if self.state_cache.version != version:
+            return []  # Another thread committed meanwhile - check again next time
+
+        differences = []
+        cached_players = {p['name']: p for p in cached.participants}
+        stored_players = {p['name']: p for p in stored.participants}
+        for name in stored_players.keys() - cached_players.keys():
+            differences.append(f"participant {name} missing from the cache")
+        for name in cached_players.keys() - stored_players.keys():
+            differences.append(f"participant {name} cached but not in the database")
+        for name in cached_players.keys() & stored_players.keys():
+            if cached_players[name] != stored_players[name]:
+                differences.append(f"participant {name} differs")
+        if not differences and cached.participants != stored.participants:
+            differences.append("participants out of signup order")
+        for field in WeeklyState._fields[1:]:
+            if getattr(cached, field) != getattr(stored, field):
+                differences.append(f"{field} differ")
+        if differences:
+            self.state_cache.invalidate()
+        return differences
+
+    def get_participants(self, status_filter: str = None) -> List[Dict]:
+        """Get participants, optionally filtered by status ('playing', 'reserve', or None for all).
+        Copies from the state cache - callers can change them. Before the cache is loaded, a
+        filtered read is one query on the status index rather than a load of the whole week."""
+        if status_filter and self.state_cache.current() is None:
+            conn = self._connect()
+            try:
+                rows = conn.execute("""
+                    SELECT p.id, p.name, p.preferences, p.signup_order, p.status, g.guest_name
+                    FROM participants p LEFT JOIN guests g ON g.host_id = p.id
+                    WHERE p.status = ?
+                    ORDER BY p.signup_order, p.id, g.signup_order
+                """, (status_filter,)).fetchall()
+            finally:
+                conn.close()
+            return self._players_from_rows(rows)
+        return [{**p, 'guests': list(p['guests'])} for p in self.state().players(status_filter)]
+
+    def get_spots_used(self) -> Dict:
+        """Spots taken by each status, players plus their guests: {'playing': n, 'reserve': n}"""
+        return self.state().spots_used()
 
     def update_participants(self, players: List[Dict]) -> Dict:
         """Replace participants with AI list, preserving signup_order for existing players.
         Manually-added players (via admin commands) are preserved even if AI doesn't find them.
-        New players get order based on their position in the AI list (= chat signup order).
+        New players get order based on their position in the list (AIAnalyzer sorts it by signup time).
         Returns {'promoted': [names], 'demoted': [names]} after status recalculation."""
         conn = self._connect()
         try:
             cursor = conn.cursor()
 
             # Read existing data before delete
-            cursor.execute("SELECT name, signup_order, manually_added, guests, preferences FROM participants")
+            cursor.execute("SELECT name, signup_order, manually_added, id, preferences FROM participants")
             existing_rows = cursor.fetchall()
             existing_orders = {row[0]: row[1] for row in existing_rows}
-            manual_players = {row[0]: {'guests': row[3], 'preferences': row[4], 'order': row[1]}
+            manual_players = {row[0]: {'guests': [], 'preferences': row[4], 'order': row[1]}
                             for row in existing_rows if row[2] == 1}
+            cursor.execute("""
+                SELECT p.name, g.guest_name FROM guests g JOIN participants p ON p.id = g.host_id
+                WHERE p.manually_added = 1 ORDER BY g.host_id, g.signup_order
+            """)
+            for name, guest in cursor.fetchall():
+                manual_players[name]['guests'].append(guest)
             max_order = max(existing_orders.values()) if existing_orders else 0
 
+            # Known aliases -> canonical names, so a nickname never becomes a second participant
+            canonical_players = {}
+            for player in players:
+                name = self.identity.canonical(player['name'])
+                if name not in canonical_players:
+                    canonical_players[name] = {**player, 'name': name, 'guests': list(player.get('guests') or [])}
+                else:
+                    # Listed twice (name and alias) - keep the first entry, with both entries' guests
+                    entry = canonical_players[name]
+                    entry['guests'] += [g for g in player.get('guests') or [] if g not in entry['guests']]
+                    entry['preferences'] = entry.get('preferences') or player.get('preferences')
+            players = list(canonical_players.values())
+
             # Build set of AI-found player names
             ai_names = {p['name'] for p in players}
 
@@ -278,9 +1500,8 @@ class Database:
                     order = max_order
                 # If AI found a manually-added player, merge any manual guests the AI missed
                 if name in manual_players:
-                    manual_guests = json.loads(manual_players[name]['guests']) if manual_players[name]['guests'] else []
                     ai_guests = player.get('guests', [])
-                    for g in manual_guests:
+                    for g in manual_players[name]['guests']:
                         if g not in ai_guests:
                             ai_guests.append(g)
                     player['guests'] = ai_guests
@@ -293,20 +1514,24 @@ class Database:
             # Preserve manually-added players that AI didn't find
             for name, data in manual_players.items():
                 if name not in ai_names:
-                    guests_json = data['guests']
-                    prefs = data['preferences']
                     ordered_players.append(
-                        ({'name': name, 'guests': json.loads(guests_json) if guests_json else [], 'preferences': prefs},
+                        ({'name': name, 'guests': data['guests'], 'preferences': data['preferences']},
                          data['order'], 1))
 
             # Replace all participants
+            cursor.execute("DELETE FROM guests")
             cursor.execute("DELETE FROM participants")
             for player, order, manual in ordered_players:
-                guests_json = json.dumps(player.get('guests', []))
                 cursor.execute("""
-                    INSERT INTO participants (name, guests, preferences, signup_order, status, manually_added, updated_at)
-                    VALUES (?, ?, ?, ?, 'playing', ?, CURRENT_TIMESTAMP)
-                """, (player['name'], guests_json, player.get('preferences'), order, manual))
+                    INSERT INTO participants (name, preferences, signup_order, status, manually_added, updated_at)
+                    VALUES (?, ?, ?, 'playing', ?, CURRENT_TIMESTAMP)
+                """, (player['name'], player.get('preferences'), order, manual))
+                self._insert_guests(cursor, cursor.lastrowid, player.get('guests') or [])
+                self.identity.add_name(player['name'])
+            self.status_engine.invalidate()  # Everything replaced - reloaded by the recalculation
+            self.state_cache.update(lambda state: state.with_participants(
+                WeeklyState.player(player['name'], player.get('guests') or [], player.get('preferences'), order)
+                for player, order, manual in sorted(ordered_players, key=lambda entry: entry[1])))
             conn.commit()
         finally:
             conn.close()
@@ -314,12 +1539,27 @@ class Database:
         # Recalculate playing/reserve statuses based on capacity
         return self.recalculate_statuses()
 
+    @staticmethod
+    def _insert_guests(cursor, host_id: int, guests: List[str]) -> int:
+        """Add guests after any the host already has. Returns how many were added."""
+        for guest in guests:
+            cursor.execute("""
+                INSERT INTO guests (host_id, guest_name, signup_order)
+                VALUES (?, ?, (SELECT COALESCE(MAX(signup_order), 0) + 1 FROM guests WHERE host_id = ?))
+            """, (host_id, guest, host_id))
+        return len(guests)
+
     def clear_participants(self):
         """Clear all participants for new week (also clears time preferences)"""
         conn = self._connect()
         cursor = conn.cursor()
+        cursor.execute("DELETE FROM guests")
         cursor.execute("DELETE FROM participants")
+        self.status_engine.invalidate()
+        self.state_cache.update(lambda state: state.with_participants(()))
+        cursor.execute("DELETE FROM signup_votes")
         cursor.execute("DELETE FROM last_snapshot")
+        cursor.execute("DELETE FROM analysis_state")
         conn.commit()
         conn.close()
 
@@ -330,44 +1570,422 @@ class Database:
 
         # Get all participants
         cursor.execute("SELECT name, preferences FROM participants")
+        changes = {}
         for name, prefs in cursor.fetchall():
             if prefs:
                 # Remove 'early' and 'late' from preferences
                 cleaned = ' '.join([word for word in prefs.split() if word.lower() not in ['early', 'late']])
                 cursor.execute("UPDATE participants SET preferences = ? WHERE name = ?", (cleaned.strip() or None, name))
+                changes[name] = {'preferences': cleaned.strip() or None}
+        if changes:
+            self.state_cache.update(lambda state: state.with_changed_players(changes))
+
+        conn.commit()
+        conn.close()
+
+    def save_snapshot(self, messages: List[Dict]):
+        """Save messages snapshot for change detection"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM last_snapshot")
+            cursor.execute("""
+                INSERT INTO last_snapshot (id, messages_json, analyzed_at)
+                VALUES (1, ?, CURRENT_TIMESTAMP)
+            """, (json.dumps(messages),))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_last_snapshot(self) -> Optional[List[Dict]]:
+        """Get last messages snapshot"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT messages_json FROM last_snapshot WHERE id = 1")
+            row = cursor.fetchone()
+            if row:
+                return json.loads(row[0])
+            return None
+        finally:
+            conn.close()
+
+    def get_analysis_state(self) -> Dict:
+        """Get incremental analysis bookkeeping: {'incremental_runs': int, 'full_analyzed_at': str or None}"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT incremental_runs, full_analyzed_at FROM analysis_state WHERE id = 1")
+            row = cursor.fetchone()
+            if row:
+                return {'incremental_runs': row[0], 'full_analyzed_at': row[1]}
+            return {'incremental_runs': 0, 'full_analyzed_at': None}
+        finally:
+            conn.close()
+
+    def record_full_analysis(self):
+        """Mark that a full transcript analysis was applied (resets the incremental counter)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO analysis_state (id, incremental_runs, full_analyzed_at)
+                VALUES (1, 0, CURRENT_TIMESTAMP)
+                ON CONFLICT(id) DO UPDATE SET incremental_runs = 0, full_analyzed_at = CURRENT_TIMESTAMP
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record_incremental_analysis(self):
+        """Mark that an incremental patch was applied"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO analysis_state (id, incremental_runs, incremental_analyzed_at)
+                VALUES (1, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT(id) DO UPDATE SET incremental_runs = incremental_runs + 1,
+                                              incremental_analyzed_at = CURRENT_TIMESTAMP
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==================== AI ANALYSIS CACHE ====================
+
+    def get_cached_analysis(self, cache_key: str) -> Optional[Dict]:
+        """Look up a cached AI result by key (counts the hit). Returns {'result', 'usage'} or None."""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT result_json, usage_json FROM analysis_cache WHERE cache_key = ?", (cache_key,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute("""
+                UPDATE analysis_cache SET hits = hits + 1, last_hit_at = CURRENT_TIMESTAMP
+                WHERE cache_key = ?
+            """, (cache_key,))
+            conn.commit()
+            return {'result': json.loads(row[0]), 'usage': json.loads(row[1]) if row[1] else None}
+        finally:
+            conn.close()
+
+    def save_cached_analysis(self, cache_key: str, purpose: str, model: str, result: Dict, usage: Dict = None):
+        """Store a parsed AI result under its content-addressed key"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO analysis_cache (cache_key, purpose, model, result_json, usage_json, hits, created_at)
+                VALUES (?, ?, ?, ?, ?, 0, CURRENT_TIMESTAMP)
+            """, (cache_key, purpose, model, json.dumps(result), json.dumps(usage) if usage else None))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_analysis_cache_stats(self) -> Dict:
+        """Lifetime cache stats: entries (= misses that were stored) and total hits, per purpose"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT purpose, COUNT(*), COALESCE(SUM(hits), 0) FROM analysis_cache GROUP BY purpose")
+            return {purpose: {'entries': entries, 'hits': hits} for purpose, entries, hits in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    def prune_analysis_cache(self, days: int = 14):
+        """Drop cache entries not created or hit in the last N days"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM analysis_cache
+                WHERE COALESCE(last_hit_at, created_at) < datetime('now', ?)
+            """, (f'-{int(days)} days',))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def archive_inactive_constraints(self) -> int:
+        """Move removed constraints into constraints_archive, so constraints only holds active rows.
+        Returns how many were archived."""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO constraints_archive (id, constraint_type, player_name, target_name, value, created_at)
+                SELECT id, constraint_type, player_name, target_name, value, created_at
+                FROM constraints WHERE active = 0
+            """)
+            archived = conn.execute("DELETE FROM constraints WHERE active = 0").rowcount
+            conn.commit()  # Both statements in one transaction
+            return archived
+        finally:
+            conn.close()
+
+    def optimize(self):
+        """Refresh the query planner's table statistics: a full ANALYZE the first time (no
+        sqlite_stat1 yet), then PRAGMA optimize, which only re-analyzes tables that changed a lot"""
+        conn = self._connect()
+        try:
+            analyzed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+            conn.execute("PRAGMA optimize" if analyzed else "ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==================== SHADOW RUNS ====================
+
+    SHADOW_FIELDS = ['primary_model', 'candidate_model', 'prompt', 'agree', 'error',
+                     'primary_seconds', 'candidate_seconds', 'primary_input_tokens', 'primary_output_tokens',
+                     'candidate_input_tokens', 'candidate_output_tokens', 'primary_cost', 'candidate_cost']
+
+    # ==================== LLM LEDGER ====================
+
+    LEDGER_FIELDS = ['created_at', 'lane', 'purpose', 'model', 'input_tokens', 'output_tokens',
+                     'cache_read_tokens', 'cache_write_tokens', 'seconds', 'cost']
+
+    def record_llm_call(self, entry: Dict):
+        """Append one API call to the ledger (see TokenLedger.record for the fields)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                INSERT INTO llm_ledger ({', '.join(self.LEDGER_FIELDS)})
+                VALUES ({', '.join('?' for _ in self.LEDGER_FIELDS)})
+            """, [entry[f] for f in self.LEDGER_FIELDS])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_llm_spend(self, since: str) -> float:
+        """Total cost (USD) of calls made at or after `since` ("YYYY-MM-DD HH:MM:SS", local time)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(SUM(cost), 0) FROM llm_ledger WHERE created_at >= ?", (since,))
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    def get_llm_usage(self, since: str = None, group_by: str = 'model') -> List[Dict]:
+        """Ledger totals since `since` (all time if None), one row per `group_by` value
+        ('model', 'lane' or 'purpose'), most expensive first"""
+        if group_by not in ('model', 'lane', 'purpose'):
+            raise ValueError(f"can't group ledger by {group_by}")
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {group_by}, COUNT(*), SUM(input_tokens), SUM(output_tokens), SUM(cache_read_tokens),
+                       SUM(cache_write_tokens), SUM(seconds), SUM(cost)
+                FROM llm_ledger WHERE created_at >= ?
+                GROUP BY {group_by} ORDER BY SUM(cost) DESC, {group_by}
+            """, (since or '',))
+            return [{'key': key, 'calls': calls, 'input_tokens': tin or 0, 'output_tokens': tout or 0,
+                     'cache_read_tokens': cread or 0, 'cache_write_tokens': cwrite or 0,
+                     'seconds': seconds or 0.0, 'cost': cost or 0.0}
+                    for key, calls, tin, tout, cread, cwrite, seconds, cost in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def save_shadow_run(self, run: Dict):
+        """Store one shadow comparison (see ShadowEvaluator.evaluate for the fields)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                INSERT INTO shadow_runs ({', '.join(self.SHADOW_FIELDS)}, diff_json)
+                VALUES ({', '.join('?' for _ in self.SHADOW_FIELDS)}, ?)
+            """, [int(run[f]) if f == 'agree' else run[f] for f in self.SHADOW_FIELDS] + [json.dumps(run['diff'])])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_shadow_runs(self, limit: int = 20) -> List[Dict]:
+        """Most recent shadow runs first"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {', '.join(self.SHADOW_FIELDS)}, diff_json, created_at FROM shadow_runs
+                ORDER BY id DESC LIMIT ?
+            """, (limit,))
+            runs = []
+            for row in cursor.fetchall():
+                run = dict(zip(self.SHADOW_FIELDS, row))
+                run['agree'] = bool(run['agree'])
+                run['diff'] = json.loads(row[-2]) if row[-2] else {}
+                run['created_at'] = row[-1]
+                runs.append(run)
+            return runs
+        finally:
+            conn.close()
+
+    def log_message_labels(self, rows: List[Dict]) -> int:
+        """Store labelled messages ({'key', 'week', 'sender', 'text', 'label'}). A message keeps
+        the label from its latest analysis. Returns the number of rows written."""
+        if not rows:
+            return 0
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO message_labels (message_key, week, sender, text, label)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(message_key) DO UPDATE SET label = excluded.label
+            """, [(r['key'], r['week'], r['sender'], r['text'], r['label']) for r in rows])
+            conn.commit()
+            return len(rows)
+        finally:
+            conn.close()
+
+    def get_message_labels(self) -> List[Dict]:
+        """All labelled messages, oldest week first"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT week, sender, text, label FROM message_labels ORDER BY week, created_at")
+            return [{'week': w, 'sender': s, 'text': t, 'label': l} for w, s, t, l in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def save_intent_model(self, model: Dict, examples: int):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO intent_model (id, model_json, examples, trained_at)
+                VALUES (1, ?, ?, CURRENT_TIMESTAMP)
+            """, (json.dumps(model), examples))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_intent_model(self) -> Optional[Dict]:
+        """Saved classifier weights, or None if it has never been trained"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT model_json FROM intent_model WHERE id = 1")
+            row = cursor.fetchone()
+            return json.loads(row[0]) if row else None
+        finally:
+            conn.close()
+
+    def save_alias(self, alias: str, name: str, source: str):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO aliases (alias, name, source, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (alias, name, source))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_aliases(self) -> Dict[str, str]:
+        """Learned aliases: alias key -> canonical name"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT alias, name FROM aliases ORDER BY updated_at")
+            return dict(cursor.fetchall())
+        finally:
+            conn.close()
+
+    def get_known_names(self) -> List[str]:
+        """Every player name seen this season: labelled message senders, constraint names, participants"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT sender FROM message_labels WHERE sender NOT IN ('Unknown', 'You')
+                UNION SELECT player_name FROM constraints WHERE active = 1
+                UNION SELECT target_name FROM constraints WHERE active = 1 AND target_name IS NOT NULL
+                UNION SELECT name FROM participants
+            """)
+            return [row[0] for row in cursor.fetchall() if row[0]]
+        finally:
+            conn.close()
 
-        conn.commit()
-        conn.close()
+    def sync_signup_votes(self, votes: List[Dict]) -> Dict[str, list]:
+        """Store the votes currently showing (voter, source, choice, at) and report what changed since
+        the last scrape: {'added': [votes], 'withdrawn': [names], 'changed': [votes]}. first_seen is the
+        vote time from the poll panel, or the scrape that first showed it (reactions have no time) -
+        "YYYY/MM/DD HH:MM", comparable with message_sort_key()."""
+        now = datetime.now().strftime('%Y/%m/%d %H:%M')
+        changes = {'added': [], 'withdrawn': [], 'changed': []}
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT voter, choice, active FROM signup_votes")
+            stored = {voter: (choice, active) for voter, choice, active in cursor.fetchall()}
+            showing = set()
+            for vote in votes:
+                name = self.identity.canonical(vote['voter'])
+                if name in showing:
+                    continue  # Voted and reacted - the first one seen counts
+                showing.add(name)
+                vote = {**vote, 'voter': name}
+                if name not in stored or not stored[name][1]:
+                    # New (or re-cast) vote - re-inserted so rowid keeps first-seen order within a scrape
+                    cursor.execute("DELETE FROM signup_votes WHERE voter = ?", (name,))
+                    cursor.execute("""
+                        INSERT INTO signup_votes (voter, source, choice, first_seen, active)
+                        VALUES (?, ?, ?, ?, 1)
+                    """, (name, vote['source'], vote['choice'], vote.get('at') or now))
+                    changes['added'].append(vote)
+                elif stored[name][0] != vote['choice']:
+                    cursor.execute("UPDATE signup_votes SET choice = ?, source = ? WHERE voter = ?",
+                                   (vote['choice'], vote['source'], name))
+                    changes['changed'].append(vote)
+            for voter, (_, active) in stored.items():
+                if active and voter not in showing:
+                    cursor.execute("UPDATE signup_votes SET active = 0 WHERE voter = ?", (voter,))
+                    changes['withdrawn'].append(voter)
+            conn.commit()
+            return changes
+        finally:
+            conn.close()
 
-    def save_snapshot(self, messages: List[Dict]):
-        """Save messages snapshot for change detection"""
+    def get_signup_votes(self) -> List[Dict]:
+        """Votes still showing, in the order they were first seen"""
         conn = self._connect()
         try:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM last_snapshot")
             cursor.execute("""
-                INSERT INTO last_snapshot (id, messages_json, analyzed_at)
-                VALUES (1, ?, CURRENT_TIMESTAMP)
-            """, (json.dumps(messages),))
-            conn.commit()
+                SELECT voter, source, choice, first_seen FROM signup_votes
+                WHERE active = 1 ORDER BY first_seen, rowid
+            """)
+            return [{'voter': voter, 'source': source, 'choice': choice, 'first_seen': first_seen}
+                    for voter, source, choice, first_seen in cursor.fetchall()]
         finally:
             conn.close()
 
-    def get_last_snapshot(self) -> Optional[List[Dict]]:
-        """Get last messages snapshot"""
+    def set_player_preferences(self, name: str, preferences: str = None) -> bool:
+        """Overwrite a participant's preferences. Returns False if the player isn't signed up."""
         conn = self._connect()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT messages_json FROM last_snapshot WHERE id = 1")
-            row = cursor.fetchone()
-            if row:
-                return json.loads(row[0])
-            return None
+            cursor.execute("""
+                UPDATE participants SET preferences = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE name = ?
+            """, (preferences, name))
+            if cursor.rowcount:
+                self.state_cache.update(lambda state: state.with_changed_players({name: {'preferences': preferences}}))
+            conn.commit()
+            return cursor.rowcount > 0
         finally:
             conn.close()
 
-    def add_player_manually(self, name: str, guests: List[str] = None, preferences: str = None) -> str:
-        """Manually add a player. Returns 'playing', 'reserve', 'exists', or 'error'."""
+    def add_player_manually(self, name: str, guests: List[str] = None, preferences: str = None, manual: bool = True) -> str:
+        """Manually add a player. Returns 'playing', 'reserve', 'exists', or 'error' ('added' inside batch()).
+        manual=False is for AI-detected signups, which a later full re-analysis may drop again."""
+        name = self.identity.canonical(name)
         try:
             conn = self._connect()
             cursor = conn.cursor()
@@ -382,31 +2000,33 @@ class Database:
             cursor.execute("SELECT MAX(signup_order) FROM participants")
             max_order = cursor.fetchone()[0] or 0
 
-            guests_json = json.dumps(guests or [])
             cursor.execute("""
-                INSERT INTO participants (name, guests, preferences, signup_order, status, manually_added, updated_at)
-                VALUES (?, ?, ?, ?, 'playing', 1, CURRENT_TIMESTAMP)
-            """, (name, guests_json, preferences, max_order + 1))
+                INSERT INTO participants (name, preferences, signup_order, status, manually_added, updated_at)
+                VALUES (?, ?, ?, 'playing', ?, CURRENT_TIMESTAMP)
+            """, (name, preferences, max_order + 1, 1 if manual else 0))
+            block = 1 + self._insert_guests(cursor, cursor.lastrowid, guests or [])
+            self.status_engine.added(name, block)
+            player = WeeklyState.player(name, guests or [], preferences, max_order + 1)
+            self.state_cache.update(lambda state: state.with_participants(state.participants + (player,)))
 
             conn.commit()
             conn.close()
+            self.identity.add_name(name)
+            if self._in_batch():
+                return 'added'  # Status settled when the batch ends
 
             # Recalculate statuses - this player may end up as reserve
             self.recalculate_statuses()
 
             # Check what status they got
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute("SELECT status FROM participants WHERE name = ?", (name,))
-            row = cursor.fetchone()
-            conn.close()
-            return row[0] if row else 'error'
+            return next((p['status'] for p in self.state().participants if p['name'] == name), 'error')
         except Exception as e:
             print(f"❌ Error adding player: {e}")
             return 'error'
 
     def remove_player_manually(self, name: str) -> Dict:
         """Manually remove a player. Returns {'removed': bool, 'was_status': str, 'promoted': [names]}."""
+        name = self.identity.canonical(name)
         try:
             conn = self._connect()
             cursor = conn.cursor()
@@ -419,7 +2039,10 @@ class Database:
                 return {'removed': False, 'was_status': None, 'promoted': []}
 
             was_status = row[0]
+            cursor.execute("DELETE FROM guests WHERE host_id = (SELECT id FROM participants WHERE name = ?)", (name,))
             cursor.execute("DELETE FROM participants WHERE name = ?", (name,))
+            self.status_engine.removed(name)
+            self.state_cache.update(lambda state: state.with_participants(p for p in state.participants if p['name'] != name))
             conn.commit()
             conn.close()
 
@@ -436,23 +2059,21 @@ class Database:
             conn = self._connect()
             cursor = conn.cursor()
 
-            # Get current guests
-            cursor.execute("SELECT guests FROM participants WHERE name = ?", (host_name,))
+            cursor.execute("SELECT id FROM participants WHERE name = ?", (host_name,))
             row = cursor.fetchone()
 
             if not row:
                 conn.close()
                 return {'success': False, 'promoted': [], 'demoted': []}
 
-            guests = json.loads(row[0]) if row[0] else []
-            if guest_name not in guests:
-                guests.append(guest_name)
-
-            cursor.execute("""
-                UPDATE participants
-                SET guests = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE name = ?
-            """, (json.dumps(guests), host_name))
+            # A guest already listed isn't added again
+            cursor.execute("SELECT 1 FROM guests WHERE host_id = ? AND guest_name = ?", (row[0], guest_name))
+            added = 0 if cursor.fetchone() else self._insert_guests(cursor, row[0], [guest_name])
+            self.status_engine.resized(host_name, added)
+            if added:
+                self.state_cache.update(lambda state: state.with_changed_players(
+                    {p['name']: {'guests': p['guests'] + (guest_name,)} for p in state.participants if p['name'] == host_name}))
+            cursor.execute("UPDATE participants SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (row[0],))
 
             conn.commit()
             conn.close()
@@ -471,40 +2092,44 @@ class Database:
 
             if host_name:
                 # Remove from specific host
-                cursor.execute("SELECT guests FROM participants WHERE name = ?", (host_name,))
+                cursor.execute("SELECT id FROM participants WHERE name = ?", (host_name,))
                 row = cursor.fetchone()
                 if not row:
                     conn.close()
                     return {'success': False, 'promoted': [], 'demoted': []}
 
-                guests = json.loads(row[0]) if row[0] else []
-                if guest_name in guests:
-                    guests.remove(guest_name)
-                    cursor.execute("""
-                        UPDATE participants
-                        SET guests = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE name = ?
-                    """, (json.dumps(guests), host_name))
+                cursor.execute("""
+                    DELETE FROM guests WHERE id = (SELECT id FROM guests WHERE host_id = ? AND guest_name = ?
+                                                   ORDER BY signup_order LIMIT 1)
+                """, (row[0], guest_name))
+                hosts = [host_name] if cursor.rowcount else []
+                if hosts:
+                    self.status_engine.resized(host_name, -1)
+                    cursor.execute("UPDATE participants SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (row[0],))
             else:
-                # Remove from all hosts
-                cursor.execute("SELECT name, guests FROM participants")
-                rows = cursor.fetchall()
-                removed = False
-
-                for name, guests_json in rows:
-                    guests = json.loads(guests_json) if guests_json else []
-                    if guest_name in guests:
-                        guests.remove(guest_name)
-                        cursor.execute("""
-                            UPDATE participants
-                            SET guests = ?, updated_at = CURRENT_TIMESTAMP
-                            WHERE name = ?
-                        """, (json.dumps(guests), name))
-                        removed = True
-
-                if not removed:
+                # Remove from all hosts (one of theirs each, if they listed it twice)
+                cursor.execute("""
+                    SELECT g.id, g.host_id, p.name FROM guests g JOIN participants p ON p.id = g.host_id
+                    WHERE g.guest_name = ? ORDER BY g.host_id, g.signup_order
+                """, (guest_name,))
+                first = {}
+                for guest_id, host_id, host in cursor.fetchall():
+                    first.setdefault(host_id, (guest_id, host))
+                if not first:
                     conn.close()
                     return {'success': False, 'promoted': [], 'demoted': []}
+                cursor.executemany("DELETE FROM guests WHERE id = ?", [(guest_id,) for guest_id, _ in first.values()])
+                cursor.executemany("UPDATE participants SET updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                                   [(host_id,) for host_id in first])
+                hosts = [host for _, host in first.values()]
+                for host in hosts:
+                    self.status_engine.resized(host, -1)
+            if hosts:
+                def without_one(guests):
+                    i = guests.index(guest_name)
+                    return guests[:i] + guests[i + 1:]
+                self.state_cache.update(lambda state: state.with_changed_players(
+                    {p['name']: {'guests': without_one(p['guests'])} for p in state.participants if p['name'] in hosts}))
 
             conn.commit()
             conn.close()
@@ -544,6 +2169,8 @@ class Database:
                 INSERT INTO constraints (constraint_type, player_name, target_name, value, active, created_at)
                 VALUES (?, ?, ?, ?, 1, CURRENT_TIMESTAMP)
             """, (constraint_type, player_name, target_name, value))
+            added = WeeklyState.constraint(cursor.lastrowid, constraint_type, player_name, target_name, value)
+            self.state_cache.update(lambda state: state.with_constraints(state.constraints + (added,)))
 
             conn.commit()
             conn.close()
@@ -570,6 +2197,11 @@ class Database:
                 """, (constraint_type, player_name))
 
             rows_affected = cursor.rowcount
+            if rows_affected:
+                self.state_cache.update(lambda state: state.with_constraints(
+                    c for c in state.constraints
+                    if not (c['type'] == constraint_type and c['player'] == player_name
+                            and (not target_name or c['target'] == target_name))))
             conn.commit()
             conn.close()
             return rows_affected > 0
@@ -578,66 +2210,27 @@ class Database:
             return False
 
     def get_constraints(self, player_name: str = None) -> List[Dict]:
-        """Get all active constraints (optionally for a specific player)"""
-        try:
+        """Get all active constraints (optionally for a specific player). Before the state cache
+        is loaded, one player's constraints are a query on the player index."""
+        if player_name and self.state_cache.current() is None:
             conn = self._connect()
-            cursor = conn.cursor()
-
-            if player_name:
-                cursor.execute("""
+            try:
+                rows = conn.execute("""
                     SELECT constraint_type, player_name, target_name, value
                     FROM constraints
                     WHERE player_name = ? AND active = 1
-                    ORDER BY constraint_type, player_name
-                """, (player_name,))
-            else:
-                cursor.execute("""
-                    SELECT constraint_type, player_name, target_name, value
-                    FROM constraints
-                    WHERE active = 1
-                    ORDER BY constraint_type, player_name
-                """)
-
-            rows = cursor.fetchall()
-            conn.close()
-
-            constraints = []
-            for row in rows:
-                constraints.append({
-                    'type': row[0],
-                    'player': row[1],
-                    'target': row[2],
-                    'value': row[3]
-                })
-            return constraints
-        except Exception as e:
-            print(f"❌ Error getting constraints: {e}")
-            return []
+                    ORDER BY constraint_type, player_name, target_name IS NOT NULL, target_name, id
+                """, (player_name,)).fetchall()
+            finally:
+                conn.close()
+            return [{'type': row[0], 'player': row[1], 'target': row[2], 'value': row[3]} for row in rows]
+        return [{'type': c['type'], 'player': c['player'], 'target': c['target'], 'value': c['value']}
+                for c in self.state().constraints if player_name is None or c['player'] == player_name]
 
     def get_partner_preferences(self) -> Dict[str, List[str]]:
         """Get all partner preferences as a dict {player: [preferred_partners]}
         Includes both season-long partner_preference and weekly_pairing constraints."""
-        try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT player_name, target_name
-                FROM constraints
-                WHERE constraint_type IN ('partner_preference', 'weekly_pairing') AND active = 1
-            """)
-            rows = cursor.fetchall()
-            conn.close()
-
-            preferences = {}
-            for player, target in rows:
-                if player not in preferences:
-                    preferences[player] = []
-                if target not in preferences[player]:
-                    preferences[player].append(target)
-            return preferences
-        except Exception as e:
-            print(f"❌ Error getting partner preferences: {e}")
-            return {}
+        return self.state().partner_preferences()
 
     def save_weekly_pairings(self, pairings: List[list]):
         """Save AI-detected MP pairings as weekly constraints.
@@ -649,6 +2242,7 @@ class Database:
             cursor = conn.cursor()
             # Clear previous weekly pairings before adding new ones
             cursor.execute("DELETE FROM constraints WHERE constraint_type = 'weekly_pairing'")
+            saved = []
             for pair in pairings:
                 if len(pair) == 2:
                     p1, p2 = pair[0], pair[1]
@@ -656,18 +2250,27 @@ class Database:
                         INSERT INTO constraints (constraint_type, player_name, target_name, active)
                         VALUES ('weekly_pairing', ?, ?, 1)
                     """, (p1, p2))
+                    saved.append(WeeklyState.constraint(cursor.lastrowid, 'weekly_pairing', p1, p2))
                     print(f"   🤝 MP pairing detected: {p1} ↔ {p2}")
+            self.state_cache.update(lambda state: state.with_constraints(
+                tuple(c for c in state.constraints if c['type'] != 'weekly_pairing') + tuple(saved)))
             conn.commit()
             conn.close()
         except Exception as e:
             print(f"❌ Error saving weekly pairings: {e}")
 
+    def get_weekly_pairings(self) -> List[list]:
+        """Get this week's AI-detected MP pairings as [[player, partner], ...]"""
+        return self.state().weekly_pairings()
+
     def clear_weekly_pairings(self):
         """Clear all AI-detected weekly pairings"""
         try:
             conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("DELETE FROM constraints WHERE constraint_type = 'weekly_pairing'")
+            self.state_cache.update(lambda state: state.with_constraints(
+                c for c in state.constraints if c['type'] != 'weekly_pairing'))
             conn.commit()
             conn.close()
         except Exception as e:
@@ -675,54 +2278,14 @@ class Database:
 
     def get_avoidances(self) -> Dict[str, List[str]]:
         """Get all avoidances as a dict {player: [players_to_avoid]}"""
-        try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT player_name, target_name
-                FROM constraints
-                WHERE constraint_type = 'avoid' AND active = 1
-            """)
-            rows = cursor.fetchall()
-            conn.close()
-
-            avoidances = {}
-            for player, target in rows:
-                if player not in avoidances:
-                    avoidances[player] = []
-                avoidances[player].append(target)
-            return avoidances
-        except Exception as e:
-            print(f"❌ Error getting avoidances: {e}")
-            return {}
+        return self.state().avoidances()
 
     # ==================== TEE TIME MANAGEMENT (Phase 4) ====================
 
     def get_tee_time_settings(self) -> Optional[Dict]:
         """Get active tee time settings"""
-        try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT start_time, interval_minutes, num_slots
-                FROM tee_time_settings
-                WHERE active = 1
-                ORDER BY created_at DESC
-                LIMIT 1
-            """)
-            row = cursor.fetchone()
-            conn.close()
-
-            if row:
-                return {
-                    'start_time': row[0],
-                    'interval_minutes': row[1],
-                    'num_slots': row[2]
-                }
-            return None
-        except Exception as e:
-            print(f"❌ Error getting tee time settings: {e}")
-            return None
+        settings = self.state().tee_time_settings
+        return dict(settings) if settings else None
 
     def set_tee_time_settings(self, start_time: str, interval_minutes: int, num_slots: int) -> bool:
         """Set new tee time settings (deactivates previous settings)"""
@@ -738,6 +2301,10 @@ class Database:
                 INSERT INTO tee_time_settings (start_time, interval_minutes, num_slots, active, created_at)
                 VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)
             """, (start_time, interval_minutes, num_slots))
+            self.status_engine.capacity_changed()
+            settings = MappingProxyType({'start_time': start_time, 'interval_minutes': interval_minutes,
+                                         'num_slots': num_slots})
+            self.state_cache.update(lambda state: state.with_tee_times(tee_time_settings=settings))
 
             conn.commit()
             conn.close()
@@ -748,74 +2315,52 @@ class Database:
 
     def generate_tee_times(self) -> List[str]:
         """Generate list of available tee times (auto-generated + additions - removals)"""
-        # Start with auto-generated times
-        settings = self.get_tee_time_settings()
-        if not settings:
-            return []
-
-        from datetime import datetime, timedelta
-
-        # Parse start time
-        start_hour, start_min = map(int, settings['start_time'].split(':'))
-        current = datetime.now().replace(hour=start_hour, minute=start_min, second=0, microsecond=0)
-
-        tee_times = set()
-        for i in range(settings['num_slots']):
-            tee_times.add(current.strftime('%H:%M'))
-            current += timedelta(minutes=settings['interval_minutes'])
-
-        # Add manually added times
-        added_times = self.get_manual_tee_times()
-        tee_times.update(added_times)
-
-        # Remove manually removed times
-        removed_times = self.get_removed_tee_times()
-        tee_times.difference_update(removed_times)
-
-        # Convert back to sorted list
-        return sorted(list(tee_times))
+        return list(self.state().tee_times)
 
     def get_capacity(self) -> int:
         """Max players = number of tee time slots * MAX_GROUP_SIZE"""
-        tee_times = self.generate_tee_times()
-        return len(tee_times) * Config.MAX_GROUP_SIZE
+        return self.state().capacity
 
     def recalculate_statuses(self) -> Dict:
         """Recalculate playing/reserve status based on signup_order and capacity.
-        Returns {'promoted': [names], 'demoted': [names]} for notifications."""
-        capacity = self.get_capacity()
+        Returns {'promoted': [names], 'demoted': [names]} for notifications.
+        Inside batch() this waits for the end of the batch (and returns no changes)."""
+        if self._in_batch():
+            return {'promoted': [], 'demoted': []}
+        engine = self.status_engine
         conn = self._connect()
         try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, guests, signup_order, status FROM participants ORDER BY signup_order")
-            rows = cursor.fetchall()
-
-            spots_used = 0
-            promoted = []
-            demoted = []
-
-            for name, guests_json, signup_order, old_status in rows:
-                guests = json.loads(guests_json) if guests_json else []
-                block_size = 1 + len(guests)
-
-                if spots_used + block_size <= capacity:
-                    new_status = 'playing'
-                    spots_used += block_size
-                else:
-                    new_status = 'reserve'
-
-                if new_status != old_status:
-                    cursor.execute("UPDATE participants SET status = ? WHERE name = ?", (new_status, name))
-                    if new_status == 'playing':
-                        promoted.append(name)
-                    else:
-                        demoted.append(name)
-
+            # Settle under the write lock: no other thread then has uncommitted changes in the engine
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            with engine.lock:
+                try:
+                    if engine.capacity is None:
+                        engine.capacity = self.get_capacity()
+                    if not engine.loaded:
+                        engine.load(self._status_blocks(conn))
+                    changes = engine.settle(engine.capacity)
+                    conn.executemany("UPDATE participants SET status = ? WHERE name = ?", changes)
+                    if changes:
+                        self.state_cache.update(lambda state: state.with_changed_players(
+                            {name: {'status': status} for status, name in changes}))
+                except BaseException:
+                    engine.invalidate()
+                    raise
             conn.commit()
-            return {'promoted': promoted, 'demoted': demoted}
+            return {'promoted': [name for status, name in changes if status == 'playing'],
+                    'demoted': [name for status, name in changes if status == 'reserve']}
         finally:
             conn.close()
 
+    @staticmethod
+    def _status_blocks(conn) -> List[tuple]:
+        """(name, status, block size) for every player in signup order - a block is the player plus their guests"""
+        return conn.execute("""
+            SELECT p.name, p.status, 1 + (SELECT COUNT(*) FROM guests g WHERE g.host_id = p.id)
+            FROM participants p ORDER BY p.signup_order, p.id
+        """).fetchall()
+
     def add_manual_tee_time(self, time_str: str) -> bool:
         """Add a single tee time manually"""
         try:
@@ -827,6 +2372,10 @@ class Database:
                 INSERT INTO manual_tee_times (tee_time)
                 VALUES (?)
             """, (time_str,))
+            self.status_engine.capacity_changed()
+            self.state_cache.update(lambda state: state.with_tee_times(
+                manual_tee_times=tuple(sorted(state.manual_tee_times + (time_str,))),
+                removed_tee_times=tuple(t for t in state.removed_tee_times if t != time_str)))
             conn.commit()
             conn.close()
             return True
@@ -835,6 +2384,9 @@ class Database:
             conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("DELETE FROM removed_tee_times WHERE tee_time = ?", (time_str,))
+            self.status_engine.capacity_changed()
+            self.state_cache.update(lambda state: state.with_tee_times(
+                removed_tee_times=tuple(t for t in state.removed_tee_times if t != time_str)))
             conn.commit()
             conn.close()
             return True
@@ -853,6 +2405,10 @@ class Database:
                 INSERT INTO removed_tee_times (tee_time)
                 VALUES (?)
             """, (time_str,))
+            self.status_engine.capacity_changed()
+            self.state_cache.update(lambda state: state.with_tee_times(
+                manual_tee_times=tuple(t for t in state.manual_tee_times if t != time_str),
+                removed_tee_times=tuple(sorted(state.removed_tee_times + (time_str,)))))
 
             conn.commit()
             conn.close()
@@ -863,21 +2419,11 @@ class Database:
 
     def get_manual_tee_times(self) -> List[str]:
         """Get all manually added tee times"""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT tee_time FROM manual_tee_times ORDER BY tee_time")
-        times = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return times
+        return list(self.state().manual_tee_times)
 
     def get_removed_tee_times(self) -> List[str]:
         """Get all removed tee times"""
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT tee_time FROM removed_tee_times ORDER BY tee_time")
-        times = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return times
+        return list(self.state().removed_tee_times)
 
     def clear_manual_tee_times(self) -> bool:
         """Clear all manually added and removed tee times (reset to pure auto-generation)"""
@@ -885,6 +2431,8 @@ class Database:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM manual_tee_times")
         cursor.execute("DELETE FROM removed_tee_times")
+        self.status_engine.capacity_changed()
+        self.state_cache.update(lambda state: state.with_tee_times(manual_tee_times=(), removed_tee_times=()))
         conn.commit()
         conn.close()
         return True
@@ -954,93 +2502,776 @@ class Database:
             conn.close()
 
 
-# ==================== AI ANALYZER ====================
-class AIAnalyzer:
-    """Uses Claude to analyze all messages and extract player state"""
+# ==================== SINGLE FLIGHT ====================
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one. The first caller runs the function;
+    callers arriving while it runs wait and get the same result (or the same exception).
+    Nothing is kept afterwards - a call made once it has finished runs again. A nested call for
+    the key from the thread already running it runs directly instead of waiting on itself."""
 
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> in-flight call
+        self.stats = {'calls': 0, 'shared': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = {'thread': threading.current_thread(), 'done': threading.Event(),
+                                           'result': None, 'error': None}
+                self.stats['calls'] += 1
+                role = 'leader'
+            elif call['thread'] is threading.current_thread():
+                role = 'nested'
+            else:
+                self.stats['shared'] += 1
+                role = 'follower'
+        if role == 'nested':
+            return fn()
+        if role == 'follower':
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+    def in_flight(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+# ==================== AI API GATEWAY ====================
+class AIUnavailableError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open"""
+
+
+class BudgetExceededError(AIUnavailableError):
+    """Raised instead of calling the API when the weekly AI budget has paused this kind of call"""
+
+
+# USD per million tokens (input, output) - same figures as test_model_compare.py.
+# Prompt cache reads bill at 0.1x the input price and cache writes at 1.25x.
+MODEL_PRICING = {
+    "claude-haiku-4-5-20251001": (1.00, 5.00),
+    "claude-sonnet-4-5-20250929": (3.00, 15.00),
+}
+
+
+def usage_cost(model: str, usage: Dict) -> float:
+    """USD cost of one call from its token usage (cache token fields are optional)"""
+    price_in, price_out = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (usage['input_tokens'] * price_in + usage['output_tokens'] * price_out
+            + usage.get('cache_read_tokens', 0) * price_in * 0.1
+            + usage.get('cache_write_tokens', 0) * price_in * 1.25) / 1_000_000
+
+
+class TokenLedger:
+    """Records every API response's tokens, latency and cost (llm_ledger table) and enforces
+    the weekly budget (WEEKLY_AI_BUDGET_USD, weeks starting Monday 00:00 like the weekly reset).
+
+    As this week's spend approaches the budget the bot degrades in stages instead of stopping:
+      slow  - main group checked BUDGET_SLOW_FACTOR times less often; shadow runs paused
+      local - admin commands understood by the local rules only
+      fast  - main group analysis on the fast model only (no escalation)
+    One ledger is shared by every AI caller. Without a database it only keeps this week's total."""
+
+    STAGES = ('normal', 'slow', 'local', 'fast')
+
+    def __init__(self, db: 'Database' = None, weekly_budget: float = 0.0, thresholds: tuple = (0.6, 0.8, 0.9)):
+        self.db = db
+        self.weekly_budget = weekly_budget  # 0 = no budget, record only
+        self.thresholds = thresholds  # Share of the budget at which slow / local / fast start
+        self.stats = {'calls': 0, 'cost': 0.0, 'blocked': 0}
+        self._lock = threading.Lock()
+        self._week = None
+        self._week_spend = 0.0
+
+    @staticmethod
+    def week_start(now: datetime = None) -> str:
+        """Monday 00:00 of this week, in the ledger's created_at format"""
+        now = now or datetime.now()
+        monday = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        return monday.strftime("%Y-%m-%d %H:%M:%S")
+
+    def week_spend(self) -> float:
+        """USD spent since Monday (read from the ledger once per week, then kept in memory)"""
+        start = self.week_start()
+        with self._lock:
+            if self._week != start:
+                self._week = start
+                self._week_spend = 0.0
+                if self.db:
+                    try:
+                        self._week_spend = self.db.get_llm_spend(start)
+                    except Exception as e:
+                        print(f"⚠️  Couldn't read LLM ledger: {e}")
+            return self._week_spend
+
+    def record(self, lane: str, purpose: str, model: str, response, seconds: float) -> Optional[Dict]:
+        """Write one API response to the ledger. Returns the entry (None if the response had no usage)."""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return None
+        entry = {
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'lane': lane, 'purpose': purpose,
+            'model': model or '', 'input_tokens': usage.input_tokens or 0, 'output_tokens': usage.output_tokens or 0,
+            'cache_read_tokens': getattr(usage, 'cache_read_input_tokens', 0) or 0,
+            'cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', 0) or 0, 'seconds': seconds,
+        }
+        entry['cost'] = usage_cost(entry['model'], entry)
+        self.week_spend()  # Roll over to the new week before adding to it
+        with self._lock:
+            self._week_spend += entry['cost']
+            self.stats['calls'] += 1
+            self.stats['cost'] += entry['cost']
+        if self.db:
+            try:
+                self.db.record_llm_call(entry)
+            except Exception as e:
+                print(f"⚠️  Couldn't write LLM ledger: {e}")
+        return entry
+
+    def used(self) -> float:
+        """Share of the weekly budget spent (0.0 with no budget)"""
+        return self.week_spend() / self.weekly_budget if self.weekly_budget > 0 else 0.0
+
+    def stage(self) -> str:
+        used = self.used()
+        stage = 'normal'
+        for name, at in zip(self.STAGES[1:], self.thresholds):
+            if used >= at:
+                stage = name
+        return stage
+
+    def allows(self, lane: str) -> bool:
+        """False if the budget stage has paused this lane's calls ('shadow' from slow, 'commands' from local)"""
+        level = self.STAGES.index(self.stage())
+        allowed = not ((lane == 'shadow' and level >= 1) or (lane == 'commands' and level >= 2))
+        if not allowed:
+            with self._lock:
+                self.stats['blocked'] += 1
+        return allowed
+
+    def fast_only(self) -> bool:
+        return self.stage() == 'fast'
+
+    def interval_factor(self, slow_factor: float) -> float:
+        """Multiplier for the main group check interval"""
+        return slow_factor if self.stage() != 'normal' else 1
+
+    def describe(self) -> str:
+        spent = self.week_spend()
+        if self.weekly_budget <= 0:
+            return f"${spent:.2f} this week (no budget set)"
+        return f"${spent:.2f} of ${self.weekly_budget:.2f} this week ({self.used():.0%}) - {self.stage()}"
+
+
+class CircuitBreaker:
+    """Stops calling the Anthropic API after repeated failures.
+
+    closed -> open after `threshold` consecutive failures; open -> half_open once
+    `reset_seconds` have passed (one trial call is let through); a successful trial
+    closes it again, a failed one re-opens it. A call that says nothing about the API's
+    health (a 400 for a bad request) neither closes nor opens it. Shared by every AI caller."""
+
+    def __init__(self, threshold: int = 5, reset_seconds: float = 300):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True if a call may go ahead now (moves open -> half_open when the cool-off is over)"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+                print("🟡 AI circuit breaker half-open - trying one call")
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
 
-    def analyze_messages(self, messages: List[Dict]) -> Dict:
-        """
-        Analyze all messages and return complete player state
+    def is_available(self) -> bool:
+        """Non-mutating check: would a call be attempted right now?"""
+        with self._lock:
+            if self.state == 'open':
+                return time.time() - self.opened_at >= self.reset_seconds
+            return not (self.state == 'half_open' and self._trial_in_flight)
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print("🟢 AI circuit breaker closed - API recovered")
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_inconclusive(self):
+        """The call failed for its own reasons (bad request etc.) - the API answered, but that
+        isn't a successful trial. Frees the half-open trial slot and changes nothing else."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.consecutive_failures >= self.threshold):
+                self.state = 'open'
+                self.opened_at = time.time()
+                self.times_opened += 1
+                print(f"🔴 AI circuit breaker OPEN after {self.consecutive_failures} failures - "
+                      f"pausing AI calls for {self.reset_seconds}s")
+
+    def describe(self) -> str:
+        with self._lock:
+            if self.state == 'open':
+                remaining = max(0, int(self.reset_seconds - (time.time() - self.opened_at)))
+                return f"🔴 open (retry in {remaining}s, {self.consecutive_failures} failures)"
+            if self.state == 'half_open':
+                return "🟡 half-open (trial call)"
+            return "🟢 closed"
+
+
+class LatencyHistogram:
+    """Fixed log-scale buckets (seconds) - constant memory however many calls are recorded,
+    and precise enough to see where API time goes. Quantiles report the bucket's upper bound."""
+
+    BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
 
-        Returns:
-        {
-            "players": [
-                {"name": "Alex", "status": "playing", "guests": ["Guest1"], "preferences": "early tee time"},
-                {"name": "John", "status": "playing", "guests": ["Tom"], "preferences": null}
-            ],
-            "summary": "8 players confirmed for Sunday...",
-            "changes": ["Alex added a guest", "Sarah dropped out"]
-        }
-        """
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)  # Last bucket: above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.BUCKETS + (self.max,), self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {'count': self.count, 'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'max': self.max}
+
+
+class AnthropicClientPool:
+    """One Anthropic client - and so one keep-alive HTTP connection pool - shared by every AI
+    caller (analysis, admin commands, shadow runs). Each caller still has its own LLMGateway
+    lane (deadline, retries, stats); the pool has enough connections that lanes never queue
+    on each other. Keeps time-to-first-byte and total latency histograms per endpoint and per
+    model from httpx event hooks, and can pre-warm a connection (TLS handshake included)
+    before it's needed. Get it with get_client_pool()."""
+
+    def __init__(self, api_key: str, base_url: str = None, max_connections: int = 10,
+                 keepalive_seconds: float = 300, prewarm_idle_seconds: float = 240):
+        self.prewarm_idle_seconds = prewarm_idle_seconds
+        self.histograms = {}  # (kind, label) -> {'ttfb': LatencyHistogram, 'total': LatencyHistogram}
+        self.stats = {'requests': 0, 'warmups': 0, 'warmup_failures': 0}
+        self.last_used = 0.0
+        self._lock = threading.Lock()
+        self._warming = False
+        # httpx.Limits, taken from the SDK so it matches the httpx it was built against
+        limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=max_connections, max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_seconds)
+        http_client = anthropic.DefaultHttpxClient(
+            limits=limits, event_hooks={'request': [self._on_request], 'response': [self._on_response]})
+        # Retries are handled by LLMGateway (with the shared circuit breaker), not the SDK
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+
+    def _on_request(self, request):
+        model = None
+        try:
+            model = json.loads(request.content or b'{}').get('model')
+        except Exception:
+            pass
+        request.extensions['pool_started'] = time.perf_counter()
+        request.extensions['pool_model'] = model
 
-        # PRE-FILTER MESSAGES before sending to AI
-        # 1. Find the organizer message ("now taking names")
-        organizer_keywords = ["now taking names", "taking names for sunday", "taking names this sunday"]
-        organizer_idx = -1
+    def _on_response(self, response):
+        started = response.request.extensions.get('pool_started')
+        if started is None:
+            return
+        ttfb = time.perf_counter() - started
+        response.read()  # Non-streaming calls read the body straight after this anyway
+        total = time.perf_counter() - started
+        labels = [('endpoint', response.request.url.path)]
+        if response.request.extensions.get('pool_model'):
+            labels.append(('model', response.request.extensions['pool_model']))
+        with self._lock:
+            self.stats['requests'] += 1
+            self.last_used = time.time()
+            for label in labels:
+                hist = self.histograms.setdefault(label, {'ttfb': LatencyHistogram(), 'total': LatencyHistogram()})
+                hist['ttfb'].add(ttfb)
+                hist['total'].add(total)
+
+    def warm(self) -> bool:
+        """Open a connection with a free request (list one model) so the next real call skips the
+        TCP/TLS setup. Any HTTP answer - even 401 - means the connection is up."""
+        started = time.time()
+        try:
+            self.client.with_options(timeout=10).models.list(limit=1)
+        except anthropic.APIStatusError:
+            pass
+        except Exception as e:
+            with self._lock:
+                self.stats['warmup_failures'] += 1
+            print(f"⚠️  AI connection pre-warm failed: {type(e).__name__}")
+            return False
+        with self._lock:
+            self.stats['warmups'] += 1
+            self.last_used = time.time()
+        print(f"🔥 AI connection warmed in {time.time() - started:.2f}s")
+        return True
 
-        for i, msg in enumerate(messages):
-            text_lower = msg['text'].lower()
-            if any(keyword in text_lower for keyword in organizer_keywords):
-                organizer_idx = i
-                break
+    def warm_if_idle(self, background: bool = True):
+        """Pre-warm if no request has gone out for prewarm_idle_seconds (idle connections get closed)"""
+        with self._lock:
+            if self._warming or time.time() - self.last_used < self.prewarm_idle_seconds:
+                return
+            self._warming = True
 
-        # 2. Filter messages: only include from organizer message onward
-        if organizer_idx >= 0:
-            filtered_messages = messages[organizer_idx:]
-        else:
-            # "Taking names" message not visible - too many messages since then
-            # Run delta analysis on recent messages to catch new signups/dropouts
-            print(f"⚠️  'Taking names' message not found in {len(messages)} loaded messages - running delta analysis")
-            return self._analyze_delta(messages)
+        def run():
+            try:
+                self.warm()
+            finally:
+                with self._lock:
+                    self._warming = False
 
-        # 3. Filter out messages that quote the organizer message WITHOUT adding signup text
-        final_messages = []
-        signup_keywords = ["please", "yes", "i'm in", "count me in", "me", "im in"]
+        if background:
+            threading.Thread(target=run, name='ai-prewarm', daemon=True).start()
+        else:
+            run()
+
+    def latency_summary(self) -> Dict[tuple, Dict]:
+        """{(kind, label): {'ttfb': summary, 'total': summary}} - kind is 'endpoint' or 'model'"""
+        with self._lock:
+            return {label: {stage: hist.summary() for stage, hist in hists.items()}
+                    for label, hists in self.histograms.items()}
+
+
+_client_pools = {}
+_client_pools_lock = threading.Lock()
+
+
+def get_client_pool(api_key: str, base_url: str = None) -> AnthropicClientPool:
+    """The shared AnthropicClientPool for this API key and base URL (created on first use).
+    base_url None = the SDK default, or the ANTHROPIC_BASE_URL environment variable - tests
+    point this at a local fake server."""
+    with _client_pools_lock:
+        key = (api_key, base_url)
+        if key not in _client_pools:
+            _client_pools[key] = AnthropicClientPool(
+                api_key, base_url, max_connections=Config.AI_MAX_CONNECTIONS,
+                keepalive_seconds=Config.AI_KEEPALIVE_SECONDS, prewarm_idle_seconds=Config.AI_PREWARM_IDLE_SECONDS)
+        return _client_pools[key]
+
+
+class LLMGateway:
+    """Single choke point for Anthropic API calls.
+
+    Adds a per-call deadline, bounded retries with full-jitter exponential backoff for
+    retryable errors (timeouts, connection errors, 429, 5xx/overloaded), the shared
+    circuit breaker, per-purpose latency samples for the admin stats, and the token ledger
+    (every response is recorded; calls the weekly budget has paused are refused)."""
+
+    LATENCY_SAMPLES = 50
+
+    def __init__(self, client, breaker: CircuitBreaker = None, timeout: float = 60,
+                 max_retries: int = 2, backoff_base: float = 1.0, backoff_cap: float = 20.0,
+                 ledger: TokenLedger = None, lane: str = 'analysis'):
+        self.client = client
+        self.breaker = breaker or CircuitBreaker()
+        self.ledger = ledger or TokenLedger()
+        self.lane = lane  # Ledger label: 'analysis', 'commands' or 'shadow'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.latencies = {}  # purpose -> list of recent successful call durations (seconds)
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'over_budget': 0}
+        self._lock = threading.Lock()  # stats and latencies are updated from the analysis worker and admin threads
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.InternalServerError)):
+            return True  # APITimeoutError is an APIConnectionError
+        return isinstance(error, anthropic.APIStatusError) and (error.status_code == 529 or error.status_code >= 500)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _record_latency(self, purpose: str, seconds: float):
+        with self._lock:
+            samples = self.latencies.setdefault(purpose, [])
+            samples.append(seconds)
+            del samples[:-self.LATENCY_SAMPLES]
+
+    def latency_summary(self) -> Dict[str, Dict]:
+        """{purpose: {'count', 'p50', 'p95', 'max'}} over the recent samples"""
+        summary = {}
+        with self._lock:
+            for purpose, samples in self.latencies.items():
+                ordered = sorted(samples)
+                summary[purpose] = {
+                    'count': len(ordered),
+                    'p50': ordered[len(ordered) // 2],
+                    'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    'max': ordered[-1],
+                }
+        return summary
+
+    def create(self, purpose: str, timeout: float = None, **kwargs):
+        """client.messages.create with deadline, retries and breaker. Raises AIUnavailableError
+        if the breaker is open (BudgetExceededError if the budget has paused this lane),
+        otherwise the last API error once retries are exhausted."""
+        timeout = timeout or self.timeout
+        self._count('calls')
+        if not self.ledger.allows(self.lane):
+            self._count('over_budget')
+            raise BudgetExceededError(f"Weekly AI budget ({self.ledger.describe()}) - skipped {purpose} call")
+        if not self.breaker.allow_request():
+            self._count('rejected')
+            raise AIUnavailableError(f"AI circuit breaker open - skipped {purpose} call")
+
+        deadline = time.time() + timeout * (self.max_retries + 1)
+        attempt = 0
+        while True:
+            started = time.time()
+            try:
+                response = self.client.messages.create(timeout=timeout, **kwargs)
+            except Exception as e:
+                backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+                retryable = self.is_retryable(e)
+                if retryable and attempt < self.max_retries and time.time() + backoff < deadline:
+                    attempt += 1
+                    self._count('retries')
+                    print(f"⚠️  {purpose} call failed ({type(e).__name__}) - retry {attempt}/{self.max_retries} in {backoff:.1f}s")
+                    time.sleep(backoff)
+                    continue
+                self._count('failures')
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # Bad request etc. - don't trip the breaker, but it isn't a success either
+                    self.breaker.record_inconclusive()
+                raise
+            self._record_latency(purpose, time.time() - started)
+            self.ledger.record(self.lane, purpose, kwargs.get('model'), response, time.time() - started)
+            self.breaker.record_success()
+            return response
+
+
+# ==================== STRUCTURED AI OUTPUT ====================
+# JSON schemas for every LLM reply. Claude is forced to answer through a tool whose
+# input_schema is one of these, then the input is re-checked with validate_schema()
+# (the API does not guarantee the schema is honoured).
+
+_NAME = {"type": "string", "minLength": 1}
+_PLAYER = {
+    "type": "object",
+    "required": ["name"],
+    "properties": {
+        "name": _NAME,
+        "guests": {"type": "array", "items": _NAME},
+        "preferences": {"type": ["string", "null"]},
+    },
+}
+_PAIRINGS = {"type": "array", "items": {"type": "array", "items": _NAME, "minItems": 2, "maxItems": 2}}
+_GUEST_CHANGE = {
+    "type": "object",
+    "required": ["guest_name"],
+    "properties": {"host": {"type": ["string", "null"]}, "guest_name": _NAME},
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "required": ["players", "pairings", "total_count"],
+    "properties": {
+        "players": {"type": "array", "items": _PLAYER},
+        "pairings": _PAIRINGS,
+        "total_count": {"type": "integer"},
+        "summary": {"type": "string"},
+        "changes": {"type": "array", "items": {"type": "string"}},
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]},
+    },
+}
+
+DELTA_SCHEMA = {
+    "type": "object",
+    "required": ["add", "remove", "guest_add", "guest_remove"],
+    "properties": {
+        "add": {"type": "array", "items": _PLAYER},
+        "remove": {"type": "array", "items": _NAME},
+        "guest_add": {"type": "array", "items": _GUEST_CHANGE},
+        "guest_remove": {"type": "array", "items": _GUEST_CHANGE},
+    },
+}
+
+INCREMENTAL_SCHEMA = {
+    "type": "object",
+    "required": ["add", "remove", "guest_add", "guest_remove", "preferences", "pairings"],
+    "properties": {
+        **DELTA_SCHEMA["properties"],
+        "preferences": {"type": "array", "items": {
+            "type": "object",
+            "required": ["name"],
+            "properties": {"name": _NAME, "preferences": {"type": ["string", "null"]}},
+        }},
+        "pairings": _PAIRINGS,
+    },
+}
+CHUNK_SCHEMA = {
+    "type": "object",
+    "required": ["events", "pairings"],
+    "properties": {
+        "events": {"type": "array", "items": {
+            "type": "object",
+            "required": ["line", "name", "action"],
+            "properties": {
+                "line": {"type": "integer"},
+                "name": _NAME,
+                "action": {"type": "string", "enum": ["in", "out", "guest_add", "guest_remove", "preference"]},
+                "guest_name": {"type": ["string", "null"]},
+                "preferences": {"type": ["string", "null"]},
+            },
+        }},
+        "pairings": _PAIRINGS,
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]},
+    },
+}
+
+ADMIN_COMMANDS = [
+    "show_list", "show_tee_sheet", "add_player", "remove_player", "add_guest", "remove_guest",
+    "set_partner_preference", "remove_partner_preference", "set_avoidance", "remove_avoidance",
+    "show_constraints", "set_tee_times", "show_tee_times", "set_time_preference", "remove_time_preference",
+    "add_tee_time", "remove_tee_time", "clear_tee_times", "clear_time_preferences", "clear_tee_sheet",
+    "clear_participants", "swap_players", "move_player", "randomize", "show_ai_stats", "show_shadow_stats", "show_usage",
+    "unknown",
+]
+
+COMMAND_SCHEMA = {
+    "type": "object",
+    "required": ["command", "confidence", "params"],
+    "properties": {
+        "command": {"type": "string", "enum": ADMIN_COMMANDS},
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]},
+        "params": {
+            "type": "object",
+            "properties": {
+                "player_name": {"type": ["string", "null"]},
+                "target_name": {"type": ["string", "null"]},
+                "guest_name": {"type": ["string", "null"]},
+                "host_name": {"type": ["string", "null"]},
+                "start_time": {"type": ["string", "null"]},
+                "interval_minutes": {"type": ["integer", "string", "null"]},
+                "num_slots": {"type": ["integer", "string", "null"]},
+                "time_preference": {"type": ["string", "null"]},
+                "tee_time": {"type": ["string", "null"]},
+                "group_number": {"type": ["integer", "string", "null"]},
+                "runs": {"type": ["integer", "string", "null"]},
+            },
+        },
+        "needs_response": {"type": "boolean"},
+    },
+}
+
+BATCH_COMMAND_SCHEMA = {
+    "type": "object",
+    "required": ["commands"],
+    "properties": {
+        "commands": {"type": "array", "items": {
+            **COMMAND_SCHEMA,
+            "required": ["message"] + COMMAND_SCHEMA["required"],
+            "properties": {"message": {"type": "integer"}, **COMMAND_SCHEMA["properties"]},
+        }},
+    },
+}
+
+_JSON_TYPES = {
+    "object": dict, "array": list, "string": str,
+    "integer": int, "number": (int, float), "boolean": bool, "null": type(None),
+}
+
+
+def validate_schema(value, schema: Dict, path: str = "$") -> List[str]:
+    """Check value against the small JSON-schema subset used above.
+    Returns a list of human-readable errors (empty if valid) - these are fed back to the
+    model verbatim on a repair retry, so they name the exact path that is wrong."""
+    errors = []
+    types = schema.get("type")
+    if types:
+        types = types if isinstance(types, list) else [types]
+        # bool is a subclass of int in Python - don't let True pass as an integer
+        ok = any(isinstance(value, _JSON_TYPES[t]) and not (t in ("integer", "number") and isinstance(value, bool))
+                 for t in types)
+        if not ok:
+            return [f"{path}: expected {' or '.join(types)}, got {type(value).__name__}"]
+
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if isinstance(value, str) and len(value.strip()) < schema.get("minLength", 0):
+        errors.append(f"{path}: must not be empty")
+
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing required field '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate_schema(value[key], sub_schema, f"{path}.{key}"))
+
+    if isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            errors.append(f"{path}: needs at least {schema['minItems']} items")
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            errors.append(f"{path}: allows at most {schema['maxItems']} items")
+        if "items" in schema:
+            for i, item in enumerate(value):
+                errors.extend(validate_schema(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+class StructuredCaller:
+    """Calls Claude with a forced tool whose input_schema is the expected reply shape.
+
+    Replaces hand-stripping ```json fences and json.loads on free text. A reply that
+    fails validation gets exactly one targeted repair turn (the validation errors are
+    sent back as an is_error tool_result); if that also fails, ValueError is raised."""
+
+    def __init__(self, gateway: LLMGateway):
+        self.gateway = gateway
+        self.stats = {'calls': 0, 'parse_failures': 0, 'repairs': 0, 'repair_failures': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    @staticmethod
+    def _extract(response, tool_name: str):
+        """Return (tool_use_block, input) or (None, None) if the model didn't call the tool"""
+        for block in response.content:
+            if getattr(block, 'type', None) == 'tool_use' and block.name == tool_name:
+                return block, block.input
+        return None, None
+
+    @staticmethod
+    def _usage(response) -> Optional[Dict]:
+        if getattr(response, 'usage', None) is None:
+            return None
+        return {'input_tokens': response.usage.input_tokens, 'output_tokens': response.usage.output_tokens}
+
+    def call(self, model: str, max_tokens: int, system_prompt: str, user_prompt: str,
+             tool_name: str, schema: Dict, purpose: str = None) -> tuple:
+        """Returns (validated_result, usage). Raises on API errors or an unrepairable reply.
+        `purpose` ('analysis', 'delta', 'command'...) labels the call in the ledger and latency stats;
+        the tool name is used if none is given."""
+        tool = {
+            "name": tool_name,
+            "description": "Record the structured result. Always respond by calling this tool.",
+            "input_schema": schema,
+        }
+        messages = [{"role": "user", "content": user_prompt}]
+        self._count('calls')
+
+        response = self.gateway.create(
+            purpose or tool_name,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0.1,
+            system=system_prompt,
+            tools=[tool],
+            tool_choice={"type": "tool", "name": tool_name},
+            messages=messages
+        )
+        usage = self._usage(response)
+        block, result = self._extract(response, tool_name)
+        errors = validate_schema(result, schema) if block else [f"no {tool_name} tool call in reply"]
+        if not errors:
+            return result, usage
+
+        # One targeted repair attempt - tell the model exactly what was wrong
+        self._count('parse_failures')
+        print(f"⚠️  {tool_name} reply failed validation ({len(errors)} error(s)): {'; '.join(errors[:3])} - requesting repair")
+        if block:
+            repair_turn = [{
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "is_error": True,
+                "content": "Schema validation failed:\n" + "\n".join(errors[:20]) +
+                           f"\nCall {tool_name} again with the corrected, complete result."
+            }]
+        else:
+            repair_turn = f"You must respond by calling the {tool_name} tool with the complete result."
+        messages = messages + [
+            {"role": "assistant", "content": response.content},
+            {"role": "user", "content": repair_turn},
+        ]
 
-        for msg in filtered_messages:
-            # Check if message is quoting the organizer message
-            text_lower = msg['text'].lower()
-            is_pure_organizer_quote = False
+        response = self.gateway.create(
+            purpose or tool_name,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0.1,
+            system=system_prompt,
+            tools=[tool],
+            tool_choice={"type": "tool", "name": tool_name},
+            messages=messages
+        )
+        repair_usage = self._usage(response)
+        if usage and repair_usage:
+            usage = {k: usage[k] + repair_usage[k] for k in usage}
+        block, result = self._extract(response, tool_name)
+        errors = validate_schema(result, schema) if block else [f"no {tool_name} tool call in reply"]
+        if errors:
+            self._count('repair_failures')
+            raise ValueError(f"{tool_name} reply still invalid after repair: {'; '.join(errors[:3])}")
+        self._count('repairs')
+        print(f"   🔧 {tool_name} reply repaired")
+        return result, usage
 
-            # If message contains organizer keywords (like "now taking names") but sender didn't send the original
-            if any(keyword in text_lower for keyword in organizer_keywords):
-                # Check if this is the original organizer message or a quote
-                if organizer_idx >= 0:
-                    original_organizer = messages[organizer_idx]
-                    # If this person isn't the original organizer, they're quoting it
-                    if msg['sender'] != original_organizer['sender']:
-                        # They're quoting, but check if they added their own signup text
-                        # Look at the last 2 lines for signup keywords
-                        lines = msg['text'].strip().split('\n')
-                        last_lines = ' '.join(lines[-2:]).lower() if len(lines) >= 2 else lines[-1].lower() if lines else ""
-
-                        # Check if they added signup text after the quote
-                        has_signup_text = any(keyword in last_lines for keyword in signup_keywords)
-
-                        if not has_signup_text:
-                            # Pure quote with no signup - filter it out
-                            is_pure_organizer_quote = True
 
-            if not is_pure_organizer_quote:
-                final_messages.append(msg)
+# ==================== AI ANALYZER ====================
+class AIAnalyzer:
+    """Uses Claude to analyze all messages and extract player state"""
 
-        # Format messages for AI (include timestamps for chronological context)
-        def format_msg_line(msg):
-            ts = msg.get('timestamp', '')
-            if ts and '[' in ts and ']' in ts:
-                try:
-                    time_part = ts.split('[')[1].split(']')[0]  # "HH:MM, DD/MM/YYYY"
-                    return f"[{time_part}] [{msg['sender']}]: {msg['text']}"
-                except:
-                    pass
-            return f"[{msg['sender']}]: {msg['text']}"
+    ANALYSIS_MODEL = "claude-sonnet-4-5-20250929"
+    FAST_MODEL = "claude-haiku-4-5-20251001"  # First tier of the cascade - escalates to ANALYSIS_MODEL
 
-        messages_text = "\n".join([format_msg_line(msg) for msg in final_messages])
+    MODEL_PRICING = MODEL_PRICING  # USD per million tokens (input, output)
 
-        system_prompt = """You extract golf signup data from WhatsApp messages. Be deterministic and precise.
+    # System prompt for full analysis - a class attribute so shadow runs can try a candidate prompt
+    ANALYSIS_PROMPT = """You extract golf signup data from WhatsApp messages. Be deterministic and precise.
 
 RULES:
 1. Player names = exact [SenderName] from brackets. Never invent names.
@@ -1054,66 +3285,481 @@ RULES:
 9. QUOTED MESSAGES: When a message starts with another person's name/number/text before the sender's own words, that initial part is a QUOTE. Only the sender's OWN words (after the quote) count. Preferences mentioned in the sender's own words belong to THE SENDER, not the quoted person.
 10. Guests: ONLY "+1" or "can I have a guest" = "[HostName]-Guest" (anonymous guest). "bringing [Name]" where [Name] is not a group member = named guest.
 11. SIGNING UP OTHERS: "me and X please" or "me and X for MP" or "me X and Y please" = the sender PLUS X and Y as SEPARATE PLAYERS (not guests). Example: [Alex] says "Me and John balls for MP please" = TWO players: Alex AND John Balls. Example: [Maice] says "Me mitch and ken please" = THREE players: Maice, Mitch, Ken. They are independent players, NOT guests.
-12. NAME RESOLUTION: If someone is signed up by nickname (e.g. "ken") and later a matching person sends their own message (e.g. [KennyD]), use the [SenderName] as the canonical name. Similarly, use full names from recap messages when available (e.g. recap says "Mitchell Pettengell" for "mitch").
+12. NAMES: Write each player's name as it was given - their [SenderName], the name used by whoever signed them up (e.g. "ken"), or the name in a recap. Don't try to work out that a nickname and a sender are the same person; names are matched up after extraction.
 13. Note early/late or specific tee time preferences if mentioned. Attribute preferences to the person who SAID them, not to a quoted person.
 14. MP/Match Play pairings: When someone says "me and [Name] for MP" or similar, both are playing AND want to be paired together. Add to "pairings" array as [sender, named_player].
 15. RECAP MESSAGES (overrides Rule 1 for names): The organizer may post a numbered or bulleted list of names as a recap/roll call. ALL names in this recap are confirmed players even if they never sent a message themselves. This OVERRIDES Rule 1 - use the name from the recap as their player name. Examples: If recap lists "Scotty (+1)" = Scotty is playing with a guest (Scotty-Guest). If recap lists "Ricky Parkhurst" but no [Ricky Parkhurst] message exists = Ricky Parkhurst is still a confirmed player. You MUST include every single name from the recap list.
-16. CRITICAL: Return players in the ORDER they first signed up (earliest message = first in list). This order determines who gets a playing spot vs goes on the reserves list."""
+16. confidence: "high" if every signup is clear, "medium" if you had to interpret some messages, "low" if several signups are ambiguous or contradictory."""
+
+    # System prompt for one chunk of a long signup window - events, not a list; reduce_chunks() applies them
+    CHUNK_PROMPT = """You extract golf signup EVENTS from one part of a WhatsApp signup thread. Be deterministic and precise.
+Messages are numbered. Other parts of the thread are handled separately, so record what THESE messages say -
+never guess at anything from outside them.
+
+EVENTS (one per change, with the number of the message it came from):
+- "in": someone is playing. "yes please", "I'm in", "me", "please". "me and X please" = one "in" for the sender AND one for X.
+- "out": someone is not playing. "I'm out", "can't make it", "take me off", illness mentions.
+- "guest_add": a player brings a guest. "+1" or "can I have a guest" = guest_name "[Name]-Guest"; "bringing Tom" (not a group member) = guest_name "Tom".
+- "guest_remove": a guest is no longer coming (guest_name if known).
+- "preference": an early/late or specific tee time request - preferences is the request as said.
+
+RULES:
+1. name = exact [SenderName] from brackets, or the name used by whoever signed them up (e.g. "ken"). Never invent names.
+2. The ORGANIZER posts "now taking names" - NOT a player unless they separately sign up or list themselves in a recap.
+3. RECAP MESSAGES: a numbered or bulleted list of names from the organizer = an "in" for EVERY name listed ("Scotty (+1)" also = a guest_add).
+4. Skip [Unknown] senders. IGNORE questions, banter, emoji reactions and organisational chat.
+5. QUOTED MESSAGES: only the sender's OWN words count, and preferences belong to the person who said them.
+6. If someone changes their mind within these messages, record both events - later messages win.
+7. MP/Match Play: "me and [Name] for MP" = both "in" and [sender, named_player] in "pairings".
+8. confidence: "high" if every event is clear, "medium" if you had to interpret some messages, "low" if several are ambiguous."""
+
+    def __init__(self, api_key: str, db: 'Database' = None, breaker: CircuitBreaker = None,
+                 ledger: TokenLedger = None):
+        self.pool = get_client_pool(api_key)
+        self.client = self.pool.client
+        self.ledger = ledger or TokenLedger(db)
+        self.gateway = LLMGateway(self.client, breaker, timeout=Config.AI_TIMEOUT_SECONDS,
+                                  max_retries=Config.AI_MAX_RETRIES, ledger=self.ledger, lane='analysis')
+        self.structured = StructuredCaller(self.gateway)
+        self.db = db  # Optional - enables the persistent analysis cache
+        self.identity = db.identity if db else IdentityIndex()  # Nickname / sender name matching
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        self.tier_stats = {}  # model -> calls, cache hits, latency, tokens and cost
+        self._stats_lock = threading.Lock()
+        self._flights = SingleFlight()  # Identical calls in flight at once share one API call
+        self.cascade_stats = {'runs': 0, 'escalations': 0, 'reasons': {}}
+        self.compaction_stats = {'runs': 0, 'tokens_before': 0, 'tokens_after': 0}
+        self.last_window = []  # Signup window sent by the last full analysis
+        self.run_calls = []  # API calls made by the current analysis (model, seconds, tokens, cost)
+        self.shadow = None  # Optional ShadowEvaluator - replays sampled analyses on a candidate model/prompt
+
+    @staticmethod
+    def _cache_key(model: str, system_prompt: str, user_prompt: str, schema: Dict) -> str:
+        """Content address for an AI call: model + prompts + output schema, with whitespace
+        normalised per line so re-scrapes that only differ in trailing spaces/blank lines share an entry"""
+        normalised = '\n'.join(' '.join(line.split()) for line in user_prompt.strip().splitlines() if line.strip())
+        payload = json.dumps([model, system_prompt, normalised, schema], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _cached_call(self, purpose: str, model: str, max_tokens: int, system_prompt: str, user_prompt: str,
+                     tool_name: str, schema: Dict) -> Dict:
+        """Structured call behind the persistent content-addressed cache. A hit skips the API call entirely.
+        Safe to call from several threads at once (chunked analysis, shared refreshes): the stats are
+        updated under a lock, and an identical call already in flight is joined rather than paid twice.
+        Once the weekly budget is nearly spent every call goes to FAST_MODEL."""
+        if model != self.FAST_MODEL and self.ledger.fast_only():
+            print(f"💷 Weekly AI budget nearly spent - {purpose} call on {self.FAST_MODEL} instead of {model}")
+            model = self.FAST_MODEL
+        with self._stats_lock:
+            tier = self.tier_stats.setdefault(model, {'calls': 0, 'cache_hits': 0, 'seconds': 0.0,
+                                                      'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0})
+        key = self._cache_key(model, system_prompt, user_prompt, schema)
+        if self.db:
+            cached = self.db.get_cached_analysis(key)
+            with self._stats_lock:
+                if cached is not None:
+                    self.cache_stats['hits'] += 1
+                    tier['cache_hits'] += 1
+                else:
+                    self.cache_stats['misses'] += 1
+            if cached is not None:
+                print(f"💾 Analysis cache hit ({purpose}) - skipped API call ({self.cache_hit_rate():.0%} hit rate this session)")
+                return cached['result']
+
+        if self._flights.in_flight(key):
+            print(f"🔗 Identical {purpose} call already in flight - sharing its result")
+        # Each caller gets its own copy - results are post-processed in place further on
+        return copy.deepcopy(self._flights.do(key, lambda: self._uncached_call(
+            key, purpose, model, max_tokens, system_prompt, user_prompt, tool_name, schema, tier)))
+
+    def _uncached_call(self, key: str, purpose: str, model: str, max_tokens: int, system_prompt: str,
+                       user_prompt: str, tool_name: str, schema: Dict, tier: Dict) -> Dict:
+        """The API call behind _cached_call() (run once per key at a time)"""
+        if self.db:
+            cached = self.db.get_cached_analysis(key)  # Stored by a call for this key that just finished
+            if cached is not None:
+                return cached['result']
+        started = time.time()
+        result, usage = self.structured.call(model, max_tokens, system_prompt, user_prompt, tool_name, schema,
+                                             purpose=purpose)
+        call = {'model': model, 'seconds': time.time() - started, 'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0}
+        if usage:
+            call.update(input_tokens=usage['input_tokens'], output_tokens=usage['output_tokens'],
+                        cost=self.call_cost(model, usage))
+        with self._stats_lock:
+            self.run_calls.append(call)
+            tier['calls'] += 1
+            for field in ('seconds', 'input_tokens', 'output_tokens', 'cost'):
+                tier[field] += call[field]
+        if self.db:
+            self.db.save_cached_analysis(key, purpose, model, result, usage)
+        return result
+
+    @staticmethod
+    def call_cost(model: str, usage: Dict) -> float:
+        """USD cost of one call from its token usage"""
+        return usage_cost(model, usage)
+
+    def cache_hit_rate(self) -> float:
+        """Session cache hit rate (0.0 - 1.0)"""
+        total = self.cache_stats['hits'] + self.cache_stats['misses']
+        return self.cache_stats['hits'] / total if total else 0.0
+
+    ORGANIZER_KEYWORDS = ["now taking names", "taking names for sunday", "taking names this sunday"]
+
+    def find_organizer_index(self, messages: List[Dict]) -> int:
+        """Index of the organizer's "now taking names" message, or -1 if not loaded"""
+        for i, msg in enumerate(messages):
+            text_lower = msg['text'].lower()
+            if any(keyword in text_lower for keyword in self.ORGANIZER_KEYWORDS):
+                return i
+        return -1
+
+    def drop_organizer_quotes(self, messages: List[Dict], organizer_sender: str) -> List[Dict]:
+        """Filter out messages that quote the organizer message WITHOUT adding signup text"""
+        final_messages = []
+        signup_keywords = ["please", "yes", "i'm in", "count me in", "me", "im in"]
+
+        for msg in messages:
+            # Check if message is quoting the organizer message
+            text_lower = msg['text'].lower()
+            is_pure_organizer_quote = False
+
+            # If message contains organizer keywords (like "now taking names") but sender didn't send the original
+            if any(keyword in text_lower for keyword in self.ORGANIZER_KEYWORDS):
+                # If this person isn't the original organizer, they're quoting it
+                if msg['sender'] != organizer_sender:
+                    # They're quoting, but check if they added their own signup text
+                    # Look at the last 2 lines for signup keywords
+                    lines = msg['text'].strip().split('\n')
+                    last_lines = ' '.join(lines[-2:]).lower() if len(lines) >= 2 else lines[-1].lower() if lines else ""
+
+                    # Check if they added signup text after the quote
+                    has_signup_text = any(keyword in last_lines for keyword in signup_keywords)
+
+                    if not has_signup_text:
+                        # Pure quote with no signup - filter it out
+                        is_pure_organizer_quote = True
+
+            if not is_pure_organizer_quote:
+                final_messages.append(msg)
+        return final_messages
+
+    def filter_signup_window(self, messages: List[Dict]) -> Optional[List[Dict]]:
+        """Messages from the organizer's "taking names" post onward, minus pure quotes of it.
+        Returns None if the organizer message isn't among the loaded messages."""
+        organizer_idx = self.find_organizer_index(messages)
+        if organizer_idx < 0:
+            return None
+        return self.drop_organizer_quotes(messages[organizer_idx:], messages[organizer_idx]['sender'])
+
+    def compact(self, messages: List[Dict], context: List[Dict] = None) -> List[Dict]:
+        """Transcript compaction before prompt building (no-op if TRANSCRIPT_COMPACTION is off)"""
+        if not Config.TRANSCRIPT_COMPACTION or not messages:
+            return messages
+        compacted, stats = compact_transcript(messages, context)
+        self.compaction_stats['runs'] += 1
+        self.compaction_stats['tokens_before'] += stats['tokens_before']
+        self.compaction_stats['tokens_after'] += stats['tokens_after']
+        saved = 1 - stats['tokens_after'] / stats['tokens_before'] if stats['tokens_before'] else 0.0
+        print(f"🗜️  Compacted transcript: {stats['messages_before']} -> {stats['messages_after']} messages, "
+              f"~{stats['tokens_before']:,} -> ~{stats['tokens_after']:,} tokens (-{saved:.0%}; "
+              f"{stats['quotes_stripped']} quotes stripped, {stats['noise_dropped']} noise, {stats['merged']} merged)")
+        return compacted
+
+    def compaction_savings(self) -> float:
+        """Share of transcript tokens removed by compaction this session (0.0 - 1.0)"""
+        before = self.compaction_stats['tokens_before']
+        return 1 - self.compaction_stats['tokens_after'] / before if before else 0.0
+
+    def cascade_check(self, result: Dict, messages: List[Dict], current: List[Dict]) -> List[str]:
+        """Sanity checks on a cheap-tier analysis. Returns "label: detail" reasons to escalate (empty = accept).
+
+        - unknown names: a player who never sent a message and isn't mentioned in any
+        - large diff: the list changes more than CASCADE_MAX_CHANGE_RATIO of the current DB list
+        - the model reported low confidence
+        (Signup order isn't checked - it is computed locally from timestamps, see order_by_signup)"""
+        reasons = []
+        players = [p['name'] for p in result.get('players', [])]
+        senders = {m['sender'].lower() for m in messages}
+        words = set()
+        for m in messages:
+            words.update(re.findall(r"[a-z0-9']+", m['text'].lower()))
+
+        unknown = [n for n in players
+                   if n.lower() not in senders and not (set(re.findall(r"[a-z0-9']+", n.lower())) & words)]
+        if unknown:
+            reasons.append(f"unknown names: {', '.join(unknown[:3])}")
+
+        if len(current) >= 4:
+            before = {p['name'].lower() for p in current}
+            after = {n.lower() for n in players}
+            changed = len(before ^ after)
+            if changed > max(3, len(before) * Config.CASCADE_MAX_CHANGE_RATIO):
+                reasons.append(f"large diff: {changed} names changed")
+
+        if result.get('confidence') == 'low':
+            reasons.append("low confidence: self-reported")
+        return reasons
+
+    def escalation_rate(self) -> float:
+        """Share of cascade runs that needed the strong model (0.0 - 1.0)"""
+        runs = self.cascade_stats['runs']
+        return self.cascade_stats['escalations'] / runs if runs else 0.0
+
+    def analyze_messages(self, messages: List[Dict]) -> Optional[Dict]:
+        """
+        Analyze all messages and return complete player state (None if the AI call failed)
+
+        Returns:
+        {
+            "players": [
+                {"name": "Alex", "status": "playing", "guests": ["Guest1"], "preferences": "early tee time"},
+                {"name": "John", "status": "playing", "guests": ["Tom"], "preferences": null}
+            ],
+            "summary": "8 players confirmed for Sunday...",
+            "changes": ["Alex added a guest", "Sarah dropped out"]
+        }
+        """
+
+        # PRE-FILTER MESSAGES before sending to AI
+        self.run_calls = []
+        final_messages = self.filter_signup_window(messages)
+        if final_messages is None:
+            self.last_window = []
+            # "Taking names" message not visible - too many messages since then
+            # Run delta analysis on recent messages to catch new signups/dropouts
+            print(f"⚠️  'Taking names' message not found in {len(messages)} loaded messages - running delta analysis")
+            return self._analyze_delta(self.compact(messages))
+        # Window first, then compact it (earlier messages only resolve quotes): compaction merges a
+        # sender's messages a minute or two apart, which could fold the organizer's "taking names"
+        # post into their last message before it
+        final_messages = self.compact(final_messages, context=messages[:self.find_organizer_index(messages)])
+        self.last_window = final_messages  # Labelled for the local intent classifier once applied
+
+        if len(final_messages) > Config.ANALYSIS_CHUNK_MESSAGES:
+            return self._analyze_chunked(final_messages)
+
+        messages_text = "\n".join([format_message_line(msg) for msg in final_messages])
+
+        system_prompt = self.ANALYSIS_PROMPT
 
         user_prompt = f"""MESSAGES:
 {messages_text}
 
-IMPORTANT: Players must be listed in the order they FIRST signed up (earliest signup first in list).
-Return ONLY valid JSON:
-{{"players": [{{"name": "SenderName", "guests": [], "preferences": null}}], "pairings": [["Player1", "Player2"]], "total_count": 0, "summary": "", "changes": []}}"""
+Record the result with the record_signups tool."""
 
-        try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=4000,
-                temperature=0.1,
-                system=system_prompt,
-                messages=[{
-                    "role": "user",
-                    "content": user_prompt
-                }]
-            )
+        if Config.AI_CASCADE and self.FAST_MODEL != self.ANALYSIS_MODEL:
+            # Cheap tier first - only escalate when its result fails the sanity checks
+            self.cascade_stats['runs'] += 1
+            result = None
+            try:
+                result = self._cached_call('analysis', self.FAST_MODEL, 4000, system_prompt, user_prompt,
+                                           'record_signups', ANALYSIS_SCHEMA)
+                current = self.db.get_participants() if self.db else []
+                reasons = self.cascade_check(result, final_messages, current)
+            except AIUnavailableError as e:
+                print(f"❌ AI Analysis error: {e}")
+                return None
+            except Exception as e:
+                reasons = [f"fast tier failed: {type(e).__name__}"]
+            if reasons and self.ledger.fast_only():
+                # No escalation on the budget's last stage - the fast tier's answer (if any) stands
+                print(f"💷 Weekly AI budget nearly spent - not escalating ({'; '.join(reasons)})")
+                self.cascade_stats['reasons']['budget'] = self.cascade_stats['reasons'].get('budget', 0) + 1
+                if result is None:
+                    return None
+                reasons = []
+            if not reasons:
+                final = self._finalise(result, final_messages)
+                self._shadow(system_prompt, user_prompt, final, final_messages)
+                return final
+            self.cascade_stats['escalations'] += 1
+            for reason in reasons:
+                label = reason.split(':')[0]
+                self.cascade_stats['reasons'][label] = self.cascade_stats['reasons'].get(label, 0) + 1
+            print(f"⬆️  Escalating analysis to {self.ANALYSIS_MODEL}: {'; '.join(reasons)}")
 
-            result_text = response.content[0].text.strip()
+        try:
+            result = self._cached_call('analysis', self.ANALYSIS_MODEL, 4000, system_prompt, user_prompt,
+                                       'record_signups', ANALYSIS_SCHEMA)
 
-            # Remove markdown code blocks if present
-            if result_text.startswith("```"):
-                result_text = result_text.split("```")[1]
-                if result_text.startswith("json"):
-                    result_text = result_text[4:]
-                result_text = result_text.strip()
+        except Exception as e:
+            # None = keep existing data and retry next cycle (never apply a half-parsed list)
+            print(f"❌ AI Analysis error: {e}")
+            return None
+        final = self._finalise(result, final_messages)
+        self._shadow(system_prompt, user_prompt, final, final_messages)
+        return final
+
+    def _finalise(self, result: Dict, window: List[Dict]) -> Dict:
+        """Local post-processing of a full analysis: nicknames and recap names matched to players
+        (prompt rule 12 leaves this to us), then players put in signup order from the timestamps.
+        The model only decides who is in or out."""
+        players, renamed = self.identity.merge_players(result.get('players', []), [m['sender'] for m in window])
+        if renamed:
+            print("🪪 Resolved names: " + ', '.join(f"{old} -> {new}" for old, new in renamed.items()))
+        pairings = [[renamed.get(n, n) for n in pair] for pair in result.get('pairings', [])]
+        return {**result, 'players': self.order_by_signup(players, window, renamed), 'pairings': pairings}
+
+    def signup_times(self, names: List[str], window: List[Dict], renamed: Dict[str, str] = None) -> Dict[str, tuple]:
+        """When each player signed up, as (timestamp key, position in the scrape, offset in the text):
+        their own first signup-looking message, or an earlier organizer recap / other player's signup
+        message naming them ("me and ken please"). The scrape is in timestamp then on-screen order,
+        so position breaks ties within a minute. Players with no such message are left out."""
+        key = IdentityIndex.key
+        by_sender = {}
+        for i, msg in enumerate(window):
+            by_sender.setdefault(key(self.identity.canonical(msg['sender'])), []).append(i)
+
+        own = {}
+        for name in names:
+            idxs = by_sender.get(key(name), [])
+            labels = [IntentClassifier.keyword_label(window[i]['text']) for i in idxs]
+            own[name] = next((i for i, label in zip(idxs, labels) if label in ('signup', 'guest')),
+                             next((i for i, label in zip(idxs, labels) if label is None), idxs[0] if idxs else None))
+
+        # Messages that can sign someone else up: the organizer's (recaps) and each player's own signup
+        organizer_idx = self.find_organizer_index(window)
+        sources = {i for i in own.values() if i is not None}
+        if organizer_idx >= 0:
+            sources |= set(by_sender.get(key(window[organizer_idx]['sender']), []))
+
+        first_words = {}
+        for name in names:
+            first = key(name).split()[0] if key(name) else ''
+            first_words[first] = first_words.get(first, 0) + 1
+        times = {}
+        for name in names:
+            terms = {key(name)} | {key(old) for old, new in (renamed or {}).items() if new == name}
+            first = key(name).split()[0] if key(name) else ''
+            if len(first) >= 3 and first_words[first] == 1:
+                terms.add(first)
+            patterns = [re.compile(r"(?<!\w)" + re.escape(t) + r"(?!\w)") for t in terms if t]
+            candidates = []
+            if own[name] is not None:
+                candidates.append((message_sort_key(window[own[name]]), own[name], 0))
+            for i in sorted(sources):
+                if i == own[name] or key(self.identity.canonical(window[i]['sender'])) == key(name):
+                    continue
+                text = window[i]['text'].lower()
+                offsets = [match.start() for match in (p.search(text) for p in patterns) if match]
+                if offsets:
+                    candidates.append((message_sort_key(window[i]), i, min(offsets)))
+                    break
+            if candidates:
+                times[name] = min(candidates)
+        return times
 
-            result = json.loads(result_text)
-            return result
+    def order_by_signup(self, players: List[Dict], window: List[Dict], renamed: Dict[str, str] = None) -> List[Dict]:
+        """Players sorted by signup_times() - this order decides playing vs reserves, so it is computed
+        here, deterministically, rather than taken from the model's list. Players with no signup
+        message found keep the model's relative order, after everyone else."""
+        times = self.signup_times([p['name'] for p in players], window, renamed)
+        ranked = sorted(range(len(players)), key=lambda i: (times.get(players[i]['name'], ('~',)), i))
+        return [players[i] for i in ranked]
+
+    def _shadow(self, system_prompt: str, user_prompt: str, result: Dict, window: List[Dict]):
+        """Offer a fresh (non-cached) primary result to the shadow evaluator, if one is configured.
+        The candidate's result gets the same local post-processing before the two are compared."""
+        if self.shadow is None or not self.run_calls:
+            return
+        primary = {
+            'model': self.run_calls[-1]['model'],
+            **{field: sum(c[field] for c in self.run_calls) for field in ('seconds', 'input_tokens', 'output_tokens', 'cost')},
+        }
+        self.shadow.maybe_submit(system_prompt, user_prompt, result, primary,
+                                 finalise=lambda candidate: self._finalise(candidate, window))
+
+    def _analyze_chunked(self, window: List[Dict]) -> Optional[Dict]:
+        """Map-reduce analysis for long signup windows: fixed-size chunks from the start of the window
+        are analysed in parallel into per-message events, then reduce_chunks() merges them locally.
+        Chunk boundaries never move, so every chunk except the newest is byte-identical to the last
+        run and comes straight from the analysis cache. None if any chunk failed."""
+        size = max(Config.ANALYSIS_CHUNK_MESSAGES, 1)
+        chunks = [window[i:i + size] for i in range(0, len(window), size)]
+        organizer = window[0]['sender']
+        print(f"🧩 {len(window)} messages - analysing in {len(chunks)} chunks of up to {size}")
+
+        def analyse(part):
+            index, chunk = part
+            lines = "\n".join(f"{n}. {format_message_line(msg)}" for n, msg in enumerate(chunk, 1))
+            continued = " (continues from earlier messages)" if index else ""
+            user_prompt = f"""ORGANIZER: {organizer}
+PART {index + 1} of the signup thread{continued}
+
+MESSAGES:
+{lines}
+
+Record the events with the record_events tool."""
+            return self._cached_call('chunk', self.ANALYSIS_MODEL, 4000, self.CHUNK_PROMPT, user_prompt,
+                                     'record_events', CHUNK_SCHEMA)
 
+        try:
+            with ThreadPoolExecutor(max_workers=max(Config.ANALYSIS_CHUNK_WORKERS, 1)) as pool:
+                results = list(pool.map(analyse, enumerate(chunks)))
         except Exception as e:
-            print(f"❌ AI Analysis error: {e}")
-            return {
-                "players": [],
-                "total_count": 0,
-                "summary": "Error analyzing messages",
-                "changes": []
-            }
+            # Never reduce a partial set of chunks - a missing chunk would silently drop its signups
+            print(f"❌ AI Analysis error (chunked): {e}")
+            return None
+        return self._finalise(self.reduce_chunks(results), window)
+
+    def reduce_chunks(self, results: List[Dict]) -> Dict:
+        """Merge chunk events into a full analysis result (ANALYSIS_SCHEMA shape). Events are applied in
+        message order - chunk, then message number - so the latest message per person wins. Players
+        come out in first-signup order; _finalise() puts them in exact timestamp order afterwards."""
+        players = {}  # key -> player, in first-seen order
+        playing = {}  # key -> currently in?
+        events = sorted(((c, event.get('line', 0), n, event) for c, result in enumerate(results)
+                         for n, event in enumerate(result.get('events', []))), key=lambda e: e[:3])
+        for _, _, _, event in events:
+            name = self.identity.canonical(event['name'].strip())
+            key = IdentityIndex.key(name)
+            player = players.setdefault(key, {'name': name, 'guests': [], 'preferences': None})
+            action = event['action']
+            if action == 'in':
+                playing[key] = True
+            elif action == 'out':
+                playing[key] = False
+                player['guests'] = []  # Guests go with their host
+            elif action == 'guest_add':
+                playing[key] = True
+                guest = event.get('guest_name') or f"{player['name']}-Guest"
+                if guest not in player['guests']:
+                    player['guests'].append(guest)
+            elif action == 'guest_remove' and player['guests']:
+                guest = event.get('guest_name')
+                player['guests'].remove(guest if guest in player['guests'] else player['guests'][-1])
+            elif action == 'preference':
+                player['preferences'] = event.get('preferences')
+
+        final = [player for key, player in players.items() if playing.get(key)]
+        in_keys = {IdentityIndex.key(p['name']) for p in final}
+        pairings, seen = [], set()
+        for result in results:
+            for pair in result.get('pairings', []):
+                pair = [self.identity.canonical(n.strip()) for n in pair]
+                keys = tuple(sorted(IdentityIndex.key(n) for n in pair))
+                if keys not in seen and all(k in in_keys for k in keys):
+                    seen.add(keys)
+                    pairings.append(pair)
+
+        ranks = ['low', 'medium', 'high']
+        confidence = min((r.get('confidence', 'high') for r in results), key=ranks.index, default='high')
+        total = sum(1 + len(p['guests']) for p in final)
+        return {
+            'players': final,
+            'pairings': pairings,
+            'total_count': total,
+            'summary': f"{total} playing ({len(results)} chunks analysed)",
+            'changes': [],
+            'confidence': confidence,
+        }
 
     def _analyze_delta(self, messages: List[Dict]) -> Optional[Dict]:
         """Analyze recent messages for new signups/dropouts when 'taking names' is not visible.
         Returns a delta result with 'add' and 'remove' lists, or None if nothing found."""
-        def format_msg_line(msg):
-            ts = msg.get('timestamp', '')
-            if ts and '[' in ts and ']' in ts:
-                try:
-                    time_part = ts.split('[')[1].split(']')[0]
-                    return f"[{time_part}] [{msg['sender']}]: {msg['text']}"
-                except:
-                    pass
-            return f"[{msg['sender']}]: {msg['text']}"
-
-        messages_text = "\n".join([format_msg_line(msg) for msg in messages])
+        messages_text = "\n".join([format_message_line(msg) for msg in messages])
 
         system_prompt = """You analyze recent WhatsApp golf group messages to find NEW signups or dropouts.
 The original signup message is no longer visible - you are only seeing recent messages.
@@ -1127,7 +3773,7 @@ Look for:
 IGNORE: Banter, questions about tee times, general chat, reactions.
 Only include clear signup/dropout intent.
 
-Return JSON with:
+Record with:
 - "add": list of {"name": "SenderName", "guests": [], "preferences": null} for new signups
 - "remove": list of player names dropping out
 - "guest_add": list of {"host": "SenderName", "guest_name": "HostName-Guest"} for guest additions
@@ -1136,30 +3782,17 @@ Return JSON with:
         user_prompt = f"""RECENT MESSAGES:
 {messages_text}
 
-Return ONLY valid JSON:
-{{"add": [], "remove": [], "guest_add": [], "guest_remove": []}}"""
+Record the result with the record_delta tool (empty lists if nothing found)."""
 
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=1000,
-                temperature=0.1,
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_prompt}]
-            )
-
-            result_text = response.content[0].text.strip()
-            if result_text.startswith("```"):
-                result_text = result_text.split("```")[1]
-                if result_text.startswith("json"):
-                    result_text = result_text[4:]
-                result_text = result_text.rstrip("`")
-            delta = json.loads(result_text)
+            delta = self._cached_call('delta', self.ANALYSIS_MODEL, 1000, system_prompt, user_prompt,
+                                      'record_delta', DELTA_SCHEMA)
 
             has_changes = (delta.get('add') or delta.get('remove') or
                           delta.get('guest_add') or delta.get('guest_remove'))
 
             if has_changes:
+                delta['add'] = self.order_by_signup(delta.get('add', []), messages)
                 print(f"📝 Delta analysis found changes: +{len(delta.get('add', []))} players, -{len(delta.get('remove', []))} players, +{len(delta.get('guest_add', []))} guests, -{len(delta.get('guest_remove', []))} guests")
                 return {'delta': delta}
             else:
@@ -1170,17 +3803,446 @@ Return ONLY valid JSON:
             print(f"⚠️  Delta analysis error: {e}")
             return None
 
+    @staticmethod
+    def empty_patch() -> Dict:
+        return {'add': [], 'remove': [], 'guest_add': [], 'guest_remove': [], 'preferences': [], 'pairings': []}
+
+    def analyze_incremental(self, participants: List[Dict], pairings: List[list],
+                            new_messages: List[Dict]) -> Optional[Dict]:
+        """Patch the current participant state using only messages since the last analysis.
+
+        Unlike _analyze_delta, the model sees who is already signed up (names, guests,
+        preferences, signup order), so "I'm out" or "+1" from an existing player resolves
+        against real state instead of being re-derived from the whole transcript.
+
+        Returns a patch:
+        {"add": [{"name", "guests", "preferences"}], "remove": [names],
+         "guest_add": [{"host", "guest_name"}], "guest_remove": [{"host", "guest_name"}],
+         "preferences": [{"name", "preferences"}], "pairings": [[p1, p2]]}
+        or None on error (caller should fall back to a full analysis).
+        The caller compacts `new_messages` (with the previous snapshot as quote context).
+        """
+        state = [{
+            'name': p['name'],
+            'guests': p.get('guests', []),
+            'preferences': p.get('preferences'),
+            'signup_order': p.get('signup_order'),
+        } for p in participants]
+        state_text = json.dumps({'players': state, 'pairings': pairings}, indent=None)
+        messages_text = "\n".join([format_message_line(msg) for msg in new_messages])
+
+        system_prompt = """You maintain a golf signup list from WhatsApp messages. You get the CURRENT STATE (already signed-up players, in signup order) and only the NEW messages since it was computed. Return the changes those new messages make - nothing else.
+
+RULES:
+1. Player names = exact [SenderName] from brackets. If a sender matches a name in CURRENT STATE, use the state's spelling.
+2. SIGNUP ("I'm in", "yes please", "please", "me", "count me in") from someone NOT in state = add. From someone already in state = no change.
+3. DROPOUT ("I'm out", "can't make it", illness) from someone in state = remove.
+4. Latest message per person wins (use the [HH:MM, DD/MM/YYYY] timestamps).
+5. QUOTED MESSAGES: a message starting with another person's name/number/text is quoting; only the sender's own words (after the quote) count.
+6. Guests: "+1" or "can I have a guest" = guest_add "[HostName]-Guest". "bringing [Name]" = named guest. Cancelling a guest = guest_remove.
+7. "me and X please" = sender AND X as separate players. "me and X for MP" also adds a pairing [sender, X].
+8. Early/late or specific tee time requests = preferences change for that player (full new preference text).
+9. IGNORE: questions, banter, emoji reactions, organisational chat, [Unknown] senders."""
+
+        user_prompt = f"""CURRENT STATE:
+{state_text}
+
+NEW MESSAGES:
+{messages_text}
+
+Record the changes with the record_patch tool (empty lists if nothing changed)."""
+
+        try:
+            patch = self._cached_call('incremental', self.ANALYSIS_MODEL, 1000, system_prompt, user_prompt,
+                                      'record_patch', INCREMENTAL_SCHEMA)
+            print(f"📝 Incremental patch: +{len(patch['add'])} players, -{len(patch['remove'])} players, "
+                  f"+{len(patch['guest_add'])} guests, -{len(patch['guest_remove'])} guests, "
+                  f"{len(patch['preferences'])} preference changes, {len(patch['pairings'])} pairings")
+            return patch
+
+        except Exception as e:
+            print(f"⚠️  Incremental analysis error: {e}")
+            return None
+
+
+# ==================== SHADOW EVALUATION ====================
+class ShadowEvaluator:
+    """Replays a sample of full analyses against a candidate model and/or prompt.
+
+    The candidate never touches the participant list - its result is only diffed against
+    the primary one and stored in the shadow_runs table, so cheaper models or trimmed
+    prompts can be judged on real traffic. Runs on its own thread and API lane (own
+    breaker, no retries) so a slow or failing candidate can't delay or trip the primary."""
+
+    QUEUE_SIZE = 2  # Shadow jobs waiting beyond this are dropped, never queued up
+
+    def __init__(self, api_key: str, db: 'Database', model: str, sample_rate: float,
+                 system_prompt: str = None, prompt_label: str = "default", ledger: TokenLedger = None):
+        self.client = get_client_pool(api_key).client
+        self.ledger = ledger or TokenLedger(db)
+        self.gateway = LLMGateway(self.client, timeout=Config.AI_TIMEOUT_SECONDS, max_retries=0,
+                                  ledger=self.ledger, lane='shadow')
+        self.structured = StructuredCaller(self.gateway)
+        self.db = db
+        self.model = model
+        self.sample_rate = sample_rate
+        self.system_prompt = system_prompt  # None = same prompt as the primary
+        self.prompt_label = prompt_label
+        self.stats = {'sampled': 0, 'completed': 0, 'errors': 0, 'dropped': 0}
+        self._jobs = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config: 'Config', db: 'Database', ledger: TokenLedger = None) -> Optional['ShadowEvaluator']:
+        """Evaluator for the SHADOW_* settings, or None if shadow mode is off"""
+        if config.SHADOW_SAMPLE_RATE <= 0:
+            return None
+        system_prompt, label = None, "default"
+        if config.SHADOW_PROMPT_FILE:
+            try:
+                with open(config.SHADOW_PROMPT_FILE) as f:
+                    system_prompt = f.read().strip()
+                label = os.path.basename(config.SHADOW_PROMPT_FILE)
+            except OSError as e:
+                print(f"⚠️  Shadow prompt file not readable ({e}) - shadowing with the live prompt")
+        return cls(config.ANTHROPIC_API_KEY, db, config.SHADOW_MODEL, config.SHADOW_SAMPLE_RATE, system_prompt, label,
+                   ledger)
+
+    def maybe_submit(self, system_prompt: str, user_prompt: str, primary_result: Dict, primary: Dict,
+                     finalise=None) -> bool:
+        """Sample this analysis for a shadow run. Never blocks - returns True if it was queued.
+        `finalise` is the local post-processing the primary result already had (names, signup order).
+        Paused once the weekly budget reaches its first stage."""
+        if random.random() >= self.sample_rate or not self.ledger.allows('shadow'):
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='shadow-evaluator', daemon=True)
+            self._thread.start()
+        try:
+            self._jobs.put_nowait((system_prompt, user_prompt, primary_result, primary, finalise))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+        self.stats['sampled'] += 1
+        return True
+
+    def _run(self):
+        while True:
+            self.evaluate(*self._jobs.get())
+
+    def evaluate(self, system_prompt: str, user_prompt: str, primary_result: Dict, primary: Dict,
+                 finalise=None) -> Dict:
+        """Run the candidate on the same transcript, diff it against the primary and store the run"""
+        run = {
+            'primary_model': primary['model'], 'candidate_model': self.model, 'prompt': self.prompt_label,
+            'primary_seconds': primary['seconds'], 'primary_input_tokens': primary['input_tokens'],
+            'primary_output_tokens': primary['output_tokens'], 'primary_cost': primary['cost'],
+            'agree': False, 'diff': {}, 'candidate_seconds': 0.0, 'candidate_input_tokens': 0,
+            'candidate_output_tokens': 0, 'candidate_cost': 0.0, 'error': None,
+        }
+        started = time.time()
+        try:
+            result, usage = self.structured.call(self.model, 4000, self.system_prompt or system_prompt, user_prompt,
+                                                 'record_signups', ANALYSIS_SCHEMA, purpose='shadow')
+            run['candidate_seconds'] = time.time() - started
+            if usage:
+                run.update(candidate_input_tokens=usage['input_tokens'], candidate_output_tokens=usage['output_tokens'],
+                           candidate_cost=AIAnalyzer.call_cost(self.model, usage))
+            if finalise:
+                result = finalise(result)
+            run['diff'] = self.diff_results(primary_result, result)
+            run['agree'] = not run['diff']
+            self.stats['completed'] += 1
+        except Exception as e:
+            run['candidate_seconds'] = time.time() - started
+            run['error'] = f"{type(e).__name__}: {e}"[:200]
+            self.stats['errors'] += 1
+        self.db.save_shadow_run(run)
+        return run
+
+    @staticmethod
+    def diff_results(primary: Dict, candidate: Dict) -> Dict:
+        """What the candidate got differently: {'missing', 'extra', 'order', 'guests'} (only keys that differ).
+        Names compare case-insensitively; an empty dict means the two lists agree."""
+        def playing(result):
+            return [p for p in result.get('players', []) if p.get('status', 'playing') == 'playing']
+
+        def key(name):
+            return ' '.join(name.lower().split())
+
+        ours, theirs = playing(primary), playing(candidate)
+        our_names = {key(p['name']): p for p in ours}
+        their_names = {key(p['name']): p for p in theirs}
+        diff = {}
+        missing = [p['name'] for p in ours if key(p['name']) not in their_names]
+        extra = [p['name'] for p in theirs if key(p['name']) not in our_names]
+        if missing:
+            diff['missing'] = missing
+        if extra:
+            diff['extra'] = extra
+        shared_ours = [key(p['name']) for p in ours if key(p['name']) in their_names]
+        shared_theirs = [key(p['name']) for p in theirs if key(p['name']) in our_names]
+        if shared_ours != shared_theirs:
+            diff['order'] = [our_names[k]['name'] for k, other in zip(shared_ours, shared_theirs) if k != other]
+        guests = [our_names[k]['name'] for k in shared_ours
+                  if sorted(map(key, our_names[k].get('guests') or [])) != sorted(map(key, their_names[k].get('guests') or []))]
+        if guests:
+            diff['guests'] = guests
+        return diff
+
 
 # ==================== ADMIN COMMAND HANDLER ====================
+def edit_distance(a: str, b: str, limit: int = None) -> int:
+    """Optimal string alignment distance - insertions, deletions, substitutions and adjacent swaps cost 1.
+    With a limit, stops early and returns limit + 1 once the distance must exceed it."""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if limit is not None and min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+class LocalCommandParser:
+    """Rule-based parser for the admin command set listed in the startup message.
+
+    Tolerates case, punctuation and small typos in command words ("shwo list", "remvoe Dave")
+    and resolves player names against the current participants ("dave" -> "Dave Walker").
+    Returns the same {command, params, confidence} shape as the AI parser, or None when
+    the message doesn't clearly match - those still go to the AI."""
+
+    # Command words that typos are corrected towards (never names)
+    VOCABULARY = {
+        'show', 'list', 'sheet', 'constraints', 'times', 'stats', 'shadow', 'clear', 'participants',
+        'preference', 'preferences', 'randomize', 'randomise', 'shuffle', 'reshuffle', 'regenerate',
+        'remove', 'guest', 'plays', 'playing', 'with', 'pair', 'swap', 'switch', 'move', 'group',
+        'prefers', 'wants', 'early', 'late', 'avoidance', 'set', 'from', 'every', 'minutes', 'slots',
+        'time', 'last', 'away', 'take', 'into',
+    }
+    # Words that mean the "name" slot captured something other than a name
+    RESERVED = {'guest', 'tee', 'time', 'times', 'sheet', 'group', 'preference', 'preferences', 'early', 'late',
+                'list', 'all', 'everyone', 'everybody', 'avoidance', 'constraints', 'stats', 'me', 'us', 'him', 'them',
+                'and', 'with', 'for', 'to', 'from', 'the', 'please', 'pls', 'mate', 'can', 'you'}
+    NAME = re.compile(r"^[A-Za-z][\w.'()\-]*(?: [\w.'()\-]+){0,3}$")
+
+    _N = r"(?P<{}>[^\s].*?)"
+    _T = r"(?P<time>\d{1,2}[:.]\d{2})"
+
+    # (pattern, command, {param: group}, groups that must name a current participant)
+    # Order matters - specific forms ("remove tee time", "remove guest") before generic ones ("remove X")
+    RULES = [
+        (r"(?:show )?(?:the )?(?:list|participants|players)", 'show_list', {}, ()),
+        (r"(?:show )?(?:the )?tee ?sheet", 'show_tee_sheet', {}, ()),
+        (r"(?:show )?(?:the )?constraints", 'show_constraints', {}, ()),
+        (r"(?:show )?(?:the )?tee times", 'show_tee_times', {}, ()),
+        (r"(?:show )?(?:ai|cache) stats", 'show_ai_stats', {}, ()),
+        (r"(?:show )?shadow stats(?: (?:last|for) (?P<runs>\d+)(?: runs)?)?", 'show_shadow_stats', {'runs': 'runs'}, ()),
+        (r"(?:show )?(?:the )?(?:ai |token )?(?:usage|spend|budget)", 'show_usage', {}, ()),
+        (r"clear (?:the |all )?tee times", 'clear_tee_times', {}, ()),
+        (r"clear (?:the |all )?time preferences", 'clear_time_preferences', {}, ()),
+        (r"clear (?:the )?tee ?sheet", 'clear_tee_sheet', {}, ()),
+        (r"clear (?:the |all )?(?:participants|players|list)", 'clear_participants', {}, ()),
+        (r"(?:randomi[sz]e|shuffle|reshuffle|regenerate|new tee ?sheet)(?: the tee ?sheet)?", 'randomize', {}, ()),
+        (r"add (?:a )?tee ?time (?:at |for )?" + _T, 'add_tee_time', {'tee_time': 'time'}, ()),
+        (r"remove (?:the )?tee ?time (?:at |for )?" + _T, 'remove_tee_time', {'tee_time': 'time'}, ()),
+        (r"set tee ?times (?:from|at|starting(?: at)?) " + _T +
+         r"(?:,? every (?P<interval>\d+) ?(?:mins?|minutes))?(?:,? (?:with )?(?P<slots>\d+) slots)?",
+         'set_tee_times', {'start_time': 'time', 'interval_minutes': 'interval', 'num_slots': 'slots'}, ()),
+        (r"add (?:a )?guest " + _N.format('guest') + r" (?:for|with) " + _N.format('host'),
+         'add_guest', {'guest_name': 'guest', 'host_name': 'host'}, ('host',)),
+        (r"add " + _N.format('guest') + r" as (?:a )?guest (?:of|for) " + _N.format('host'),
+         'add_guest', {'guest_name': 'guest', 'host_name': 'host'}, ('host',)),
+        (r"remove (?:the )?guest " + _N.format('guest') + r"(?: (?:from|of|for) " + _N.format('host') + r")?",
+         'remove_guest', {'guest_name': 'guest', 'host_name': 'host'}, ()),
+        (r"remove " + _N.format('a') + r"'s? (?:time|tee time|early|late) preference",
+         'remove_time_preference', {'player_name': 'a'}, ('a',)),
+        (r"remove (?:the )?time preference (?:for|of) " + _N.format('a'),
+         'remove_time_preference', {'player_name': 'a'}, ('a',)),
+        (r"remove " + _N.format('a') + r"'s? (?:partner )?preference",
+         'remove_partner_preference', {'player_name': 'a'}, ()),
+        (r"remove (?:the )?(?:partner )?preference (?:for|of) " + _N.format('a'),
+         'remove_partner_preference', {'player_name': 'a'}, ()),
+        (r"remove (?:the )?avoidance (?:for|of) " + _N.format('a'), 'remove_avoidance', {'player_name': 'a'}, ()),
+        (r"(?:don'?t|do not|never) pair " + _N.format('a') + r" (?:with|and) " + _N.format('b'),
+         'set_avoidance', {'player_name': 'a', 'target_name': 'b'}, ()),
+        (r"keep " + _N.format('a') + r" away from " + _N.format('b'),
+         'set_avoidance', {'player_name': 'a', 'target_name': 'b'}, ()),
+        (_N.format('a') + r" (?:plays|playing|to play|wants to play) with " + _N.format('b'),
+         'set_partner_preference', {'player_name': 'a', 'target_name': 'b'}, ()),
+        (r"pair " + _N.format('a') + r" (?:with|and) " + _N.format('b'),
+         'set_partner_preference', {'player_name': 'a', 'target_name': 'b'}, ()),
+        (_N.format('a') + r" (?:prefers|wants|likes|would like)(?: an?)? (?P<pref>early|late)(?: tee ?time| one| slot)?",
+         'set_time_preference', {'player_name': 'a', 'time_preference': 'pref'}, ('a',)),
+        (r"(?:swap|switch) " + _N.format('a') + r" (?:with|and|for) " + _N.format('b'),
+         'swap_players', {'player_name': 'a', 'target_name': 'b'}, ('a', 'b')),
+        (r"(?:move|put) " + _N.format('a') + r" (?:to|in|into) group (?P<group>\d+)",
+         'move_player', {'player_name': 'a', 'group_number': 'group'}, ('a',)),
+        (r"add " + _N.format('a'), 'add_player', {'player_name': 'a'}, ()),
+        (r"(?:remove|drop|scratch) " + _N.format('a') + r"(?: off)?(?: the list)?", 'remove_player', {'player_name': 'a'}, ('a',)),
+        (r"take " + _N.format('a') + r" off(?: the list)?", 'remove_player', {'player_name': 'a'}, ('a',)),
+    ]
+    COMPILED = [(re.compile(f"^{pattern}$", re.IGNORECASE), command, slots, required)
+                for pattern, command, slots, required in RULES]
+
+    @staticmethod
+    def normalise(message: str) -> str:
+        """Lower-case command text with punctuation and extra whitespace removed (cache key)"""
+        text = message.replace('\u2019', "'").replace('\u2018', "'")
+        text = re.sub(r"[!?,;\"*_~]+", " ", text)
+        text = re.sub(r"\.(?!\d)", " ", text)  # Keep 8.40 style times, drop full stops
+        return ' '.join(text.lower().split())
+
+    def _correct_typos(self, text: str, name_words: set) -> str:
+        """Replace near-miss command words with the real ones - never touches a known player's name.
+        Word for word, so parse() can put back what was typed in the name slots."""
+        words = []
+        for word in text.split():
+            lower = word.lower()
+            if len(lower) >= 4 and lower not in self.VOCABULARY and lower not in name_words and lower.isalpha():
+                limit = 1 if len(lower) < 8 else 2
+                close = [v for v in self.VOCABULARY if abs(len(v) - len(lower)) <= limit and edit_distance(lower, v) <= limit]
+                if len(close) == 1:
+                    lower = close[0]
+            words.append(lower)
+        return ' '.join(words)
+
+    @staticmethod
+    def _as_typed(corrected: str, typed: str, start: int, end: int) -> str:
+        """The words typed at corrected[start:end] - a name slot is never typo-corrected ("add Sett" isn't "add set")"""
+        corrected_words, typed_words = corrected.split(' '), typed.split(' ')
+        first, last = corrected.count(' ', 0, start), corrected.count(' ', 0, end)
+        head = start - sum(len(w) + 1 for w in corrected_words[:first])
+        tail = sum(len(w) + 1 for w in corrected_words[:last]) + len(corrected_words[last]) - end
+        words = ' '.join(typed_words[first:last + 1])
+        return words[head:len(words) - tail]  # A slot only ends mid-word ("dave's") in words left as typed
+
+    @staticmethod
+    def resolve_name(name: str, names: List[str]) -> Optional[str]:
+        """Canonical participant name for what the admin typed: exact, unique first name/prefix,
+        or a unique close spelling. None if nothing (or more than one player) matches."""
+        wanted = ' '.join(name.lower().split())
+        by_key = {' '.join(n.lower().split()): n for n in names}
+        if wanted in by_key:
+            return by_key[wanted]
+        prefixed = [n for key, n in by_key.items() if key.split()[0] == wanted or key.startswith(wanted + ' ')]
+        if len(prefixed) == 1:
+            return prefixed[0]
+        if len(wanted) >= 4:
+            close = [n for key, n in by_key.items() if edit_distance(wanted, key) <= (1 if len(wanted) < 8 else 2)]
+            if len(close) == 1:
+                return close[0]
+        return None
+
+    def __init__(self, identity: IdentityIndex = None):
+        self.identity = identity  # Optional - adds learned aliases ("kenny" -> "KennyD") to name resolution
+
+    def _is_name(self, text: str) -> bool:
+        return bool(self.NAME.match(text)) and not (set(text.lower().split()) & self.RESERVED)
+
+    def parse(self, message: str, names: List[str] = None) -> Optional[Dict]:
+        names = names or []
+        name_words = {w for n in names for w in n.lower().split()}
+        typed = self.normalise(message)
+        text = self._correct_typos(typed, name_words)
+        for pattern, command, slots, required in self.COMPILED:
+            match = pattern.match(text)
+            if not match:
+                continue
+            params = {}
+            for param, group in slots.items():
+                value = match.group(group)
+                if value is None:
+                    continue
+                if group == 'time':
+                    hours, minutes = re.split(r"[:.]", value)
+                    value = f"{int(hours):02d}:{minutes}"
+                elif group in ('runs', 'interval', 'slots', 'group'):
+                    value = int(value)
+                elif group != 'pref':
+                    if text != typed:
+                        value = self._as_typed(text, typed, match.start(group), match.end(group))
+                    if not self._is_name(value):
+                        return None  # Captured a phrase, not a name - let the AI read it
+                    if group == 'guest' or command == 'add_player':
+                        # New names - only an exact (case-insensitive) match is the same person
+                        resolved = next((n for n in names if n.lower() == value), None)
+                    else:
+                        resolved = self.resolve_name(value, names)
+                        if resolved is None and self.identity:
+                            resolved = self.identity.resolve(value, within=names)
+                    if resolved is None and group in required:
+                        return None  # Not a current player - probably not what it looks like
+                    value = resolved or self._original_case(value, message)
+                    if value is None:
+                        return None  # Words split by punctuation ("Dave, Tom") - a list, not one name
+                params[param] = value
+            return {"command": command, "confidence": "high", "params": params, "needs_response": True}
+        return None
+
+    @staticmethod
+    def _original_case(value: str, message: str) -> Optional[str]:
+        """The name as the admin wrote it (parsing lower-cases everything), None if it isn't there verbatim"""
+        match = re.search(re.escape(value).replace("\\ ", r"\s+"), message, re.IGNORECASE)
+        return match.group(0) if match else None
+
+
 class AdminCommandHandler:
     """Handles admin commands with AI-powered understanding"""
 
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    COMMAND_MODEL = "claude-haiku-4-5-20251001"
+
+    # Read-only commands understood without the AI (used while the circuit breaker is open)
+    OFFLINE_COMMANDS = {
+        'show list': 'show_list', 'list': 'show_list',
+        'show tee sheet': 'show_tee_sheet', 'tee sheet': 'show_tee_sheet',
+        'show constraints': 'show_constraints', 'show tee times': 'show_tee_times',
+        'show ai stats': 'show_ai_stats', 'ai stats': 'show_ai_stats',
+        'show shadow stats': 'show_shadow_stats', 'shadow stats': 'show_shadow_stats',
+        'show usage': 'show_usage', 'usage': 'show_usage', 'show ai usage': 'show_usage',
+    }
 
-    def parse_command(self, message: str, sender: str) -> Dict:
+    CACHE_SIZE = 200  # AI-parsed commands remembered by normalised text
+
+    COMMAND_PROMPT = """Parse golf admin commands into JSON. Extract exact names/values as written.
+
+Commands: show_list, show_tee_sheet, add_player(player_name), remove_player(player_name), add_guest(guest_name,host_name), remove_guest(guest_name), set_partner_preference(player_name,target_name), remove_partner_preference(player_name), set_avoidance(player_name,target_name), remove_avoidance(player_name), show_constraints, set_tee_times(start_time,interval_minutes,num_slots), show_tee_times, set_time_preference(player_name,time_preference=early|late), remove_time_preference(player_name), add_tee_time(tee_time), remove_tee_time(tee_time), clear_tee_times, clear_time_preferences, clear_tee_sheet, clear_participants, swap_players(player_name,target_name), move_player(player_name,group_number), randomize, show_ai_stats, show_shadow_stats(runs), show_usage, unknown
+
+swap_players: "swap X with Y", "switch X and Y" - swaps two players between their groups on the tee sheet
+move_player: "move X to group 3", "put X in group 2", "move X to the 3 ball" - moves a single player from their current group to a specified group number
+randomize: "randomize", "shuffle", "reshuffle", "new tee sheet", "regenerate" - creates a completely new random tee sheet
+show_ai_stats: "show ai stats", "ai stats", "cache stats" - reports AI analysis cache hit rates
+show_shadow_stats: "show shadow stats", "shadow stats last 50" - compares the shadow (candidate) model with the live one; runs = number of recent runs if given
+show_usage: "show usage", "ai usage", "budget" - AI token usage and spend against the weekly budget"""
+
+    BATCH_PROMPT = """
+
+Several admin messages are given, numbered. A message may hold more than one command (one per line or sentence) - record one entry per command, in the order given, with "message" set to its message number. Skip chit-chat."""
+
+    def __init__(self, api_key: str, breaker: CircuitBreaker = None, identity: IdentityIndex = None,
+                 ledger: TokenLedger = None):
+        self.client = get_client_pool(api_key).client
+        self.gateway = LLMGateway(self.client, breaker, timeout=Config.AI_COMMAND_TIMEOUT_SECONDS,
+                                  max_retries=Config.AI_MAX_RETRIES, ledger=ledger, lane='commands')
+        self.structured = StructuredCaller(self.gateway)
+        self.local = LocalCommandParser(identity)
+        self.cache = {}  # normalised command text -> AI parse result
+        self.batch_cache = {}  # normalised message text -> list of AI parse results (multi-command messages)
+        self.parse_stats = {'local': 0, 'cached': 0, 'ai': 0}
+
+    def fast_path_rate(self) -> float:
+        """Share of parsed commands answered without an AI call (local rules + cache)"""
+        total = sum(self.parse_stats.values())
+        return (self.parse_stats['local'] + self.parse_stats['cached']) / total if total else 0.0
+
+    def parse_command(self, message: str, sender: str, names: List[str] = None) -> Dict:
         """
-        Parse admin command and extract intent
+        Parse admin command and extract intent. Tries the local rules first (names resolved
+        against `names`, the current participants), then the cache, then the AI.
 
         Returns:
         {
@@ -1189,36 +4251,49 @@ class AdminCommandHandler:
             "response_needed": true/false
         }
         """
+        local = self.local.parse(message, names)
+        if local:
+            self.parse_stats['local'] += 1
+            print(f"   ⚡ Parsed locally ({self.fast_path_rate():.0%} of commands without AI)")
+            return local
 
-        admin_system = """Parse golf admin commands into JSON. Extract exact names/values as written.
-
-Commands: show_list, show_tee_sheet, add_player(player_name), remove_player(player_name), add_guest(guest_name,host_name), remove_guest(guest_name), set_partner_preference(player_name,target_name), remove_partner_preference(player_name), set_avoidance(player_name,target_name), remove_avoidance(player_name), show_constraints, set_tee_times(start_time,interval_minutes,num_slots), show_tee_times, set_time_preference(player_name,time_preference=early|late), remove_time_preference(player_name), add_tee_time(tee_time), remove_tee_time(tee_time), clear_tee_times, clear_time_preferences, clear_tee_sheet, clear_participants, swap_players(player_name,target_name), move_player(player_name,group_number), randomize, unknown
+        key = LocalCommandParser.normalise(message)
+        if key in self.cache:
+            self.parse_stats['cached'] += 1
+            print(f"   💾 Command parse cache hit ({self.fast_path_rate():.0%} of commands without AI)")
+            return json.loads(json.dumps(self.cache[key]))
 
-swap_players: "swap X with Y", "switch X and Y" - swaps two players between their groups on the tee sheet
-move_player: "move X to group 3", "put X in group 2", "move X to the 3 ball" - moves a single player from their current group to a specified group number
-randomize: "randomize", "shuffle", "reshuffle", "new tee sheet", "regenerate" - creates a completely new random tee sheet"""
+        admin_system = self.COMMAND_PROMPT
 
         admin_user_prompt = f"""COMMAND: "{message}"
 
-Return ONLY JSON: {{"command":"show_list|show_tee_sheet|add_player|remove_player|add_guest|remove_guest|set_partner_preference|remove_partner_preference|set_avoidance|remove_avoidance|show_constraints|set_tee_times|show_tee_times|set_time_preference|remove_time_preference|add_tee_time|remove_tee_time|clear_tee_times|clear_time_preferences|clear_tee_sheet|clear_participants|swap_players|move_player|randomize|unknown","confidence":"high|medium|low","params":{{}},"needs_response":true}}"""
+Record the parsed command with the record_command tool."""
 
         try:
-            response = self.client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=300,
-                temperature=0.1,
-                system=admin_system,
-                messages=[{"role": "user", "content": admin_user_prompt}]
-            )
-
-            result_text = response.content[0].text.strip()
-            if result_text.startswith("```"):
-                result_text = result_text.split("```")[1]
-                if result_text.startswith("json"):
-                    result_text = result_text[4:]
-                result_text = result_text.strip()
+            result, _ = self.structured.call(self.COMMAND_MODEL, 300, admin_system, admin_user_prompt,
+                                             'record_command', COMMAND_SCHEMA, purpose='command')
+            result.setdefault('needs_response', True)
+            self.parse_stats['ai'] += 1
+            if len(self.cache) >= self.CACHE_SIZE:
+                self.cache.pop(next(iter(self.cache)))  # Oldest first
+            self.cache[key] = json.loads(json.dumps(result))
+            return result
 
-            return json.loads(result_text)
+        except AIUnavailableError as e:
+            # API is down - read-only commands can still be answered from DB state
+            print(f"⚠️  {e}")
+            normalised = ' '.join(''.join(c for c in message.lower() if c.isalnum() or c.isspace()).split())
+            command = self.OFFLINE_COMMANDS.get(normalised)
+            if command:
+                return {"command": command, "confidence": "high", "params": {}, "needs_response": True}
+            return {
+                "command": "unknown",
+                "confidence": "low",
+                "params": {},
+                "needs_response": True,
+                "ai_unavailable": True,
+                "over_budget": isinstance(e, BudgetExceededError)
+            }
 
         except Exception as e:
             print(f"⚠️  Admin command parse error: {e}")
@@ -1230,12 +4305,277 @@ Return ONLY JSON: {{"command":"show_list|show_tee_sheet|add_player|remove_player
             }
 
 
+    @staticmethod
+    def split_clauses(message: str) -> List[str]:
+        """Split a multi-command message into one candidate command per line / sentence / "then" """
+        parts = re.split(r"\n+|;|\.\s+|,?\s+(?:and )?then\s+", message.strip())
+        return [p.strip() for p in parts if p and p.strip()]
+
+    def parse_batch(self, messages: List[str], sender: str, names: List[str] = None) -> List[List[Dict]]:
+        """Parse every new admin message from one poll together. Returns one list of commands per
+        message (a message can hold several). Messages whose every clause matches the local rules,
+        or that are cached, cost nothing; the rest share a single AI call."""
+        parsed = [None] * len(messages)
+        pending = []
+        for i, message in enumerate(messages):
+            clauses = self.split_clauses(message)
+            local = [self.local.parse(clause, names) for clause in clauses]
+            if local and all(local):
+                self.parse_stats['local'] += 1
+                parsed[i] = local
+                continue
+            key = LocalCommandParser.normalise(message)
+            if key in self.batch_cache:
+                self.parse_stats['cached'] += 1
+                parsed[i] = json.loads(json.dumps(self.batch_cache[key]))
+                continue
+            pending.append(i)
+
+        if pending:
+            numbered = "\n".join(f'{n}. "{messages[i]}"' for n, i in enumerate(pending, 1))
+            user_prompt = f"""MESSAGES:
+{numbered}
+
+Record every command with the record_commands tool."""
+            try:
+                result, _ = self.structured.call(self.COMMAND_MODEL, 300 + 200 * len(pending),
+                                                 self.COMMAND_PROMPT + self.BATCH_PROMPT, user_prompt,
+                                                 'record_commands', BATCH_COMMAND_SCHEMA, purpose='command_batch')
+                for n, i in enumerate(pending, 1):
+                    commands = [{k: v for k, v in c.items() if k != 'message'}
+                                for c in result['commands'] if c['message'] == n]
+                    for command in commands:
+                        command.setdefault('needs_response', True)
+                    parsed[i] = commands or [{"command": "unknown", "confidence": "low", "params": {},
+                                              "needs_response": False}]
+                    self.parse_stats['ai'] += 1
+                    if len(self.batch_cache) >= self.CACHE_SIZE:
+                        self.batch_cache.pop(next(iter(self.batch_cache)))
+                    self.batch_cache[LocalCommandParser.normalise(messages[i])] = json.loads(json.dumps(parsed[i]))
+            except AIUnavailableError as e:
+                print(f"⚠️  {e}")
+                for i in pending:
+                    parsed[i] = [{"command": "unknown", "confidence": "low", "params": {}, "needs_response": True,
+                                  "ai_unavailable": True, "over_budget": isinstance(e, BudgetExceededError)}]
+            except Exception as e:
+                print(f"⚠️  Admin command parse error: {e}")
+                for i in pending:
+                    parsed[i] = [{"command": "unknown", "confidence": "low", "params": {}, "needs_response": False}]
+        return parsed
+
+
+# ==================== LOCAL INTENT CLASSIFIER ====================
+def message_week(msg: Dict) -> str:
+    """ISO week ("2026-W08") of a scraped message, from its timestamp"""
+    try:
+        when = datetime.strptime(message_sort_key(msg), "%Y/%m/%d %H:%M")
+    except ValueError:
+        when = datetime.now()
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class IntentClassifier:
+    """Small CPU-only classifier for main group messages: signup / dropout / guest / ignore.
+
+    Deterministic keyword rules catch the obvious cases ("please mate", "can't make it",
+    "+1") from day one. Once enough AI-labelled messages have been logged, a multinomial
+    logistic regression over word 1-2 grams and character trigrams (pure Python, trained
+    with SGD) covers the rest. Only short, simple messages classified with high confidence
+    are handled locally - anything naming other people, tee times or questions goes to the LLM.
+    A local dropout removes the sender, so the dropout rules only take first-person phrasings:
+    "can't make it" counts, "Mike can't make it" (relayed for someone else) doesn't."""
+
+    LABELS = ['signup', 'dropout', 'guest', 'ignore']
+    MIN_TRAINING_EXAMPLES = 50
+
+    SIGNUP_PATTERN = re.compile(
+        r"^(yes|yea|yeah|yep|aye|ok|go on)?\s*(please|pls|plz|in please|me please|please mate|i'?m in|im in|"
+        r"count me in|put me down|pencil me in|stick me down|in)\s*(please|pls|mate|rick|ricky|thanks|cheers)*[\s.!]*$")
+    ADDRESSEES = r"rick|ricky|mate|lads|guys|gents|all"
+    DROPOUT_PATTERN = re.compile(
+        # Optional "sorry Ricky -" / "can you" lead-in, the sender's own dropout, then only filler words
+        rf"^(sorry|unfortunately|afraid|gutted)?\W*({ADDRESSEES})?\W*(can you |could you |please |pls )*"
+        r"(i |i'?m |im )?(can'?t make it|cannot make it|won'?t make it|can'?t play|cannot play|out|"
+        r"not playing|take me off|pull me out|remove me|drop me|count me out)"
+        rf"(\W+(this|that|sunday|week|weekend|now|today|tomorrow|as well|too|sorry|please|pls|thanks|cheers|"
+        rf"off|the list|anymore|i'?m afraid|{ADDRESSEES}))*\W*$")
+    GUEST_PATTERN = re.compile(r"^(\+1|plus one|can i (have|bring) a guest)\b")
+    COMPLEX_PATTERN = re.compile(
+        r"(\band\b|&|\bwith\b|\?|\d[:.]\d|\bearly\b|\blate\b|\btee\b|\btime\b|\bmp\b|\bpair|\bguest\b|\bbring)")
+    # A second clause: "Dave can't make it, put me in instead", "Can't make it. Sam will"
+    CLAUSE_PATTERN = re.compile(r"[,;]|[.!]\s+\w|\b(but|so|instead|because|cos|if|or|then|for)\b")
+    # Words a simple message may start with (capitalised) or contain without naming anyone
+    COMMON_WORDS = frozenset((
+        "please pls plz yes yea yeah yep aye ok okay go on sorry can can't cant cannot could count put pencil "
+        "stick take pull remove drop in out im i'm i i'll ill i'd id me my not won't unfortunately afraid gutted "
+        "plus one scratch sign add cross got gonna have to make it play playing this week sunday "
+        "now today tomorrow as well too you thanks cheers off the list anymore down up a an be will "
+        "rick ricky mate lads guys gents all").split())
+
+    def __init__(self, identity: IdentityIndex = None):
+        self.identity = identity  # Known players and aliases - a message naming one isn't simple
+        self.weights = {}  # feature -> [weight per label]
+        self.bias = [0.0] * len(self.LABELS)
+        self.examples = 0
+        self.stats = {'local': 0, 'llm': 0}
+
+    @staticmethod
+    def normalise(text: str) -> str:
+        text = EMOJI_CHARS.sub('', text.lower()).replace('’', "'")
+        return ' '.join(text.split())
+
+    @classmethod
+    def keyword_label(cls, text: str) -> Optional[str]:
+        """Bootstrap rules - a label only for unambiguous phrasings, else None"""
+        norm = cls.normalise(text)
+        if not norm:
+            return 'ignore'
+        if cls.GUEST_PATTERN.search(norm):
+            return 'guest'
+        if cls.DROPOUT_PATTERN.search(norm):
+            return 'dropout'
+        if cls.SIGNUP_PATTERN.match(norm):
+            return 'signup'
+        return None
+
+    @classmethod
+    def features(cls, text: str) -> List[str]:
+        norm = cls.normalise(text)
+        words = re.findall(r"[a-z0-9+']+", norm)
+        feats = [f"w:{w}" for w in words]
+        feats += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+        padded = f" {norm} "
+        feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        feats.append(f"len:{min(len(words), 10)}")
+        return feats
+
+    @property
+    def trained(self) -> bool:
+        return bool(self.weights)
+
+    def _scores(self, feats: List[str]) -> List[float]:
+        scores = list(self.bias)
+        for f in feats:
+            w = self.weights.get(f)
+            if w:
+                for k in range(len(scores)):
+                    scores[k] += w[k]
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def train(self, examples: List[Dict], epochs: int = 25, learning_rate: float = 0.3, l2: float = 1e-4):
+        """Fit on [{'text', 'label'}] with deterministic SGD (same data -> same model)"""
+        data = [(self.features(e['text']), self.LABELS.index(e['label'])) for e in examples if e['label'] in self.LABELS]
+        self.weights = {}
+        self.bias = [0.0] * len(self.LABELS)
+        rng = random.Random(0)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + 0.2 * epoch)
+            for feats, target in data:
+                probs = self._scores(feats)
+                grads = [p - (1.0 if k == target else 0.0) for k, p in enumerate(probs)]
+                for k, g in enumerate(grads):
+                    self.bias[k] -= rate * g
+                for f in feats:
+                    w = self.weights.setdefault(f, [0.0] * len(self.LABELS))
+                    for k, g in enumerate(grads):
+                        w[k] -= rate * (g + l2 * w[k])
+        self.examples = len(data)
+
+    def predict(self, text: str) -> tuple:
+        """(label, confidence, source) - source is 'keyword', 'model', or 'none' (untrained, no rule)"""
+        label = self.keyword_label(text)
+        if label:
+            return label, 1.0, 'keyword'
+        if not self.trained:
+            return 'ignore', 0.0, 'none'
+        probs = self._scores(self.features(text))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.LABELS[best], probs[best], 'model'
+
+    def is_simple(self, text: str, label: str) -> bool:
+        """True if the message's effect is fully captured by its label and sender
+        (no other names, tee times, questions, pairings, named guests or second clause)"""
+        norm = self.normalise(text)
+        if self.CLAUSE_PATTERN.search(norm) or self.names_someone(text):
+            return False
+        if label == 'guest':
+            return bool(self.GUEST_PATTERN.search(norm)) and len(norm.split()) <= 6
+        return len(norm.split()) <= 8 and not self.COMPLEX_PATTERN.search(norm)
+
+    def names_someone(self, text: str) -> bool:
+        """A capitalised word that isn't everyday message wording, or a known player/alias"""
+        words = re.findall(r"[A-Za-z][A-Za-z']*", text.replace('’', "'"))
+        for word in words:
+            if word[0].isupper() and word.lower() not in self.COMMON_WORDS:
+                return True
+        if self.identity:
+            keys = [w.lower() for w in words]
+            candidates = [k for k in keys if k not in self.COMMON_WORDS]
+            candidates += [f"{a} {b}" for a, b in zip(keys, keys[1:])]
+            if any(k in self.identity.aliases for k in candidates):
+                return True
+        return False
+
+    def to_dict(self) -> Dict:
+        return {'labels': self.LABELS, 'weights': self.weights, 'bias': self.bias, 'examples': self.examples}
+
+    def load(self, model: Optional[Dict]):
+        if model and model.get('labels') == self.LABELS:
+            self.weights = model['weights']
+            self.bias = model['bias']
+            self.examples = model.get('examples', 0)
+
+    def evaluate(self, examples: List[Dict], threshold: float) -> Dict:
+        """Accuracy, coverage at `threshold` (share handled locally) and per-message latency"""
+        correct = local = local_correct = 0
+        per_label = {label: [0, 0] for label in self.LABELS}  # label -> [correct, total]
+        started = time.perf_counter()
+        for e in examples:
+            label, confidence, _ = self.predict(e['text'])
+            hit = label == e['label']
+            correct += hit
+            per_label.setdefault(e['label'], [0, 0])
+            per_label[e['label']][0] += hit
+            per_label[e['label']][1] += 1
+            if confidence >= threshold and self.is_simple(e['text'], label):
+                local += 1
+                local_correct += hit
+        elapsed = time.perf_counter() - started
+        n = len(examples)
+        return {
+            'examples': n,
+            'accuracy': correct / n if n else 0.0,
+            'coverage': local / n if n else 0.0,
+            'local_accuracy': local_correct / local if local else 0.0,
+            'per_label': {k: (c / t if t else 0.0, t) for k, (c, t) in per_label.items()},
+            'latency_us': elapsed / n * 1_000_000 if n else 0.0,
+        }
+
+
 # ==================== WHATSAPP BOT ====================
+def _browser_exclusive(method):
+    """WhatsAppBot methods that drive Chrome hold browser_lock - the scheduler, polling loop and
+    admin commands share one browser, and interleaved navigation/scrolling corrupts both."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.browser_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class WhatsAppBot:
     """Simplified WhatsApp interface - just scrape messages"""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, identity: IdentityIndex = None):
         self.config = config
+        self.identity = identity  # Optional - senders are scraped under their canonical names
+        self.last_votes = None  # Yes-votes read by the last main group scrape (None = none could be read)
+        self.browser_lock = threading.RLock()  # Re-entrant: a reload + scrape holds it across both
         self.driver = None
         self.wait = None
         self.session_start_time = None
@@ -1314,17 +4654,169 @@ class WhatsAppBot:
         hours_running = (time.time() - self.session_start_time) / 3600
         return hours_running >= self.config.CHROME_RESTART_HOURS
 
+    @_browser_exclusive
     def restart_session(self):
         """Restart Chrome session"""
         print("🔄 Restarting Chrome session...")
         self.close()
         time.sleep(2)
         return self.initialize()
+
+    @_browser_exclusive
+    def reload(self):
+        """Reload WhatsApp Web to reset its DOM - the next chat visit loads a full set of messages"""
+        print("   Reloading WhatsApp Web for clean message load...")
+        self.driver.get('https://web.whatsapp.com')
+        time.sleep(8)
+        self.wait.until(EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]')))
+        time.sleep(2)
+        print("   ✅ WhatsApp reloaded")
+
+    VOTE_COUNT = re.compile(r'^\d+ votes?$', re.IGNORECASE)
+    VOTE_TIME = re.compile(r'^(?:(today|yesterday|monday|tuesday|wednesday|thursday|friday|saturday|sunday)'
+                           r'|(\d{1,2})/(\d{1,2})/(\d{4}))?(?:,? (?:at )?)?(\d{1,2}):(\d{2})$', re.IGNORECASE)
+
+    @classmethod
+    def vote_time(cls, line: str, now: datetime = None) -> Optional[str]:
+        """Poll panel vote time ("Today at 10:02", "Friday 21:14", "13/02/2026 at 09:00") as
+        "YYYY/MM/DD HH:MM" (comparable with message_sort_key), or None if the line isn't one"""
+        match = cls.VOTE_TIME.match(line.strip())
+        if not match:
+            return None
+        now = now or datetime.now()
+        day, dd, mm, yyyy, hh, mi = match.groups()
+        if dd:
+            date = datetime(int(yyyy), int(mm), int(dd))
+        elif day and day.lower() == 'yesterday':
+            date = now - timedelta(days=1)
+        elif day and day.lower() != 'today':
+            weekday = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'].index(day.lower())
+            date = now - timedelta(days=(now.weekday() - weekday) % 7 or 7)
+        else:
+            date = now
+        return f"{date.strftime('%Y/%m/%d')} {int(hh):02d}:{mi}"
+
+    @staticmethod
+    def vote_choice(option: str) -> Optional[str]:
+        """What a poll option means for signups: 'in', 'guest' (playing plus a guest) or None (no / maybe)"""
+        text = option.lower()
+        if re.search(r"\b(no|not|out|can'?t|cannot|maybe|unsure)\b", text):
+            return None
+        if '+1' in text or 'guest' in text:
+            return 'guest'
+        if re.search(r"\b(yes|yeah|in|playing|play|me|available)\b", text) or any(e in option for e in "👍✅"):
+            return 'in'
+        return None
+
+    @classmethod
+    def parse_poll_details(cls, text: str, now: datetime = None) -> Dict[str, List[tuple]]:
+        """The "Poll details" panel text -> {option: [(voter, vote time or None), ...]}.
+        Each option heading is followed by an "N votes" line, then its voters, each with a time."""
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        options, current = {}, None
+        for i, line in enumerate(lines):
+            if i + 1 < len(lines) and cls.VOTE_COUNT.match(lines[i + 1]):
+                current = line
+                options[current] = []
+            elif current is None or cls.VOTE_COUNT.match(line) or line.lower() in ('see all', 'you'):
+                continue
+            elif cls.vote_time(line, now):
+                if options[current] and options[current][-1][1] is None:
+                    options[current][-1] = (options[current][-1][0], cls.vote_time(line, now))
+            else:
+                options[current].append((line, None))
+        return options
+
+    @staticmethod
+    def parse_reaction_rows(rows: List[Dict], signup_reactions: List[str]) -> List[str]:
+        """Reaction popup rows ({'text', 'emojis'}) -> names that reacted with a signup emoji, in listed order"""
+        def bare(emoji):
+            return re.sub('[\U0001F3FB-\U0001F3FF\uFE0F\u200D\u2640\u2642]', '', emoji)
+        wanted = {bare(e) for e in signup_reactions}
+        names = []
+        for row in rows:
+            lines = [line.strip() for line in (row.get('text') or '').splitlines() if line.strip()]
+            lines = [line for line in lines if line.lower() not in ('click to remove', 'tap to remove')]
+            if not lines or lines[0] == 'You':
+                continue
+            emojis = [bare(e) for e in row.get('emojis', [])] + [bare(line) for line in lines[1:]]
+            if any(e in wanted for e in emojis) and lines[0] not in names:
+                names.append(lines[0])
+        return names
+
+    def read_signup_votes(self) -> Optional[List[Dict]]:
+        """Yes-votes on the loaded "taking names" post: poll voters (from its "View votes" panel)
+        and signup reactions. Returns [{'voter', 'source', 'choice', 'at'}] in listed order, or
+        None if neither could be read - a failed read must never look like everyone withdrawing."""
+        try:
+            posts = [elem for elem in self.driver.find_elements(By.CSS_SELECTOR, '.message-in, .message-out')
+                     if any(phrase in (elem.text or '').lower() for phrase in ('taking names', 'names for sunday'))]
+        except Exception:
+            return None
+        if not posts:
+            return None
+        post = posts[-1]
+        votes, read_any = [], False
+
+        def voter_name(name):
+            name = self.config.NAME_MAPPING.get(name, name)
+            return self.identity.canonical(name) if self.identity else name
+
+        try:
+            buttons = post.find_elements(By.XPATH, './/*[@role="button"][contains(., "View votes")]')
+            if buttons:
+                buttons[0].click()
+                time.sleep(2)
+                panel = self.driver.execute_script("""
+                    let title = [...document.querySelectorAll('span, div')].find(el => el.innerText === 'Poll details');
+                    let el = title;
+                    while (el && !/\n\d+ votes?\n/i.test(el.innerText)) { el = el.parentElement; }
+                    return el ? el.innerText : null;
+                """)
+                self.driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
+                if panel:
+                    read_any = True
+                    for option, voters in self.parse_poll_details(panel).items():
+                        choice = self.vote_choice(option)
+                        if choice:
+                            votes += [{'voter': voter_name(name), 'source': 'poll', 'choice': choice, 'at': at}
+                                      for name, at in voters]
+        except Exception as e:
+            print(f"   ⚠️ Couldn't read poll votes: {e}")
+
+        try:
+            bubbles = post.find_elements(By.CSS_SELECTOR, 'button[aria-label*="eaction"]')
+            if bubbles:
+                bubbles[0].click()
+                time.sleep(2)
+                rows = self.driver.execute_script("""
+                    let dialogs = document.querySelectorAll('[role="dialog"]');
+                    if (!dialogs.length) return null;
+                    let dialog = dialogs[dialogs.length - 1];
+                    return [...dialog.querySelectorAll('[role="listitem"], [role="row"]')].map(row => ({
+                        text: row.innerText,
+                        emojis: [...row.querySelectorAll('img[alt]')].map(img => img.alt)
+                    }));
+                """)
+                self.driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
+                if rows is not None:
+                    read_any = True
+                    for name in self.parse_reaction_rows(rows, self.config.SIGNUP_REACTIONS):
+                        votes.append({'voter': voter_name(name), 'source': 'reaction', 'choice': 'in', 'at': None})
+        except Exception as e:
+            print(f"   ⚠️ Couldn't read reactions: {e}")
+
+        if not read_any:
+            return None
+        print(f"   🗳️  {len(votes)} signup vote(s)/reaction(s) on the 'taking names' post")
+        return votes
+
     def sanitize_message(self, message: str) -> str:
         """Remove characters outside BMP that Chrome can't handle"""
         # Keep only characters in the Basic Multilingual Plane (U+0000 to U+FFFF)
         return ''.join(char for char in message if ord(char) <= 0xFFFF)
 
+    @_browser_exclusive
     def send_to_group(self, group_name: str, message: str):
         """Send message to a group"""
         try:
@@ -1393,8 +4885,11 @@ class WhatsAppBot:
             except:
                 pass
 
+    @_browser_exclusive
     def get_all_messages(self, group_name: str, scroll_for_history: bool = False) -> List[Dict]:
         """Get ALL messages from the group (no filtering)"""
+        if scroll_for_history:
+            self.last_votes = None
         try:
             time.sleep(3)
 
@@ -1495,6 +4990,15 @@ class WhatsAppBot:
                     message_elem = elem.find_element(By.CSS_SELECTOR, '.copyable-text')
                     text = message_elem.text if message_elem else ""
 
+                    # Quoted reply block - lets transcript compaction strip the quote exactly
+                    quoted = ""
+                    try:
+                        quote_elems = elem.find_elements(By.CSS_SELECTOR, 'div[aria-label="Quoted message"], .quoted-mention')
+                        if quote_elems:
+                            quoted = quote_elems[0].text.strip()
+                    except:
+                        pass
+
                     if sender == "Unknown" and not is_outgoing and text:
                         lines = text.split('\n')
                         if len(lines) > 1:
@@ -1506,26 +5010,40 @@ class WhatsAppBot:
                     if sender in self.config.NAME_MAPPING:
                         sender = self.config.NAME_MAPPING[sender]
 
+                    if self.identity and sender not in ("Unknown", "You"):
+                        # Unsaved contacts: the header has their number, the bubble their display name
+                        header_sender = timestamp.split(']', 1)[1].strip().rstrip(':').strip() if ']' in timestamp else ''
+                        if PHONE_LINE.match(header_sender) and not PHONE_LINE.match(sender):
+                            self.identity.learn(header_sender, sender, 'phone')
+                        sender = self.identity.canonical(sender)
+
                     if text and text.strip():
-                        return {
+                        msg = {
                             'sender': sender,
                             'text': text,
                             'is_outgoing': is_outgoing,
                             'timestamp': timestamp
                         }
+                        if quoted:
+                            msg['quoted'] = quoted
+                        return msg
                 except:
                     pass
                 return None
 
             # Accumulate messages across scroll positions
             accumulated = {}  # key: (sender, text_first_80) -> message dict
+            # On-screen order: (-scroll pass, index in that pass). Each pass scrolls further up, so
+            # messages first seen in a later pass are above (older than) everything seen before
+            dom_order = {}
 
             # Collect initial messages from current position
-            for elem in self.driver.find_elements(By.CSS_SELECTOR, '.message-in, .message-out'):
+            for index, elem in enumerate(self.driver.find_elements(By.CSS_SELECTOR, '.message-in, .message-out')):
                 msg = extract_message_from_element(elem)
                 if msg:
                     key = (msg['sender'], msg['text'][:80])
                     accumulated[key] = msg
+                    dom_order.setdefault(key, (0, index))
 
             # Only scroll for main group (to find "taking names" and all signups)
             if scroll_for_history:
@@ -1568,12 +5086,13 @@ class WhatsAppBot:
                         time.sleep(1.5)
 
                         new_count = 0
-                        for elem in self.driver.find_elements(By.CSS_SELECTOR, '.message-in, .message-out'):
+                        for index, elem in enumerate(self.driver.find_elements(By.CSS_SELECTOR, '.message-in, .message-out')):
                             msg = extract_message_from_element(elem)
                             if msg:
                                 key = (msg['sender'], msg['text'][:80])
                                 if key not in accumulated:
                                     accumulated[key] = msg
+                                    dom_order[key] = (-(scroll_i + 1), index)
                                     new_count += 1
 
                         # Check for stop phrase
@@ -1600,26 +5119,21 @@ class WhatsAppBot:
                 else:
                     print(f"   ⚠️ No scroll container found, using {len(accumulated)} initial messages")
 
-            # Convert accumulated dict to list, sorted by timestamp
-            # data-pre-plain-text format: [HH:MM, DD/MM/YYYY] Name:
-            def parse_sort_key(msg):
-                ts = msg.get('timestamp', '')
-                if ts and '[' in ts and ']' in ts:
-                    try:
-                        bracket_content = ts.split('[')[1].split(']')[0]  # "HH:MM, DD/MM/YYYY"
-                        parts = bracket_content.split(', ')
-                        if len(parts) == 2:
-                            time_str = parts[0].strip()  # "HH:MM"
-                            date_str = parts[1].strip()  # "DD/MM/YYYY"
-                            # Convert to sortable format: YYYY/MM/DD HH:MM
-                            date_parts = date_str.split('/')
-                            if len(date_parts) == 3:
-                                return f"{date_parts[2]}/{date_parts[1]}/{date_parts[0]} {time_str}"
-                    except:
-                        pass
-                return "9999/99/99 99:99"  # No timestamp — sort to end
-
-            messages = sorted(accumulated.values(), key=parse_sort_key)[-Config.MAX_MESSAGES:]
+                # Poll votes / reactions on the "taking names" post - it's loaded now we've scrolled to it
+                self.last_votes = self.read_signup_votes() if self.config.VOTE_SIGNUPS else None
+
+            # Convert accumulated dict to list, sorted by timestamp then on-screen order (several
+            # messages share each minute - the order within it decides signup order)
+            ordered = sorted(accumulated, key=lambda k: (message_sort_key(accumulated[k]), dom_order.get(k, (0, 0))))
+            messages = [accumulated[k] for k in ordered]
+            # MAX_MESSAGES only caps history we don't need: everything since "taking names" is kept
+            # (long weeks are analysed in chunks - see AIAnalyzer._analyze_chunked)
+            start = max(len(messages) - Config.MAX_MESSAGES, 0)
+            stop_idx = next((i for i in range(len(messages) - 1, -1, -1)
+                             if any(phrase in messages[i]['text'].lower() for phrase in STOP_PHRASES)), None)
+            if stop_idx is not None:
+                start = min(start, stop_idx)
+            messages = messages[start:]
             print(f"   📨 Total messages to analyse: {len(messages)}")
 
             return messages
@@ -1628,6 +5142,7 @@ class WhatsAppBot:
             print(f"❌ Error getting messages: {e}")
             return None
 
+    @_browser_exclusive
     def send_message(self, phone_number: str, message: str):
         """Send message to a phone number"""
         try:
@@ -2241,6 +5756,107 @@ class TeeSheetGenerator:
         return '\n'.join(lines), True, groups
 
 
+# ==================== BACKGROUND ANALYSIS ====================
+class AnalysisWorker:
+    """Runs main group analysis on its own thread so admin polling never waits on the AI.
+
+    The polling loop hands off each scraped transcript with submit() and carries on.
+    Only the newest waiting transcript is kept - an older one that hasn't started yet is
+    superseded. Every submission gets an increasing sequence number that is passed to the
+    handler, so results can be checked against what's already been applied."""
+
+    def __init__(self, handler):
+        self.handler = handler  # handler(messages, adjust_published, seq) -> result
+        self.stats = {'submitted': 0, 'completed': 0, 'superseded': 0, 'joined': 0, 'errors': 0}
+        self._cond = threading.Condition()
+        self._pending = None  # (seq, messages, adjust_published)
+        self._running = None  # (seq, messages, adjust_published) of the job in progress
+        self._last_seq = 0
+        self._done_seq = 0
+        self._busy = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='analysis-worker', daemon=True)
+            self._thread.start()
+
+    def on_worker_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, messages: List[Dict], adjust_published: bool = False) -> int:
+        """Queue a transcript for analysis and return its sequence number.
+        Runs inline if the worker thread hasn't been started (scripts/tests). A transcript
+        identical to the one waiting or being analysed joins that job (same sequence number)."""
+        with self._cond:
+            if self._thread is not None:
+                for job in (self._pending, self._running):
+                    if job is not None and job[1] == messages and (job[2] or not adjust_published):
+                        self.stats['joined'] += 1
+                        print(f"   🔗 Same transcript as analysis #{job[0]} - joining it")
+                        return job[0]
+            self._last_seq += 1
+            seq = self._last_seq
+            self.stats['submitted'] += 1
+            if self._thread is None:
+                job = (seq, messages, adjust_published)
+            else:
+                if self._pending is not None:
+                    self.stats['superseded'] += 1
+                    # Keep the published-sheet adjustment if the superseded job asked for it
+                    adjust_published = adjust_published or self._pending[2]
+                    print(f"   ⏭️  Analysis #{self._pending[0]} superseded by #{seq} before it started")
+                self._pending = (seq, messages, adjust_published)
+                self._cond.notify_all()
+                return seq
+        self._execute(*job)
+        return seq
+
+    def wait_for(self, seq: int, timeout: float) -> bool:
+        """Block until submission `seq` (or a newer one that superseded it) has finished"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._done_seq < seq:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def describe(self) -> str:
+        with self._cond:
+            state = "busy" if self._busy else "idle"
+            waiting = f", #{self._pending[0]} waiting" if self._pending else ""
+        st = self.stats
+        return (f"{state}{waiting} - {st['completed']} done, {st['superseded']} superseded, "
+                f"{st['joined']} joined, {st['errors']} errors")
+
+    def _execute(self, seq: int, messages: List[Dict], adjust_published: bool):
+        with self._cond:
+            self._busy = True
+            self._running = (seq, messages, adjust_published)
+        try:
+            self.handler(messages, adjust_published, seq)
+            self.stats['completed'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ Background analysis #{seq} failed: {e}")
+        finally:
+            with self._cond:
+                self._busy = False
+                self._running = None
+                self._done_seq = max(self._done_seq, seq)
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                job, self._pending = self._pending, None
+            self._execute(*job)
+
+
 # ==================== MAIN BOT ====================
 class SwindleBot:
     """Main bot controller - simplified AI-native version"""
@@ -2248,9 +5864,36 @@ class SwindleBot:
     def __init__(self):
         self.config = Config()
         self.db = Database(self.config.DB_PATH)
-        self.ai = AIAnalyzer(self.config.ANTHROPIC_API_KEY)
-        self.admin_handler = AdminCommandHandler(self.config.ANTHROPIC_API_KEY)
-        self.whatsapp = WhatsAppBot(self.config)
+        # One breaker for every AI caller - they all hit the same API
+        self.ai_breaker = CircuitBreaker(self.config.AI_BREAKER_THRESHOLD, self.config.AI_BREAKER_RESET_SECONDS)
+        # One ledger too - every call's tokens and cost, and the weekly budget they all count against
+        self.ledger = TokenLedger(self.db, self.config.WEEKLY_AI_BUDGET_USD,
+                                  (self.config.BUDGET_SLOW_AT, self.config.BUDGET_LOCAL_COMMANDS_AT,
+                                   self.config.BUDGET_FAST_ONLY_AT))
+        self._budget_stage = 'normal'
+        self.ai = AIAnalyzer(self.config.ANTHROPIC_API_KEY, db=self.db, breaker=self.ai_breaker, ledger=self.ledger)
+        self.ai.shadow = ShadowEvaluator.from_config(self.config, self.db, self.ledger)
+        # Admin commands get their own gateway (a separate lane) so they never queue behind a long analysis
+        self.admin_handler = AdminCommandHandler(self.config.ANTHROPIC_API_KEY, breaker=self.ai_breaker,
+                                                 identity=self.db.identity, ledger=self.ledger)
+        self._queued_analysis = None  # Latest main group scrape waiting for the AI to come back
+        self._ai_was_available = True
+        # Main group analysis runs off the polling thread; results carry a sequence number
+        self.analysis_worker = AnalysisWorker(self._run_analysis_job)
+        self._apply_lock = threading.Lock()
+        self._applied_seq = 0  # Newest analysis whose result has been written to the DB
+        self._admin_outbox = queue.Queue()  # Admin notices raised on the worker, sent by the polling loop
+        self._admin_batch = None  # Collected replies while a burst of admin commands is being applied
+        self._flights = SingleFlight()  # Concurrent main group scrapes/refreshes share the one in progress
+        # Local intent classifier - simple new messages are applied without an LLM call
+        self.intent = IntentClassifier(identity=self.db.identity)
+        self.intent.load(self.db.get_intent_model())
+        if not self.intent.trained:
+            self.retrain_intent_classifier()
+        # NAME_MAPPING entries are aliases too (display name / phone number -> player name)
+        for alias, name in self.config.NAME_MAPPING.items():
+            self.db.identity.learn(alias, name, 'mapping')
+        self.whatsapp = WhatsAppBot(self.config, identity=self.db.identity)
         self.tee_generator = TeeSheetGenerator(self.config)
         self.running = True
         self._admin_anchor = []  # Last 3 admin messages as fingerprint for new message detection
@@ -2266,7 +5909,7 @@ class SwindleBot:
             "added ", "removed ", "cleared ", "swapped:", "moved:",
             "set preference", "set avoidance", "partner preference saved",
             # Error responses
-            "error:", "failed ",
+            "error:", "failed ", "couldn't apply",
             # Warning/info responses
             "preference already", "preference not found",
             "avoidance already", "avoidance not found",
@@ -2321,9 +5964,40 @@ class SwindleBot:
         self.whatsapp.send_message(self.config.MY_NUMBER, message)
 
     def send_to_admin_group(self, message: str):
-        """Send message to admin group"""
+        """Send message to admin group (collected into one reply while an admin batch runs)"""
+        if self._in_admin_batch():
+            self._admin_batch['replies'].append(message)
+            return
         self.whatsapp.send_to_group(self.config.ADMIN_GROUP_NAME, message)
 
+    def _in_admin_batch(self) -> bool:
+        batch = self._admin_batch
+        return batch is not None and batch['thread'] == threading.get_ident()
+
+    def _with_participant_list(self, message: str) -> str:
+        """Command reply followed by the participant list - in a batch the list is added once, at the end"""
+        if self._in_admin_batch():
+            self._admin_batch['show_list'] = True
+            return message
+        return f"{message}\n\n{self.generate_participant_list()}"
+
+    def notify_admin_group(self, message: str):
+        """Send to the admin group, or queue it if called from the analysis worker
+        (the browser is driven by the polling loop, which sends queued notices)"""
+        if self.analysis_worker.on_worker_thread():
+            self._admin_outbox.put(message)
+        else:
+            self.send_to_admin_group(message)
+
+    def _flush_admin_outbox(self):
+        """Send admin notices queued by the analysis worker"""
+        while True:
+            try:
+                message = self._admin_outbox.get_nowait()
+            except queue.Empty:
+                return
+            self.send_to_admin_group(message)
+
     def _restart_bot(self):
         """Restart the bot by re-executing the current script"""
         import sys
@@ -2335,18 +6009,20 @@ class SwindleBot:
         os.execv(sys.executable, [sys.executable] + sys.argv)
 
     def auto_adjust_published_sheet(self):
-        """Auto-adjust published tee sheet if participants changed"""
+        """Auto-adjust published tee sheet if participants changed (once, at the end, for an admin batch)"""
+        if self._in_admin_batch() and self._admin_batch['deferring']:
+            self._admin_batch['adjust'] = True
+            return
         published = self.db.get_published_tee_sheet()
         if not published:
             return
-        participants = self.db.get_participants(status_filter='playing')
-        avoidances = self.db.get_avoidances()
+        state = self.db.state()
         tee_sheet, had_changes, adjusted_groups = self.tee_generator.adjust_tee_sheet(
-            published, participants, avoidances
+            published, state.players('playing'), state.avoidances()
         )
         if had_changes:
             self.db.save_published_tee_sheet(adjusted_groups, {}, tee_sheet)
-            self.send_to_admin_group(f"📢 *Tee sheet auto-updated:*\n\n{tee_sheet}")
+            self.notify_admin_group(f"📢 *Tee sheet auto-updated:*\n\n{tee_sheet}")
             print(f"   📢 Auto-adjusted published tee sheet")
 
     def handle_admin_command(self, command_text: str, sender: str):
@@ -2367,13 +6043,134 @@ class SwindleBot:
             self._restart_bot()
             return
 
-        # Parse command with AI
-        result = self.admin_handler.parse_command(command_text, sender)
+        # Parse command (local rules first, AI for anything they don't cover)
+        names = [p['name'] for p in self.db.get_participants()]
+        result = self.admin_handler.parse_command(command_text, sender, names)
         command = result.get('command', 'unknown')
         confidence = result.get('confidence', 'low')
 
         print(f"   → Detected: {command} (confidence: {confidence})")
 
+        if result.get('ai_unavailable'):
+            self.send_to_admin_group(self.OVER_BUDGET_REPLY if result.get('over_budget') else self.AI_UNAVAILABLE_REPLY)
+            return
+
+        self.execute_admin_command(result)
+
+    AI_UNAVAILABLE_REPLY = (
+        "⚠️ AI is temporarily unavailable so I couldn't understand that command.\n\n"
+        "Show list / Show tee sheet / Show constraints / Show tee times still work. "
+        "Try again in a few minutes."
+    )
+
+    OVER_BUDGET_REPLY = (
+        "💷 This week's AI budget is nearly spent, so commands are only understood in their usual form.\n\n"
+        "Try e.g. Add [Name] / Remove [Name] / Swap [Name] with [Name] / Show list. Show usage has the details."
+    )
+
+    # Commands that only report state - run after a batch's changes are committed
+    VIEW_COMMANDS = {'show_list', 'show_tee_sheet', 'show_constraints', 'show_tee_times',
+                     'show_ai_stats', 'show_shadow_stats', 'show_usage'}
+    DIRECT_COMMANDS = {'shutdown', 'stop bot', 'kill bot', 'restart', 'restart bot', 'reboot'}
+
+    def handle_admin_messages(self, messages: List[Dict]):
+        """Handle every new admin message from one poll together.
+
+        All messages (including multi-command ones) are parsed in one go, every change is
+        applied in a single DB transaction, the published tee sheet is auto-adjusted at most
+        once, and the admins get one consolidated reply instead of one send per command."""
+        direct = [m for m in messages if m['text'].strip().lower() in self.DIRECT_COMMANDS]
+        texts = [m for m in messages if m not in direct]
+        if len(texts) == 1 and len(self.admin_handler.split_clauses(texts[0]['text'])) == 1:
+            self.handle_admin_command(texts[0]['text'], texts[0]['sender'])
+        elif texts:
+            print(f"📱 Processing {len(texts)} admin message(s) as one batch")
+            names = [p['name'] for p in self.db.get_participants()]
+            parsed = self.admin_handler.parse_batch([m['text'] for m in texts], texts[0]['sender'], names)
+            commands = [c for per_message in parsed for c in per_message]
+            for c in commands:
+                print(f"   → Detected: {c.get('command', 'unknown')} (confidence: {c.get('confidence', 'low')})")
+            self.execute_admin_batch(commands)
+        # Shutdown/restart last, so the rest of the burst is applied first
+        for m in direct:
+            self.handle_admin_command(m['text'], m['sender'])
+
+    def execute_admin_batch(self, commands: List[Dict]):
+        """Apply parsed commands as one unit: changes in one db.batch() (one transaction, one status
+        recalculation), then one auto-adjust, then the views, all collected into a single admin group message.
+        All or nothing: a change that fails - raising, or replying "❌ ..." as the handlers do - rolls back the batch."""
+        unavailable = any(c.get('ai_unavailable') for c in commands)
+        over_budget = any(c.get('over_budget') for c in commands)
+        commands = [c for c in commands if not c.get('ai_unavailable') and c.get('command', 'unknown') != 'unknown']
+        changes = [c for c in commands if c['command'] not in self.VIEW_COMMANDS]
+        views = [c for c in commands if c['command'] in self.VIEW_COMMANDS]
+
+        self._admin_batch = {'thread': threading.get_ident(), 'replies': [], 'show_list': False,
+                             'adjust': False, 'deferring': True}
+        try:
+            try:
+                with self.db.batch() as outcome:
+                    for command in changes:
+                        replied = len(self._admin_batch['replies'])
+                        self.execute_admin_command(command)
+                        failure = next((r for r in self._admin_batch['replies'][replied:] if r.startswith('❌')), None)
+                        if failure:
+                            raise RuntimeError(f"{command['command']}: {failure.lstrip('❌ ')}")
+                if outcome['promoted']:
+                    self._admin_batch['replies'].append(f"📢 Reserve promoted to playing: {', '.join(outcome['promoted'])}")
+                    self._admin_batch['adjust'] = True
+                if outcome['demoted']:
+                    self._admin_batch['replies'].append(f"⚠️ On reserves (no space): {', '.join(outcome['demoted'])}")
+            except Exception as e:
+                print(f"❌ Admin batch rolled back: {e}")
+                self._admin_batch.update(replies=[f"❌ Couldn't apply those commands - nothing was changed ({e})"],
+                                         show_list=False, adjust=False)
+            self._admin_batch['deferring'] = False
+            if self._admin_batch['show_list'] and not any(c['command'] == 'show_list' for c in views):
+                self._admin_batch['replies'].append(self.generate_participant_list())
+            if self._admin_batch['adjust'] and not any(c['command'] == 'show_tee_sheet' for c in views):
+                self.auto_adjust_published_sheet()
+            for command in views:
+                self.execute_admin_command(command)
+            if unavailable:
+                self._admin_batch['replies'].append(self.OVER_BUDGET_REPLY if over_budget else self.AI_UNAVAILABLE_REPLY)
+            replies = self._admin_batch['replies']
+        finally:
+            self._admin_batch = None
+
+        if replies:
+            self.send_to_admin_group('\n\n'.join(replies))
+            print(f"   ✅ Sent one reply for {len(commands)} command(s)")
+
+    # Command params naming a player - resolved to the canonical name before any handler runs
+    NAME_PARAMS = ('player_name', 'target_name', 'host_name')
+
+    def _resolve_command_names(self, result: Dict) -> Dict:
+        """Admin-typed names -> canonical player names (nicknames, typos, phone numbers).
+        add_player only takes known aliases - an unknown name there is a new player."""
+        params = result.get('params') or {}
+        wanted = {k: params[k] for k in self.NAME_PARAMS if isinstance(params.get(k), str) and params[k].strip()}
+        if not wanted:
+            return result
+        identity = self.db.identity
+        names = [p['name'] for p in self.db.get_participants()]
+        resolved = dict(params)
+        for param, value in wanted.items():
+            if result.get('command') == 'add_player':
+                canonical = identity.resolve(value, fuzzy=False)
+            else:
+                # This week's players first; constraints can name anyone seen this season
+                canonical = identity.resolve(value, within=names) or identity.resolve(value)
+            if canonical and canonical != value:
+                print(f"   🪪 {value} -> {canonical}")
+                resolved[param] = canonical
+        return {**result, 'params': resolved}
+
+    def execute_admin_command(self, result: Dict):
+        """Run one parsed admin command and reply in the admin group"""
+        result = self._resolve_command_names(result)
+        command = result.get('command', 'unknown')
+
         if command == 'show_list':
             self.refresh_main_group()
             participant_list = self.generate_participant_list()
@@ -2382,14 +6179,14 @@ class SwindleBot:
 
         elif command == 'show_tee_sheet':
             self.refresh_main_group()
-            participants = self.db.get_participants(status_filter='playing')
+            state = self.db.state()  # One snapshot for the players, constraints and tee times
+            participants = state.players('playing')
             published = self.db.get_published_tee_sheet()
 
             if published:
                 # Published sheet exists - minimally adjust it
-                avoidances = self.db.get_avoidances()
                 tee_sheet, had_changes, adjusted_groups = self.tee_generator.adjust_tee_sheet(
-                    published, participants, avoidances
+                    published, participants, state.avoidances()
                 )
                 if had_changes:
                     self.db.save_published_tee_sheet(adjusted_groups, {}, tee_sheet)
@@ -2400,11 +6197,8 @@ class SwindleBot:
                     print(f"   ✅ Sent published tee sheet (no changes)")
             else:
                 # No published sheet - generate fresh and save as published
-                partner_prefs = self.db.get_partner_preferences()
-                avoidances = self.db.get_avoidances()
-                available_times = self.db.generate_tee_times()
                 tee_sheet, groups, assigned_times = self.tee_generator.generate(
-                    participants, partner_prefs, avoidances, available_times
+                    participants, state.partner_preferences(), state.avoidances(), list(state.tee_times)
                 )
                 self.db.save_published_tee_sheet(groups, assigned_times, tee_sheet)
                 self.send_to_admin_group(tee_sheet)
@@ -2421,16 +6215,19 @@ class SwindleBot:
                 return
 
             status = self.db.add_player_manually(player_name)
-            if status == 'playing':
-                participant_list = self.generate_participant_list()
-                self.send_to_admin_group(f"✅ Added {player_name} (playing)\n\n{participant_list}")
+            if status == 'added':
+                # Part of a batch - where they land is reported once the batch's statuses are settled
+                self.send_to_admin_group(self._with_participant_list(f"✅ Added {player_name}"))
+                print(f"   ✅ Added player: {player_name}")
+                self.auto_adjust_published_sheet()
+            elif status == 'playing':
+                self.send_to_admin_group(self._with_participant_list(f"✅ Added {player_name} (playing)"))
                 print(f"   ✅ Added player: {player_name} (playing)")
                 self.auto_adjust_published_sheet()
             elif status == 'reserve':
                 reserves = self.db.get_participants(status_filter='reserve')
                 position = next((i+1 for i, r in enumerate(reserves) if r['name'] == player_name), len(reserves))
-                participant_list = self.generate_participant_list()
-                self.send_to_admin_group(f"✅ Added {player_name} to reserves (position {position})\n\n{participant_list}")
+                self.send_to_admin_group(self._with_participant_list(f"✅ Added {player_name} to reserves (position {position})"))
                 print(f"   ✅ Added player: {player_name} (reserve position {position})")
             elif status == 'exists':
                 self.send_to_admin_group(f"⚠️ {player_name} is already in the participants list")
@@ -2451,13 +6248,11 @@ class SwindleBot:
 
             result_info = self.db.remove_player_manually(player_name)
             if result_info.get('removed'):
-                participant_list = self.generate_participant_list()
                 msg = f"✅ Removed {player_name}"
                 if result_info.get('promoted'):
                     promoted_names = ', '.join(result_info['promoted'])
                     msg += f"\n\n📢 Reserve promoted to playing: {promoted_names}"
-                msg += f"\n\n{participant_list}"
-                self.send_to_admin_group(msg)
+                self.send_to_admin_group(self._with_participant_list(msg))
                 print(f"   ✅ Removed player: {player_name}")
                 if result_info.get('promoted'):
                     print(f"   📢 Promoted from reserves: {result_info['promoted']}")
@@ -2479,13 +6274,11 @@ class SwindleBot:
 
             result_info = self.db.add_guest_manually(host_name, guest_name)
             if result_info.get('success'):
-                participant_list = self.generate_participant_list()
                 msg = f"✅ Added {guest_name} as guest of {host_name}"
                 if result_info.get('demoted'):
                     demoted_names = ', '.join(result_info['demoted'])
                     msg += f"\n\n⚠️ Moved to reserves (no space): {demoted_names}"
-                msg += f"\n\n{participant_list}"
-                self.send_to_admin_group(msg)
+                self.send_to_admin_group(self._with_participant_list(msg))
                 print(f"   ✅ Added guest: {guest_name} for {host_name}")
                 if result_info.get('demoted'):
                     print(f"   ⚠️ Demoted to reserves: {result_info['demoted']}")
@@ -2507,14 +6300,12 @@ class SwindleBot:
 
             result_info = self.db.remove_guest_manually(guest_name, host_name)
             if result_info.get('success'):
-                participant_list = self.generate_participant_list()
                 host_text = f" from {host_name}" if host_name else ""
                 msg = f"✅ Removed guest {guest_name}{host_text}"
                 if result_info.get('promoted'):
                     promoted_names = ', '.join(result_info['promoted'])
                     msg += f"\n\n📢 Reserve promoted to playing: {promoted_names}"
-                msg += f"\n\n{participant_list}"
-                self.send_to_admin_group(msg)
+                self.send_to_admin_group(self._with_participant_list(msg))
                 print(f"   ✅ Removed guest: {guest_name}")
                 if result_info.get('promoted'):
                     print(f"   📢 Promoted from reserves: {result_info['promoted']}")
@@ -2782,11 +6573,7 @@ class SwindleBot:
                     new_pref = f"{new_pref} {time_pref}".strip()
 
                     # Save to database
-                    conn = sqlite3.connect(self.db.db_path, timeout=10)
-                    cursor = conn.cursor()
-                    cursor.execute("UPDATE participants SET preferences = ? WHERE name = ?", (new_pref, player_name))
-                    conn.commit()
-                    conn.close()
+                    self.db.set_player_preferences(player_name, new_pref)
 
                     self.send_to_admin_group(f"✅ Set {player_name} preference to: {time_pref} tee time")
                     print(f"   ✅ Set {player_name} to {time_pref}")
@@ -2814,12 +6601,7 @@ class SwindleBot:
                     current_pref = p.get('preferences') or ''
                     cleaned = ' '.join([w for w in current_pref.split() if w.lower() not in ['early', 'late']])
 
-                    conn = sqlite3.connect(self.db.db_path, timeout=10)
-                    cursor = conn.cursor()
-                    cursor.execute("UPDATE participants SET preferences = ? WHERE name = ?",
-                                 (cleaned.strip() or None, player_name))
-                    conn.commit()
-                    conn.close()
+                    self.db.set_player_preferences(player_name, cleaned.strip() or None)
 
                     self.send_to_admin_group(f"✅ Removed time preference for {player_name}")
                     print(f"   ✅ Removed time preference for {player_name}")
@@ -3081,21 +6863,36 @@ class SwindleBot:
 
         elif command == 'randomize':
             # Randomize the tee sheet (full fresh generation) - playing only, no reserves
-            participants = self.db.get_participants(status_filter='playing')
+            state = self.db.state()
+            participants = state.players('playing')
             if not participants:
                 self.send_to_admin_group("❌ No participants to generate tee sheet for")
                 return
-            partner_prefs = self.db.get_partner_preferences()
-            avoidances = self.db.get_avoidances()
-            available_times = self.db.generate_tee_times()
             tee_sheet, groups, assigned_times = self.tee_generator.generate(
-                participants, partner_prefs, avoidances, available_times
+                participants, state.partner_preferences(), state.avoidances(), list(state.tee_times)
             )
             # Save as the new published sheet
             self.db.save_published_tee_sheet(groups, assigned_times, tee_sheet)
             self.send_to_admin_group(f"🔀 *RANDOMIZED TEE SHEET*\n\n{tee_sheet}")
             print(f"   ✅ Randomized and published new tee sheet")
 
+        elif command == 'show_ai_stats':
+            self.send_to_admin_group(self.generate_ai_stats())
+            print(f"   ✅ Sent AI stats")
+
+        elif command == 'show_shadow_stats':
+            params = result.get('params', {})
+            try:
+                runs = int(params.get('runs') or 20)
+            except (TypeError, ValueError):
+                runs = 20
+            self.send_to_admin_group(self.generate_shadow_stats(max(1, runs)))
+            print(f"   ✅ Sent shadow stats")
+
+        elif command == 'show_usage':
+            self.send_to_admin_group(self.generate_usage_report())
+            print(f"   ✅ Sent usage report")
+
         elif command == 'unknown':
             # Unknown command - just log it, don't respond
             print(f"   ⚠️  Not a recognized command, ignoring")
@@ -3113,15 +6910,15 @@ class SwindleBot:
 
     def generate_participant_list(self) -> str:
         """Generate formatted participant list with capacity and reserves"""
-        playing = self.db.get_participants(status_filter='playing')
-        reserves = self.db.get_participants(status_filter='reserve')
-        capacity = self.db.get_capacity()
+        state = self.db.state()  # One snapshot, no database reads
+        playing = state.players('playing')
+        reserves = state.players('reserve')
+        capacity = state.capacity
 
         if not playing and not reserves:
             return f'🏌️ *Shanks Bot Update*\n\nNo names in yet - it\'s looking quiet out there!'
 
-        playing_spots = sum(1 + len(p.get('guests', [])) for p in playing)
-        reserve_spots = sum(1 + len(p.get('guests', [])) for p in reserves)
+        playing_spots = state.spots_used()['playing']
 
         lines = [f'🏌️ *Shanks Bot Update*\n']
 
@@ -3147,6 +6944,149 @@ class SwindleBot:
 
         return '\n'.join(lines)
 
+    def generate_ai_stats(self) -> str:
+        """Format AI usage stats (cache hit rates, breaker state, latencies, structured reply failures) for the admin group"""
+        lines = ["📊 *AI Stats*\n"]
+
+        hits = self.ai.cache_stats['hits']
+        misses = self.ai.cache_stats['misses']
+        lines.append("💾 *Analysis cache (since start):*")
+        lines.append(f"  {hits} hits / {hits + misses} lookups ({self.ai.cache_hit_rate():.0%} hit rate)")
+
+        lifetime = self.db.get_analysis_cache_stats()
+        if lifetime:
+            lines.append("\n💾 *Analysis cache (stored):*")
+            for purpose, stats in sorted(lifetime.items()):
+                lookups = stats['entries'] + stats['hits']
+                rate = stats['hits'] / lookups if lookups else 0.0
+                lines.append(f"  {purpose}: {stats['hits']} hits / {lookups} lookups ({rate:.0%})")
+
+        compaction = self.ai.compaction_stats
+        if compaction['runs']:
+            lines.append("\n🗜️ *Transcript compaction:*")
+            lines.append(f"  {compaction['runs']} transcripts, ~{compaction['tokens_before']:,} -> "
+                         f"~{compaction['tokens_after']:,} tokens ({self.ai.compaction_savings():.0%} saved)")
+
+        intent = self.intent.stats
+        lines.append("\n🧠 *Local classifier:*")
+        source = f"trained on {self.intent.examples} messages" if self.intent.trained else "keyword rules only"
+        lines.append(f"  {source}; {intent['local']} new messages handled locally, {intent['llm']} sent to AI")
+
+        cascade = self.ai.cascade_stats
+        if cascade['runs']:
+            lines.append("\n🪜 *Model cascade:*")
+            lines.append(f"  {cascade['escalations']} of {cascade['runs']} analyses escalated ({self.ai.escalation_rate():.0%})")
+            for reason, count in sorted(cascade['reasons'].items(), key=lambda r: -r[1]):
+                lines.append(f"    {reason}: {count}")
+        for model, tier in sorted(self.ai.tier_stats.items()):
+            avg = tier['seconds'] / tier['calls'] if tier['calls'] else 0.0
+            lines.append(f"  {model}: {tier['calls']} calls (+{tier['cache_hits']} cached), "
+                         f"avg {avg:.1f}s, ${tier['cost']:.4f}")
+
+        shared = self._flights.stats['shared'] + self.ai._flights.stats['shared']
+        if shared:
+            lines.append(f"\n🔗 *Shared work:* {self._flights.stats['shared']} scrapes/refreshes joined one in progress, "
+                         f"{self.ai._flights.stats['shared']} identical AI calls shared")
+
+        parsed = self.admin_handler.parse_stats
+        lines.append("\n⚡ *Command parsing:*")
+        lines.append(f"  {parsed['local']} local, {parsed['cached']} cached, {parsed['ai']} AI "
+                     f"({self.admin_handler.fast_path_rate():.0%} without an AI call)")
+
+        lines.append(f"\n🔌 *AI API:* {self.ai_breaker.describe()}")
+        if self._queued_analysis is not None:
+            lines.append("  ⏸️ main group analysis queued")
+        lines.append(f"  Analysis worker: {self.analysis_worker.describe()}")
+        for label, gateway in (("Analysis", self.ai.gateway), ("Commands", self.admin_handler.gateway)):
+            st = gateway.stats
+            lines.append(f"  {label}: {st['calls']} calls, {st['retries']} retries, "
+                         f"{st['failures']} failed, {st['rejected']} skipped (breaker), {st['over_budget']} skipped (budget)")
+            for purpose, lat in sorted(gateway.latency_summary().items()):
+                lines.append(f"    {purpose}: p50 {lat['p50']:.1f}s, p95 {lat['p95']:.1f}s, max {lat['max']:.1f}s ({lat['count']} calls)")
+
+        pool = self.ai.pool
+        lines.append(f"\n🌐 *HTTP pool:* {pool.stats['requests']} requests, {pool.stats['warmups']} pre-warms "
+                     f"({pool.stats['warmup_failures']} failed)")
+        for (kind, label), lat in sorted(pool.latency_summary().items()):
+            ttfb, total = lat['ttfb'], lat['total']
+            lines.append(f"  {kind} {label}: first byte p50 {ttfb['p50']:.2f}s p95 {ttfb['p95']:.2f}s, "
+                         f"total p50 {total['p50']:.1f}s p95 {total['p95']:.1f}s ({total['count']})")
+
+        lines.append("\n🧾 *Structured replies:*")
+        for label, caller in (("Analysis", self.ai.structured), ("Commands", self.admin_handler.structured)):
+            st = caller.stats
+            lines.append(f"  {label}: {st['calls']} calls, {st['parse_failures']} invalid, "
+                         f"{st['repairs']} repaired, {st['repair_failures']} unrepairable")
+
+        return '\n'.join(lines)
+
+    def generate_usage_report(self) -> str:
+        """AI spend from the token ledger: this week against the budget (by model and by call type),
+        last week and all time"""
+        lines = ["💷 *AI Usage*\n", f"Spend: {self.ledger.describe()}"]
+        stage = self.ledger.stage()
+        if stage != 'normal':
+            lines.append(f"  Saving mode: {stage} (see the budget notice)")
+
+        def tokens(row):
+            cached = row['cache_read_tokens'] + row['cache_write_tokens']
+            return f"{row['input_tokens']:,} in / {row['output_tokens']:,} out" + (f" / {cached:,} cache" if cached else "")
+
+        week_start = self.ledger.week_start()
+        for title, group_by in (("By model", 'model'), ("By call", 'purpose')):
+            rows = self.db.get_llm_usage(week_start, group_by)
+            if rows:
+                lines.append(f"\n*{title} (this week):*")
+                for row in rows:
+                    lines.append(f"  {row['key']}: {row['calls']} calls, {tokens(row)}, ${row['cost']:.4f}")
+
+        last_week = self.ledger.week_start(datetime.now() - timedelta(days=7))
+        previous = self.db.get_llm_spend(last_week) - self.db.get_llm_spend(week_start)
+        total = self.db.get_llm_usage(None, 'lane')
+        lines.append(f"\nLast week: ${previous:.2f}")
+        lanes = ', '.join(f"{r['key']} ${r['cost']:.2f}" for r in total) or 'no calls yet'
+        lines.append(f"All time: {sum(r['calls'] for r in total)} calls, ${sum(r['cost'] for r in total):.2f} ({lanes})")
+        return '\n'.join(lines)
+
+    def generate_shadow_stats(self, limit: int = 20) -> str:
+        """Summarise the last N shadow runs: agreement with the live model, latency and token cost"""
+        lines = ["🕶️ *Shadow Stats*\n"]
+        shadow = self.ai.shadow
+        if shadow:
+            lines.append(f"Candidate: {shadow.model} ({shadow.prompt_label} prompt), sampling {shadow.sample_rate:.0%} of analyses")
+            st = shadow.stats
+            lines.append(f"This session: {st['completed']} compared, {st['errors']} failed, {st['dropped']} skipped (busy)\n")
+        else:
+            lines.append("Shadow mode is off (SHADOW_SAMPLE_RATE = 0)\n")
+
+        runs = self.db.get_shadow_runs(limit)
+        if not runs:
+            lines.append("No shadow runs recorded yet")
+            return '\n'.join(lines)
+
+        ok = [r for r in runs if not r['error']]
+        lines.append(f"*Last {len(runs)} runs:*")
+        if ok:
+            agreed = sum(r['agree'] for r in ok)
+            lines.append(f"  Agreement: {agreed}/{len(ok)} ({agreed / len(ok):.0%})")
+            for label, prefix in (("Live", 'primary'), ("Shadow", 'candidate')):
+                seconds = sum(r[f'{prefix}_seconds'] or 0 for r in ok) / len(ok)
+                tokens_in = sum(r[f'{prefix}_input_tokens'] or 0 for r in ok) / len(ok)
+                tokens_out = sum(r[f'{prefix}_output_tokens'] or 0 for r in ok) / len(ok)
+                cost = sum(r[f'{prefix}_cost'] or 0 for r in ok)
+                lines.append(f"  {label}: avg {seconds:.1f}s, {tokens_in:,.0f} in / {tokens_out:,.0f} out tokens, ${cost:.4f} total")
+        if len(ok) < len(runs):
+            lines.append(f"  Failed: {len(runs) - len(ok)} (last: {next(r['error'] for r in runs if r['error'])})")
+
+        disagreements = [r for r in ok if not r['agree']][:3]
+        if disagreements:
+            lines.append("\n*Recent differences:*")
+            for r in disagreements:
+                parts = [f"{kind} {', '.join(names[:4])}" for kind, names in r['diff'].items()]
+                lines.append(f"  {r['created_at'][:16]}: {'; '.join(parts)}")
+
+        return '\n'.join(lines)
+
     def clear_weekly_data(self):
         """Clear data for new week (Monday 00:01)"""
         print("⏰ Clearing data for new week...")
@@ -3168,6 +7108,16 @@ class SwindleBot:
         message = "🏌️ *Shanks Bot - New Week!*\n\nSlate wiped clean, ready for a fresh one.\n\n✅ *Cleared:*\n- Participants\n- Time preferences\n- Tee time modifications\n- Published tee sheet\n- MP pairings\n\n🔒 *Kept:*\n- Partner preferences\n- Tee time settings"
         self.send_to_admin_group(message)
 
+    def weekly_maintenance(self):
+        """Once-a-week upkeep (Monday 00:30) - kept out of clear_weekly_data, which the polling
+        loop calls on every check during Monday's first hour"""
+        print("⏰ Weekly maintenance...")
+        pruned = self.db.prune_analysis_cache()
+        archived = self.db.archive_inactive_constraints()
+        self.db.optimize()
+        self.retrain_intent_classifier()
+        print(f"✅ Weekly maintenance complete: {pruned} cache entries pruned, {archived} removed constraints archived")
+
     def send_weekly_opening(self):
         """Send Monday morning message - ready to take tee times for Sunday"""
         print("⏰ Sending weekly opening message...")
@@ -3184,6 +7134,10 @@ class SwindleBot:
         print("⏰ Sending health check...")
         now = datetime.now()
         message = f"🏌️ *Shanks Bot* is alive and well! Still on the job.\n_{now.strftime('%d/%m/%Y %H:%M')}_"
+        differences = self.db.verify_state_cache()
+        if differences:
+            print(f"⚠️  State cache out of date, reloading: {'; '.join(differences[:5])}")
+            message += f"\n\n⚠️ Cached list was out of date ({len(differences)} differences) - reloaded"
         self.send_to_admin_group(message)
 
     def send_startup_message(self):
@@ -3212,7 +7166,10 @@ class SwindleBot:
             "Clear tee sheet",
             "Clear time preferences",
             "Clear participants",
-            "Randomize"
+            "Randomize",
+            "Show AI stats",
+            "Show shadow stats",
+            "Show usage"
         ]
         admin_msg = f"🏌️ *Shanks Bot is online!* Ready to go at {now.strftime('%H:%M')}.\n\n*Commands:*\n" + "\n".join(f"  - {cmd}" for cmd in commands)
         self.send_to_admin_group(admin_msg)
@@ -3244,80 +7201,351 @@ class SwindleBot:
         sorted_old = sorted(last_snapshot, key=lambda m: (m.get('sender', ''), m.get('text', '')))
         return json.dumps(sorted_new) == json.dumps(sorted_old)
 
-    def _apply_delta(self, delta: Dict):
-        """Apply delta changes (add/remove players/guests) on top of existing DB data - silently"""
-        for player in delta.get('add', []):
-            name = player.get('name')
-            if name:
-                status = self.db.add_player_manually(name, player.get('guests'), player.get('preferences'))
-                if status in ('playing', 'reserve'):
-                    print(f"   ➕ Delta: added {name} ({status})")
-
-        for name in delta.get('remove', []):
-            if name:
-                result = self.db.remove_player_manually(name)
-                if result.get('removed'):
-                    print(f"   ➖ Delta: removed {name}")
-
-        for guest_info in delta.get('guest_add', []):
-            host = guest_info.get('host')
-            guest_name = guest_info.get('guest_name')
-            if host and guest_name:
-                result = self.db.add_guest_manually(host, guest_name)
-                if result.get('success'):
-                    print(f"   ➕ Delta: added guest {guest_name} for {host}")
-
-        for guest_info in delta.get('guest_remove', []):
-            host = guest_info.get('host')
-            guest_name = guest_info.get('guest_name')
-            if guest_name:
-                result = self.db.remove_guest_manually(guest_name, host)
-                if result.get('success'):
-                    print(f"   ➖ Delta: removed guest {guest_name}")
+    def _apply_delta(self, delta: Dict, manual: bool = True) -> Dict:
+        """Apply delta changes (add/remove players/guests) on top of existing DB data - silently.
+        manual=False marks added players as AI-derived so the next full analysis can reconcile them.
+        Everything goes in as one db.batch(), so statuses are recalculated once; returns its
+        {'promoted': [names], 'demoted': [names]}."""
+        with self.db.batch() as outcome:
+            for player in delta.get('add', []):
+                name = player.get('name')
+                if name:
+                    status = self.db.add_player_manually(name, player.get('guests'), player.get('preferences'), manual=manual)
+                    if status in ('added', 'playing', 'reserve'):
+                        print(f"   ➕ Delta: added {name}")
+
+            for name in delta.get('remove', []):
+                if name:
+                    result = self.db.remove_player_manually(name)
+                    if result.get('removed'):
+                        print(f"   ➖ Delta: removed {name}")
+
+            for guest_info in delta.get('guest_add', []):
+                host = guest_info.get('host')
+                guest_name = guest_info.get('guest_name')
+                if host and guest_name:
+                    result = self.db.add_guest_manually(host, guest_name)
+                    if result.get('success'):
+                        print(f"   ➕ Delta: added guest {guest_name} for {host}")
+
+            for guest_info in delta.get('guest_remove', []):
+                host = guest_info.get('host')
+                guest_name = guest_info.get('guest_name')
+                if guest_name:
+                    result = self.db.remove_guest_manually(guest_name, host)
+                    if result.get('success'):
+                        print(f"   ➖ Delta: removed guest {guest_name}")
+
+            for pref_info in delta.get('preferences', []):
+                name = pref_info.get('name')
+                if name and self.db.set_player_preferences(name, pref_info.get('preferences') or None):
+                    print(f"   ✏️  Delta: {name} preference -> {pref_info.get('preferences')}")
+
+            new_pairings = [p for p in delta.get('pairings', []) if isinstance(p, list) and len(p) == 2]
+            if new_pairings:
+                existing = self.db.get_weekly_pairings()
+                merged = existing + [p for p in new_pairings if p not in existing]
+                if merged != existing:
+                    self.db.save_weekly_pairings(merged)
+
+        if outcome['promoted']:
+            print(f"   📢 Delta: promoted from reserves: {', '.join(outcome['promoted'])}")
+        if outcome['demoted']:
+            print(f"   ⏳ Delta: on reserves (no space): {', '.join(outcome['demoted'])}")
+        return outcome
+
+    def apply_signup_votes(self, votes: Optional[List[Dict]]):
+        """Apply poll votes / reactions on the "taking names" post directly - no AI call. New yes-votes
+        are added, withdrawn ones removed, and switching to a "+ guest" option adds or drops the guest.
+        Text messages still cover guests, preferences and dropouts (see _with_votes)."""
+        if votes is None or not self.config.VOTE_SIGNUPS:
+            return
+        with self._apply_lock:
+            changes = self.db.sync_signup_votes(votes)
+            if not any(changes.values()):
+                return
+            patch = AIAnalyzer.empty_patch()
+            for vote in changes['added']:
+                name = vote['voter']
+                guests = [f"{name}-Guest"] if vote['choice'] == 'guest' else []
+                patch['add'].append({'name': name, 'guests': guests, 'preferences': None})
+            patch['remove'] = changes['withdrawn']
+            for vote in changes['changed']:
+                change = {'host': vote['voter'], 'guest_name': f"{vote['voter']}-Guest"}
+                patch['guest_add' if vote['choice'] == 'guest' else 'guest_remove'].append(change)
+            self._apply_delta(patch, manual=False)
+        print(f"🗳️  Votes applied without AI: +{len(changes['added'])} players, -{len(changes['withdrawn'])} players, "
+              f"{len(changes['changed'])} guest change(s)")
+
+    def _with_votes(self, players: List[Dict], window: List[Dict]) -> List[Dict]:
+        """Add this week's voters to a full analysis result - the model only sees text, so a player
+        who just voted isn't in its list. A voter whose latest dropout-looking message is newer than
+        their vote stays out. Everyone is ordered by their earliest signup, message or vote."""
+        votes = self.db.get_signup_votes() if self.config.VOTE_SIGNUPS else []
+        if not votes:
+            return players
+        key = IdentityIndex.key
+        dropped = {}
+        for msg in window:
+            if IntentClassifier.keyword_label(msg['text']) == 'dropout':
+                sender = key(self.db.identity.canonical(msg['sender']))
+                dropped[sender] = max(dropped.get(sender, ''), message_sort_key(msg))
+        times = self.ai.signup_times([p['name'] for p in players], window)
+        timed = {key(p['name']): [times.get(p['name'], ('~',)), i, p] for i, p in enumerate(players)}
+        for n, vote in enumerate(votes):
+            name, voted_at = vote['voter'], (vote['first_seen'], len(window), n)
+            entry = timed.get(key(name))
+            if entry is None:
+                if dropped.get(key(name), '') > vote['first_seen']:
+                    continue
+                entry = timed[key(name)] = [voted_at, len(players) + n, {'name': name, 'guests': [], 'preferences': None}]
+            entry[0] = min(entry[0], voted_at)
+            if vote['choice'] == 'guest' and not entry[2].get('guests'):
+                entry[2] = {**entry[2], 'guests': [f"{name}-Guest"]}
+        return [player for _, _, player in sorted(timed.values(), key=lambda t: t[:2])]
+
+    def _incremental_window(self, messages: List[Dict], last_snapshot: Optional[List[Dict]]) -> Optional[List[Dict]]:
+        """Messages after the last analysed watermark, or None if a full re-analysis is needed.
+
+        The watermark is the newest message in the last analysed snapshot. Anything that
+        isn't strictly "new messages appended after it" (first run, new week, edited or
+        late-loaded history, a large burst, or the periodic consistency check) goes full."""
+        if not last_snapshot or not self.db.get_participants():
+            return None
 
-    def refresh_main_group(self):
-        """Reload WhatsApp Web and do a fresh scan of the main group.
-        This ensures a full message load (WhatsApp loads fewer messages on chat re-visits).
-        Only used before scheduled messages - on-demand commands use DB data."""
-        print(f"🔄 Refreshing main group before scheduled message...")
-        try:
-            # Reload page to reset WhatsApp's DOM - ensures full message load
-            print("   Reloading WhatsApp Web for clean message load...")
-            self.whatsapp.driver.get('https://web.whatsapp.com')
-            time.sleep(8)
-            # Wait for WhatsApp to be ready
-            self.whatsapp.wait.until(
-                EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'))
-            )
-            time.sleep(2)
-            print("   ✅ WhatsApp reloaded")
+        state = self.db.get_analysis_state()
+        if state['incremental_runs'] >= self.config.FULL_ANALYSIS_EVERY:
+            print(f"🔁 {state['incremental_runs']} incremental updates since last full analysis - running consistency check")
+            return None
 
-            messages = self.whatsapp.get_all_messages(self.config.GROUP_NAME, scroll_for_history=True)
-            if messages is None:
-                print("⚠️  Failed to get main group messages - using existing data")
-                return
+        seen = {message_key(m) for m in last_snapshot}
+        watermark = max(message_sort_key(m) for m in last_snapshot)
+        new_messages = [m for m in messages if message_key(m) not in seen]
+        if not new_messages:
+            return None
+        if any(message_sort_key(m) < watermark for m in new_messages):
+            print("🔁 New messages appeared before the last analysed message - running full analysis")
+            return None
+        if len(new_messages) > self.config.INCREMENTAL_MAX_MESSAGES:
+            print(f"🔁 {len(new_messages)} new messages since last analysis - running full analysis")
+            return None
+        if self.ai.find_organizer_index(new_messages) >= 0:
+            print("🔁 New 'taking names' message - running full analysis")
+            return None
+        return new_messages
+
+    def _claim_apply(self, seq: Optional[int]) -> bool:
+        """Sequence check before writing an analysis result (caller holds _apply_lock).
+        False if a newer transcript's result has already been applied."""
+        if seq is None:
+            return True  # Synchronous caller - nothing to race with
+        if seq < self._applied_seq:
+            print(f"⏭️  Discarding analysis #{seq} - #{self._applied_seq} already applied")
+            return False
+        self._applied_seq = seq
+        return True
 
-            # Check if messages have changed since last analysis (order-independent)
-            last_snapshot = self.db.get_last_snapshot()
-            if self._snapshot_matches(messages, last_snapshot):
-                print("📋 No new messages since last check - already up to date")
-                return
+    def _resolve_locally(self, window: List[Dict], participants: List[Dict]) -> tuple:
+        """Handle confidently classified simple messages without the LLM.
+
+        Returns (local_patch or None, messages still needing the LLM). A sender with any
+        message the classifier isn't sure about goes to the LLM entirely, so "latest message
+        wins" is never split between the two paths."""
+        if not self.config.LOCAL_CLASSIFIER:
+            return None, window
+
+        verdicts = []
+        needs_llm = set()
+        signed_up = {p['name'].lower() for p in participants}
+        for msg in window:
+            sender = msg['sender']
+            label, confidence, _ = self.intent.predict(msg['text'])
+            verdicts.append((msg, label))
+            if sender == 'Unknown':
+                continue  # Ignored by the analysis rules anyway
+            if confidence < self.config.LOCAL_CLASSIFIER_THRESHOLD or not self.intent.is_simple(msg['text'], label):
+                needs_llm.add(sender)
+            elif label == 'guest' and sender.lower() not in signed_up:
+                needs_llm.add(sender)  # "+1" from someone not on the list - let the LLM decide
+
+        patch = AIAnalyzer.empty_patch()
+        remaining = []
+        for position, (msg, label) in enumerate(verdicts):
+            sender = msg['sender']
+            if sender in needs_llm:
+                remaining.append(msg)
+                continue
+            if sender == 'Unknown' or label == 'ignore':
+                continue
+            key = sender.lower()
+            if label == 'signup' and key not in signed_up:
+                patch['add'].append({'name': sender, 'guests': [], 'preferences': None,
+                                     'at': (message_sort_key(msg), position, 0)})
+                signed_up.add(key)
+            elif label == 'dropout' and key in signed_up:
+                added_here = [p for p in patch['add'] if p['name'].lower() == key]
+                if added_here:
+                    patch['add'].remove(added_here[0])  # Signed up and dropped out since the last check
+                else:
+                    patch['remove'].append(sender)
+                signed_up.discard(key)
+            elif label == 'guest':
+                patch['guest_add'].append({'host': sender, 'guest_name': f"{sender}-Guest"})
+
+        handled = len(window) - len(remaining)
+        self.intent.stats['local'] += handled
+        self.intent.stats['llm'] += len(remaining)
+        if handled:
+            print(f"🧠 Local classifier handled {handled}/{len(window)} message(s): "
+                  f"+{len(patch['add'])} players, -{len(patch['remove'])} players, +{len(patch['guest_add'])} guests")
+        return (patch if any(patch.values()) else None), remaining
+
+    def _combine_patches(self, local_patch: Optional[Dict], llm_patch: Dict, window: List[Dict]) -> Dict:
+        """Merge the local and LLM patches (disjoint senders), with new players in signup order.
+        `window` is every new message (both paths); LLM-added players are timed by
+        AIAnalyzer.signup_times(), so the model's list order never decides who gets a spot."""
+        local_patch = local_patch or AIAnalyzer.empty_patch()
+        combined = {key: local_patch.get(key, []) + llm_patch.get(key, []) for key in AIAnalyzer.empty_patch()}
+        times = self.ai.signup_times([p.get('name', '') for p in llm_patch.get('add', [])], window)
+        for player in llm_patch.get('add', []):
+            player['at'] = times.get(player.get('name', ''), ('~',))
+        combined['add'] = sorted(combined['add'], key=lambda p: p['at'])
+        return combined
+
+    def _log_intent_labels(self, messages: List[Dict], signed_up: set, dropped: set, guest_hosts: set):
+        """Label analysed messages with the intent implied by the AI's decision (classifier training data).
+
+        Per sender: the first signup-looking message (or their first message) of a signed-up
+        player is 'signup'; the last dropout-looking message (or last message) of a dropped
+        player is 'dropout'; a guest-looking message of a host whose guests changed is 'guest';
+        everything else is 'ignore'. Organizer and [Unknown] messages are skipped."""
+        by_sender = {}
+        for msg in messages or []:
+            text_lower = msg['text'].lower()
+            if msg['sender'] == 'Unknown' or any(k in text_lower for k in AIAnalyzer.ORGANIZER_KEYWORDS):
+                continue
+            by_sender.setdefault(msg['sender'].lower(), []).append(msg)
+
+        rows = []
+        for sender, msgs in by_sender.items():
+            keyword = [IntentClassifier.keyword_label(m['text']) for m in msgs]
+            labels = ['ignore'] * len(msgs)
+            if sender in signed_up:
+                labels[next((i for i, k in enumerate(keyword) if k == 'signup'), 0)] = 'signup'
+            if sender in dropped:
+                last = next((i for i in reversed(range(len(msgs))) if keyword[i] == 'dropout'), len(msgs) - 1)
+                labels[last] = 'dropout'
+                for i in range(last):
+                    if keyword[i] == 'signup':
+                        labels[i] = 'signup'
+            if sender in guest_hosts:
+                idx = next((i for i in reversed(range(len(msgs)))
+                            if keyword[i] == 'guest' or 'guest' in msgs[i]['text'].lower()), None)
+                if idx is not None and labels[idx] == 'ignore':
+                    labels[idx] = 'guest'
+            for msg, label in zip(msgs, labels):
+                key = hashlib.sha1(json.dumps(message_key(msg)).encode('utf-8')).hexdigest()
+                rows.append({'key': key, 'week': message_week(msg), 'sender': msg['sender'],
+                             'text': msg['text'], 'label': label})
+        self.db.log_message_labels(rows)
+
+    def retrain_intent_classifier(self) -> bool:
+        """Retrain the local classifier on every logged label (weekly, and at startup if untrained)"""
+        examples = self.db.get_message_labels()
+        if len(examples) < IntentClassifier.MIN_TRAINING_EXAMPLES:
+            print(f"🧠 Intent classifier: {len(examples)} labelled messages "
+                  f"(need {IntentClassifier.MIN_TRAINING_EXAMPLES}) - keyword rules only")
+            return False
+        started = time.time()
+        self.intent.train(examples)
+        self.db.save_intent_model(self.intent.to_dict(), len(examples))
+        print(f"🧠 Intent classifier trained on {len(examples)} messages in {time.time() - started:.1f}s")
+        return True
+
+    def process_main_group_messages(self, messages: List[Dict], adjust_published: bool = False,
+                                    seq: Optional[int] = None) -> Optional[Dict]:
+        """Analyse freshly scraped main group messages and apply the result to the database.
+
+        Uses an incremental patch (current DB state + messages since the watermark) when
+        possible and a full transcript analysis otherwise. `seq` is the analysis worker's
+        sequence number - a result older than one already applied is dropped. Returns the
+        full analysis result for logging, or None when nothing needed a full analysis."""
+        # Check if messages have changed since last analysis (order-independent)
+        last_snapshot = self.db.get_last_snapshot()
+        if self._snapshot_matches(messages, last_snapshot):
+            print(f"📋 No new messages since last check - skipping AI analysis (saving tokens)")
+            return None
+
+        if not self.ai_breaker.is_available():
+            # AI API is down - keep serving from DB state, analyse once the breaker lets calls through
+            self._queued_analysis = messages
+            print(f"⏸️  AI unavailable ({self.ai_breaker.describe()}) - analysis of {len(messages)} messages queued")
+            return None
+        self._queued_analysis = None
+
+        new_messages = self._incremental_window(messages, last_snapshot)
+        if new_messages is not None:
+            organizer_idx = self.ai.find_organizer_index(last_snapshot)
+            organizer = last_snapshot[organizer_idx]['sender'] if organizer_idx >= 0 else None
+            window = self.ai.compact(new_messages, context=last_snapshot)
+            window = self.ai.drop_organizer_quotes(window, organizer)
+            if not window:
+                print("📋 Only quotes, reactions or noise since last check - nothing to analyse")
+                with self._apply_lock:
+                    if self._claim_apply(seq):
+                        self.db.save_snapshot(messages)
+                return None
+
+            participants = self.db.get_participants()
+            local_patch, llm_window = self._resolve_locally(window, participants)
+            if llm_window:
+                print(f"🤖 Incremental analysis of {len(llm_window)} new message(s)...")
+                patch = self.ai.analyze_incremental(participants, self.db.get_weekly_pairings(), llm_window)
+            else:
+                patch = AIAnalyzer.empty_patch()
+            if patch is not None:
+                with self._apply_lock:
+                    if not self._claim_apply(seq):
+                        return None
+                    self._apply_delta(self._combine_patches(local_patch, patch, window), manual=False)
+                    self._log_intent_labels(
+                        llm_window,
+                        signed_up={p.get('name', '').lower() for p in patch['add']},
+                        dropped={n.lower() for n in patch['remove']},
+                        guest_hosts={g.get('host', '').lower() for g in patch['guest_add']},
+                    )
+                    self.db.save_snapshot(messages)
+                    self.db.record_incremental_analysis()
+                    if adjust_published:
+                        self.auto_adjust_published_sheet()
+                return None
+            print("⚠️  Incremental analysis failed - falling back to full analysis")
+
+        # Analyze with AI
+        print(f"🤖 Analyzing {len(messages)} messages with AI...")
+        result = self.ai.analyze_messages(messages)
 
-            # Analyze with AI
-            print(f"🤖 Analyzing {len(messages)} messages with AI...")
-            result = self.ai.analyze_messages(messages)
+        if result is None:
+            # No result at all - keep existing data
+            print("📋 Keeping existing player data")
+            if not self.ai_breaker.is_available():
+                self._queued_analysis = messages
+            return None
+
+        with self._apply_lock:
+            if not self._claim_apply(seq):
+                return None
 
-            if result is not None and result.get('delta'):
+            if result.get('delta'):
                 # Delta mode - apply changes on top of existing data
                 self._apply_delta(result['delta'])
                 self.db.save_snapshot(messages)
-                return
+                return None
 
-            if result is None:
-                # No result at all - keep existing data
-                print("📋 Keeping existing player data")
-                return
+            result['players'] = self._with_votes(result['players'], self.ai.last_window)
 
+            # Only update database if AI returned valid results
+            # Prevents wiping participants on API errors
             if result['players'] or result.get('total_count', 0) > 0:
                 # Safety check: don't overwrite a larger list with a significantly smaller one
                 existing = self.db.get_participants()
@@ -3328,21 +7556,136 @@ class SwindleBot:
                 else:
                     changes = self.db.update_participants(result['players'])
                     self.db.save_snapshot(messages)
+                    self.db.record_full_analysis()
+                    kept = {p['name'].lower() for p in result['players']}
+                    self._log_intent_labels(
+                        self.ai.last_window,
+                        signed_up=kept,
+                        dropped={p['name'].lower() for p in existing} - kept,
+                        guest_hosts={p['name'].lower() for p in result['players'] if p.get('guests')},
+                    )
+                    # Save any AI-detected MP pairings as weekly constraints
                     if result.get('pairings'):
                         self.db.save_weekly_pairings(result['pairings'])
-                    print(f"✅ Refreshed: {result['total_count']} players")
                     # Notify admin group if reserves were promoted
                     if changes.get('promoted'):
                         promoted_names = ', '.join(changes['promoted'])
-                        self.send_to_admin_group(f"📢 Reserve promoted to playing: {promoted_names}")
+                        self.notify_admin_group(f"📢 Reserve promoted to playing: {promoted_names}")
                         print(f"   📢 Promoted from reserves: {changes['promoted']}")
-                    self.auto_adjust_published_sheet()
+                    if adjust_published:
+                        self.auto_adjust_published_sheet()
             else:
                 existing = self.db.get_participants()
                 if existing:
                     print(f"⚠️  AI returned 0 players but DB has {len(existing)} - keeping existing data")
                 else:
                     self.db.save_snapshot(messages)
+                    self.db.record_full_analysis()
+        return result
+
+    def _run_analysis_job(self, messages: List[Dict], adjust_published: bool, seq: int):
+        """Analysis worker entry point - analyse, apply, and log the outcome"""
+        result = self.process_main_group_messages(messages, adjust_published=adjust_published, seq=seq)
+        if result is None or result.get('delta'):
+            return
+
+        # Log results
+        print(f"✅ Analysis #{seq} complete:")
+        print(f"   Players: {result.get('total_count', len(result.get('players', [])))}")
+        print(f"   Summary: {result.get('summary', '')}")
+        if result.get('changes'):
+            print(f"   Changes: {', '.join(result['changes'])}")
+
+        # Change notifications disabled per user request
+        # If you want to re-enable, uncomment the lines below:
+        # if result.get('changes') and len(result['changes']) > 0:
+        #     change_msg = f"🔔 UPDATE\n\n{result['summary']}\n\nChanges:\n"
+        #     change_msg += '\n'.join(f"• {c}" for c in result['changes'])
+        #     self.send_to_me(change_msg)
+
+    def _check_ai_availability(self):
+        """Tell admins when the AI circuit breaker opens or recovers, and run any
+        main group analysis that was queued while it was open"""
+        is_open = self.ai_breaker.state == 'open'
+        if is_open and self._ai_was_available:
+            self._ai_was_available = False
+            self.send_to_admin_group(
+                f"⚠️ AI API unavailable - {self.ai_breaker.describe()}\n\n"
+                f"Lists and tee sheets are served from current data; new messages will be analysed once it recovers."
+            )
+        elif self.ai_breaker.state == 'closed' and not self._ai_was_available:
+            self._ai_was_available = True
+            self.send_to_admin_group("✅ AI API recovered - back to normal")
+
+        if self._queued_analysis is not None and self.ai_breaker.is_available():
+            print("▶️  Running main group analysis queued while the AI was unavailable")
+            messages, self._queued_analysis = self._queued_analysis, None
+            self.analysis_worker.submit(messages, adjust_published=True)
+
+    BUDGET_NOTICES = {
+        'normal': "✅ AI budget back to normal - {budget}",
+        'slow': "💷 AI budget {budget}\n\nChecking the main group every {minutes} min instead of "
+                "{normal_minutes} and pausing shadow runs.",
+        'local': "💷 AI budget {budget}\n\nAdmin commands are now understood by the built-in rules only "
+                 "(Show list, Add/Remove [Name], tee times etc. still work).",
+        'fast': "💷 AI budget {budget}\n\nMain group analysis is on the cheaper model only from now until Monday.",
+    }
+
+    def _check_ai_budget(self):
+        """Tell admins when the weekly AI budget moves the bot to another stage (see TokenLedger)"""
+        stage = self.ledger.stage()
+        if stage == self._budget_stage:
+            return
+        print(f"💷 AI budget stage: {self._budget_stage} -> {stage} ({self.ledger.describe()})")
+        self._budget_stage = stage
+        self.send_to_admin_group(self.BUDGET_NOTICES[stage].format(
+            budget=self.ledger.describe(), normal_minutes=self.config.MAIN_GROUP_CHECK_MINUTES,
+            minutes=int(self.config.MAIN_GROUP_CHECK_MINUTES * self.config.BUDGET_SLOW_FACTOR)))
+
+    def scrape_main_group(self, reload: bool = False) -> Optional[List[Dict]]:
+        """Scrape the main group (optionally after a page reload) and apply any poll votes.
+        Single-flight: a thread asking while another scrape is in progress gets that scrape's
+        messages instead of driving the browser through the same scroll again."""
+        def scrape():
+            with self.whatsapp.browser_lock:
+                if reload:
+                    self.whatsapp.reload()
+                messages = self.whatsapp.get_all_messages(self.config.GROUP_NAME, scroll_for_history=True)
+                votes = self.whatsapp.last_votes
+            if messages is not None:
+                self.apply_signup_votes(votes)
+            return messages
+
+        if self._flights.in_flight('scrape'):
+            print("🔗 Main group scrape already in progress - sharing its messages")
+        return self._flights.do('scrape', scrape)
+
+    def refresh_main_group(self):
+        """Reload WhatsApp Web and do a fresh scan of the main group.
+        This ensures a full message load (WhatsApp loads fewer messages on chat re-visits).
+        Used before scheduled messages and Show list / Show tee sheet. Concurrent refreshes
+        (scheduler + admin command) join the one already running and share its result."""
+        if self._flights.in_flight('refresh'):
+            print("🔗 Main group refresh already in progress - waiting for it")
+        self._flights.do('refresh', self._refresh_main_group)
+
+    def _refresh_main_group(self):
+        print(f"🔄 Refreshing main group before scheduled message...")
+        try:
+            # Reload page to reset WhatsApp's DOM - ensures full message load
+            messages = self.scrape_main_group(reload=True)
+            if messages is None:
+                print("⚠️  Failed to get main group messages - using existing data")
+                return
+
+            # Analysis runs on the worker (serialised with the polling loop's hand-offs); wait for it
+            seq = self.analysis_worker.submit(messages, adjust_published=True)
+            if self.analysis_worker.wait_for(seq, self.config.ANALYSIS_WAIT_SECONDS):
+                print(f"✅ Refreshed: {len(self.db.get_participants())} players")
+            else:
+                print(f"⚠️  Analysis still running after {self.config.ANALYSIS_WAIT_SECONDS}s - using current data")
+            if not self.analysis_worker.on_worker_thread():
+                self._flush_admin_outbox()
         except Exception as e:
             print(f"⚠️  Error refreshing main group: {e} - using existing data")
 
@@ -3357,12 +7700,9 @@ class SwindleBot:
         """Generate Saturday 5pm tee sheet and publish it (locks in groups/times) - playing only, no reserves"""
         print("⏰ Generating Saturday tee sheet...")
         self.refresh_main_group()
-        participants = self.db.get_participants(status_filter='playing')
-        partner_prefs = self.db.get_partner_preferences()
-        avoidances = self.db.get_avoidances()
-        available_times = self.db.generate_tee_times()
+        state = self.db.state()
         tee_sheet, groups, assigned_times = self.tee_generator.generate(
-            participants, partner_prefs, avoidances, available_times
+            state.players('playing'), state.partner_preferences(), state.avoidances(), list(state.tee_times)
         )
         # Save as published sheet - future changes will only minimally adjust
         self.db.save_published_tee_sheet(groups, assigned_times, tee_sheet)
@@ -3390,6 +7730,7 @@ class SwindleBot:
         schedule.every().saturday.at("10:00").do(self.send_daily_update)
         schedule.every().saturday.at("17:00").do(self.generate_saturday_tee_sheet)
         schedule.every().monday.at("00:01").do(self.clear_weekly_data)
+        schedule.every().monday.at("00:30").do(self.weekly_maintenance)
         schedule.every().monday.at("10:00").do(self.send_weekly_opening)
         print("✅ Scheduled jobs configured")
 
@@ -3454,6 +7795,16 @@ class SwindleBot:
                 if now.weekday() == 0 and now.hour == 0:
                     self.clear_weekly_data()
 
+                # === AI AVAILABILITY (circuit breaker) ===
+                self._check_ai_availability()
+                self._check_ai_budget()
+                # Checked less often once the weekly AI budget is running low
+                main_interval = self.config.MAIN_GROUP_CHECK_MINUTES * 60 * self.ledger.interval_factor(
+                    self.config.BUDGET_SLOW_FACTOR)
+
+                # Send notices raised by background analysis (promotions, auto-adjusted sheet)
+                self._flush_admin_outbox()
+
                 # === MONITOR MAIN GROUP ===
                 time_since_last_check = current_time - last_main_check
                 if time_since_last_check >= main_interval:
@@ -3468,79 +7819,19 @@ class SwindleBot:
                             should_monitor_main = False
 
                     if should_monitor_main:
+                        # Re-open an AI connection while the browser scrapes, if it's gone cold
+                        self.ai.pool.warm_if_idle()
                         print(f"\n📥 Fetching messages from {self.config.GROUP_NAME}...")
-                        messages = self.whatsapp.get_all_messages(self.config.GROUP_NAME, scroll_for_history=True)
+                        messages = self.scrape_main_group()
 
                         if messages is None:
                             consecutive_failures += 1
                             print(f"⚠️  Failed to get main group messages ({consecutive_failures}/{max_consecutive_failures})")
                         else:
                             consecutive_failures = 0
-
-                            # Check if messages have changed since last analysis (order-independent)
-                            last_snapshot = self.db.get_last_snapshot()
-                            if self._snapshot_matches(messages, last_snapshot):
-                                print(f"📋 No new messages since last check - skipping AI analysis (saving tokens)")
-                                last_main_check = current_time
-                                continue
-
-                            # Analyze with AI
-                            print(f"🤖 Analyzing {len(messages)} messages with AI...")
-                            result = self.ai.analyze_messages(messages)
-
-                            if result is not None and result.get('delta'):
-                                # Delta mode - apply changes on top of existing data
-                                self._apply_delta(result['delta'])
-                                self.db.save_snapshot(messages)
-                                last_main_check = current_time
-                                continue
-
-                            if result is None:
-                                # No result at all - keep existing data
-                                print("📋 Keeping existing player data")
-                                last_main_check = current_time
-                                continue
-
-                            # Only update database if AI returned valid results
-                            # Prevents wiping participants on API errors
-                            if result['players'] or result.get('total_count', 0) > 0:
-                                # Safety check: don't overwrite a larger list with a significantly smaller one
-                                existing = self.db.get_participants()
-                                new_count = len(result['players'])
-                                existing_count = len(existing) if existing else 0
-                                if existing_count > 0 and new_count < existing_count * 0.7:
-                                    print(f"⚠️  AI returned {new_count} players but DB has {existing_count} - keeping existing data (possible scrape issue)")
-                                else:
-                                    changes = self.db.update_participants(result['players'])
-                                    self.db.save_snapshot(messages)
-                                    # Save any AI-detected MP pairings as weekly constraints
-                                    if result.get('pairings'):
-                                        self.db.save_weekly_pairings(result['pairings'])
-                                    # Notify admin group if reserves were promoted
-                                    if changes.get('promoted'):
-                                        promoted_names = ', '.join(changes['promoted'])
-                                        self.send_to_admin_group(f"📢 Reserve promoted to playing: {promoted_names}")
-                                        print(f"   📢 Promoted from reserves: {changes['promoted']}")
-                            else:
-                                existing = self.db.get_participants()
-                                if existing:
-                                    print(f"⚠️  AI returned 0 players but DB has {len(existing)} - keeping existing data")
-                                else:
-                                    self.db.save_snapshot(messages)
-
-                            # Log results
-                            print(f"✅ Analysis complete:")
-                            print(f"   Players: {result['total_count']}")
-                            print(f"   Summary: {result['summary']}")
-                            if result.get('changes'):
-                                print(f"   Changes: {', '.join(result['changes'])}")
-
-                            # Change notifications disabled per user request
-                            # If you want to re-enable, uncomment the lines below:
-                            # if result.get('changes') and len(result['changes']) > 0:
-                            #     change_msg = f"🔔 UPDATE\n\n{result['summary']}\n\nChanges:\n"
-                            #     change_msg += '\n'.join(f"• {c}" for c in result['changes'])
-                            #     self.send_to_me(change_msg)
+                            # Hand off to the analysis worker and go straight back to polling
+                            seq = self.analysis_worker.submit(messages)
+                            print(f"📨 Main group transcript handed to analysis worker (#{seq})")
 
                     last_main_check = current_time
 
@@ -3564,6 +7855,7 @@ class SwindleBot:
                     else:
                         print(f"   Found {len(new_messages)} new message(s)")
 
+                        commands = []
                         for msg in new_messages:
                             sender = msg['sender']
                             text = msg['text']
@@ -3579,13 +7871,17 @@ class SwindleBot:
 
                             if is_admin:
                                 print(f"✅ New admin message from: {sender}")
-                                self.handle_admin_command(text, sender)
-                                # Activate burst mode
-                                burst_mode_until = time.time() + burst_duration
-                                print(f"⚡ Burst mode activated - checking every {burst_interval}s for {burst_duration}s")
+                                commands.append(msg)
                             else:
                                 print(f"⚠️  Message from non-admin: {sender}")
 
+                        if commands:
+                            # Everything from this poll is parsed and applied together, with one reply
+                            self.handle_admin_messages(commands)
+                            # Activate burst mode
+                            burst_mode_until = time.time() + burst_duration
+                            print(f"⚡ Burst mode activated - checking every {burst_interval}s for {burst_duration}s")
+
                     # Always update the anchor to the latest 3 messages
                     self._admin_anchor = [(m['sender'], m['text']) for m in admin_messages[-3:]]
 
@@ -3628,9 +7924,12 @@ class SwindleBot:
             return
 
         self.schedule_jobs()
+        self.db.optimize()
 
         scheduler_thread = threading.Thread(target=self.run_scheduler, daemon=True)
         scheduler_thread.start()
+        self.analysis_worker.start()
+        self.ai.pool.warm_if_idle()
 
         print("\n✅ Bot is running!")
         print(f"📱 Monitoring: {self.config.GROUP_NAME}")
@@ -3644,6 +7943,7 @@ class SwindleBot:
             self.monitor_messages()
         finally:
             self.whatsapp.close()
+            self.db.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Anthropic API, for tests that want real HTTP (connection pooling, latency hooks).
+
+Serves POST /v1/messages (answers with a tool_use block for whatever tool the request forces, using
+FakeAnthropicServer.answers[tool_name]) and GET /v1/models. HTTP/1.1 keep-alive, so connection reuse
+can be counted. Point a client at it with get_client_pool(key, base_url=server.url).
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeAnthropicServer:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.answers = {}  # tool name -> tool input to reply with
+        self.connections = 0
+        self.requests = []  # (method, path, body)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append(('GET', self.path, None))
+                if self.path.startswith('/v1/models'):
+                    self._reply({'data': [{'type': 'model', 'id': 'claude-fake', 'display_name': 'Fake',
+                                           'created_at': '2026-01-01T00:00:00Z'}],
+                                 'has_more': False, 'first_id': 'claude-fake', 'last_id': 'claude-fake'})
+                else:
+                    self._reply({'type': 'error', 'error': {'type': 'not_found_error', 'message': 'not found'}}, 404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.requests.append(('POST', self.path, body))
+                if server.delay:
+                    time.sleep(server.delay)
+                tool = (body.get('tool_choice') or {}).get('name', 'reply')
+                self._reply({'id': 'msg_fake', 'type': 'message', 'role': 'assistant', 'model': body.get('model'),
+                             'content': [{'type': 'tool_use', 'id': 'toolu_fake', 'name': tool,
+                                          'input': server.answers.get(tool, {})}],
+                             'stop_reason': 'tool_use', 'stop_sequence': None,
+                             'usage': {'input_tokens': 900, 'output_tokens': 150}})
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
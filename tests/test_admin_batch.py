@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Test batched admin command parsing and the shared DB transaction - no API needed"""
+
+import sys, os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AdminCommandHandler, Database
+
+print("="*70)
+print(" TESTING BATCHED ADMIN COMMANDS")
+print("="*70)
+
+names = ['Dave Walker', 'Wes', 'Alex', 'John Balls']
+
+
+class FakeClient:
+    """Answers a batch parse: message 1 is two commands, message 2 is one"""
+    def __init__(self):
+        self.messages = self
+        self.calls = []
+
+    def create(self, timeout=None, **kwargs):
+        self.calls.append(kwargs)
+        answer = {'commands': [
+            {'message': 1, 'command': 'add_player', 'confidence': 'high', 'params': {'player_name': 'Tom'}},
+            {'message': 1, 'command': 'add_player', 'confidence': 'high', 'params': {'player_name': 'Sam'}},
+            {'message': 2, 'command': 'set_time_preference', 'confidence': 'medium',
+             'params': {'player_name': 'Wes', 'time_preference': 'early'}},
+        ]}
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name='record_commands', input=answer)],
+                               usage=SimpleNamespace(input_tokens=600, output_tokens=80))
+
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+print("\n📋 Splitting multi-command messages")
+split = AdminCommandHandler.split_clauses
+check("One command stays whole", split("Add guest Tom for Alex") == ["Add guest Tom for Alex"])
+check("Lines split", split("Remove Wes\nAdd Tom Jones") == ["Remove Wes", "Add Tom Jones"])
+check("Sentences and semicolons split", split("Remove Wes. Add Tom Jones; show list") ==
+      ["Remove Wes", "Add Tom Jones", "show list"])
+check("\"then\" splits", split("Remove Wes and then show list") == ["Remove Wes", "show list"])
+check("Times are not sentences", split("Add tee time 8.40") == ["Add tee time 8.40"])
+
+print("\n📋 Batch parsing")
+handler = AdminCommandHandler(None)
+client = FakeClient()
+handler.gateway.client = client
+messages = ["Remove Wes\nShow list", "Add Tom and Sam", "Wes wants an early one this week", "Show tee sheet"]
+parsed = handler.parse_batch(messages, "Admin", names)
+check("One result list per message", len(parsed) == 4)
+check("Locally parsed message keeps every clause",
+      [c['command'] for c in parsed[0]] == ['remove_player', 'show_list'])
+check("Unmatched messages share one AI call", len(client.calls) == 1
+      and '"Remove Wes' not in client.calls[0]['messages'][0]['content'])
+check("Multi-intent message returns each command", [c['params'] for c in parsed[1]] ==
+      [{'player_name': 'Tom'}, {'player_name': 'Sam'}] and all('message' not in c for c in parsed[1]))
+check("Commands go back to the right message", parsed[2][0]['command'] == 'set_time_preference'
+      and parsed[3][0]['command'] == 'show_tee_sheet')
+again = handler.parse_batch(["add tom and sam!"], "Admin", names)
+check("Repeat message served from cache", again[0] == parsed[1] and len(client.calls) == 1)
+check("Stats count messages", handler.parse_stats == {'local': 2, 'cached': 1, 'ai': 2})
+
+print("\n📋 Shared transaction")
+db_path = "data/test_admin_batch.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+with db.transaction():
+    db.add_player_manually("Tom Jones")
+    db.add_player_manually("Sam Hill")
+    with db.transaction():
+        db.add_player_manually("Alex")
+check("Changes commit together (nested block joins)",
+      sorted(p['name'] for p in db.get_participants()) == ['Alex', 'Sam Hill', 'Tom Jones'])
+try:
+    with db.transaction():
+        db.add_player_manually("Wes")
+        db.remove_player_manually("Alex")
+        raise RuntimeError("command failed")
+except RuntimeError:
+    pass
+check("A failure rolls back the whole batch",
+      sorted(p['name'] for p in db.get_participants()) == ['Alex', 'Sam Hill', 'Tom Jones'])
+db.add_player_manually("Wes")
+check("Connections work normally afterwards", 'Wes' in [p['name'] for p in db.get_participants()])
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Test the rule-based admin command parser, its AI fallback and the parse cache - no API needed"""
+
+import sys, os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AdminCommandHandler, LocalCommandParser, edit_distance
+
+print("="*70)
+print(" TESTING ADMIN COMMAND FAST PATH")
+print("="*70)
+
+names = ['Dave Walker', 'Dave Smith', 'Wes', 'Alex', 'John Balls', 'Lewis.S', 'Leon (Thameside)', 'Maice Browne']
+
+# (message, expected command, expected params) - expected None = must go to the AI
+cases = [
+    ("Show list", 'show_list', {}),
+    ("show the list!", 'show_list', {}),
+    ("Shwo list", 'show_list', {}),
+    ("Tee sheet", 'show_tee_sheet', {}),
+    ("Show constraints", 'show_constraints', {}),
+    ("show tee times", 'show_tee_times', {}),
+    ("AI stats", 'show_ai_stats', {}),
+    ("Shadow stats last 50", 'show_shadow_stats', {'runs': 50}),
+    ("Add Tom Jones", 'add_player', {'player_name': 'Tom Jones'}),
+    ("Add Dave", 'add_player', {'player_name': 'Dave'}),
+    ("Add Sett", 'add_player', {'player_name': 'Sett'}),           # unknown name kept as typed, not "Set"
+    ("Remvoe guest Tmie from Alex", 'remove_guest', {'guest_name': 'Tmie', 'host_name': 'Alex'}),
+    ("Remvoe Wes", 'remove_player', {'player_name': 'Wes'}),
+    ("remove leon.", 'remove_player', {'player_name': 'Leon (Thameside)'}),
+    ("Take Alex off the list", 'remove_player', {'player_name': 'Alex'}),
+    ("Add guest Tom for Alex", 'add_guest', {'guest_name': 'Tom', 'host_name': 'Alex'}),
+    ("Remove guest Tom from Alex", 'remove_guest', {'guest_name': 'Tom', 'host_name': 'Alex'}),
+    ("Remove Alex's preference", 'remove_partner_preference', {'player_name': 'Alex'}),
+    ("Remove Wes's time preference", 'remove_time_preference', {'player_name': 'Wes'}),
+    ("Don't pair Alex with Wes", 'set_avoidance', {'player_name': 'Alex', 'target_name': 'Wes'}),
+    ("Alex plays with John balls", 'set_partner_preference', {'player_name': 'Alex', 'target_name': 'John Balls'}),
+    ("Maice wants a late tee time", 'set_time_preference', {'player_name': 'Maice Browne', 'time_preference': 'late'}),
+    ("switch wes and lewis s", 'swap_players', {'player_name': 'Wes', 'target_name': 'Lewis.S'}),
+    ("Move Alex to group 3", 'move_player', {'player_name': 'Alex', 'group_number': 3}),
+    ("set tee times from 7.30 every 10 minutes, 12 slots", 'set_tee_times',
+     {'start_time': '07:30', 'interval_minutes': 10, 'num_slots': 12}),
+    ("Add tee time 8.40", 'add_tee_time', {'tee_time': '08:40'}),
+    ("Clear time preferences", 'clear_time_preferences', {}),
+    ("Randomise", 'randomize', {}),
+    ("Remove Bob", None, None),                      # not a current player
+    ("Swap Dave with Alex", None, None),             # two Daves - ambiguous
+    ("Add Dave and Tom please", None, None),         # two names in one slot
+    ("Remove the early preference for everyone", None, None),
+    ("Can you sort the groups so the new lads are together", None, None),
+]
+
+
+class FakeClient:
+    """Counts AI parses"""
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    def create(self, timeout=None, **kwargs):
+        self.calls += 1
+        answer = {'command': 'add_player', 'confidence': 'medium', 'params': {'player_name': 'Dave'}}
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name='record_command', input=answer)],
+                               usage=SimpleNamespace(input_tokens=400, output_tokens=30))
+
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+print("\n📋 Local rules")
+parser = LocalCommandParser()
+for message, command, params in cases:
+    result = parser.parse(message, names)
+    if command is None:
+        check(f"\"{message}\" -> AI", result is None)
+    else:
+        check(f"\"{message}\" -> {command} {params}",
+              result is not None and result['command'] == command and result['params'] == params)
+
+print("\n📋 Helpers")
+check("Adjacent swap costs one edit", edit_distance("remvoe", "remove") == 1)
+check("Unique first name resolves", LocalCommandParser.resolve_name("maice", names) == 'Maice Browne')
+check("Ambiguous first name does not", LocalCommandParser.resolve_name("dave", names) is None)
+
+print("\n📋 AI fallback + cache")
+handler = AdminCommandHandler(None)
+client = FakeClient()
+handler.gateway.client = client
+local = handler.parse_command("Show list", "Admin", names)
+calls_after_local = client.calls
+first = handler.parse_command("Can you pop Dave on for Sunday", "Admin", names)
+again = handler.parse_command("can you pop dave on for sunday!!", "Admin", names)
+check("Local parse makes no AI call", local['command'] == 'show_list' and calls_after_local == 0)
+check("Unmatched command goes to the AI", first['command'] == 'add_player' and client.calls == 1)
+check("Same command (different case/punctuation) served from cache", again == first and client.calls == 1)
+check("Hit rate reported", handler.parse_stats == {'local': 1, 'cached': 1, 'ai': 1}
+      and abs(handler.fast_path_rate() - 2 / 3) < 1e-9)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
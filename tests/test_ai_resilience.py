@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Test the circuit breaker and LLMGateway (retries with backoff, deadlines, breaker and counters) with fake API clients"""
+
+import sys, os, time, threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import anthropic
+from src.swindle_bot_v5_admin import CircuitBreaker, LLMGateway, AIUnavailableError
+
+print("="*70)
+print(" TESTING AI RESILIENCE")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+SDK = anthropic.Anthropic(api_key='test')
+httpx = sys.modules[type(anthropic.DEFAULT_CONNECTION_LIMITS).__module__.split('.')[0]]  # The httpx the SDK was built against
+
+
+def api_error(status: int):
+    """The SDK's own exception for an HTTP status (500 -> InternalServerError, 400 -> BadRequestError...)"""
+    request = httpx.Request('POST', 'https://api.anthropic.com/v1/messages')
+    response = httpx.Response(status, request=request)
+    return SDK._make_status_error(f"HTTP {status}", body=None, response=response)
+
+
+class FakeClient:
+    """Raises the queued errors in turn, then answers"""
+    def __init__(self, errors=()):
+        self.messages = self
+        self.errors = list(errors)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def create(self, timeout=None, **kwargs):
+        with self._lock:
+            self.calls.append(timeout)
+            error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise error
+        return SimpleNamespace(content=[], usage=SimpleNamespace(input_tokens=100, output_tokens=10))
+
+
+def gateway(client, breaker=None, **options):
+    return LLMGateway(client, breaker or CircuitBreaker(threshold=2, reset_seconds=0.05),
+                      **{'timeout': 5, 'max_retries': 2, 'backoff_base': 0.001, 'backoff_cap': 0.01, **options})
+
+
+print("\n📋 Circuit breaker")
+breaker = CircuitBreaker(threshold=2, reset_seconds=0.05)
+breaker.record_failure()
+check("Stays closed below the threshold", breaker.state == 'closed' and breaker.allow_request())
+breaker.record_failure()
+check("Opens at the threshold and refuses calls", breaker.state == 'open' and not breaker.allow_request()
+      and not breaker.is_available() and breaker.times_opened == 1)
+time.sleep(0.06)
+check("Cool-off over: available, still open until asked", breaker.is_available() and breaker.state == 'open')
+check("Half-open lets exactly one trial through", breaker.allow_request() and breaker.state == 'half_open'
+      and not breaker.allow_request() and not breaker.is_available())
+breaker.record_failure()
+check("A failed trial re-opens it", breaker.state == 'open' and breaker.times_opened == 2 and not breaker.allow_request())
+time.sleep(0.06)
+breaker.allow_request()
+breaker.record_success()
+check("A successful trial closes it", breaker.state == 'closed' and breaker.consecutive_failures == 0
+      and breaker.allow_request() and breaker.describe() == "🟢 closed")
+
+print("\n📋 Retries")
+client = FakeClient([api_error(529), anthropic.APITimeoutError(httpx.Request('POST', 'https://api.anthropic.com'))])
+lane = gateway(client)
+lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+check("Overloaded and timeout retried, then answered", len(client.calls) == 3 and lane.stats['retries'] == 2
+      and lane.stats['failures'] == 0 and lane.breaker.state == 'closed')
+check("Every attempt gets the per-call deadline", client.calls == [5, 5, 5])
+check("Latency and ledger recorded once", lane.latency_summary()['test']['count'] == 1 and lane.ledger.stats['calls'] == 1)
+
+client = FakeClient([api_error(500)] * 3)
+lane = gateway(client)
+try:
+    lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+    raised = None
+except anthropic.InternalServerError as e:
+    raised = e
+check("Gives up after max_retries and raises the last error", raised is not None and len(client.calls) == 3
+      and lane.stats['failures'] == 1 and lane.breaker.consecutive_failures == 1)
+
+client = FakeClient([api_error(400), api_error(500)])
+lane = gateway(client)
+try:
+    lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+except anthropic.BadRequestError:
+    pass
+check("A bad request isn't retried and doesn't count against the breaker",
+      len(client.calls) == 1 and lane.breaker.consecutive_failures == 0 and lane.stats['retries'] == 0)
+
+print("\n📋 Deadline")
+client = FakeClient([api_error(503)] * 3)
+lane = gateway(client, timeout=0.01, backoff_base=30, backoff_cap=30)
+started = time.time()
+try:
+    lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+except anthropic.APIStatusError:
+    pass
+check("No retry whose backoff would run past the deadline", len(client.calls) == 1 and time.time() - started < 1)
+check("Deadline passed to the client as its timeout", client.calls == [0.01])
+
+print("\n📋 Gateway and breaker")
+breaker = CircuitBreaker(threshold=2, reset_seconds=0.05)
+client = FakeClient([api_error(500)] * 6)
+lane = gateway(client, breaker, max_retries=0)
+for _ in range(2):
+    try:
+        lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+    except anthropic.InternalServerError:
+        pass
+try:
+    lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+    refused = False
+except AIUnavailableError:
+    refused = True
+check("Repeated failures open the breaker and calls are refused", breaker.state == 'open' and refused
+      and len(client.calls) == 2 and lane.stats['rejected'] == 1)
+
+time.sleep(0.06)
+client.errors = [api_error(400)]
+try:
+    lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+except anthropic.BadRequestError:
+    pass
+check("A 400 on the half-open trial doesn't close the breaker", breaker.state == 'half_open'
+      and breaker.consecutive_failures == 2)
+lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+check("...the next call is the trial, and its success closes it", breaker.state == 'closed'
+      and breaker.consecutive_failures == 0)
+
+print("\n📋 Counters from several threads")
+lane = gateway(FakeClient(), max_retries=0)
+
+
+def caller():
+    for _ in range(300):
+        lane.create('test', model='claude-fake', max_tokens=10, messages=[])
+
+
+threads = [threading.Thread(target=caller) for _ in range(8)]
+switch_interval = sys.getswitchinterval()
+sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+sys.setswitchinterval(switch_interval)
+check("No call lost from the counters", lane.stats['calls'] == 2400 and lane.ledger.stats['calls'] == 2400
+      and lane.latency_summary()['test']['count'] == LLMGateway.LATENCY_SAMPLES)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test the offline analysis benchmark harness (scoring, record/replay client, echo run) - no API needed"""
+
+import sys, os, json, tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.benchmark_analysis import (RecordedClient, ExpectedClient, score_result, run_variant,
+                                        VARIANTS, MANIFEST_PATH, ROOT)
+from src.swindle_bot_v5_admin import parse_recorded_transcript
+
+print("="*70)
+print(" TESTING ANALYSIS BENCHMARK HARNESS")
+print("="*70)
+
+with open(MANIFEST_PATH) as f:
+    week = json.load(f)['weeks'][0]
+with open(os.path.join(ROOT, week['transcript'])) as f:
+    messages = parse_recorded_transcript(f.read())
+expected = week['expected']
+
+
+def player(name, prefs=None):
+    return {'name': name, 'status': 'playing', 'guests': [], 'preferences': prefs}
+
+
+perfect = {'players': [player(n, expected['preferences'].get(n)) for n in expected['order'] + expected['also_playing']],
+           'pairings': expected['pairings'], 'total_count': 0}
+swapped = dict(perfect, players=[perfect['players'][1], perfect['players'][0]] + perfect['players'][2:])
+with_dropout = dict(perfect, players=perfect['players'] + [player('Blaine')])
+case_only = dict(perfect, players=[dict(p, name=p['name'].upper()) for p in perfect['players']])
+
+
+class FakeLive:
+    """Counts calls so the test can prove replay never touches the 'network'"""
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    def create(self, timeout=None, **kwargs):
+        self.calls += 1
+        answer = {'players': [player('Wes')], 'pairings': [], 'total_count': 1}
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name='record_signups', input=answer)],
+                               usage=SimpleNamespace(input_tokens=1200, output_tokens=40))
+
+
+recordings = os.path.join(tempfile.mkdtemp(), 'recordings.json')
+live = FakeLive()
+recorder = RecordedClient(recordings, live=live)
+recorded_result, recorded_metrics = run_variant(VARIANTS['sonnet'], messages, recorder)
+recorder.save()
+replayer = RecordedClient(recordings)
+replayed_result, replayed_metrics = run_variant(VARIANTS['sonnet'], messages, replayer)
+missing_result, missing_metrics = run_variant(VARIANTS['haiku'], messages, RecordedClient(recordings))
+
+echo_result, echo_metrics = run_variant(VARIANTS['sonnet'], messages, ExpectedClient(expected))
+_, raw_metrics = run_variant(VARIANTS['sonnet-raw'], messages, ExpectedClient(expected))
+
+tests = [
+    ("Labelled answer scores 100%", score_result(perfect, expected)['accuracy'] == 1.0),
+    ("Signup order swap is penalised", 0 < score_result(swapped, expected)['order'] < 1.0),
+    ("Listing a dropout is penalised", score_result(with_dropout, expected)['excluded'] < 1.0),
+    ("Names match case-insensitively", score_result(case_only, expected)['accuracy'] == 1.0),
+    ("Failed analysis scores 0%", score_result(None, expected)['accuracy'] == 0.0),
+    ("Live call recorded with its usage", live.calls == 1 and recorded_metrics['input_tokens'] == 1200),
+    ("Replay is identical and makes no live call",
+     replayed_result == recorded_result and live.calls == 1 and replayed_metrics['output_tokens'] == 40),
+    ("Unrecorded request reported, not sent", missing_result is None and 'no recorded response' in missing_metrics['error']),
+    ("Echo run returns the labelled list", score_result(echo_result, expected)['accuracy'] == 1.0),
+    ("Compaction shrinks the measured prompt", 0 < echo_metrics['input_tokens'] < raw_metrics['input_tokens']),
+]
+
+passed = 0
+failed = 0
+for description, ok in tests:
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
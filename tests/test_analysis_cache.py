@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Test the persistent content-addressed AI result cache (hits, misses, keys and hit-rate counters) with a fake API client"""
+
+import sys, os, sqlite3
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AIAnalyzer, Database, ANALYSIS_SCHEMA
+
+print("="*70)
+print(" TESTING ANALYSIS CACHE")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+class FakeClient:
+    """Answers every call with the same record_signups result and counts the calls"""
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    def create(self, timeout=None, **kwargs):
+        self.calls += 1
+        answer = {'players': [{'name': 'Wes', 'guests': []}], 'pairings': [], 'total_count': 1}
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name='record_signups', input=answer)],
+                               usage=SimpleNamespace(input_tokens=900, output_tokens=150))
+
+
+def analyzer(db):
+    ai = AIAnalyzer(None, db)
+    ai.gateway.client = FakeClient()
+    return ai
+
+
+def call(ai, user_prompt="MESSAGES:\n[08:05, 15/02/2026] Wes: Please", model=AIAnalyzer.ANALYSIS_MODEL,
+         system_prompt="system", schema=ANALYSIS_SCHEMA):
+    return ai._cached_call('analysis', model, 1000, system_prompt, user_prompt, 'record_signups', schema)
+
+
+db_path = "data/test_analysis_cache.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+
+print("\n📋 Hits and misses")
+ai = analyzer(db)
+first = call(ai)
+check("First call is a miss and goes to the API", ai.gateway.client.calls == 1
+      and ai.cache_stats == {'hits': 0, 'misses': 1} and ai.cache_hit_rate() == 0.0)
+check("...and its result is stored", db.get_analysis_cache_stats() == {'analysis': {'entries': 1, 'hits': 0}})
+again = call(ai)
+check("Same call again is a hit - no API call", ai.gateway.client.calls == 1 and again == first
+      and ai.cache_stats == {'hits': 1, 'misses': 1} and ai.cache_hit_rate() == 0.5)
+check("Hit counted per model tier and in the database",
+      ai.tier_stats[AIAnalyzer.ANALYSIS_MODEL]['cache_hits'] == 1 and ai.tier_stats[AIAnalyzer.ANALYSIS_MODEL]['calls'] == 1
+      and db.get_analysis_cache_stats()['analysis']['hits'] == 1)
+again['players'].append('changed')
+check("A hit hands out a fresh copy", call(ai)['players'] == [{'name': 'Wes', 'guests': []}])
+
+print("\n📋 Cache keys")
+ai = analyzer(db)
+call(ai, user_prompt="  MESSAGES:  \n\n[08:05, 15/02/2026]   Wes: Please   \n")
+check("Whitespace-only differences in the transcript share an entry", ai.gateway.client.calls == 0
+      and ai.cache_stats['hits'] == 1)
+call(ai, user_prompt="MESSAGES:\n[08:05, 15/02/2026] Wes: Please\n[08:10, 15/02/2026] Dave: Yes please")
+check("A new message is a miss", ai.gateway.client.calls == 1)
+call(ai, model=AIAnalyzer.FAST_MODEL)
+call(ai, system_prompt="candidate prompt")
+call(ai, schema={**ANALYSIS_SCHEMA, 'required': ['players']})
+check("Model, system prompt and schema are all part of the key", ai.gateway.client.calls == 4
+      and ai.cache_stats == {'hits': 1, 'misses': 4} and ai.cache_hit_rate() == 0.2)
+check("Keys are deterministic", AIAnalyzer._cache_key('m', 's', 'u', ANALYSIS_SCHEMA)
+      == AIAnalyzer._cache_key('m', 's', ' u ', ANALYSIS_SCHEMA) != AIAnalyzer._cache_key('m', 's', 'v', ANALYSIS_SCHEMA))
+
+print("\n📋 Persistence")
+db.close()
+db = Database(db_path)
+ai = analyzer(db)
+call(ai)
+check("Entries survive a restart", ai.gateway.client.calls == 0 and ai.cache_stats == {'hits': 1, 'misses': 0})
+conn = sqlite3.connect(db_path)
+conn.execute("UPDATE analysis_cache SET created_at = datetime('now', '-30 days'), last_hit_at = NULL WHERE model = ?",
+             (AIAnalyzer.FAST_MODEL,))
+conn.commit()
+conn.close()
+check("Entries not used for 14 days are pruned", db.prune_analysis_cache() == 1
+      and db.get_analysis_cache_stats()['analysis']['entries'] == 4)
+
+ai = analyzer(None)
+call(ai)
+call(ai)
+check("No database - no cache, every call goes to the API", ai.gateway.client.calls == 2
+      and ai.cache_stats == {'hits': 0, 'misses': 0} and ai.cache_hit_rate() == 0.0)
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
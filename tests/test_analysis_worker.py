@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Test the background analysis worker (superseding, joining, waiting) and the stale-result check
+on apply - with a fake AI, no browser or API needed"""
+
+import sys, os, threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AnalysisWorker, SwindleBot, AIAnalyzer, CircuitBreaker, Database
+
+print("="*70)
+print(" TESTING ANALYSIS WORKER")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def msg(sender, hhmm, text):
+    return {'sender': sender, 'text': text, 'is_outgoing': False, 'timestamp': f"[{hhmm}, 15/02/2026] {sender}: "}
+
+
+handled = []
+release = threading.Event()
+started = threading.Event()
+
+
+def handler(messages, adjust_published, seq):
+    handled.append((seq, len(messages), adjust_published))
+    started.set()
+    release.wait(5)
+    if messages and messages[-1]['text'] == 'boom':
+        raise RuntimeError("analysis failed")
+
+
+print("\n📋 Without a thread")
+worker = AnalysisWorker(handler)
+release.set()
+seq = worker.submit([msg("Wes", "08:05", "Please")])
+check("Runs inline and returns its sequence number", seq == 1 and handled == [(1, 1, False)]
+      and worker.stats['completed'] == 1 and worker.wait_for(1, 0))
+
+print("\n📋 Superseding")
+handled.clear()
+release.clear()
+started.clear()
+worker = AnalysisWorker(handler)
+worker.start()
+transcript = [msg("Rick", "08:00", "Now taking names for Sunday")]
+first = worker.submit(list(transcript))
+started.wait(5)
+second = worker.submit(transcript + [msg("Wes", "08:05", "Please")], adjust_published=True)
+third = worker.submit(transcript + [msg("Wes", "08:05", "Please"), msg("Dave", "08:10", "Yes please")])
+check("Sequence numbers keep increasing", (first, second, third) == (1, 2, 3))
+check("Waiting times out while the running job is busy", not worker.wait_for(first, 0.05)
+      and worker.describe().startswith("busy, #3 waiting"))
+release.set()
+check("Waiting on a superseded job returns once its replacement is done", worker.wait_for(second, 5))
+check("A waiting job is replaced by a newer transcript before it starts", [h[0] for h in handled] == [1, 3]
+      and worker.stats['superseded'] == 1 and worker.stats['completed'] == 2)
+check("...keeping the superseded job's published-sheet adjustment", handled[1] == (3, 3, True))
+
+print("\n📋 Joining")
+handled.clear()
+release.clear()
+started.clear()
+running = worker.submit(list(transcript))
+started.wait(5)
+check("Same transcript as the running job joins it", worker.submit(list(transcript)) == running
+      and worker.stats['joined'] == 1)
+check("...unless it also asks for a published-sheet adjustment the job won't make",
+      worker.submit(list(transcript), adjust_published=True) == running + 1)
+pending = running + 1
+check("Same transcript as the waiting job joins that", worker.submit(list(transcript)) == pending
+      and worker.stats['joined'] == 2 and worker.stats['superseded'] == 1)
+release.set()
+worker.wait_for(pending, 5)
+check("Each transcript analysed once", handled == [(running, 1, False), (pending, 1, True)])
+
+print("\n📋 Errors")
+handled.clear()
+failing = worker.submit(transcript + [msg("Wes", "08:05", "boom")])
+worker.wait_for(failing, 5)
+after = worker.submit(transcript + [msg("Wes", "08:05", "Please")])
+check("A failed analysis is counted and the worker keeps going", worker.wait_for(after, 5)
+      and worker.stats['errors'] == 1 and [h[0] for h in handled] == [failing, after])
+
+print("\n📋 Stale results")
+bot = SimpleNamespace(_applied_seq=0)
+claim = lambda seq: SwindleBot._claim_apply(bot, seq)
+check("Newer results are applied", claim(2) and bot._applied_seq == 2 and claim(2) and claim(5))
+check("An older result than one already applied is dropped", not claim(4) and bot._applied_seq == 5)
+check("Synchronous callers (no sequence number) always apply", claim(None) and bot._applied_seq == 5)
+
+db_path = "data/test_analysis_worker.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+calls = []
+answer = {'players': [{'name': 'Wes', 'guests': [], 'preferences': None}], 'pairings': [], 'total_count': 1,
+          'confidence': 'high'}
+bot = SwindleBot.__new__(SwindleBot)  # No browser - just the analysis path
+bot.db = db
+bot.config = SimpleNamespace(FULL_ANALYSIS_EVERY=6, INCREMENTAL_MAX_MESSAGES=40, LOCAL_CLASSIFIER=False, VOTE_SIGNUPS=False)
+bot.ai = AIAnalyzer(None, db)
+bot.ai._cached_call = lambda purpose, *args: calls.append(purpose) or answer
+bot.ai_breaker = CircuitBreaker()
+bot._queued_analysis = None
+bot._apply_lock = threading.Lock()
+bot._applied_seq = 7
+messages = transcript + [msg("Wes", "08:05", "Please")]
+bot.process_main_group_messages(messages, seq=6)
+check("An analysis that finishes after a newer one was applied writes nothing", calls == ['analysis']
+      and db.get_participants() == [] and db.get_last_snapshot() is None and bot._applied_seq == 7)
+bot.process_main_group_messages(messages, seq=8)
+check("The next one is applied", [p['name'] for p in db.get_participants()] == ['Wes']
+      and db.get_last_snapshot() == messages and bot._applied_seq == 8)
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
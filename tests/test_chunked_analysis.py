@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Test map-reduce analysis of long signup windows (chunking, event merge, chunk cache) - no API needed"""
+
+import sys, os, re, time, threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AIAnalyzer, Config, Database
+
+print("="*70)
+print(" TESTING CHUNKED ANALYSIS")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+LINE = re.compile(r'^(\d+)\. \[[^\]]*\] \[([^\]]+)\]: (.*)$')
+
+
+class FakeClient:
+    """Answers record_events by keyword-matching each numbered line, like a (very) literal model"""
+    def __init__(self, fail_on=None):
+        self.messages = self
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def create(self, timeout=None, **kwargs):
+        prompt = kwargs['messages'][0]['content']
+        tool = kwargs['tool_choice']['name']
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if self.fail_on and self.fail_on in prompt:
+            raise ValueError("record_events reply still invalid after repair")
+        events, pairings = [], []
+        for line in prompt.splitlines():
+            match = LINE.match(line)
+            if not match:
+                continue
+            number, sender, text = int(match.group(1)), match.group(2), match.group(3).lower()
+            mate = re.search(r"me and (.+?) for mp", text)
+            if "taking names" in text or "?" in text:
+                continue
+            if "out" in text:
+                events.append({'line': number, 'name': sender, 'action': 'out'})
+            elif "+1" in text:
+                events.append({'line': number, 'name': sender, 'action': 'guest_add', 'guest_name': None})
+            elif mate:
+                events += [{'line': number, 'name': sender, 'action': 'in'},
+                           {'line': number, 'name': mate.group(1).title(), 'action': 'in'}]
+                pairings.append([sender, mate.group(1).title()])
+            elif "please" in text:
+                events.append({'line': number, 'name': sender, 'action': 'in'})
+            if "early" in text:
+                events.append({'line': number, 'name': sender, 'action': 'preference', 'preferences': 'early'})
+        answer = {'events': events, 'pairings': pairings, 'confidence': 'high'}
+        if tool == 'record_signups':
+            answer = {'players': [], 'pairings': [], 'total_count': 0}
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name=tool, input=answer)],
+                               usage=SimpleNamespace(input_tokens=900, output_tokens=150))
+
+
+def msg(sender, minute, text):
+    return {'sender': sender, 'text': text, 'is_outgoing': False,
+            'timestamp': f"[{8 + minute // 60:02d}:{minute % 60:02d}, 15/02/2026] {sender}: "}
+
+
+def names(result):
+    return [p['name'] for p in result['players']]
+
+
+window = [msg("Rick", 0, "Now taking names for Sunday"),
+          msg("Wes", 1, "Please mate, early one if poss"),
+          msg("Alex", 2, "Me and John Balls for MP please"),
+          msg("Pete", 3, "Me and Mo for MP please"),
+          msg("Sam", 3, "Yes please")]
+window += [msg(f"Player {i:02d}", 3 + i, "Please") for i in range(1, 13)]
+window += [msg("Dave", 16, "Please, +1 as well"),
+           msg("Sam", 17, "Sorry I'm out this week"),
+           msg("Tom", 18, "What time is first tee?"),
+           msg("Pete", 19, "Can't make it now, I'm out")]
+window += [msg(f"Player {i:02d}", 7 + i, "Please") for i in range(13, 20)]
+window += [msg("Wes", 27, "Back to me - I'm out, sorry"),
+           msg("Sam", 28, "Sorted it, back in please")]
+
+Config.ANALYSIS_CHUNK_MESSAGES = 10
+Config.ANALYSIS_CHUNK_WORKERS = 4
+
+db_path = "data/test_chunked_analysis.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+ai = AIAnalyzer(None, db)
+client = FakeClient()
+ai.gateway.client = client
+
+print(f"\n📋 Map + reduce ({len(window)} messages, chunks of {Config.ANALYSIS_CHUNK_MESSAGES})")
+result = ai.analyze_messages(window)
+check("One call per chunk", client.calls == 3)
+check("Chunks analysed in parallel", client.max_running > 1)
+check("Player who dropped out in a later chunk is out", 'Wes' not in names(result))
+check("Out then back in: latest message wins", 'Sam' in names(result))
+check("Dropping out takes the MP pairing with them", 'Pete' not in names(result)
+      and result['pairings'] == [['Alex', 'John Balls']])
+check("Player signed up by a mate stays in", 'Mo' in names(result))
+dave = next(p for p in result['players'] if p['name'] == 'Dave')
+check("Guest from a middle chunk kept", dave['guests'] == ['Dave-Guest'])
+check("Signups from every chunk, in signup order",
+      names(result) == ['Alex', 'John Balls', 'Sam'] + [f"Player {i:02d}" for i in range(1, 13)] + ['Dave']
+      + [f"Player {i:02d}" for i in range(13, 20)] + ['Mo'])
+check("Total counts guests", result['total_count'] == len(result['players']) + 1)
+
+print("\n📋 Chunk cache")
+client.calls = 0
+grown = window + [msg("Kev", 29, "Please")]
+result = ai.analyze_messages(grown)
+check("Only the newest chunk is re-analysed", client.calls == 1)
+check("New signup picked up", names(result)[-2:] == ['Kev', 'Mo'])
+
+print("\n📋 Failures and short windows")
+ai_failing = AIAnalyzer(None)
+ai_failing.gateway.client = FakeClient(fail_on="PART 2")
+check("Any failed chunk fails the whole analysis", ai_failing.analyze_messages(window) is None)
+ranks = ai.reduce_chunks([{'events': [], 'pairings': [], 'confidence': 'high'},
+                          {'events': [], 'pairings': [], 'confidence': 'medium'}])
+check("Confidence is the lowest across chunks", ranks['confidence'] == 'medium')
+Config.ANALYSIS_CHUNK_MESSAGES = 500
+Config.AI_CASCADE = False
+single = FakeClient()
+ai_single = AIAnalyzer(None)
+ai_single.gateway.client = single
+ai_single.analyze_messages(window)
+check("Windows under the chunk size use one full analysis call", single.calls == 1)
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
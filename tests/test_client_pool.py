@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Test the shared Anthropic client pool (connection reuse, pre-warm, latency histograms) against a local fake server"""
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import (LatencyHistogram, get_client_pool, AIAnalyzer,
+                                      AdminCommandHandler)
+from tests.fake_anthropic_server import FakeAnthropicServer
+
+print("="*70)
+print(" TESTING CLIENT POOL")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+print("\n📋 Latency histogram")
+hist = LatencyHistogram()
+for seconds in [0.05] * 90 + [3.0] * 9 + [70.0]:
+    hist.add(seconds)
+summary = hist.summary()
+check("Quantiles from buckets", summary['p50'] == 0.1 and summary['p95'] == 4.0 and summary['max'] == 70.0)
+check("Count and mean", summary['count'] == 100 and abs(summary['mean'] - (90 * 0.05 + 27 + 70) / 100) < 1e-9)
+check("Empty histogram", LatencyHistogram().summary()['p95'] == 0.0)
+
+with FakeAnthropicServer(delay=0.05) as server:
+    print("\n📋 Pool against the fake server")
+    server.answers['record_signups'] = {'players': [{'name': 'Wes', 'guests': []}], 'pairings': [], 'total_count': 1}
+    pool = get_client_pool('test-key', server.url)
+    check("One shared pool per key and URL", get_client_pool('test-key', server.url) is pool
+          and get_client_pool('other-key', server.url) is not pool)
+
+    pool.prewarm_idle_seconds = 60
+    pool.warm_if_idle(background=False)
+    check("Pre-warm opens a connection", pool.stats['warmups'] == 1 and server.connections == 1)
+    pool.warm_if_idle(background=False)
+    check("No pre-warm while the pool is in use", pool.stats['warmups'] == 1)
+
+    for _ in range(3):
+        pool.client.messages.create(model='claude-fake-model', max_tokens=10, messages=[{'role': 'user', 'content': 'hi'}],
+                                    tools=[{'name': 'record_signups', 'input_schema': {'type': 'object'}}],
+                                    tool_choice={'type': 'tool', 'name': 'record_signups'})
+    check("Calls reuse the warmed connection", server.connections == 1)
+
+    latency = pool.latency_summary()
+    messages = latency.get(('endpoint', '/v1/messages'))
+    check("Per-endpoint histograms", messages and messages['total']['count'] == 3
+          and ('endpoint', '/v1/models') in latency)
+    model = latency.get(('model', 'claude-fake-model'))
+    check("Per-model histograms", model and model['ttfb']['count'] == 3)
+    check("First byte within total", messages['ttfb']['max'] <= messages['total']['max'] and messages['ttfb']['max'] >= 0.05)
+
+    print("\n📋 AI callers share the pool")
+    os.environ['ANTHROPIC_BASE_URL'] = server.url  # get_client_pool(key) with no URL -> SDK reads this
+    ai = AIAnalyzer('fake-server-key')
+    handler = AdminCommandHandler('fake-server-key', None)
+    check("Analyzer and command handler share one client", ai.client is handler.client and ai.pool.client is ai.client)
+
+    before = server.connections
+    reply = ai.gateway.create('record_signups', model=ai.ANALYSIS_MODEL, max_tokens=100, system="system",
+                              tools=[{'name': 'record_signups', 'input_schema': {'type': 'object'}}],
+                              tool_choice={'type': 'tool', 'name': 'record_signups'},
+                              messages=[{'role': 'user', 'content': 'MESSAGES: ...'}])
+    check("Analyzer's gateway calls go over HTTP", reply.content[0].input['players'][0]['name'] == 'Wes')
+    check("Analyzer call recorded under its model",
+          ('model', ai.ANALYSIS_MODEL) in ai.pool.latency_summary() and server.connections == before + 1)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
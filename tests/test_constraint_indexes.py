@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Test the constraint and participant indexes (EXPLAIN QUERY PLAN of the real queries), archiving and ANALYZE"""
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database
+
+print("="*70)
+print(" TESTING CONSTRAINT INDEXES")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def plans(db, table, call):
+    """Run call() and return the query plan of every statement it ran on `table`, other than inserts.
+    Starts from an empty state cache, so reads go to the database rather than memory."""
+    db.state_cache.invalidate()
+    conn = db._connect()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    result = []
+    for sql in statements:
+        if table in sql and not sql.lstrip().startswith('INSERT'):
+            result.append(' | '.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")))
+    conn.close()
+    return result
+
+
+def indexed(plan_list, table, index):
+    """Every statement found its rows in `table` through the index, never a full scan"""
+    return bool(plan_list) and all(f"{table} USING INDEX {index}" in plan or f"{table} USING COVERING INDEX {index}" in plan
+                                   for plan in plan_list)
+
+
+db_path = "data/test_constraint_indexes.db"
+for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(db_path + suffix):
+        os.remove(db_path + suffix)
+db = Database(db_path)
+
+# A season's worth of churn: most constraints added and removed again, a few still active
+for week in range(30):
+    for i in range(8):
+        db.add_constraint('avoid', f"Player {i}", f"Player {week % 8 + 10}")
+        db.remove_constraint('avoid', f"Player {i}", f"Player {week % 8 + 10}")
+for i in range(6):
+    db.add_constraint('partner_preference', f"Player {i}", f"Player {i + 20}")
+db.add_constraint('avoid', 'Wes', 'Dave')
+db.save_weekly_pairings([['Rick', 'Bob']])
+for i in range(30):
+    db.add_player_manually(f"Player {i}")
+db.optimize()
+
+print("\n📋 Constraint queries use the partial indexes")
+check("show_constraints list, already sorted by the index",
+      indexed(plans(db, 'constraints', db.get_constraints), 'constraints', 'idx_constraints_type')
+      and 'TEMP B-TREE' not in plans(db, 'constraints', db.get_constraints)[0])
+check("One player's constraints",
+      indexed(plans(db, 'constraints', lambda: db.get_constraints('Wes')), 'constraints', 'idx_constraints_player'))
+check("Add checks for a duplicate",
+      indexed(plans(db, 'constraints', lambda: db.add_constraint('avoid', 'Wes', 'Alex')), 'constraints', 'idx_constraints_'))
+check("Remove",
+      indexed(plans(db, 'constraints', lambda: db.remove_constraint('avoid', 'Wes', 'Alex')), 'constraints', 'idx_constraints_'))
+check("Partner preferences, avoidances and pairings for the tee sheet",
+      all(indexed(plans(db, 'constraints', call), 'constraints', 'idx_constraints_type')
+          for call in (db.get_partner_preferences, db.get_avoidances, db.get_weekly_pairings)))
+check("Known names", indexed(plans(db, 'constraints', db.get_known_names), 'constraints', 'idx_constraints_'))
+check("Answers match", db.get_avoidances() == {'Wes': ['Dave']}
+      and db.get_partner_preferences()['Rick'] == ['Bob'])
+
+print("\n📋 Participant lists")
+check("Playing/reserve lists by status in signup order",
+      indexed(plans(db, 'participants', lambda: db.get_participants('reserve')), 'p', 'idx_participants_status'))
+check("The state cache load joins guests on the host index",
+      indexed(plans(db, 'guests', db.get_participants), 'g', 'idx_guests_host'))
+
+print("\n📋 Archiving")
+before = db.get_constraints()
+archived = db.archive_inactive_constraints()
+conn = db._connect()
+left = conn.execute("SELECT COUNT(*) FROM constraints WHERE active = 0").fetchone()[0]
+kept = conn.execute("SELECT COUNT(*) FROM constraints_archive").fetchone()[0]
+conn.close()
+check("Removed constraints moved to the archive", archived == 241 and left == 0 and kept == 241)
+check("Active constraints untouched", db.get_constraints() == before)
+check("Nothing left to archive the next time", db.archive_inactive_constraints() == 0)
+
+print("\n📋 Planner statistics")
+conn = db._connect()
+stats = dict(conn.execute("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = 'constraints'").fetchall())
+conn.close()
+check("ANALYZE gathered index statistics", 'idx_constraints_type' in stats and 'idx_constraints_player' in stats)
+check("Partial indexes hold only the active rows", stats['idx_constraints_type'].split()[0] == '8')
+conn = db._connect()
+statements = []
+conn.set_trace_callback(statements.append)
+db.optimize()
+conn.set_trace_callback(None)
+conn.close()
+check("Later runs use PRAGMA optimize", 'PRAGMA optimize' in statements and 'ANALYZE' not in statements)
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
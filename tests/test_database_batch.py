@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Test Database.batch() (one transaction, one status recalculation, combined promotions) and its callers"""
+
+import sys, os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database, SwindleBot, AIAnalyzer, Config
+
+print("="*70)
+print(" TESTING DATABASE BATCH")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+class CountingDatabase(Database):
+    """Counts the status recalculations that actually run"""
+    def __init__(self, db_path):
+        self.recalcs = 0
+        super().__init__(db_path)
+
+    def recalculate_statuses(self):
+        if not self._in_batch():
+            self.recalcs += 1
+        return super().recalculate_statuses()
+
+
+def statuses(db):
+    return {p['name']: p['status'] for p in db.get_participants()}
+
+
+db_path = "data/test_database_batch.db"
+for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(db_path + suffix):
+        os.remove(db_path + suffix)
+db = CountingDatabase(db_path)
+db.set_tee_time_settings('08:00', 10, 2)  # 8 spots
+for i in range(7):
+    db.add_player_manually(f"Player {i}")
+
+print("\n📋 One recalculation")
+db.recalcs = 0
+with db.batch() as outcome:
+    added = [db.add_player_manually(name) for name in ("Wes", "Dave", "Alex")]
+    removed = db.remove_player_manually("Player 0")
+    guest = db.add_guest_manually("Player 1", "Tom")
+    with db.batch() as inner:
+        db.add_player_manually("Sam")
+    check("Statuses not settled inside the batch", added == ['added'] * 3 and removed['promoted'] == []
+          and guest['promoted'] == guest['demoted'] == [] and inner is outcome)
+    check("Nothing recalculated yet", db.recalcs == 0 and outcome == {'promoted': [], 'demoted': []})
+check("Recalculated once at the end", db.recalcs == 1)
+check("Combined result", sorted(outcome['demoted']) == ['Alex', 'Dave', 'Sam'] and outcome['promoted'] == [])
+check("Final statuses as if applied one by one", statuses(db) == {
+    **{f"Player {i}": 'playing' for i in range(1, 7)}, 'Wes': 'playing', 'Dave': 'reserve',
+    'Alex': 'reserve', 'Sam': 'reserve'})
+
+print("\n📋 Promotions")
+with db.batch() as outcome:
+    db.remove_player_manually("Player 1")  # Frees 2 spots (player and guest)
+    db.remove_player_manually("Player 2")
+check("Freed spots promote reserves once, in signup order", outcome == {'promoted': ['Dave', 'Alex', 'Sam'], 'demoted': []})
+
+print("\n📋 Failure")
+before = statuses(db)
+recalcs = db.recalcs
+try:
+    with db.batch():
+        db.add_player_manually("Ken")
+        db.remove_player_manually("Wes")
+        raise RuntimeError("command failed")
+except RuntimeError:
+    pass
+check("Rolled back, nothing recalculated", statuses(db) == before and db.recalcs == recalcs)
+check("Calls outside a batch recalculate again", db.add_player_manually("Ken") == 'reserve' and db.recalcs == recalcs + 1)
+
+print("\n📋 Deltas")
+bot = SimpleNamespace(db=db, config=Config, ai=AIAnalyzer(None, db))
+patch = AIAnalyzer.empty_patch()
+patch['add'] = [{'name': f"New {i}", 'guests': [], 'preferences': None} for i in range(5)]
+patch['remove'] = ['Player 3', 'Player 4', 'Player 5', 'Player 6']
+patch['guest_add'] = [{'host': 'Wes', 'guest_name': 'Wes-Guest'}]
+db.recalcs = 0
+outcome = SwindleBot._apply_delta(bot, patch, manual=False)
+check("Ten changes, one recalculation", db.recalcs == 1)
+check("Delta returns the combined changes", outcome['promoted'] == ['Ken']
+      and outcome['demoted'] == ['New 2', 'New 3', 'New 4'])
+
+print("\n📋 Admin command bursts")
+sent = []
+bot = SimpleNamespace(db=db, _admin_batch=None, send_to_admin_group=sent.append, VIEW_COMMANDS=SwindleBot.VIEW_COMMANDS,
+                      OVER_BUDGET_REPLY='', AI_UNAVAILABLE_REPLY='', auto_adjust_published_sheet=lambda: None,
+                      generate_participant_list=lambda: "LIST")
+bot._resolve_command_names = lambda command: command
+bot._in_admin_batch = lambda: SwindleBot._in_admin_batch(bot)
+bot.send_to_admin_group = lambda message: SwindleBot.send_to_admin_group(bot, message) if bot._in_admin_batch() \
+    else sent.append(message)
+bot._with_participant_list = lambda message: SwindleBot._with_participant_list(bot, message)
+bot.execute_admin_command = lambda command: SwindleBot.execute_admin_command(bot, command)
+db.recalcs = 0
+SwindleBot.execute_admin_batch(bot, [
+    {'command': 'remove_player', 'params': {'player_name': 'Dave'}},
+    {'command': 'remove_player', 'params': {'player_name': 'Alex'}},
+    {'command': 'add_player', 'params': {'player_name': 'Rick'}},
+])
+check("Burst recalculated once", db.recalcs == 1)
+check("One reply with the combined promotions", len(sent) == 1 and 'Added Rick' in sent[0]
+      and 'promoted to playing: New 2, New 3' in sent[0] and 'On reserves (no space): Rick' in sent[0])
+
+sent.clear()
+before = [p['name'] for p in db.get_participants()]
+SwindleBot.execute_admin_batch(bot, [
+    {'command': 'add_player', 'params': {'player_name': 'Lee'}},
+    {'command': 'remove_player', 'params': {'player_name': 'Nobody'}},  # Handler replies "❌ Player 'Nobody' not found"
+])
+check("A handler's ❌ reply rolls back the whole burst", [p['name'] for p in db.get_participants()] == before)
+check("...and the one reply says nothing changed and which command failed", len(sent) == 1
+      and 'nothing was changed' in sent[0] and "remove_player: Player 'Nobody' not found" in sent[0]
+      and 'Added Lee' not in sent[0])
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Test Database connection handling (per-thread WAL connections, handles, transactions, concurrent writers)"""
+
+import sys, os, threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database
+
+print("="*70)
+print(" TESTING DATABASE CONNECTIONS")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+db_path = "data/test_database_connections.db"
+for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(db_path + suffix):
+        os.remove(db_path + suffix)
+with open(db_path + '-wal', 'wb') as f:
+    f.write(b'left over from a deleted database')
+db = Database(db_path)
+
+print("\n📋 Connections")
+check("Stale WAL of a deleted database discarded", db.get_participants() == [])
+first, second = db._connect(), db._connect()
+check("One connection per thread, kept between calls", first._shared is second._shared)
+check("WAL mode, synchronous=NORMAL, busy timeout",
+      first.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+      and first.execute("PRAGMA synchronous").fetchone()[0] == 1
+      and first.execute("PRAGMA busy_timeout").fetchone()[0] == 10000)
+first.close()
+second.close()
+others = []
+worker = threading.Thread(target=lambda: others.append(db._connect()._shared))
+worker.start()
+worker.join()
+check("Other threads get their own", others[0] is not first._shared)
+
+print("\n📋 Handles")
+outer = db._connect()
+outer.execute("INSERT INTO participants (name, signup_order) VALUES ('Wes', 1)")
+db.get_participants()  # Inner call opens and closes its own handle
+check("Inner call's close keeps the outer caller's pending write", outer.in_transaction)
+del outer
+check("Dropping a handle rolls back what its caller left uncommitted",
+      db.get_participants() == [] and not db._connect()._shared.conn.in_transaction)
+db.add_player_manually("Wes")
+check("Normal calls commit", [p['name'] for p in db.get_participants()] == ['Wes'])
+
+print("\n📋 Transactions")
+with db.transaction() as conn:
+    db.add_player_manually("Dave")
+    conn.execute("UPDATE participants SET preferences = 'early' WHERE name = 'Dave'")
+    with db.transaction():
+        db.add_player_manually("Alex")
+check("Block commits together and yields the connection",
+      {p['name']: p['preferences'] for p in db.get_participants()} == {'Wes': None, 'Dave': 'early', 'Alex': None})
+try:
+    with db.transaction():
+        db.remove_player_manually("Dave")
+        raise RuntimeError("command failed")
+except RuntimeError:
+    pass
+check("Failure rolls back", len(db.get_participants()) == 3)
+
+print("\n📋 Concurrent writers")
+errors = []
+
+
+def writer(t):
+    try:
+        for i in range(25):
+            db.add_player_manually(f"T{t} P{i}")
+            with db.transaction():
+                db.set_player_preferences(f"T{t} P{i}", f"slot {i}")
+    except Exception as e:
+        errors.append(e)
+
+
+threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+players = db.get_participants()
+check("No lock errors, every write landed", not errors and len(players) == 103
+      and all(p['preferences'] for p in players if p['name'].startswith('T')))
+
+db.close()
+check("Reconnects after close()", len(db.get_participants()) == 103)
+db.close()
+os.remove(db_path)
+check("Closing checkpoints and removes the WAL", not os.path.exists(db_path + '-wal'))
+
+deleted = Database(db_path)
+deleted.add_player_manually("Wes")
+os.remove(db_path)  # While its connection is still open
+deleted.close()
+check("A database deleted while open leaves no WAL files behind",
+      not os.path.exists(db_path + '-wal') and not os.path.exists(db_path + '-shm'))
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
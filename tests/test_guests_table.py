@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Test the guests table (migration from the old JSON column, guest commands, capacity counts, index use)"""
+
+import sys, os, sqlite3
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database
+
+print("="*70)
+print(" TESTING GUESTS TABLE")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def plan(db, sql, params=()):
+    """EXPLAIN QUERY PLAN details, joined into one string"""
+    conn = db._connect()
+    try:
+        return ' | '.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    finally:
+        conn.close()
+
+
+db_path = "data/test_guests_table.db"
+for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(db_path + suffix):
+        os.remove(db_path + suffix)
+
+# A database from before the guests table: guests as JSON in participants.guests
+old = sqlite3.connect(db_path)
+old.execute("""
+    CREATE TABLE participants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        guests TEXT,
+        preferences TEXT,
+        signup_order INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'playing',
+        manually_added INTEGER NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+""")
+old.executemany("INSERT INTO participants (name, guests, signup_order, manually_added) VALUES (?, ?, ?, ?)",
+                [('Wes', '["Tom", "Jerry"]', 1, 0), ('Dave', '[]', 2, 0), ('Alex', None, 3, 0),
+                 ('Rick', '["Bob"]', 4, 1), ('Scotty', '["Scotty-Guest", "Scotty-Guest"]', 5, 0)])
+old.commit()
+old.close()
+
+print("\n📋 Migration")
+db = Database(db_path)
+players = {p['name']: p['guests'] for p in db.get_participants()}
+check("JSON guests moved into the table, in order",
+      players == {'Wes': ['Tom', 'Jerry'], 'Dave': [], 'Alex': [], 'Rick': ['Bob'],
+                  'Scotty': ['Scotty-Guest', 'Scotty-Guest']})
+conn = db._connect()
+leftover = conn.execute("SELECT COUNT(*) FROM participants WHERE guests IS NOT NULL").fetchone()[0]
+conn.close()
+check("Old column emptied", leftover == 0)
+db.close()
+db = Database(db_path)
+check("Migration runs once", {p['name']: p['guests'] for p in db.get_participants()} == players)
+
+print("\n📋 Guest commands")
+db.add_guest_manually('Dave', 'Sam')
+db.add_guest_manually('Dave', 'Sam')
+db.add_guest_manually('Dave', 'Max')
+check("Guests added after the host's others, once each",
+      next(p['guests'] for p in db.get_participants() if p['name'] == 'Dave') == ['Sam', 'Max'])
+check("Unknown host", not db.add_guest_manually('Nobody', 'Sam')['success'])
+db.add_guest_manually('Alex', 'Sam')
+check("Removal without a host takes the guest off everyone", db.remove_guest_manually('Sam')['success']
+      and all('Sam' not in p['guests'] for p in db.get_participants()))
+check("Removing a guest nobody has", not db.remove_guest_manually('Sam')['success'])
+db.remove_guest_manually('Jerry', 'Wes')
+check("Removal from one host", next(p['guests'] for p in db.get_participants() if p['name'] == 'Wes') == ['Tom'])
+db.remove_player_manually('Wes')
+conn = db._connect()
+orphans = conn.execute("SELECT COUNT(*) FROM guests WHERE host_id NOT IN (SELECT id FROM participants)").fetchone()[0]
+conn.close()
+check("Guests go with their host", orphans == 0)
+
+print("\n📋 Re-analysis")
+db.update_participants([{'name': 'Dave', 'guests': ['Max', 'Lee']}, {'name': 'Alex', 'guests': []}])
+players = {p['name']: p['guests'] for p in db.get_participants()}
+check("AI guests replace the old ones, manual player's guests kept",
+      players == {'Dave': ['Max', 'Lee'], 'Alex': [], 'Rick': ['Bob']})
+db.update_participants([{'name': 'Dave', 'guests': ['Max', 'Lee']}, {'name': 'Alex', 'guests': []},
+                        {'name': 'Scotty', 'guests': ['Scotty-Guest', 'Scotty-Guest']}])
+check("Two anonymous guests of one host are both kept", db.get_participants()[-1]['guests'] == ['Scotty-Guest', 'Scotty-Guest']
+      and db.get_spots_used()['playing'] == 9)
+db.add_guest_manually('Scotty', 'Scotty-Guest')
+db.remove_guest_manually('Scotty-Guest', 'Scotty')
+check("...an added guest already listed isn't added again, and removal takes one",
+      db.get_participants()[-1]['guests'] == ['Scotty-Guest'] and db.get_spots_used()['playing'] == 8
+      and db.verify_state_cache() == [])
+db.remove_player_manually('Scotty')
+check("add_player_manually with guests", db.add_player_manually('Ken', guests=['Ann', 'Bea']) == 'playing'
+      and db.get_participants()[-1]['guests'] == ['Ann', 'Bea'])
+
+print("\n📋 Capacity")
+db.set_tee_time_settings('08:00', 10, 3)
+capacity = db.get_capacity()
+db.add_player_manually('Big', guests=[f"Friend {i}" for i in range(capacity)])
+spots = db.get_spots_used()
+statuses = {p['name']: p['status'] for p in db.get_participants()}
+check("Blocks counted with their guests", statuses['Big'] == 'reserve' and statuses['Ken'] == 'playing')
+check("Spots per status", spots == {'playing': 9, 'reserve': 1 + capacity})
+check("Status filter", [p['name'] for p in db.get_participants('reserve')] == ['Big']
+      and db.get_participants('reserve')[0]['guests'][0] == 'Friend 0')
+
+print("\n📋 Indexes")
+check("Guest removal without a host uses the name index",
+      'idx_guests_name' in plan(db, "DELETE FROM guests WHERE guest_name = ?", ('Sam',)))
+check("Capacity count uses the host index",
+      'COVERING INDEX idx_guests_host' in plan(db, """
+          SELECT p.name, p.status, 1 + (SELECT COUNT(*) FROM guests g WHERE g.host_id = p.id)
+          FROM participants p ORDER BY p.signup_order"""))
+check("Participant list joins on the host index",
+      'SEARCH g USING INDEX idx_guests_host' in plan(db, """
+          SELECT p.id, p.name, p.preferences, p.signup_order, p.status, g.guest_name
+          FROM participants p LEFT JOIN guests g ON g.host_id = p.id
+          ORDER BY p.signup_order, p.id, g.signup_order"""))
+
+db.close()
+os.remove(db_path)
+
+print("\n📋 Guests table with a unique name per host")
+old = sqlite3.connect(db_path)
+old.execute("CREATE TABLE participants (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, guests TEXT, "
+            "preferences TEXT, signup_order INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL DEFAULT 'playing', "
+            "manually_added INTEGER NOT NULL DEFAULT 0, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+old.execute("CREATE TABLE guests (id INTEGER PRIMARY KEY AUTOINCREMENT, host_id INTEGER NOT NULL REFERENCES participants(id), "
+            "guest_name TEXT NOT NULL, signup_order INTEGER NOT NULL DEFAULT 0, UNIQUE (host_id, guest_name))")
+old.execute("INSERT INTO participants (name, signup_order) VALUES ('Wes', 1)")
+old.executemany("INSERT INTO guests (host_id, guest_name, signup_order) VALUES (1, ?, ?)", [('Tom', 1), ('Wes-Guest', 2)])
+old.commit()
+old.close()
+db = Database(db_path)
+conn = db._connect()
+table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'guests'").fetchone()[0]
+indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'guests'")}
+conn.close()
+check("Rebuilt without the unique constraint, rows and indexes kept", 'UNIQUE' not in table_sql
+      and db.get_participants()[0]['guests'] == ['Tom', 'Wes-Guest'] and {'idx_guests_host', 'idx_guests_name'} <= indexes)
+db.update_participants([{'name': 'Wes', 'guests': ['Wes-Guest', 'Wes-Guest']}])
+check("...so a second anonymous guest can be stored", db.get_participants()[0]['guests'] == ['Wes-Guest', 'Wes-Guest'])
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
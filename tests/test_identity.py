@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Test the identity index (aliases, prefix + trigram lookups, nickname merging) - no API needed"""
+
+import sys, os, time, random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import IdentityIndex, Database
+
+print("="*70)
+print(" TESTING IDENTITY RESOLUTION")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+print("\n📋 Lookups")
+index = IdentityIndex()
+for name in ['Dave Walker', 'Dave Smith', 'Wes', 'KennyD', 'Maice Browne', 'Leon (Thameside)', 'Mitchell Pettengell']:
+    index.add_name(name)
+index.learn('+44 7700 900123', 'Wes', 'mapping')
+check("Exact name, any case", index.resolve("maice browne") == 'Maice Browne')
+check("Phone number, any formatting", index.resolve("447700900123") == 'Wes')
+check("Unique prefix", index.resolve("ken") == 'KennyD' and index.resolve("leon") == 'Leon (Thameside)')
+check("Ambiguous prefix", index.resolve("dave") is None)
+check("Typo within edit distance", index.resolve("Dave Walkr") == 'Dave Walker' and index.resolve("Maice Brown") == 'Maice Browne')
+check("Typo too far", index.resolve("Dave Wilson") is None)
+check("Limited to this week's names", index.resolve("dave", within=['Dave Smith', 'Wes']) == 'Dave Smith')
+check("Exact-only mode", index.resolve("ken", fuzzy=False) is None and index.canonical("ken") == 'ken')
+
+print("\n📋 Nickname merging")
+players = [
+    {'name': 'Maice Browne', 'guests': [], 'preferences': None},
+    {'name': 'ken', 'guests': ['ken-Guest'], 'preferences': 'early'},
+    {'name': 'mitch', 'guests': [], 'preferences': None},
+    {'name': 'Wes', 'guests': [], 'preferences': None},
+    {'name': 'KennyD', 'guests': [], 'preferences': None},
+    {'name': 'Mitchell Pettengell', 'guests': [], 'preferences': None},
+    {'name': 'Ricky Parkhurst', 'guests': [], 'preferences': None},
+    {'name': 'Ricky', 'guests': [], 'preferences': None},
+]
+merged, renamed = index.merge_players(players, senders=['Maice Browne', 'Wes', 'KennyD', 'Ricky'])
+check("Nickname merged into the sender at its earlier position",
+      [p['name'] for p in merged] == ['Maice Browne', 'KennyD', 'Mitchell Pettengell', 'Wes', 'Ricky'])
+kenny = next(p for p in merged if p['name'] == 'KennyD')
+check("Merged player keeps guests and preferences", kenny['guests'] == ['ken-Guest'] and kenny['preferences'] == 'early')
+check("Renames reported", renamed == {'ken': 'KennyD', 'mitch': 'Mitchell Pettengell', 'Ricky Parkhurst': 'Ricky'})
+check("Prefix and first-name merges are not remembered as aliases", index.aliases.get('ken') != 'KennyD'
+      and index.aliases.get('mitch') != 'Mitchell Pettengell' and index.aliases.get('ricky parkhurst') != 'Ricky')
+merged, renamed = index.merge_players([{'name': 'Tom', 'guests': []}, {'name': 'Tommy Smith', 'guests': []}],
+                                      senders=['Tommy Smith'])
+check("...so a fuzzy hit only applies to the list it was made for",
+      renamed == {'Tom': 'Tommy Smith'} and index.aliases.get('tom') != 'Tommy Smith')
+
+print("\n📋 Persistence + database use")
+db_path = "data/test_identity.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+db.add_constraint('partner_preference', 'Alex', 'John Balls')
+db.identity.learn('Johnny', 'John Balls', 'analysis')
+reopened = Database(db_path)
+check("Season names seeded from constraints", reopened.identity.resolve("alex", fuzzy=False) == 'Alex')
+check("Learned aliases survive a restart", reopened.identity.resolve("johnny", fuzzy=False) == 'John Balls')
+reopened.update_participants([{'name': 'John Balls', 'guests': []}, {'name': 'Johnny', 'guests': []},
+                              {'name': 'Alex', 'guests': []}])
+check("Known alias never becomes a second participant",
+      [p['name'] for p in reopened.get_participants()] == ['John Balls', 'Alex'])
+reopened.update_participants([{'name': 'John Balls', 'guests': ['Pete']}, {'name': 'Johnny', 'guests': ['Sam', 'Pete']},
+                              {'name': 'Alex', 'guests': []}])
+check("...and both entries' guests are kept", reopened.get_participants()[0]['guests'] == ['Pete', 'Sam'])
+check("Adding by alias finds the existing player", reopened.add_player_manually("johnny") == 'exists')
+check("Removing by alias removes the canonical player",
+      reopened.remove_player_manually("JOHNNY")['removed'] and len(reopened.get_participants()) == 1)
+os.remove(db_path)
+
+print("\n📋 Scale")
+rng = random.Random(7)
+syllables = ['al', 'ber', 'ca', 'dan', 'el', 'fin', 'gar', 'ho', 'is', 'jo', 'ken', 'li', 'mar', 'no', 'os',
+             'pet', 'ric', 'sam', 'ty', 'vin', 'wes', 'ash', 'by', 'ton', 'ley', 'son', 'ford', 'well']
+big_names = sorted({f"{''.join(rng.sample(syllables, 2)).title()} {''.join(rng.sample(syllables, 3)).title()}"
+                    for _ in range(6000)})[:5000]
+big = IdentityIndex()
+for name in big_names:
+    big.add_name(name)
+queries = [name[:3] + 'q' + name[4:] for name in big_names[::50]]  # One letter wrong
+started = time.time()
+found = [big.resolve(q) for q in queries]
+per_lookup = (time.time() - started) / len(queries)
+print(f"   {per_lookup * 1e6:.0f}µs per fuzzy lookup over {len(big_names)} names")
+check("Fuzzy lookup over 5000 names stays fast", per_lookup < 0.01)
+check("Fuzzy lookups find the right names", sum(f == n for f, n in zip(found, big_names[::50])) >= 0.9 * len(queries))
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Test incremental analysis: patches from the messages after the watermark, and the fallbacks
+to a full transcript analysis - with a fake AI, no browser or API needed"""
+
+import sys, os, threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import SwindleBot, AIAnalyzer, CircuitBreaker, Database
+
+print("="*70)
+print(" TESTING INCREMENTAL ANALYSIS")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def msg(sender, hhmm, text):
+    return {'sender': sender, 'text': text, 'is_outgoing': False, 'timestamp': f"[{hhmm}, 15/02/2026] {sender}: "}
+
+
+class FakeAI:
+    """Stands in for AIAnalyzer._cached_call: answers by purpose and records every call"""
+    def __init__(self):
+        self.calls = []
+        self.answers = {}
+
+    def __call__(self, purpose, model, max_tokens, system_prompt, user_prompt, tool_name, schema):
+        self.calls.append((purpose, user_prompt))
+        answer = self.answers[purpose]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def purposes(self):
+        return [purpose for purpose, _ in self.calls]
+
+
+def full_answer(*names):
+    return {'players': [{'name': n, 'guests': [], 'preferences': None} for n in names], 'pairings': [],
+            'total_count': len(names), 'summary': '', 'changes': [], 'confidence': 'high'}
+
+
+def patch(**changes):
+    return {**AIAnalyzer.empty_patch(), **changes}
+
+
+def names():
+    return [p['name'] for p in db.get_participants()]
+
+
+db_path = "data/test_incremental_analysis.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+fake = FakeAI()
+bot = SwindleBot.__new__(SwindleBot)  # No browser - just the analysis path
+bot.db = db
+bot.config = SimpleNamespace(FULL_ANALYSIS_EVERY=3, INCREMENTAL_MAX_MESSAGES=4, LOCAL_CLASSIFIER=False, VOTE_SIGNUPS=False)
+bot.ai = AIAnalyzer(None, db)
+bot.ai._cached_call = fake
+bot.ai_breaker = CircuitBreaker()
+bot._queued_analysis = None
+bot._apply_lock = threading.Lock()
+bot._applied_seq = 0
+bot.notify_admin_group = lambda message: None
+
+transcript = [msg("Rick", "08:00", "Now taking names for Sunday"),
+              msg("Wes", "08:05", "Please"),
+              msg("Dave", "08:10", "Yes please")]
+
+print("\n📋 First check")
+fake.answers['analysis'] = full_answer('Wes', 'Dave')
+bot.process_main_group_messages(list(transcript))
+check("No snapshot yet - full analysis", fake.purposes() == ['analysis'] and names() == ['Wes', 'Dave'])
+check("Snapshot saved as the watermark", db.get_last_snapshot() == transcript
+      and db.get_analysis_state()['incremental_runs'] == 0)
+
+print("\n📋 New messages after the watermark")
+fake.calls.clear()
+transcript += [msg("Sam", "09:00", "Count me in"), msg("Wes", "09:05", "Can't make it now sorry")]
+fake.answers['incremental'] = patch(add=[{'name': 'Sam', 'guests': [], 'preferences': None}], remove=['Wes'])
+bot.process_main_group_messages(list(transcript))
+prompt = fake.calls[0][1] if fake.calls else ''
+check("Only a patch is asked for", fake.purposes() == ['incremental'])
+check("The prompt carries the current state and only the new messages",
+      '"name": "Wes"' in prompt and '"name": "Dave"' in prompt and "Count me in" in prompt
+      and "Can't make it" in prompt and "Yes please" not in prompt and "taking names" not in prompt)
+check("Patch applied on top of the database", names() == ['Dave', 'Sam'])
+check("Snapshot and counter moved on", db.get_last_snapshot() == transcript
+      and db.get_analysis_state()['incremental_runs'] == 1)
+
+fake.calls.clear()
+bot.process_main_group_messages(list(transcript))
+check("Same transcript again - no AI call", fake.calls == [])
+
+print("\n📋 Falling back to a full analysis")
+snapshot = db.get_last_snapshot()
+check("Nothing new - no window", bot._incremental_window(transcript, snapshot) is None)
+check("A new message after the watermark - incremental",
+      bot._incremental_window(transcript + [msg("Tom", "09:30", "Please")], snapshot) == [msg("Tom", "09:30", "Please")])
+check("Late-loaded history before the watermark - full",
+      bot._incremental_window(transcript[:2] + [msg("Tom", "08:30", "Please")] + transcript[2:], snapshot) is None)
+burst = [msg(f"Player {i}", f"10:0{i}", "Please") for i in range(5)]
+check("More than INCREMENTAL_MAX_MESSAGES new messages - full", bot._incremental_window(transcript + burst, snapshot) is None
+      and bot._incremental_window(transcript + burst[:4], snapshot) == burst[:4])
+check("A new 'taking names' post - full",
+      bot._incremental_window(transcript + [msg("Rick", "10:00", "Now taking names for Sunday")], snapshot) is None)
+check("No snapshot or no players - full", bot._incremental_window(transcript, None) is None)
+db.record_incremental_analysis()
+db.record_incremental_analysis()
+check("Every FULL_ANALYSIS_EVERY updates - full consistency check",
+      bot._incremental_window(transcript + [msg("Tom", "09:30", "Please")], snapshot) is None)
+
+fake.calls.clear()
+transcript.append(msg("Tom", "09:30", "Please"))
+fake.answers['analysis'] = full_answer('Dave', 'Sam', 'Tom')
+bot.process_main_group_messages(list(transcript))
+check("The consistency check runs a full analysis and resets the counter", fake.purposes() == ['analysis']
+      and names() == ['Dave', 'Sam', 'Tom'] and db.get_analysis_state()['incremental_runs'] == 0)
+
+fake.calls.clear()
+transcript.append(msg("Alex", "09:40", "Yes please"))
+fake.answers['incremental'] = RuntimeError("API down")
+fake.answers['analysis'] = full_answer('Dave', 'Sam', 'Tom', 'Alex')
+bot.process_main_group_messages(list(transcript))
+check("A failed patch falls back to a full analysis", fake.purposes() == ['incremental', 'analysis']
+      and names() == ['Dave', 'Sam', 'Tom', 'Alex'] and db.get_last_snapshot() == transcript)
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
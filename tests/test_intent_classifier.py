@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Test the local intent classifier (keyword bootstrap + n-gram logistic regression) - no API needed"""
+
+import sys, os, shutil, tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import IntentClassifier, IdentityIndex, Database, SwindleBot
+
+print("="*70)
+print(" TESTING LOCAL INTENT CLASSIFIER")
+print("="*70)
+
+# Phrasings taken from real main group scrapes
+keyword_cases = [
+    ("Please mate", 'signup'),
+    ("Yes please Ricky", 'signup'),
+    ("Yea please mate", 'signup'),
+    ("Yes pls mate", 'signup'),
+    ("please", 'signup'),
+    ("Can you take me off please Rick, cheers", 'dropout'),
+    ("Sorry Ricky - can you remove me as well mate.", 'dropout'),
+    ("Can't make it this week lads", 'dropout'),
+    ("+1 please", 'guest'),
+    ("Can i have a guest for sunday please", 'guest'),
+    ("How's it holding up out there today lads", None),
+    ("Me and John balls for MP please mate", None),
+    # Relayed for someone else - never the sender's own dropout
+    ("Mike can't make it", None),
+    ("Dave can't make it, put me in instead", None),
+    ("Sorry Ricky, Pete cant play this week", None),
+]
+
+# Labelled history (what the bot logs from AI decisions), including phrasings the rules miss
+training = (
+    [{'text': t, 'label': 'signup'} for t in [
+        "Please made", "Pencel me in please", "Sign me up", "Sign me up please mate", "Put my name down",
+        "Put me down please", "Stick my name down", "Yes mate", "Go on then please", "In mate",
+        "Id love to play", "I'll play", "Ill play please", "Add me please", "Add me mate",
+    ] * 3] +
+    [{'text': t, 'label': 'dropout'} for t in [
+        "Sorry lads I'm gonna have to pull out", "Pull out please", "Got to pull out mate", "Scratch me",
+        "Scratch me off", "Family stuff so I'll have to drop out", "Out this week sorry",
+        "Cross me off please", "Cross me off mate", "Gonna have to bail",
+    ] * 3] +
+    [{'text': t, 'label': 'ignore'} for t in [
+        "Lovely", "They just closed the course", "I rate the 11am beers thou", "All on the list",
+        "3 spaces left gents", "Red sauce", "Haha", "Putting green a little wet", "Full at the moment mate",
+        "What a shot", "Weather looks grim", "Who's driving", "See you all there", "Cheers lads",
+    ] * 3] +
+    [{'text': t, 'label': 'guest'} for t in [
+        "+1 for me", "Plus one please", "Can I bring a mate", "Got a mate coming", "Bringing my brother",
+    ] * 3]
+)
+
+model = IntentClassifier()
+model.train(training)
+again = IntentClassifier()
+again.train(training)
+
+model_cases = [
+    ("Sign me up mate", 'signup'),
+    ("Scratch me off please", 'dropout'),
+    ("Cheers lads see you there", 'ignore'),
+]
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+print("\n📋 Keyword bootstrap")
+for text, expected in keyword_cases:
+    check(f"\"{text}\" -> {expected}", IntentClassifier.keyword_label(text) == expected)
+
+print("\n📋 Trained model")
+for text, expected in model_cases:
+    label, confidence, source = model.predict(text)
+    check(f"\"{text}\" -> {expected} (got {label}, {confidence:.2f}, {source})", label == expected and source == 'model')
+check("Training is deterministic", model.to_dict() == again.to_dict())
+check("Untrained model defers to the LLM", IntentClassifier().predict("Sign me up mate")[1] == 0.0)
+
+restored = IntentClassifier()
+restored.load(model.to_dict())
+check("Model survives save/load", restored.predict("Scratch me off please") == model.predict("Scratch me off please"))
+
+print("\n📋 Local handling guard")
+check("Plain signup is simple", model.is_simple("Please mate", 'signup'))
+check("Signing up someone else is not", not model.is_simple("Me and John balls for MP please", 'signup'))
+check("Tee time request is not", not model.is_simple("Please, early one if poss", 'signup'))
+check("Questions are not", not model.is_simple("Any spaces left?", 'ignore'))
+check("Plain +1 is simple", model.is_simple("+1 please", 'guest'))
+check("Named guest is not", not model.is_simple("Bringing Dean Masterson", 'guest'))
+check("Plain dropout is simple", model.is_simple("Can't make it this week lads", 'dropout'))
+relayed = ["Mike can't make it", "Dave can't make it, put me in instead", "Sorry Ricky, Pete cant play this week"]
+check("Relayed dropouts are not", not any(model.is_simple(text, 'dropout') for text in relayed))
+check("A second clause is not", not model.is_simple("Can't make it. Sam will", 'dropout'))
+identity = IdentityIndex()
+identity.add_name("Dave Walker")
+identity._index("dave", "Dave Walker")
+known = IntentClassifier(identity=identity)
+check("A known player named in lower case is not", not known.is_simple("dave cant make it", 'dropout')
+      and not known.is_simple("dave walker out", 'dropout') and known.is_simple("cant make it", 'dropout'))
+
+print("\n📋 Relayed messages go to the LLM")
+bot = SimpleNamespace(config=SimpleNamespace(LOCAL_CLASSIFIER=True, LOCAL_CLASSIFIER_THRESHOLD=0.9), intent=known)
+window = [{'sender': 'Wes', 'text': text, 'timestamp': f"[10:0{i}, 16/02/2026] Wes: "} for i, text in enumerate(relayed)]
+patch, remaining = SwindleBot._resolve_locally(bot, window, [{'name': 'Wes'}, {'name': 'Dave Walker'}])
+check("Nobody removed locally, every message left for the LLM", patch is None and remaining == window)
+window = [{'sender': 'Wes', 'text': "Can't make it this week lads", 'timestamp': "[10:00, 16/02/2026] Wes: "}]
+patch, remaining = SwindleBot._resolve_locally(bot, window, [{'name': 'Wes'}])
+check("The sender's own dropout is still handled locally", patch['remove'] == ['Wes'] and remaining == [])
+
+print("\n📋 Label log + evaluation")
+workdir = tempfile.mkdtemp()
+db = Database(os.path.join(workdir, "intent.db"))
+db.log_message_labels([{'key': 'a', 'week': '2026-W08', 'sender': 'Wes', 'text': 'Please mate', 'label': 'ignore'},
+                       {'key': 'a', 'week': '2026-W08', 'sender': 'Wes', 'text': 'Please mate', 'label': 'signup'}])
+logged = [e for e in db.get_message_labels() if e['text'] == 'Please mate']
+check("Relabelled message keeps its latest label", len(logged) == 1 and logged[0]['label'] == 'signup')
+report = model.evaluate([{'text': t, 'label': l} for t, l in model_cases], threshold=0.9)
+print(f"   accuracy {report['accuracy']:.0%}, coverage {report['coverage']:.0%}, {report['latency_us']:.0f}µs/message")
+check("Evaluation reports accuracy, coverage and latency",
+      report['accuracy'] == 1.0 and 0.0 <= report['coverage'] <= 1.0 and report['latency_us'] > 0)
+
+print("\n📋 Weekly retraining")
+retrained = []
+bot = SwindleBot.__new__(SwindleBot)  # No browser
+bot.db = db
+bot.send_to_admin_group = lambda message: None
+bot.retrain_intent_classifier = lambda: retrained.append(True)
+for _ in range(3):  # The polling loop calls it on every check during Monday's first hour
+    SwindleBot.clear_weekly_data(bot)
+check("The weekly reset doesn't retrain", retrained == [])
+SwindleBot.weekly_maintenance(bot)
+check("The once-a-week maintenance job does", retrained == [True])
+
+db.close()
+shutil.rmtree(workdir)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
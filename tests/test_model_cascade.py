@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Test the Haiku-first model cascade: cascade_check() reasons and escalation to the strong model - with a fake AI"""
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AIAnalyzer, AIUnavailableError, Config, Database
+
+print("="*70)
+print(" TESTING MODEL CASCADE")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def msg(sender, hhmm, text):
+    return {'sender': sender, 'text': text, 'is_outgoing': False, 'timestamp': f"[{hhmm}, 15/02/2026] {sender}: "}
+
+
+def result(*names, confidence='high'):
+    return {'players': [{'name': n, 'guests': [], 'preferences': None} for n in names], 'pairings': [],
+            'total_count': len(names), 'summary': '', 'changes': [], 'confidence': confidence}
+
+
+class FakeAI:
+    """Stands in for AIAnalyzer._cached_call: answers per model and records which models were called"""
+    def __init__(self, answers):
+        self.answers = answers
+        self.models = []
+
+    def __call__(self, purpose, model, max_tokens, system_prompt, user_prompt, tool_name, schema):
+        self.models.append(model)
+        answer = self.answers[model]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+FAST, STRONG = AIAnalyzer.FAST_MODEL, AIAnalyzer.ANALYSIS_MODEL
+transcript = [msg("Rick", "08:00", "Now taking names for Sunday"),
+              msg("Wes", "08:05", "Please"),
+              msg("Dave", "08:10", "Me and ken please"),
+              msg("Sam", "08:20", "Yes please")]
+
+
+def analyse(fast_answer, strong_answer=None, ai=None):
+    ai = ai or AIAnalyzer(None)
+    ai._cached_call = FakeAI({FAST: fast_answer, STRONG: strong_answer or result('Wes', 'Dave', 'ken', 'Sam')})
+    return ai, ai.analyze_messages(list(transcript))
+
+
+print("\n📋 cascade_check")
+ai = AIAnalyzer(None)
+check("A clean result passes", ai.cascade_check(result('Wes', 'Dave', 'ken'), transcript, []) == [])
+check("A name nobody sent or mentioned is flagged", ai.cascade_check(result('Wes', 'Bob'), transcript, [])
+      == ["unknown names: Bob"])
+current = [{'name': n} for n in ('Wes', 'Dave', 'Sam', 'Alex', 'Tom')]
+check("A small change to a list of 4+ passes", ai.cascade_check(result('Wes', 'Dave', 'Sam', 'ken'), transcript, current) == [])
+check("A large diff is flagged", ai.cascade_check(result('Wes'), transcript, current) == ["large diff: 4 names changed"])
+check("Self-reported low confidence is flagged", ai.cascade_check(result('Wes', confidence='low'), transcript, [])
+      == ["low confidence: self-reported"])
+
+print("\n📋 Escalation")
+ai, final = analyse(result('Wes', 'Dave', 'ken', 'Sam'))
+check("A result that passes is taken from the fast tier alone", ai._cached_call.models == [FAST]
+      and [p['name'] for p in final['players']] == ['Wes', 'Dave', 'ken', 'Sam'])
+check("...and counted as a run without escalation", ai.cascade_stats == {'runs': 1, 'escalations': 0, 'reasons': {}}
+      and ai.escalation_rate() == 0.0)
+
+ai, final = analyse(result('Wes', 'Dave', 'Bob'))
+check("A failed check escalates to the strong model", ai._cached_call.models == [FAST, STRONG]
+      and [p['name'] for p in final['players']] == ['Wes', 'Dave', 'ken', 'Sam'])
+check("...with the reason counted", ai.cascade_stats == {'runs': 1, 'escalations': 1, 'reasons': {'unknown names': 1}}
+      and ai.escalation_rate() == 1.0)
+
+ai, final = analyse(ValueError("record_signups reply still invalid after repair"))
+check("A fast tier error escalates too", ai._cached_call.models == [FAST, STRONG] and final is not None
+      and ai.cascade_stats['reasons'] == {'fast tier failed': 1})
+
+ai, final = analyse(AIUnavailableError("breaker open"))
+check("AI unavailable - no escalation, no result", ai._cached_call.models == [FAST] and final is None)
+
+db_path = "data/test_model_cascade.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+for name in ('Wes', 'Dave', 'Sam', 'Alex', 'Tom'):
+    db.add_player_manually(name)
+ai, final = analyse(result('Wes'), ai=AIAnalyzer(None, db))
+check("The large diff check compares against the database", ai._cached_call.models == [FAST, STRONG]
+      and ai.cascade_stats['reasons'] == {'large diff': 1})
+
+ai = AIAnalyzer(None)
+ai.ledger.fast_only = lambda: True
+ai, final = analyse(result('Wes', 'Bob', confidence='low'), ai=ai)
+check("Budget nearly spent - the fast tier's answer stands", ai._cached_call.models == [FAST]
+      and [p['name'] for p in final['players']] == ['Wes', 'Bob'] and ai.cascade_stats['reasons'] == {'budget': 1})
+
+Config.AI_CASCADE = False
+ai, final = analyse(result('Wes'))
+Config.AI_CASCADE = True
+check("Cascade off - straight to the strong model", ai._cached_call.models == [STRONG] and ai.cascade_stats['runs'] == 0)
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
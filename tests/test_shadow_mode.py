@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test shadow-mode evaluation (result diffing, candidate run, stored runs) - no API needed"""
+
+import sys, os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import ShadowEvaluator, Database
+
+print("="*70)
+print(" TESTING SHADOW MODE")
+print("="*70)
+
+
+def players(*names, guests=None):
+    guests = guests or {}
+    return {'players': [{'name': n, 'status': 'playing', 'guests': guests.get(n, []), 'preferences': None} for n in names],
+            'pairings': [], 'total_count': len(names)}
+
+
+class FakeClient:
+    """Answers record_signups with a fixed result, or raises"""
+    def __init__(self, answer=None, error=None):
+        self.messages = self
+        self.answer = answer
+        self.error = error
+
+    def create(self, timeout=None, **kwargs):
+        if self.error:
+            raise self.error
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name='record_signups', input=self.answer)],
+                               usage=SimpleNamespace(input_tokens=2000, output_tokens=300))
+
+
+primary = players('Wes', 'Dave', 'Alex', guests={'Alex': ['Alex-Guest']})
+primary_metrics = {'model': 'claude-sonnet-4-5-20250929', 'seconds': 6.0, 'input_tokens': 2100,
+                   'output_tokens': 320, 'cost': 0.011}
+
+db_path = "data/test_shadow.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+
+shadow = ShadowEvaluator(None, db, 'claude-haiku-4-5-20251001', sample_rate=1.0)
+shadow.gateway.client = FakeClient(players('wes', 'Dave', 'Alex', guests={'Alex': ['alex-guest']}))
+agreed = shadow.evaluate("system", "MESSAGES: ...", primary, primary_metrics)
+shadow.gateway.client = FakeClient(players('Dave', 'Wes', 'Blaine'))
+disagreed = shadow.evaluate("system", "MESSAGES: ...", primary, primary_metrics)
+shadow.gateway.client = FakeClient(error=ValueError("record_signups reply still invalid after repair"))
+failed_run = shadow.evaluate("system", "MESSAGES: ...", primary, primary_metrics)
+stored = db.get_shadow_runs(10)
+
+never = ShadowEvaluator(None, db, 'claude-haiku-4-5-20251001', sample_rate=0.0)
+
+tests = [
+    ("Same list (case-insensitive names/guests) agrees", agreed['agree'] and agreed['diff'] == {}),
+    ("Candidate cost priced from its usage", abs(agreed['candidate_cost'] - (2000 * 1 + 300 * 5) / 1_000_000) < 1e-9),
+    ("Missing player reported", disagreed['diff'].get('missing') == ['Alex']),
+    ("Extra player reported", disagreed['diff'].get('extra') == ['Blaine']),
+    ("Order change reported", disagreed['diff'].get('order') == ['Wes', 'Dave']),
+    ("Guest mismatch on a shared player reported",
+     ShadowEvaluator.diff_results(primary, players('Wes', 'Dave', 'Alex')) == {'guests': ['Alex']}),
+    ("Candidate failure stored, not raised", failed_run['error'].startswith('ValueError') and not failed_run['agree']),
+    ("Runs stored newest first with their diff",
+     len(stored) == 3 and stored[0]['error'] and stored[1]['diff'] == disagreed['diff'] and stored[2]['agree']),
+    ("Primary metrics kept alongside", stored[2]['primary_seconds'] == 6.0 and stored[2]['candidate_input_tokens'] == 2000),
+    ("Sample rate 0 never submits", not never.maybe_submit("s", "u", primary, primary_metrics) and never._thread is None),
+    ("Session stats counted", shadow.stats['completed'] == 2 and shadow.stats['errors'] == 1),
+]
+
+passed = 0
+failed = 0
+for description, ok in tests:
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test local signup ordering from message timestamps and on-screen order - no API needed"""
+
+import sys, os, json, random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import AIAnalyzer, parse_recorded_transcript
+
+print("="*70)
+print(" TESTING SIGNUP ORDER")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def msg(sender, hhmm, text):
+    return {'sender': sender, 'text': text, 'is_outgoing': False, 'timestamp': f"[{hhmm}, 15/02/2026] {sender}: "}
+
+
+def names(players):
+    return [p['name'] for p in players]
+
+
+ai = AIAnalyzer(None)
+
+print("\n📋 Recorded week")
+root = os.path.join(os.path.dirname(__file__), '..')
+with open(os.path.join(root, 'fresh_messages.txt')) as f:
+    window = ai.filter_signup_window(ai.compact(parse_recorded_transcript(f.read())))
+with open(os.path.join(root, 'tests', 'fixtures', 'analysis_benchmark.json')) as f:
+    expected = json.load(f)['weeks'][0]['expected']
+shuffled = [{'name': n, 'guests': []} for n in expected['order']]
+random.Random(1).shuffle(shuffled)
+ordered = names(ai.order_by_signup(shuffled, window))
+check("Shuffled model output comes back in the labelled signup order", ordered == expected['order'])
+again = [{'name': n, 'guests': []} for n in expected['order']]
+random.Random(2).shuffle(again)
+check("Same result whatever order the model used", names(ai.order_by_signup(again, window)) == ordered)
+with_mate = names(ai.order_by_signup(shuffled + [{'name': 'John Balls', 'guests': []}], window))
+check("Player signed up by a mate goes straight after them",
+      with_mate[with_mate.index('Alex') + 1] == 'John Balls')
+
+print("\n📋 Rules")
+window = [
+    msg("Rick", "08:00", "Now taking names for Sunday"),
+    msg("Paul", "08:01", "What time is first tee?"),
+    msg("Wes", "08:05", "Please mate"),
+    msg("Alex", "08:05", "Yes please"),
+    msg("Maice", "08:06", "Me and ken please"),
+    msg("Paul", "08:30", "Please"),
+    msg("KennyD", "09:00", "Yes please cheers Maice"),
+    msg("Rick", "10:00", "So far: Wes, Alex, Maice, Kenny, Paul, Ricky Parkhurst"),
+]
+players = [{'name': n, 'guests': []} for n in ['Ricky Parkhurst', 'Paul', 'KennyD', 'Alex', 'Maice', 'Wes', 'Ghost']]
+ordered = names(ai.order_by_signup(players, window, renamed={'ken': 'KennyD'}))
+check("Same minute: on-screen order decides", ordered.index('Wes') < ordered.index('Alex'))
+check("Chat before signing up doesn't count", ordered.index('Maice') < ordered.index('Paul'))
+check("Named by a mate before their own message", ordered.index('KennyD') == ordered.index('Maice') + 1)
+check("Recap-only player timed by the recap", ordered[-2] == 'Ricky Parkhurst')
+check("No signup message found: kept last", ordered[-1] == 'Ghost')
+check("Full order", ordered == ['Wes', 'Alex', 'Maice', 'KennyD', 'Paul', 'Ricky Parkhurst', 'Ghost'])
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
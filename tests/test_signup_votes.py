@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Test poll vote / reaction signups (panel parsing, vote sync, merge with text analysis) - no browser or API needed"""
+
+import sys, os, threading
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import WhatsAppBot, SwindleBot, AIAnalyzer, Config, Database
+
+print("="*70)
+print(" TESTING VOTE SIGNUPS")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def msg(sender, hhmm, text):
+    return {'sender': sender, 'text': text, 'is_outgoing': False, 'timestamp': f"[{hhmm}, 15/02/2026] {sender}: "}
+
+
+now = datetime(2026, 2, 15, 12, 0)  # A Sunday
+
+print("\n📋 Reading the DOM text")
+panel = """Poll details
+Names for Sunday?
+Yes please
+3 votes
+Wes
+Today at 08:05
+Alex
+Friday 21:14
+You
+Today at 09:00
+Yes + guest
+1 vote
+Dave
+13/02/2026 at 09:00
+Can't make it
+1 vote
+Tom
+Yesterday at 19:30"""
+options = WhatsAppBot.parse_poll_details(panel, now)
+check("Options and voters read from the panel", list(options) == ["Yes please", "Yes + guest", "Can't make it"]
+      and [v for v, _ in options["Yes please"]] == ['Wes', 'Alex'])
+check("Vote times read", options["Yes please"][0][1] == "2026/02/15 08:05" and options["Yes please"][1][1] == "2026/02/13 21:14"
+      and options["Yes + guest"][0][1] == "2026/02/13 09:00" and options["Can't make it"][0][1] == "2026/02/14 19:30")
+check("Option meanings", [WhatsAppBot.vote_choice(o) for o in ["Yes please", "Yes + guest", "Can't make it", "Maybe", "In 👍"]]
+      == ['in', 'guest', None, None, 'in'])
+rows = [{'text': "You\nClick to remove", 'emojis': ['👍']},
+        {'text': "Maice", 'emojis': ['👍🏽']},
+        {'text': "KennyD\n✅", 'emojis': []},
+        {'text': "Ricky", 'emojis': ['😂']}]
+check("Signup reactions only, any skin tone", WhatsAppBot.parse_reaction_rows(rows, Config.SIGNUP_REACTIONS) == ['Maice', 'KennyD'])
+
+print("\n📋 Vote sync")
+db_path = "data/test_signup_votes.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+first = db.sync_signup_votes([{'voter': 'Wes', 'source': 'poll', 'choice': 'in', 'at': '2026/02/15 08:05'},
+                              {'voter': 'Maice', 'source': 'reaction', 'choice': 'in', 'at': None}])
+check("New votes reported", [v['voter'] for v in first['added']] == ['Wes', 'Maice'] and not first['withdrawn'])
+again = db.sync_signup_votes([{'voter': 'Wes', 'source': 'poll', 'choice': 'guest', 'at': '2026/02/15 08:05'},
+                              {'voter': 'Maice', 'source': 'reaction', 'choice': 'in', 'at': None},
+                              {'voter': 'Maice', 'source': 'poll', 'choice': 'in', 'at': None}])
+check("Unchanged votes are quiet; option switch reported", not again['added'] and [v['voter'] for v in again['changed']] == ['Wes'])
+gone = db.sync_signup_votes([{'voter': 'Wes', 'source': 'poll', 'choice': 'guest', 'at': '2026/02/15 08:05'}])
+check("Retracted vote reported", gone['withdrawn'] == ['Maice'] and [v['voter'] for v in db.get_signup_votes()] == ['Wes'])
+back = db.sync_signup_votes([{'voter': 'Wes', 'source': 'poll', 'choice': 'guest', 'at': '2026/02/15 08:05'},
+                             {'voter': 'Maice', 'source': 'reaction', 'choice': 'in', 'at': None}])
+check("Re-cast vote is a new signup", [v['voter'] for v in back['added']] == ['Maice'])
+db.clear_participants()
+check("Weekly reset clears votes", db.get_signup_votes() == [])
+
+print("\n📋 Applying votes")
+bot = SimpleNamespace(db=db, config=Config, ai=AIAnalyzer(None, db), _apply_lock=threading.Lock())
+bot._apply_delta = lambda patch, manual=True: SwindleBot._apply_delta(bot, patch, manual)
+SwindleBot.apply_signup_votes(bot, [{'voter': 'Wes', 'source': 'poll', 'choice': 'in', 'at': '2026/02/15 08:05'},
+                                    {'voter': 'Dave', 'source': 'poll', 'choice': 'guest', 'at': '2026/02/15 08:06'}])
+listed = {p['name']: p for p in db.get_participants()}
+check("Voters added without an AI call", list(listed) == ['Wes', 'Dave'] and listed['Dave']['guests'] == ['Dave-Guest'])
+SwindleBot.apply_signup_votes(bot, None)
+check("Unreadable votes change nothing", len(db.get_participants()) == 2)
+SwindleBot.apply_signup_votes(bot, [{'voter': 'Dave', 'source': 'poll', 'choice': 'guest', 'at': '2026/02/15 08:06'}])
+check("Withdrawn vote removes the player", [p['name'] for p in db.get_participants()] == ['Dave'])
+
+print("\n📋 Merging with a full text analysis")
+db.sync_signup_votes([{'voter': 'Dave', 'source': 'poll', 'choice': 'guest', 'at': '2026/02/15 08:06'},
+                      {'voter': 'Wes', 'source': 'poll', 'choice': 'in', 'at': '2026/02/15 08:20'},
+                      {'voter': 'Sam', 'source': 'poll', 'choice': 'in', 'at': '2026/02/15 08:02'}])
+window = [msg("Rick", "08:00", "Now taking names for Sunday - vote in the poll"),
+          msg("Alex", "08:10", "Please mate"),
+          msg("Wes", "08:01", "Yes please"),
+          msg("Sam", "09:00", "Can't make it now sorry")]
+text_players = [{'name': 'Wes', 'guests': [], 'preferences': 'early'}, {'name': 'Alex', 'guests': [], 'preferences': None}]
+merged = SwindleBot._with_votes(bot, text_players, window)
+check("Vote-only players added in vote-time order",
+      [p['name'] for p in merged] == ['Wes', 'Dave', 'Alex'])
+check("Text details kept, guest option applied",
+      merged[0]['preferences'] == 'early' and merged[1]['guests'] == ['Dave-Guest'])
+check("Later dropout message beats the vote", 'Sam' not in [p['name'] for p in merged])
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
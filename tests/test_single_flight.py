@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Test single-flight sharing of scrapes, analyses and AI calls across threads - no browser or API needed"""
+
+import sys, os, time, threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import SingleFlight, AnalysisWorker, AIAnalyzer, SwindleBot, ANALYSIS_SCHEMA
+
+print("="*70)
+print(" TESTING SINGLE FLIGHT")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def run_together(*fns):
+    """Start every function on its own thread at once; return their results in order"""
+    results = [None] * len(fns)
+
+    def run(i, fn):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i, fn)) for i, fn in enumerate(fns)]
+    for t in threads:
+        t.start()
+        time.sleep(0.01)
+    for t in threads:
+        t.join()
+    return results
+
+
+print("\n📋 SingleFlight")
+flights = SingleFlight()
+runs = []
+
+
+def slow(value):
+    def fn():
+        runs.append(value)
+        time.sleep(0.2)
+        return value
+    return fn
+
+
+results = run_together(lambda: flights.do('k', slow('first')), lambda: flights.do('k', slow('second')),
+                       lambda: flights.do('other', slow('third')))
+check("Concurrent calls for a key share one run", runs.count('first') == 1 and 'second' not in runs
+      and results[:2] == ['first', 'first'])
+check("Different keys run independently", results[2] == 'third')
+check("A later call runs again", flights.do('k', lambda: 'fresh') == 'fresh')
+
+
+def boom():
+    time.sleep(0.2)
+    raise RuntimeError("scrape failed")
+
+
+results = run_together(lambda: flights.do('k', boom), lambda: flights.do('k', slow('never')))
+check("Followers get the leader's exception", all(isinstance(r, RuntimeError) for r in results) and 'never' not in runs)
+check("Nested call from the running thread doesn't deadlock",
+      flights.do('k', lambda: flights.do('k', lambda: 'inner')) == 'inner')
+check("Stats count shared calls", flights.stats['shared'] == 2)
+
+print("\n📋 Main group scrapes")
+scrapes = []
+
+
+class FakeWhatsApp:
+    def __init__(self):
+        self.browser_lock = threading.RLock()
+        self.last_votes = None
+
+    def reload(self):
+        scrapes.append('reload')
+
+    def get_all_messages(self, group_name, scroll_for_history=False):
+        scrapes.append('scrape')
+        time.sleep(0.2)
+        return [{'sender': 'Wes', 'text': 'Please', 'timestamp': ''}]
+
+
+bot = SimpleNamespace(whatsapp=FakeWhatsApp(), config=SimpleNamespace(GROUP_NAME='Main'), _flights=SingleFlight(),
+                      apply_signup_votes=lambda votes: None)
+results = run_together(lambda: SwindleBot.scrape_main_group(bot, reload=True), lambda: SwindleBot.scrape_main_group(bot))
+check("Polling loop joins a refresh's scrape", scrapes == ['reload', 'scrape'] and results[0] is results[1])
+
+print("\n📋 Analysis worker")
+handled = []
+
+
+def handler(messages, adjust_published, seq):
+    handled.append((seq, len(messages)))
+    time.sleep(0.2)
+
+
+worker = AnalysisWorker(handler)
+worker.start()
+transcript = [{'sender': 'Wes', 'text': 'Please', 'timestamp': ''}]
+first = worker.submit(list(transcript), adjust_published=True)
+time.sleep(0.05)
+second = worker.submit(list(transcript))
+third = worker.submit(transcript + [{'sender': 'Sam', 'text': 'Please', 'timestamp': ''}])
+worker.wait_for(third, 5)
+check("Identical transcript joins the running analysis", second == first and worker.stats['joined'] == 1)
+check("A different transcript still gets analysed", handled == [(first, 1), (third, 2)])
+
+print("\n📋 Identical AI calls")
+
+
+class FakeClient:
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    def create(self, timeout=None, **kwargs):
+        self.calls += 1
+        time.sleep(0.2)
+        answer = {'players': [{'name': 'Wes', 'guests': []}], 'pairings': [], 'total_count': 1}
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name='record_signups', input=answer)],
+                               usage=SimpleNamespace(input_tokens=900, output_tokens=150))
+
+
+ai = AIAnalyzer(None)
+client = FakeClient()
+ai.gateway.client = client
+call = lambda: ai._cached_call('analysis', ai.ANALYSIS_MODEL, 1000, "system", "MESSAGES: ...", 'record_signups', ANALYSIS_SCHEMA)
+results = run_together(call, call)
+check("Concurrent identical calls make one API call", client.calls == 1 and results[0] == results[1])
+results[0]['players'].append('changed')
+check("Each caller gets its own copy", results[1]['players'] == [{'name': 'Wes', 'guests': []}])
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
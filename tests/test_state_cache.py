@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Test the write-through state cache: hot reads make no SQL round trips, snapshots are immutable,
+and after any mix of changes, rollbacks and concurrent writers the cache matches the database"""
+
+import sys, os, random, io, contextlib, threading, sqlite3
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database, SwindleBot
+
+print("="*70)
+print(" TESTING STATE CACHE")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def statements_run(db, call):
+    """The SQL call() ran on this thread's connection"""
+    conn = db._connect()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+        conn.close()
+    return statements
+
+
+db_path = "data/test_state_cache.db"
+for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(db_path + suffix):
+        os.remove(db_path + suffix)
+db = Database(db_path)
+db.set_tee_time_settings('08:00', 10, 2)  # 8 spots
+for i in range(7):
+    db.add_player_manually(f"Player {i}", guests=["Guest"] if i == 2 else None)
+db.add_constraint('partner_preference', 'Player 0', 'Player 1')
+db.add_constraint('avoid', 'Player 3', 'Player 4')
+db.save_weekly_pairings([['Player 5', 'Player 6']])
+
+print("\n📋 Hot reads")
+bot = SimpleNamespace(db=db, _format_player_line=lambda p: SwindleBot._format_player_line(None, p))
+statements = statements_run(db, lambda: (
+    SwindleBot.generate_participant_list(bot), db.get_participants(), db.get_participants('reserve'),
+    db.get_spots_used(), db.get_capacity(), db.generate_tee_times(), db.get_tee_time_settings(),
+    db.get_constraints(), db.get_constraints('Player 3'), db.get_partner_preferences(), db.get_avoidances(),
+    db.get_weekly_pairings(), db.get_manual_tee_times(), db.get_removed_tee_times()))
+check("show_list and the tee sheet inputs make no SQLite round trips", statements == [])
+check("Loaded once", db.state_cache.stats['loads'] == 1)
+check("Answers as before", db.get_capacity() == 8 and db.get_spots_used() == {'playing': 8, 'reserve': 0}
+      and db.get_partner_preferences() == {'Player 0': ['Player 1'], 'Player 5': ['Player 6']}
+      and db.get_avoidances() == {'Player 3': ['Player 4']} and db.get_weekly_pairings() == [['Player 5', 'Player 6']]
+      and db.get_participants()[2]['guests'] == ['Guest'])
+
+print("\n📋 Snapshots")
+state = db.state()
+try:
+    state.participants[0]['name'] = 'Someone'
+    immutable = False
+except TypeError:
+    immutable = True
+check("Players in a snapshot are read-only", immutable and isinstance(state.participants[2]['guests'], tuple))
+copies = db.get_participants()
+copies[0]['name'] = 'Changed'
+copies[2]['guests'].append('Another')
+check("get_participants() hands out copies", db.get_participants()[0]['name'] == 'Player 0'
+      and db.get_participants()[2]['guests'] == ['Guest'])
+db.add_player_manually("Late")
+check("A snapshot doesn't change under its reader", len(state.participants) == 7 and len(db.state().participants) == 8
+      and db.state().players('reserve')[0]['name'] == 'Late')
+
+print("\n📋 Write-through")
+rng = random.Random(2026)
+names = [f"Player {i}" for i in range(30)]
+mismatches = []
+loads = db.state_cache.stats['loads']
+
+
+def step(kind):
+    players = [p['name'] for p in db.get_participants()]
+    if kind == 'add':
+        db.add_player_manually(rng.choice(names), guests=[f"Guest {rng.randint(0, 9)}"] if rng.random() < 0.3 else None,
+                               preferences=rng.choice([None, 'early', 'late']))
+    elif kind == 'remove' and players:
+        db.remove_player_manually(rng.choice(players))
+    elif kind == 'guest_add' and players:
+        db.add_guest_manually(rng.choice(players), f"Guest {rng.randint(0, 9)}")
+    elif kind == 'guest_remove':
+        db.remove_guest_manually(f"Guest {rng.randint(0, 9)}", rng.choice(players) if players and rng.random() < 0.5 else None)
+    elif kind == 'preferences' and players:
+        db.set_player_preferences(rng.choice(players), rng.choice([None, 'early', 'late', 'early with Dave']))
+    elif kind == 'clear_preferences':
+        db.clear_time_preferences()
+    elif kind == 'constraint':
+        kind = rng.choice(['partner_preference', 'avoid'])
+        if rng.random() < 0.6:
+            db.add_constraint(kind, rng.choice(names), rng.choice(names))
+        else:
+            db.remove_constraint(kind, rng.choice(names), rng.choice([None, rng.choice(names)]))
+    elif kind == 'pairings':
+        if rng.random() < 0.7:
+            db.save_weekly_pairings([rng.sample(names, 2) for _ in range(rng.randint(1, 3))])
+        else:
+            db.clear_weekly_pairings()
+    elif kind == 'tee_times':
+        choice = rng.random()
+        if choice < 0.3:
+            db.set_tee_time_settings('08:00', 8, rng.randint(1, 5))
+        elif choice < 0.6:
+            db.add_manual_tee_time(f"{rng.randint(9, 14):02d}:00")
+        elif choice < 0.9:
+            db.remove_manual_tee_time(rng.choice(db.generate_tee_times() or ['08:00']))
+        else:
+            db.clear_manual_tee_times()
+        db.recalculate_statuses()
+    elif kind == 'analysis':
+        keep = [p for p in db.get_participants() if rng.random() < 0.8]
+        new = [{'name': n, 'guests': [], 'preferences': 'late'} for n in rng.sample(names, 2)]
+        db.update_participants([{'name': p['name'], 'guests': p['guests']} for p in keep] + new)
+    elif kind == 'batch':
+        with db.batch():
+            for _ in range(rng.randint(2, 5)):
+                step(rng.choice(['add', 'remove', 'guest_add', 'constraint', 'preferences']))
+    elif kind == 'rollback':
+        try:
+            with db.transaction():
+                step(rng.choice(['add', 'remove', 'constraint', 'tee_times', 'pairings']))
+                step('preferences')
+                raise RuntimeError("command failed")
+        except RuntimeError:
+            pass
+    elif kind == 'clear':
+        db.clear_participants()
+
+
+kinds = ['add'] * 5 + ['remove'] * 2 + ['guest_add', 'guest_remove', 'preferences', 'constraint', 'constraint',
+                                         'pairings', 'tee_times', 'analysis', 'batch', 'rollback']
+with contextlib.redirect_stdout(io.StringIO()):
+    for n in range(400):
+        kind = rng.choice(kinds) if rng.random() > 0.01 else rng.choice(['clear', 'clear_preferences'])
+        step(kind)
+        differences = db.verify_state_cache()
+        if differences:
+            mismatches.append((n, kind, differences[:3]))
+check("Cache matches the database after 400 random changes", not mismatches)
+if mismatches:
+    print(f"   First mismatches: {mismatches[:3]}")
+check("Kept up to date without reloading", db.state_cache.stats['loads'] == loads)
+
+print("\n📋 Other threads")
+seen = {}
+
+
+def read_elsewhere(key):
+    worker = threading.Thread(target=lambda: seen.update({key: [p['name'] for p in db.get_participants()]}))
+    worker.start()
+    worker.join()
+
+
+db.clear_participants()
+db.add_player_manually("Wes")
+try:
+    with db.transaction():
+        db.add_player_manually("Dave")
+        read_elsewhere('during')
+        check("Writer sees its own change", [p['name'] for p in db.get_participants()] == ['Wes', 'Dave'])
+        raise RuntimeError("command failed")
+except RuntimeError:
+    pass
+read_elsewhere('after rollback')
+check("Other threads never see uncommitted changes", seen['during'] == ['Wes'] and seen['after rollback'] == ['Wes'])
+with db.transaction():
+    db.add_player_manually("Alex")
+read_elsewhere('after commit')
+check("...and see them once committed", seen['after commit'] == ['Wes', 'Alex'])
+
+errors = []
+
+
+def writer(t):
+    try:
+        for i in range(20):
+            db.add_player_manually(f"T{t} P{i}")
+            db.add_constraint('avoid', f"T{t} P{i}", 'Wes')
+            with db.batch():
+                db.add_guest_manually(f"T{t} P{i}", f"T{t} G{i}")
+                db.set_player_preferences(f"T{t} P{i}", 'early')
+    except Exception as e:
+        errors.append(e)
+
+
+threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+check("Concurrent writers: every write in the cache", not errors and len(db.get_participants()) == 82
+      and len([name for name in db.get_avoidances() if name.startswith('T')]) == 80 and db.verify_state_cache() == [])
+
+print("\n📋 Consistency check")
+cached = (db.get_participants('playing'), db.get_participants('reserve'), db.get_constraints('T1 P3'))
+db.state_cache.invalidate()
+check("Reads before the cache is loaded answer the same",
+      (db.get_participants('playing'), db.get_participants('reserve'), db.get_constraints('T1 P3')) == cached
+      and db.state_cache.current() is None)
+db.state_cache.invalidate()
+with db.transaction():
+    db.add_player_manually("Ken")  # Nothing loaded to apply it to
+    db.add_constraint('avoid', 'Ken', 'Wes')
+check("Changes made while nothing was loaded are read back", db.get_participants()[-1]['name'] == 'Ken'
+      and 'Ken' in db.get_avoidances() and db.verify_state_cache() == [])
+loads = db.state_cache.stats['loads']
+with db.transaction() as conn:
+    db.add_player_manually("Lee")
+    conn.execute("UPDATE participants SET preferences = 'early' WHERE name = 'Lee'")  # Not through a Database method
+    check("Raw SQL in a transaction is read back inside it", db.get_participants()[-1]['preferences'] == 'early')
+check("...and the state reloaded for it is published with the commit", db.get_participants()[-1]['preferences'] == 'early'
+      and db.state_cache.stats['loads'] == loads + 1 and db.verify_state_cache() == [])
+other_process = sqlite3.connect(db_path)
+other_process.execute("UPDATE participants SET preferences = 'late' WHERE name = 'Wes'")
+other_process.execute("DELETE FROM manual_tee_times")
+other_process.execute("INSERT INTO manual_tee_times (tee_time) VALUES ('15:00')")
+other_process.commit()
+other_process.close()
+loads = db.state_cache.stats['loads']
+differences = db.verify_state_cache()
+check("Another process's writes found",
+      differences[:3] == ['participant Wes differs', 'manual_tee_times differ', 'tee_times differ'])
+check("...and reloaded", db.get_participants()[0]['preferences'] == 'late' and '15:00' in db.generate_tee_times()
+      and db.state_cache.stats['loads'] == loads + 1 and db.verify_state_cache() == [])
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
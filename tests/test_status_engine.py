@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Test the incremental playing/reserve engine against the full recalculation, on randomised histories"""
+
+import sys, os, random, io, contextlib
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import Database, StatusEngine, Config
+
+print("="*70)
+print(" TESTING STATUS ENGINE")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+def full_recalculation(db) -> dict:
+    """The allocation rule applied from scratch: every player in signup order, a block plays if it still fits"""
+    capacity = len(db.generate_tee_times()) * Config.MAX_GROUP_SIZE
+    spots, statuses = 0, {}
+    for p in db.get_participants():
+        block = 1 + len(p['guests'])
+        statuses[p['name']] = 'playing' if spots + block <= capacity else 'reserve'
+        if statuses[p['name']] == 'playing':
+            spots += block
+    return statuses
+
+
+def expected_changes(before: dict, after: dict) -> dict:
+    """What a recalculation reports: new players are stored as playing until settled"""
+    return {'promoted': [n for n in after if after[n] == 'playing' and before.get(n, 'playing') == 'reserve'],
+            'demoted': [n for n in after if after[n] == 'reserve' and before.get(n, 'playing') == 'playing']}
+
+
+print("\n📋 Engine on its own")
+engine = StatusEngine()
+engine.load([(f"P{i}", 'playing', 1) for i in range(40)])
+engine.settle(20)
+checked = engine.stats['checked']
+engine.added("Late", 2)
+changes = engine.settle(20)
+check("Appending re-checks only the new player", changes == [('reserve', 'Late')] and engine.stats['checked'] == checked + 1)
+engine.removed("P5")
+checked = engine.stats['checked']
+changes = engine.settle(20)
+check("A playing dropout promotes the first reserve that fits", changes == [('playing', 'P20')])
+check("...and stops at the playing/reserve boundary", engine.stats['checked'] - checked <= 17)
+engine.resized("P30", 3)
+checked = engine.stats['checked']
+check("A reserve's guests change nothing ahead of them", engine.settle(20) == [] and engine.stats['checked'] - checked <= 10)
+check("Capacity change re-checks everyone", engine.settle(30)[:2] == [('playing', 'P21'), ('playing', 'P22')])
+check("Nothing to do when nothing changed", engine.settle(30) == [])
+
+print("\n📋 Randomised histories against the full recalculation")
+db_path = "data/test_status_engine.db"
+for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(db_path + suffix):
+        os.remove(db_path + suffix)
+db = Database(db_path)
+rng = random.Random(2026)
+names = [f"Player {i}" for i in range(60)]
+mismatches = []
+report_mismatches = []
+steps = 0
+
+
+def guests_of(name):
+    return next((p['guests'] for p in db.get_participants() if p['name'] == name), [])
+
+
+def step(kind):
+    """One random change; returns the {'promoted', 'demoted'} it reported, if it reports one"""
+    players = [p['name'] for p in db.get_participants()]
+    if kind == 'add':
+        guests = [f"Guest {rng.randint(0, 99)}" for _ in range(rng.choice([0, 0, 0, 1, 2, 3]))]
+        db.add_player_manually(rng.choice(names), guests=guests)
+    elif kind == 'remove' and players:
+        return db.remove_player_manually(rng.choice(players))
+    elif kind == 'guest_add' and players:
+        return db.add_guest_manually(rng.choice(players), f"Guest {rng.randint(0, 99)}")
+    elif kind == 'guest_remove' and players:
+        host = rng.choice(players)
+        guests = guests_of(host)
+        if guests:
+            return db.remove_guest_manually(rng.choice(guests), host if rng.random() < 0.5 else None)
+    elif kind == 'tee_times':
+        choice = rng.random()
+        if choice < 0.4:
+            db.set_tee_time_settings('08:00', 8, rng.randint(1, 6))
+        elif choice < 0.7:
+            db.add_manual_tee_time(f"{rng.randint(9, 14):02d}:00")
+        elif choice < 0.9:
+            times = db.generate_tee_times()
+            if times:
+                db.remove_manual_tee_time(rng.choice(times))
+        else:
+            db.clear_manual_tee_times()
+        return db.recalculate_statuses()
+    elif kind == 'analysis':
+        keep = [p for p in db.get_participants() if rng.random() < 0.8]
+        new = [{'name': n, 'guests': [], 'preferences': None} for n in rng.sample(names, 3)]
+        return db.update_participants([{'name': p['name'], 'guests': p['guests']} for p in keep] + new)
+    elif kind == 'batch':
+        with db.batch() as outcome:
+            for _ in range(rng.randint(2, 6)):
+                step(rng.choice(['add', 'remove', 'guest_add', 'guest_remove']))
+        return outcome
+    elif kind == 'rollback':
+        try:
+            with db.batch():
+                step('add')
+                step('remove')
+                raise RuntimeError("command failed")
+        except RuntimeError:
+            pass
+    elif kind == 'clear':
+        db.clear_participants()
+    return None
+
+
+kinds = ['add'] * 6 + ['remove'] * 3 + ['guest_add'] * 2 + ['guest_remove'] * 2 + ['tee_times', 'analysis', 'batch', 'rollback']
+with contextlib.redirect_stdout(io.StringIO()):
+    db.set_tee_time_settings('08:00', 8, 3)
+    for history in range(12):
+        for _ in range(60):
+            kind = rng.choice(kinds) if rng.random() > 0.005 else 'clear'
+            before = {p['name']: p['status'] for p in db.get_participants()}
+            reported = step(kind)
+            after = {p['name']: p['status'] for p in db.get_participants()}
+            steps += 1
+            if after != full_recalculation(db):
+                mismatches.append((history, kind))
+            if reported is not None:
+                # A full analysis re-inserts everyone, stored as playing until settled
+                expected = expected_changes({} if kind == 'analysis' else before, after)
+                if any(reported[key] != expected[key] for key in ('promoted', 'demoted') if key in reported):
+                    report_mismatches.append((history, kind, reported, expected))
+        db.clear_participants()
+
+check(f"Statuses match the full recalculation after all {steps} random changes", not mismatches)
+if mismatches:
+    print(f"   First mismatches: {mismatches[:5]}")
+check("Reported promotions and demotions match", not report_mismatches)
+if report_mismatches:
+    print(f"   First mismatches: {report_mismatches[:3]}")
+stats = db.status_engine.stats
+print(f"   {stats['loads']} loads, {stats['settles']} settles, {stats['checked']} entries re-checked")
+check("Incremental: far fewer entries re-checked than a rescan per change",
+      stats['loads'] < steps / 2 and stats['checked'] < stats['settles'] * 10)
+
+print("\n📋 Consistency after failures")
+db.add_player_manually("Wes")
+conn = db._connect()
+conn.execute("DELETE FROM participants WHERE name = 'Wes'")
+del conn  # Dropped without committing - rolled back
+check("Uncommitted write dropped, engine reloaded", db.status_engine.loaded is False
+      and [p['name'] for p in db.get_participants()] == ['Wes'])
+db.recalculate_statuses()
+check("Reloaded with one query", db.status_engine.loaded and full_recalculation(db) == {'Wes': 'playing'})
+
+db.close()
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
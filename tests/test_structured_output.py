@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Test schema validation of tool-use replies and StructuredCaller's one repair turn with a fake API client"""
+
+import sys, os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import (validate_schema, StructuredCaller, LLMGateway, ANALYSIS_SCHEMA,
+                                      INCREMENTAL_SCHEMA, AIAnalyzer)
+
+print("="*70)
+print(" TESTING STRUCTURED OUTPUT")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+class FakeClient:
+    """Answers with the queued replies in turn and keeps each request's messages"""
+    def __init__(self, *replies):
+        self.messages = self
+        self.replies = list(replies)
+        self.requests = []
+
+    def create(self, timeout=None, **kwargs):
+        self.requests.append(kwargs)
+        reply = self.replies.pop(0)
+        content = [SimpleNamespace(type='text', text=reply)] if isinstance(reply, str) else \
+            [SimpleNamespace(type='tool_use', id=f"toolu_{len(self.requests)}", name='record_signups', input=reply)]
+        return SimpleNamespace(content=content, usage=SimpleNamespace(input_tokens=900, output_tokens=150))
+
+
+def caller(*replies):
+    return StructuredCaller(LLMGateway(FakeClient(*replies), max_retries=0))
+
+
+def call(structured):
+    return structured.call(AIAnalyzer.ANALYSIS_MODEL, 1000, "system", "MESSAGES: ...", 'record_signups', ANALYSIS_SCHEMA)
+
+
+valid = {'players': [{'name': 'Wes', 'guests': ['Tom'], 'preferences': None}], 'pairings': [['Wes', 'Dave']],
+         'total_count': 2, 'confidence': 'high'}
+
+print("\n📋 validate_schema")
+check("A valid reply has no errors", validate_schema(valid, ANALYSIS_SCHEMA) == [])
+check("Missing required field named", validate_schema({'players': [], 'pairings': []}, ANALYSIS_SCHEMA)
+      == ["$: missing required field 'total_count'"])
+check("Wrong type named with its path", validate_schema({**valid, 'players': [{'name': 7}]}, ANALYSIS_SCHEMA)
+      == ["$.players[0].name: expected string, got int"])
+check("A bool isn't an integer", validate_schema({**valid, 'total_count': True}, ANALYSIS_SCHEMA)
+      == ["$.total_count: expected integer, got bool"])
+check("Enum checked", validate_schema({**valid, 'confidence': 'sure'}, ANALYSIS_SCHEMA)
+      == ["$.confidence: 'sure' is not one of ['high', 'medium', 'low']"])
+check("Blank names rejected", validate_schema({**valid, 'players': [{'name': '  '}]}, ANALYSIS_SCHEMA)
+      == ["$.players[0].name: must not be empty"])
+check("Pairings must be exactly two names", validate_schema({**valid, 'pairings': [['Wes'], ['A', 'B', 'C']]}, ANALYSIS_SCHEMA)
+      == ["$.pairings[0]: needs at least 2 items", "$.pairings[1]: allows at most 2 items"])
+check("Nullable fields accept null only alongside their type",
+      validate_schema({**AIAnalyzer.empty_patch(), 'preferences': [{'name': 'Wes', 'preferences': None}]}, INCREMENTAL_SCHEMA) == []
+      and validate_schema({**AIAnalyzer.empty_patch(), 'preferences': [{'name': 'Wes', 'preferences': 3}]}, INCREMENTAL_SCHEMA)
+      == ["$.preferences[0].preferences: expected string or null, got int"])
+check("Not an object at all", validate_schema(None, ANALYSIS_SCHEMA) == ["$: expected object, got NoneType"])
+
+print("\n📋 Valid first time")
+structured = caller(valid)
+result, usage = call(structured)
+request = structured.gateway.client.requests[0]
+check("Result and usage returned without a repair", result == valid and usage == {'input_tokens': 900, 'output_tokens': 150}
+      and structured.stats == {'calls': 1, 'parse_failures': 0, 'repairs': 0, 'repair_failures': 0})
+check("The tool is forced and carries the schema", request['tool_choice'] == {'type': 'tool', 'name': 'record_signups'}
+      and request['tools'][0]['input_schema'] is ANALYSIS_SCHEMA)
+
+print("\n📋 One repair turn")
+structured = caller({'players': [{'name': 'Wes'}], 'pairings': []}, valid)
+result, usage = call(structured)
+repair = structured.gateway.client.requests[1]['messages']
+turn = repair[2]['content'][0]
+check("An invalid reply is repaired", result == valid
+      and structured.stats == {'calls': 1, 'parse_failures': 1, 'repairs': 1, 'repair_failures': 0})
+check("The repair turn answers the tool call with the exact errors", len(repair) == 3 and repair[1]['role'] == 'assistant'
+      and turn['type'] == 'tool_result' and turn['tool_use_id'] == 'toolu_1' and turn['is_error']
+      and "$: missing required field 'total_count'" in turn['content'])
+check("Usage covers both calls", usage == {'input_tokens': 1800, 'output_tokens': 300})
+
+structured = caller("Here are the players: Wes", valid)
+result, _ = call(structured)
+repair = structured.gateway.client.requests[1]['messages']
+check("A reply without the tool call is asked to call it", result == valid
+      and repair[2]['content'] == "You must respond by calling the record_signups tool with the complete result.")
+
+print("\n📋 Only once")
+structured = caller({'players': []}, {'players': [], 'pairings': 'none'})
+try:
+    call(structured)
+    raised = None
+except ValueError as e:
+    raised = str(e)
+check("A second invalid reply raises ValueError", raised is not None and "still invalid after repair" in raised
+      and "$.pairings: expected array, got str" in raised)
+check("...after exactly one repair turn", len(structured.gateway.client.requests) == 2
+      and structured.stats == {'calls': 1, 'parse_failures': 1, 'repairs': 0, 'repair_failures': 1})
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Test the token ledger (recording, weekly spend, budget stages and what each stage pauses) - no API needed"""
+
+import sys, os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import (TokenLedger, LLMGateway, AIAnalyzer, AdminCommandHandler, SwindleBot,
+                                      BudgetExceededError, Config, Database)
+
+print("="*70)
+print(" TESTING TOKEN LEDGER")
+print("="*70)
+
+passed = 0
+failed = 0
+
+
+def check(description, ok):
+    global passed, failed
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+
+class FakeClient:
+    """Answers whatever tool is forced with `answer`, with fixed usage; remembers the models asked for"""
+    def __init__(self, answer=None):
+        self.messages = self
+        self.answer = answer or {}
+        self.models = []
+
+    def create(self, timeout=None, **kwargs):
+        self.models.append(kwargs['model'])
+        tool = kwargs['tool_choice']['name']
+        return SimpleNamespace(content=[SimpleNamespace(type='tool_use', id='toolu_1', name=tool, input=self.answer)],
+                               usage=SimpleNamespace(input_tokens=1000, output_tokens=200,
+                                                     cache_read_input_tokens=10000, cache_creation_input_tokens=None))
+
+
+def spend(db, cost, when=None):
+    """Put a call of the given cost in the ledger"""
+    db.record_llm_call({'created_at': (when or datetime.now()).strftime("%Y-%m-%d %H:%M:%S"), 'lane': 'analysis',
+                        'purpose': 'record_signups', 'model': AIAnalyzer.ANALYSIS_MODEL, 'input_tokens': 0,
+                        'output_tokens': 0, 'cache_read_tokens': 0, 'cache_write_tokens': 0, 'seconds': 1.0,
+                        'cost': cost})
+
+
+db_path = "data/test_token_ledger.db"
+if os.path.exists(db_path):
+    os.remove(db_path)
+db = Database(db_path)
+
+print("\n📋 Recording")
+ledger = TokenLedger(db, weekly_budget=1.0)
+gateway = LLMGateway(FakeClient(), ledger=ledger, lane='commands')
+gateway.create('record_command', model=AIAnalyzer.FAST_MODEL, max_tokens=10, messages=[],
+               tool_choice={'type': 'tool', 'name': 'record_command'})
+rows = db.get_llm_usage(ledger.week_start(), 'lane')
+expected = (1000 * 1.00 + 200 * 5.00 + 10000 * 1.00 * 0.1) / 1_000_000
+check("Every response written with lane and tokens", len(rows) == 1 and rows[0]['key'] == 'commands'
+      and rows[0]['input_tokens'] == 1000 and rows[0]['cache_read_tokens'] == 10000)
+check("Cost includes cache reads", abs(rows[0]['cost'] - expected) < 1e-12 and abs(ledger.week_spend() - expected) < 1e-12)
+monday = datetime.strptime(TokenLedger.week_start(datetime(2026, 2, 15, 23, 59)), "%Y-%m-%d %H:%M:%S")
+check("Weeks start Monday 00:00", monday == datetime(2026, 2, 9))
+spend(db, 5.0, datetime.now() - timedelta(days=7))
+check("Last week's calls don't count", abs(TokenLedger(db, 1.0).week_spend() - expected) < 1e-12)
+
+print("\n📋 Budget stages")
+ledger = TokenLedger(db, weekly_budget=1.0)
+stages = []
+for cost in (0.5, 0.1, 0.2, 0.1):
+    spend(db, cost)
+    ledger._week = None  # Re-read the spend from the table
+    stages.append(ledger.stage())
+check("Stages follow the share spent", stages == ['normal', 'slow', 'local', 'fast'])
+check("Shadow and command lanes paused, analysis not",
+      not ledger.allows('shadow') and not ledger.allows('commands') and ledger.allows('analysis'))
+check("Slower main group checks", ledger.interval_factor(3) == 3 and TokenLedger().interval_factor(3) == 1)
+check("No budget = record only", TokenLedger(db, 0).stage() == 'normal')
+
+print("\n📋 What each stage pauses")
+handler = AdminCommandHandler(None, ledger=ledger)
+client = FakeClient({'command': 'add_player', 'confidence': 'high', 'params': {}})
+handler.gateway.client = client
+local = handler.parse_command("Add Wes", "Rick", [])
+fuzzy = handler.parse_command("could you pop wes down for sunday", "Rick", [])
+check("Commands still parsed locally", local['command'] == 'add_player')
+check("AI command parse skipped, reply says why", not client.models and fuzzy.get('ai_unavailable') and fuzzy.get('over_budget'))
+try:
+    handler.gateway.create('record_command', model=AIAnalyzer.FAST_MODEL, max_tokens=10, messages=[])
+    check("Gateway refuses paused lanes", False)
+except BudgetExceededError:
+    check("Gateway refuses paused lanes", handler.gateway.stats['over_budget'] == 2)
+
+ai = AIAnalyzer(None, db, ledger=ledger)
+client = FakeClient({'players': [{'name': 'Wes', 'guests': []}, {'name': 'Nobody'}], 'pairings': [], 'total_count': 2,
+                     'confidence': 'low'})
+ai.gateway.client = client
+Config.AI_CASCADE = True
+Config.ANALYSIS_CHUNK_MESSAGES = 500
+window = [{'sender': 'Rick', 'text': 'Now taking names for Sunday', 'timestamp': '[08:00, 15/02/2026] Rick: '},
+          {'sender': 'Wes', 'text': 'Please', 'timestamp': '[08:01, 15/02/2026] Wes: '}]
+result = ai.analyze_messages(window)
+check("Fast tier's answer stands - no escalation", client.models == [AIAnalyzer.FAST_MODEL] and result is not None
+      and ai.cascade_stats['reasons'].get('budget') == 1)
+ai._cached_call('delta', AIAnalyzer.ANALYSIS_MODEL, 100, "system", "other", 'record_signups', {'type': 'object'})
+check("Every analysis call on the fast model", client.models[-1] == AIAnalyzer.FAST_MODEL)
+
+print("\n📋 Call types")
+calls = TokenLedger(db)
+ai = AIAnalyzer(None, db, ledger=calls)
+ai.gateway.client = FakeClient({'add': [], 'remove': [], 'guest_add': [], 'guest_remove': [], 'preferences': [],
+                                'pairings': []})
+ai.analyze_incremental([{'name': 'Wes'}], [], window[1:])
+ai._cached_call('delta', AIAnalyzer.ANALYSIS_MODEL, 100, "system", "delta call", 'record_delta', {'type': 'object'})
+handler = AdminCommandHandler(None, ledger=calls)
+handler.gateway.client = FakeClient({'command': 'add_player', 'confidence': 'high', 'params': {}})
+handler.parse_command("could you pop wes down for sunday", "Rick", [])
+purposes = [row['key'] for row in db.get_llm_usage(calls.week_start(), 'purpose')]
+check("Ledger records the call type, not the tool name", {'incremental', 'delta', 'command'} <= set(purposes)
+      and not {'record_patch', 'record_delta'} & set(purposes))
+check("Latency kept per call type", set(ai.gateway.latency_summary()) == {'incremental', 'delta'}
+      and set(handler.gateway.latency_summary()) == {'command'})
+
+print("\n📋 Admin notices and report")
+sent = []
+bot = SimpleNamespace(db=db, ledger=ledger, _budget_stage='normal', config=Config, send_to_admin_group=sent.append,
+                      BUDGET_NOTICES=SwindleBot.BUDGET_NOTICES)
+SwindleBot._check_ai_budget(bot)
+SwindleBot._check_ai_budget(bot)
+check("Admins told once per stage change", len(sent) == 1 and 'cheaper model' in sent[0])
+report = SwindleBot.generate_usage_report(bot)
+check("Usage report has spend, budget and breakdowns", 'of $1.00' in report and AIAnalyzer.FAST_MODEL in report
+      and 'record_command' in report and 'Last week: $5.00' in report)
+os.remove(db_path)
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Test transcript compaction on the recorded scrape (fresh_messages.txt) - no API or Chrome needed"""
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.swindle_bot_v5_admin import parse_recorded_transcript, compact_transcript, AIAnalyzer
+
+print("="*70)
+print(" TESTING TRANSCRIPT COMPACTION")
+print("="*70)
+
+with open(os.path.join(os.path.dirname(__file__), '..', 'fresh_messages.txt')) as f:
+    recorded = parse_recorded_transcript(f.read())
+
+compacted, stats = compact_transcript(recorded)
+by_sender = {}
+for msg in compacted:
+    by_sender.setdefault(msg['sender'], []).append(msg['text'])
+
+print(f"\nRecorded: {stats['messages_before']} messages, ~{stats['tokens_before']} tokens")
+print(f"Compacted: {stats['messages_after']} messages, ~{stats['tokens_after']} tokens")
+print(f"Quotes stripped: {stats['quotes_stripped']}, noise dropped: {stats['noise_dropped']}, merged: {stats['merged']}\n")
+
+
+def msg(sender, text, hhmm, quoted=None):
+    m = {'sender': sender, 'text': text, 'is_outgoing': False, 'timestamp': f"[{hhmm}, 16/02/2026] {sender}: "}
+    if quoted:
+        m['quoted'] = quoted
+    return m
+
+
+merged, merge_stats = compact_transcript([
+    msg('Wes', 'In please', '08:00'),
+    msg('Wes', 'Early if poss', '08:02'),
+    msg('Wes', 'Actually make it late', '08:30'),
+])
+noise, noise_stats = compact_transcript([
+    msg('Paul', '👍', '08:00'),
+    msg('Adam', '😂😂', '08:01'),
+    msg('Sam', 'This message was deleted', '08:02'),
+    msg('Ed', '+1 please 🙏', '08:03'),
+])
+dom, _ = compact_transcript([
+    msg('Ricky', 'Now taking names for Sunday', '08:00'),
+    msg('Alex', 'Ricky\nNow taking names for Sunday\nMe please', '08:05', quoted='Ricky\nNow taking names for Sunday'),
+])
+
+# The organizer's last message before "taking names" is close enough to be merged with it
+analyzer = AIAnalyzer(None)
+prompts = []
+analyzer._cached_call = lambda purpose, model, max_tokens, system_prompt, user_prompt, tool_name, schema: (
+    prompts.append(user_prompt) or {'players': [{'name': 'Wes', 'guests': []}], 'pairings': [], 'total_count': 1})
+analyzer.analyze_messages([
+    msg('Ricky', 'Bob is in for the medal', '10:00'),
+    msg('Ricky', 'Now taking names for Sunday', '10:01'),
+    msg('Wes', 'In please', '10:05'),
+])
+
+tests = [
+    ("Recorded transcript parsed (multiline + missing timestamp)",
+     len(recorded) == 90 and recorded[-1]['sender'] == 'Paul' and recorded[-1]['timestamp'] == ''),
+    ("Token count reduced", stats['tokens_after'] < stats['tokens_before']),
+    ("No phone-number lines left in resolved quotes",
+     not any('+44 7781' in t or '+44 7932' in t for texts in by_sender.values() for t in texts)),
+    ("KennyD's quote of Maice stripped to his own words",
+     by_sender.get('KennyD') == ['I got the 8.16 tee time as well Rick']),
+    ("Quote of a reply matched on its own words (Ricky -> Lewis.S)",
+     any(t.startswith('Just let me know mate') for t in by_sender['Ricky Parkhurst'])),
+    ("Quote of organizer message keeps only the signup", 'Please' in by_sender['.']),
+    ("Organizer message kept", any('now taking names' in t.lower() for t in by_sender['Ricky Parkhurst'])),
+    ("GIF quote stripped", "I’m going back to my red" in by_sender['Paul']),
+    ("Pure quote with no reply text dropped", not any(t == '.' for t in by_sender.get('Scotty', []))),
+    ("Every signup sender still present",
+     all(s in by_sender for s in ['Wes', 'Dave Walker', 'Alex', 'Paul', 'Maice Browne', 'Blaine', 'Ed', 'Leon (Thameside)'])),
+    ("Short same-sender burst merged, later message kept separate",
+     [m['text'] for m in merged] == ['In please\nEarly if poss', 'Actually make it late'] and merge_stats['merged'] == 1),
+    ("Emoji-only and deleted messages dropped, emoji stripped from text",
+     [m['text'] for m in noise] == ['+1 please'] and noise_stats['noise_dropped'] == 3),
+    ("DOM quote container used to strip the quote", dom[-1]['text'] == 'Me please'),
+    ("Compacted transcript still finds the organizer message",
+     AIAnalyzer(None).find_organizer_index(compacted) >= 0),
+    ("Signup window cut before compaction - the message before the organizer's post stays out",
+     len(prompts) == 1 and 'Bob is in' not in prompts[0] and 'Now taking names' in prompts[0]
+     and [m['text'] for m in analyzer.last_window] == ['Now taking names for Sunday', 'In please']),
+]
+
+passed = 0
+failed = 0
+for description, ok in tests:
+    if ok:
+        print(f"✅ {description}")
+        passed += 1
+    else:
+        print(f"❌ {description}")
+        failed += 1
+
+print("\n" + "="*70)
+print(f"Results: {passed} passed, {failed} failed")
+print("="*70)